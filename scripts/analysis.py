@@ -2,6 +2,7 @@
 
 import json
 import os
+import sys
 import pandas as pd
 from pathlib import Path
 from collections import defaultdict
@@ -10,6 +11,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from results_store import load_metrics_folders
+
 class SystemAnalyzer:
     def __init__(self, base_path: str = "./files", output_dir: str = "./analysis_results", tolerance_levels: List[float] = None):
         self.base_path = Path(base_path)
@@ -313,9 +317,8 @@ class SystemAnalyzer:
                     self.scenarios.append(scenario_dir.name)
                     
                     # Check available systems for this scenario
-                    metrics_dir = standard_metrics
-                    for system_file in metrics_dir.glob("*.json"):
-                        system_name = system_file.stem
+                    loaded = load_metrics_folders([standard_metrics])
+                    for system_name in loaded[standard_metrics]:
                         if system_name == "snowflake" and not self.include_snowflake:
                             pass  # or 'return' / 'continue' depending on context
                         elif system_name == "bigquery" and not self.include_bigquery:
@@ -331,25 +334,19 @@ class SystemAnalyzer:
         print(f"Found systems: {self.systems}")
         
     def load_data(self):
-        """Load all metrics data from JSON files"""
+        """Load all metrics data through the results store"""
         self.data = defaultdict(lambda: defaultdict(dict))
         
-        for scenario in self.scenarios:
-            # if scenario in ["ecomm", "medical", "mmqa"]:
-            #     continue
-            
-            # Use different metrics directory for mmqa
-            metrics_dir = self.base_path / scenario / "metrics" / "across_system_2.5flash"
-            
+        metrics_dirs = {
+            scenario: self.base_path / scenario / "metrics" / "across_system_2.5flash"
+            for scenario in self.scenarios
+        }
+        loaded = load_metrics_folders(metrics_dirs.values())
+        
+        for scenario, metrics_dir in metrics_dirs.items():
             for system in self.systems:
-                json_file = metrics_dir / f"{system}.json"
-                if json_file.exists():
-                    try:
-                        with open(json_file, 'r') as f:
-                            system_data = json.load(f)
-                            self.data[scenario][system] = system_data
-                    except Exception as e:
-                        print(f"Error loading {json_file}: {e}")
+                if system in loaded[metrics_dir]:
+                    self.data[scenario][system] = loaded[metrics_dir][system]
         
         print(f"Loaded data for {len(self.data)} scenarios")
         
@@ -418,21 +415,21 @@ class SystemAnalyzer:
                 # Execution time (lower is better)
                 if query_metrics:
                     min_time = min(metrics[0] for metrics in query_metrics.values())
-                    time_winners = [sys for sys, metrics in query_metrics.items() if metrics[0] == min_time]
+                    time_winners = [system_name for system_name, metrics in query_metrics.items() if metrics[0] == min_time]
                     for winner in time_winners:
                         results[scenario]['execution_time'][winner] += 1 / len(time_winners)
                 
                 # Money cost (lower is better)
                 if query_metrics:
                     min_cost = min(metrics[1] for metrics in query_metrics.values())
-                    cost_winners = [sys for sys, metrics in query_metrics.items() if metrics[1] == min_cost]
+                    cost_winners = [system_name for system_name, metrics in query_metrics.items() if metrics[1] == min_cost]
                     for winner in cost_winners:
                         results[scenario]['money_cost'][winner] += 1 / len(cost_winners)
                 
                 # Quality (higher is better)
                 if query_metrics:
                     max_quality = max(metrics[2] for metrics in query_metrics.values())
-                    quality_winners = [sys for sys, metrics in query_metrics.items() if metrics[2] == max_quality]
+                    quality_winners = [system_name for system_name, metrics in query_metrics.items() if metrics[2] == max_quality]
                     for winner in quality_winners:
                         results[scenario]['quality'][winner] += 1 / len(quality_winners)
         
@@ -541,21 +538,21 @@ class SystemAnalyzer:
                     # Execution time (lower is better)
                     if query_metrics:
                         min_time = min(metrics[0] for metrics in query_metrics.values())
-                        time_winners = [sys for sys, metrics in query_metrics.items() if metrics[0] == min_time]
+                        time_winners = [system_name for system_name, metrics in query_metrics.items() if metrics[0] == min_time]
                         for winner in time_winners:
                             results[operator_type]['execution_time'][winner] += 1 / len(time_winners)
                     
                     # Money cost (lower is better)
                     if query_metrics:
                         min_cost = min(metrics[1] for metrics in query_metrics.values())
-                        cost_winners = [sys for sys, metrics in query_metrics.items() if metrics[1] == min_cost]
+                        cost_winners = [system_name for system_name, metrics in query_metrics.items() if metrics[1] == min_cost]
                         for winner in cost_winners:
                             results[operator_type]['money_cost'][winner] += 1 / len(cost_winners)
                     
                     # Quality (higher is better)
                     if query_metrics:
                         max_quality = max(metrics[2] for metrics in query_metrics.values())
-                        quality_winners = [sys for sys, metrics in query_metrics.items() if metrics[2] == max_quality]
+                        quality_winners = [system_name for system_name, metrics in query_metrics.items() if metrics[2] == max_quality]
                         for winner in quality_winners:
                             results[operator_type]['quality'][winner] += 1 / len(quality_winners)
         
@@ -861,9 +858,9 @@ class SystemAnalyzer:
                         query_counts['execution_time'] += 1
                         for tolerance in metric_tolerances['execution_time']:
                             time_winners = []
-                            for sys, metrics in query_metrics.items():
+                            for system_name, metrics in query_metrics.items():
                                 if self._is_winner_with_tolerance(metrics[0], min_time, tolerance, 'lower', 'relative'):
-                                    time_winners.append(sys)
+                                    time_winners.append(system_name)
 
                             for winner in time_winners:
                                 tolerance_results['execution_time'][tolerance][winner] += 1
@@ -876,9 +873,9 @@ class SystemAnalyzer:
                         query_counts['money_cost'] += 1
                         for tolerance in metric_tolerances['money_cost']:
                             cost_winners = []
-                            for sys, metrics in query_metrics.items():
+                            for system_name, metrics in query_metrics.items():
                                 if self._is_winner_with_tolerance(metrics[1], min_cost, tolerance, 'lower', 'relative'):
-                                    cost_winners.append(sys)
+                                    cost_winners.append(system_name)
 
                             for winner in cost_winners:
                                 tolerance_results['money_cost'][tolerance][winner] += 1
@@ -891,9 +888,9 @@ class SystemAnalyzer:
                         query_counts['quality'] += 1
                         for tolerance in metric_tolerances['quality']:
                             quality_winners = []
-                            for sys, metrics in query_metrics.items():
+                            for system_name, metrics in query_metrics.items():
                                 if self._is_winner_with_tolerance(metrics[2], max_quality, tolerance, 'higher', 'absolute'):
-                                    quality_winners.append(sys)
+                                    quality_winners.append(system_name)
 
                             for winner in quality_winners:
                                 tolerance_results['quality'][tolerance][winner] += 1
@@ -1079,7 +1076,7 @@ class SystemAnalyzer:
                     if metric in tolerance_ranges:
                         print(f"  {metric}: {[round(x, 3) for x in tolerance_ranges[metric][:10]]}{'...' if len(tolerance_ranges[metric]) > 10 else ''}")
                         if metric in convergence_tolerances:
-                            convergences = {sys: round(tol, 3) for sys, tol in convergence_tolerances[metric].items()}
+                            convergences = {system_name: round(tol, 3) for system_name, tol in convergence_tolerances[metric].items()}
                             print(f"    Convergence points: {convergences}")
                             if convergence_criterion == "first_system":
                                 first_convergence = min(convergence_tolerances[metric].values())
@@ -58,12 +58,13 @@ run_single() {
 
     echo -e "${GREEN}=== Round ${round_num}/${NUM_ROUNDS} | Use case: ${use_case} | System: ${system} ===${NC}"
     echo "Running:"
-    echo "  python3 src/run.py --systems ${system} --use-cases ${use_case} --queries ${QUERIES[*]}"
+    echo "  python3 src/run.py --systems ${system} --use-cases ${use_case} --queries ${QUERIES[*]} --repeat ${round_num}"
 
     python3 src/run.py \
         --systems "${system}" \
         --use-cases "${use_case}" \
-        --queries "${QUERIES[@]}"
+        --queries "${QUERIES[@]}" \
+        --repeat "${round_num}"
 
     if [[ $? -eq 0 ]]; then
         echo -e "${GREEN}✓ Completed ${system} on ${use_case}${NC}"
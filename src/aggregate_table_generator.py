@@ -10,7 +10,6 @@ LaTeX tables with:
 Created by combining existing modules and enhancing functionality.
 """
 
-import json
 import numpy as np
 import pandas as pd
 from pathlib import Path
@@ -19,6 +18,8 @@ from typing import Dict, Any, List, Tuple
 from matplotlib import colors
 from natsort import natsorted
 
+from results_store import load_metrics_folders
+
 
 class AggregateTableGenerator:
     def __init__(self, base_path: str = "./files", only_common_queries: bool = True, use_repeat_folders: bool = False):
@@ -178,11 +179,8 @@ class AggregateTableGenerator:
                     self.repeat_dirs[scenario_dir.name] = repeat_dirs
 
                     # Check available systems from first repeat dir
-                    for system_file in repeat_dirs[0].glob("*.json"):
-                        system_name = system_file.stem
-                        # Skip memory files
-                        if "_memory" in system_name:
-                            continue
+                    first_repeat = load_metrics_folders([repeat_dirs[0]])
+                    for system_name in first_repeat[repeat_dirs[0]]:
                         if system_name == "snowflake" and not self.include_snowflake:
                             pass
                         elif system_name == "bigquery" and not self.include_bigquery:
@@ -199,7 +197,7 @@ class AggregateTableGenerator:
             print(f"  {scenario}: {len(dirs)} repeat(s)")
 
     def load_data(self, model_tag="2.5flash"):
-        """Load all metrics data from JSON files and average across repeats.
+        """Load all metrics data through the results store and average across repeats.
 
         For each query, averages execution_time, money_cost, and quality metrics
         across all available repeats. Only includes repeats where all three metrics
@@ -211,19 +209,15 @@ class AggregateTableGenerator:
             repeat_dirs = self.repeat_dirs.get(scenario, [])
             if not repeat_dirs:
                 continue
+            loaded = load_metrics_folders(repeat_dirs)
 
             for system in self.systems:
                 # Collect data from all repeats
-                all_repeats_data = []
-                for repeat_dir in repeat_dirs:
-                    json_file = repeat_dir / f"{system}.json"
-                    if json_file.exists():
-                        try:
-                            with open(json_file, 'r') as f:
-                                repeat_data = json.load(f)
-                                all_repeats_data.append(repeat_data)
-                        except Exception as e:
-                            print(f"Error loading {json_file}: {e}")
+                all_repeats_data = [
+                    loaded[repeat_dir][system]
+                    for repeat_dir in repeat_dirs
+                    if system in loaded[repeat_dir]
+                ]
 
                 if not all_repeats_data:
                     continue
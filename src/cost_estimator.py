@@ -0,0 +1,575 @@
+"""
+Pre-run estimate of the tokens, dollars and wall time of a benchmark run.
+
+A full run at a large scale factor (animals at 1600, cars at 157376) can cost
+more than intended and take hours. run.py --estimate runs the selected
+systems and queries at two small sample scale factors instead, generated by
+the use case's own data generator, with every LLM call answered by an
+in-process llm_replay stub server. Nothing is spent: the server counts the
+input tokens of each request offline and attributes them to the operator
+that issued it:
+
+    text    tiktoken's o200k_base encoding if installed, else 4 characters
+            per token
+    images  Gemini's tiling rule on the decoded image size (media_cache)
+    audio   32 tokens per second of decoded WAV audio, other formats are
+            timed at 128 kbit/s
+
+Per operator, calls and tokens are fitted to a power law of the scale factor
+through the two samples (a filter grows linearly, a nested-loop join
+quadratically) and extrapolated to the target scale factor. Dollars use the
+prices of src/models.toml, with a fixed number of output tokens per call as
+stub answers say nothing about real output lengths. Wall time assumes every
+operator issues its calls in waves of concurrent_llm_worker calls of a given
+latency, plus the engine overhead measured in the samples.
+
+Selectivity: the stub answers a filter's request for a row "True" or
+"False", so the rows a filter passes on to later operators (maps, joins,
+further filters) are set by the stub, not by the data. By default every
+answer is "True" (selectivity 1): every filter passes all rows, and the
+projection of the operators after a filter is an upper bound, which is the
+safe side for --budget. run.py --estimate-selectivity answers that fraction
+of the requests "True" (chosen by a hash of the request, so reruns answer
+alike) for a closer projection of selective queries. The estimate
+reports the selectivity it assumed.
+
+With --budget, whatever the estimate cannot price counts as over budget: a
+model without a price in models.toml, a system without sample metrics and a
+query whose sample runs failed or are missing.
+
+Sample runs write to files/<use case>/estimates/sf_<sample>/ (raw results
+and metrics), never to the regular metrics or the results store. Estimates
+are written to files/<use case>/estimates/<system>_sf<target>.json.
+
+Usage:
+    python src/run.py --systems lotus --use-cases animals --scale-factor 1600 \\
+        --estimate
+    python src/run.py --systems lotus --use-cases cars --scale-factor 157376 \\
+        --budget 50  # estimate first, run only if within $50
+"""
+
+import base64
+import binascii
+import io
+import json
+import math
+import wave
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from media_cache import AUDIO_TOKENS_PER_SECOND, image_tokens
+
+# Set for the sample runs; GenericRunner then writes below ESTIMATES_DIR
+ESTIMATE_ENV = "SEMBENCH_ESTIMATE"
+ESTIMATES_DIR = "estimates"
+MODELS_FILE = Path(__file__).resolve().parent / "models.toml"
+
+# Sample scale factors as fractions of the target, if not given
+DEFAULT_SAMPLE_FRACTIONS = (0.01, 0.04)
+MIN_SAMPLE_SCALE_FACTOR = 10
+DEFAULT_OUTPUT_TOKENS_PER_CALL = 20
+DEFAULT_CALL_LATENCY = 1.0
+DEFAULT_SELECTIVITY = 1.0
+# Bounds of the fitted growth exponent (constant to quadratic)
+MAX_GROWTH = 2.0
+
+TOKEN_KINDS = ("text", "image", "audio")
+# Bitrate assumed for compressed audio whose duration is not decoded
+_COMPRESSED_AUDIO_BYTES_PER_SECOND = 16000
+# Tokens of an image that cannot be decoded (Gemini's smallest image)
+_UNKNOWN_IMAGE_TOKENS = 258
+
+_encoding = None
+
+
+def sample_scale_factors(target: int) -> Tuple[int, int]:
+    """Default sample scale factors of a run at *target*."""
+    small, large = (
+        max(MIN_SAMPLE_SCALE_FACTOR, round(target * fraction))
+        for fraction in DEFAULT_SAMPLE_FRACTIONS
+    )
+    return small, max(large, small * 2)
+
+
+# ================== Token Counting ==================
+def text_tokens(text: str) -> int:
+    """Tokens of *text* (tiktoken if installed, else 4 characters each)."""
+    global _encoding
+    if not text:
+        return 0
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def _decode_base64(data: str) -> bytes:
+    try:
+        return base64.b64decode(data, validate=False)
+    except (binascii.Error, ValueError):
+        return b""
+
+
+def _image_tokens(data: bytes) -> int:
+    try:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as image:
+            return image_tokens(*image.size)
+    except Exception:
+        return _UNKNOWN_IMAGE_TOKENS
+
+
+def _audio_tokens(data: bytes) -> int:
+    try:
+        with wave.open(io.BytesIO(data), "rb") as reader:
+            seconds = reader.getnframes() / reader.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError):
+        seconds = len(data) / _COMPRESSED_AUDIO_BYTES_PER_SECOND
+    return math.ceil(seconds * AUDIO_TOKENS_PER_SECOND)
+
+
+def _media_tokens(mime_type: str, data: str) -> Tuple[str, int]:
+    raw = _decode_base64(data)
+    if mime_type.startswith("audio") or mime_type in ("wav", "mp3"):
+        return "audio", _audio_tokens(raw)
+    return "image", _image_tokens(raw)
+
+
+def count_request_tokens(body: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Input tokens of an OpenAI or Gemini request body by kind (text, image,
+    audio). Media are recognized as data URLs, OpenAI input_audio parts and
+    Gemini inline data.
+    """
+    counts = dict.fromkeys(TOKEN_KINDS, 0)
+
+    def visit(value: Any, key: str = "") -> None:
+        if isinstance(value, dict):
+            inline = value.get("inline_data") or value.get("inlineData")
+            if isinstance(inline, dict):
+                mime = inline.get("mime_type") or inline.get("mimeType") or ""
+                kind, tokens = _media_tokens(mime, inline.get("data") or "")
+                counts[kind] += tokens
+                return
+            audio = value.get("input_audio")
+            if isinstance(audio, dict):
+                kind, tokens = _media_tokens(
+                    audio.get("format") or "audio", audio.get("data") or ""
+                )
+                counts[kind] += tokens
+                return
+            for name, item in value.items():
+                visit(item, name)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item, key)
+        elif isinstance(value, str):
+            if value.startswith("data:") and ";base64," in value:
+                header, data = value.split(",", 1)
+                kind, tokens = _media_tokens(header[5:].split(";")[0], data)
+                counts[kind] += tokens
+            elif key in ("content", "text", "input", "prompt"):
+                counts["text"] += text_tokens(value)
+
+    visit(
+        body.get("messages") or body.get("contents") or body.get("input"),
+        "input",
+    )
+    visit(
+        body.get("system_instruction") or body.get("systemInstruction"),
+        "text",
+    )
+    return {kind: count for kind, count in counts.items() if count}
+
+
+# ================== Pricing ==================
+@dataclass(frozen=True)
+class Price:
+    """USD per 1M tokens (audio falls back to the input price)."""
+
+    input: float
+    output: float
+    audio: Optional[float] = None
+
+    def cost(self, tokens: Dict[str, float], output_tokens: float) -> float:
+        audio = self.audio if self.audio is not None else self.input
+        return (
+            (tokens.get("text", 0) + tokens.get("image", 0)) * self.input
+            + tokens.get("audio", 0) * audio
+            + output_tokens * self.output
+        ) / 1e6
+
+
+def load_prices(path: Path = MODELS_FILE) -> Dict[str, Price]:
+    """Prices of the models in models.toml by display name."""
+    import tomli
+
+    with open(path, "rb") as f:
+        data = tomli.load(f)
+    prices = {}
+    for model in data.get("model", []):
+        price = model.get("price") or {}
+        if "input" in price and "output" in price:
+            prices[model["display_name"]] = Price(
+                price["input"], price["output"], price.get("audio")
+            )
+    return prices
+
+
+def price_of(model: str, prices: Dict[str, Price]) -> Optional[Price]:
+    """Price of a model name as passed to run.py (provider prefix optional)."""
+    return prices.get(model) or prices.get(model.split("/", 1)[-1])
+
+
+# ================== Extrapolation ==================
+def growth_exponent(
+    small: Tuple[int, float], large: Tuple[int, float]
+) -> float:
+    """
+    Exponent b of value ~ sf^b through two (sf, value) samples, bounded to
+    [0, MAX_GROWTH]. An operator seen only in the larger sample grows
+    linearly.
+    """
+    (sf_small, small_value), (sf_large, large_value) = small, large
+    if small_value <= 0 or large_value <= 0 or sf_large == sf_small:
+        return 1.0
+    exponent = math.log(large_value / small_value) / math.log(
+        sf_large / sf_small
+    )
+    return min(MAX_GROWTH, max(0.0, exponent))
+
+
+def extrapolate(
+    small: Tuple[int, float], large: Tuple[int, float], target: int
+) -> float:
+    """Value at *target* on the power law through the two samples."""
+    sf_large, large_value = large
+    if large_value <= 0:
+        sf_large, large_value = small
+    if large_value <= 0:
+        return 0.0
+    exponent = growth_exponent(small, large)
+    return large_value * (target / sf_large) ** exponent
+
+
+@dataclass
+class OperatorEstimate:
+    """Projected calls and input tokens of one operator at the target."""
+
+    label: str
+    calls: float
+    tokens: Dict[str, float]
+    growth: float
+
+    def waves(self, concurrency: int) -> float:
+        return math.ceil(self.calls / max(1, concurrency))
+
+
+@dataclass
+class QueryEstimate:
+    """Projection of one query of one system to the target scale factor."""
+
+    query: str
+    calls: float = 0.0
+    input_tokens: float = 0.0
+    output_tokens: float = 0.0
+    tokens: Dict[str, float] = field(default_factory=dict)
+    money_cost: Optional[float] = None
+    wall_time: float = 0.0
+    operators: List[OperatorEstimate] = field(default_factory=list)
+    note: Optional[str] = None
+    # False if a sample run of the query failed or is missing; the
+    # projection then leaves out the calls the query did not make
+    complete: bool = True
+
+
+def estimate_query(
+    query: str,
+    samples: Dict[int, Dict[str, Any]],
+    target: int,
+    price: Optional[Price],
+    output_tokens_per_call: float = DEFAULT_OUTPUT_TOKENS_PER_CALL,
+    call_latency: float = DEFAULT_CALL_LATENCY,
+) -> QueryEstimate:
+    """
+    Project a query from its metric records at two sample scale factors.
+
+    Args:
+        samples: {sample scale factor: metric record}, two entries
+        price: Price of the model, None to leave the cost open
+    """
+    estimate = QueryEstimate(query)
+    (sf_small, small), (sf_large, large) = sorted(samples.items())
+    failed = [
+        sf for sf, record in samples.items()
+        if record.get("status") != "success"
+    ]
+    if failed:
+        estimate.note = f"failed at sample sf {failed[0]}"
+        estimate.complete = False
+    small_ops = small.get("llm_operator_calls") or {}
+    large_ops = large.get("llm_operator_calls") or {}
+    if not small_ops and not large_ops:
+        estimate.note = estimate.note or "no LLM calls through the endpoint"
+
+    for label in sorted(set(small_ops) | set(large_ops)):
+        ops = small_ops.get(label, {}), large_ops.get(label, {})
+        calls = extrapolate(
+            (sf_small, ops[0].get("calls", 0)),
+            (sf_large, ops[1].get("calls", 0)),
+            target,
+        )
+        tokens = {
+            kind: extrapolate(
+                (sf_small, (ops[0].get("tokens") or {}).get(kind, 0)),
+                (sf_large, (ops[1].get("tokens") or {}).get(kind, 0)),
+                target,
+            )
+            for kind in TOKEN_KINDS
+        }
+        growth = growth_exponent(
+            (sf_small, ops[0].get("calls", 0)),
+            (sf_large, ops[1].get("calls", 0)),
+        )
+        estimate.operators.append(
+            OperatorEstimate(
+                label, calls, {k: v for k, v in tokens.items() if v}, growth
+            )
+        )
+
+    concurrency = large.get("concurrent_llm_worker") or 1
+    for operator in estimate.operators:
+        estimate.calls += operator.calls
+        for kind, count in operator.tokens.items():
+            estimate.tokens[kind] = estimate.tokens.get(kind, 0) + count
+        estimate.wall_time += operator.waves(concurrency) * call_latency
+    estimate.input_tokens = sum(estimate.tokens.values())
+    estimate.output_tokens = estimate.calls * output_tokens_per_call
+    if price is not None:
+        estimate.money_cost = price.cost(
+            estimate.tokens, estimate.output_tokens
+        )
+    estimate.wall_time += extrapolate(
+        (sf_small, small.get("engine_overhead_time") or 0),
+        (sf_large, large.get("engine_overhead_time") or 0),
+        target,
+    )
+    return estimate
+
+
+@dataclass
+class SystemEstimate:
+    """Projection of all estimated queries of a system and use case."""
+
+    use_case: str
+    system: str
+    model: str
+    scale_factor: int
+    sample_scale_factors: Tuple[int, int]
+    queries: List[QueryEstimate]
+    # Fraction of the stubbed LLM requests answered "True" in the samples
+    selectivity: float = DEFAULT_SELECTIVITY
+    # Why there is no projection at all (e.g. no sample metrics)
+    error: Optional[str] = None
+
+    @property
+    def money_cost(self) -> Optional[float]:
+        costs = [q.money_cost for q in self.queries]
+        return None if None in costs else sum(costs)
+
+    @property
+    def wall_time(self) -> float:
+        return sum(q.wall_time for q in self.queries)
+
+    @property
+    def input_tokens(self) -> float:
+        return sum(q.input_tokens for q in self.queries)
+
+    @property
+    def calls(self) -> float:
+        return sum(q.calls for q in self.queries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["money_cost"] = self.money_cost
+        data["wall_time"] = self.wall_time
+        return data
+
+
+def estimate_system(
+    use_case: str,
+    system: str,
+    model: str,
+    target: int,
+    samples: Dict[int, Dict[str, Dict[str, Any]]],
+    prices: Dict[str, Price],
+    output_tokens_per_call: float = DEFAULT_OUTPUT_TOKENS_PER_CALL,
+    call_latency: float = DEFAULT_CALL_LATENCY,
+    selectivity: float = DEFAULT_SELECTIVITY,
+    queries: Optional[Iterable[str]] = None,
+) -> SystemEstimate:
+    """
+    Project every query to the target scale factor. A query without a
+    record at one of the sample scale factors is kept as incomplete
+    estimate.
+
+    Args:
+        samples: {sample scale factor: {"Q1": metric record, ...}}
+        selectivity: Selectivity of the stub the samples ran against
+        queries: Queries that were sampled (default: every query with a
+            record at any sample scale factor)
+    """
+    price = price_of(model, prices)
+    sample_sfs = tuple(sorted(samples))
+    if queries is None:
+        queries = set.union(*(set(r) for r in samples.values()))
+    estimates = []
+    for query in sorted(queries, key=_query_order):
+        missing = [sf for sf in sample_sfs if query not in samples[sf]]
+        if missing:
+            estimates.append(
+                QueryEstimate(
+                    query,
+                    money_cost=None if price is None else 0.0,
+                    note=f"no sample at sf {missing[0]}",
+                    complete=False,
+                )
+            )
+            continue
+        estimates.append(
+            estimate_query(
+                query,
+                {sf: samples[sf][query] for sf in sample_sfs},
+                target,
+                price,
+                output_tokens_per_call,
+                call_latency,
+            )
+        )
+    return SystemEstimate(
+        use_case, system, model, target, sample_sfs, estimates, selectivity
+    )
+
+
+def _query_order(query: str) -> Tuple[int, str]:
+    digits = "".join(c for c in query if c.isdigit())
+    return (int(digits) if digits else 0, query)
+
+
+def load_sample_metrics(
+    use_case_dir: Path, system: str, sample_sfs: Iterable[int]
+) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """Metric records of the sample runs of a system, by scale factor."""
+    samples = {}
+    for sf in sample_sfs:
+        metrics_file = (
+            use_case_dir / ESTIMATES_DIR / f"sf_{sf}" / "metrics"
+            / f"{system}.json"
+        )
+        try:
+            with open(metrics_file, "r") as f:
+                samples[sf] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+    return samples
+
+
+def write_estimate(use_case_dir: Path, estimate: SystemEstimate) -> Path:
+    """Write *estimate* next to the sample runs; returns its path."""
+    output_file = (
+        use_case_dir / ESTIMATES_DIR
+        / f"{estimate.system}_sf{estimate.scale_factor}.json"
+    )
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w") as f:
+        json.dump(estimate.to_dict(), f, indent=2)
+    return output_file
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}min"
+    return f"{seconds / 3600:.1f}h"
+
+
+def print_estimates(
+    estimates: List[SystemEstimate], budget: Optional[float] = None
+) -> bool:
+    """
+    Print the estimates per system and query.
+
+    Returns:
+        True if the projected total cost exceeds *budget*, or if *budget*
+        is given and the total is not known: a model without price, a
+        system without sample metrics or a query whose sample runs failed
+        or are missing all count as over budget
+    """
+    print("\n" + "=" * 60)
+    print("COST ESTIMATE")
+    print("=" * 60)
+    total = 0.0
+    unknown = []
+    for estimate in estimates:
+        name = f"{estimate.use_case}/{estimate.system}"
+        if estimate.error:
+            print(f"\n{name}: {estimate.error}")
+            unknown.append(f"{name}: {estimate.error}")
+            continue
+        cost = estimate.money_cost
+        if cost is None:
+            unknown.append(f"{name}: no price for {estimate.model}")
+        print(
+            f"\n{estimate.use_case}/{estimate.system} at sf "
+            f"{estimate.scale_factor} (samples "
+            f"{', '.join(map(str, estimate.sample_scale_factors))}, "
+            f"{estimate.model}, filter selectivity "
+            f"{estimate.selectivity:g}): {estimate.calls:,.0f} calls, "
+            f"{estimate.input_tokens:,.0f} input tokens, "
+            + (f"${cost:,.2f}" if cost is not None else "price unknown")
+            + f", {format_duration(estimate.wall_time)}"
+        )
+        for query in estimate.queries:
+            line = (
+                f"  {query.query}: {query.calls:,.0f} calls, "
+                f"{query.input_tokens:,.0f} tokens"
+            )
+            if query.money_cost is not None:
+                line += f", ${query.money_cost:,.2f}"
+            line += f", {format_duration(query.wall_time)}"
+            if query.note:
+                line += f" ({query.note})"
+            print(line)
+            if not query.complete:
+                unknown.append(f"{name} {query.query}: {query.note}")
+        total += cost or 0.0
+
+    print(f"\nTotal: ${total:,.2f}" + (" (incomplete)" if unknown else ""))
+    if any(e.selectivity >= 1.0 for e in estimates):
+        print(
+            "  Filters were assumed to pass every row (selectivity 1): "
+            "operators after a filter are projected as an upper bound"
+        )
+    if budget is not None and (unknown or not estimates):
+        print(
+            f"⚠ Cannot check the budget of ${budget:,.2f}, counted as over "
+            f"budget:"
+        )
+        for item in unknown or ["no system has an estimate"]:
+            print(f"  - {item}")
+        return True
+    if budget is not None and total > budget:
+        print(f"⚠ Projected cost exceeds the budget of ${budget:,.2f}")
+        return True
+    if budget is not None:
+        print(f"✓ Within the budget of ${budget:,.2f}")
+    return False
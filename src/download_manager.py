@@ -0,0 +1,905 @@
+"""
+Shared downloader of the scenario source archives.
+
+The scenarios fetch their source data as archives from Google Drive (and,
+when built from scratch, from Kaggle). fetch_archive() provides an archive
+and extracts it:
+
+    parallel   archives whose server honours Range requests are fetched in
+               CHUNK_SIZE chunks by several threads
+    resumable  chunks land in files/downloads/<key>.part; a JSON state file
+               next to it lists the finished chunks, so an interrupted
+               download continues where it stopped instead of starting over
+    streaming  zip and tar archives are extracted while they download: the
+               extractor reads the contiguous prefix of the .part file as
+               soon as the chunks arrive (zip entries that cannot be read
+               sequentially fall back to extraction after the download)
+    staged     extraction goes to a staging folder inside the target
+               folder; its files are moved into place only once the whole
+               archive is there and verified, so the files and folders the
+               scenarios check for never exist half-written
+    verified   the SHA-256 of every archive is checked against a pinned
+               checksum (Archive.sha256), the mirror's manifest or the
+               checksum recorded on first download in
+               files/downloads/download_manifest.json; on a mismatch the
+               staging folder is removed and nothing is moved into place
+
+Offline machines set a mirror (SEMBENCH_DATA_MIRROR, run.py --data-mirror):
+a directory holding <scenario>/<archive> files or a tarball of them, each
+with a download_manifest.json. With a mirror set, archives are read from it
+and never from the network. `mirror` builds one on a machine with network
+access.
+
+Usage:
+    fetch_archive("animals/wildlife.zip", source_data_dir)
+    python src/download_manager.py list
+    python src/download_manager.py mirror /data/sembench_mirror \\
+        --tarball /data/sembench_mirror.tar
+    python src/download_manager.py verify /data/sembench_mirror.tar
+    SEMBENCH_DATA_MIRROR=/data/sembench_mirror.tar python src/run.py ...
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import math
+import os
+import re
+import shutil
+import struct
+import sys
+import tarfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin
+
+FILES_DIR = Path(__file__).resolve().parents[1] / "files"
+DOWNLOADS_DIR = FILES_DIR / "downloads"
+MANIFEST_FILE = "download_manifest.json"
+DATA_MIRROR_ENV = "SEMBENCH_DATA_MIRROR"
+
+CHUNK_SIZE = 32 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+DEFAULT_WORKERS = 8
+RETRIES = 5
+TIMEOUT = 60
+USER_AGENT = "SemBench-downloader"
+
+
+@dataclass(frozen=True)
+class Archive:
+    key: str  # <scenario>/<file name>: path in mirrors, key in manifests
+    url: str
+    sha256: Optional[str] = None  # Pinned checksum, else the manifests
+
+
+def drive_url(file_id: str) -> str:
+    """Direct download URL of a Google Drive file."""
+    query = urlencode({"id": file_id, "export": "download", "confirm": "t"})
+    return f"https://drive.usercontent.google.com/download?{query}"
+
+
+def kaggle_url(dataset: str) -> str:
+    """Download URL of a Kaggle dataset (<owner>/<name>)."""
+    return f"https://www.kaggle.com/api/v1/datasets/download/{dataset}"
+
+
+ARCHIVES: Dict[str, Archive] = {
+    archive.key: archive
+    for archive in [
+        Archive(
+            "animals/wildlife.zip",
+            drive_url("1HG6tvXIA0BtpqbZqCR46oNSeY2yZ4Lko"),
+        ),
+        Archive(
+            "movie/movie.zip", drive_url("1WkeXN3V5A6h-D_oeWvv2G_xs2PgzcQu0")
+        ),
+        Archive(
+            "ecomm/ecomm.tar.gz",
+            drive_url("1fVV9PLgIMT-e-zxFM5ksdnN8xQlfgnmb"),
+        ),
+        Archive(
+            "mmqa/mmqa_source_data.zip",
+            drive_url("1oHXq5oxIfsyoNy9aCQ0V9G3W4puqHC6i"),
+        ),
+        Archive(
+            "cars/full_data.zip",
+            drive_url("1mNJaYSv5W_5sWhrGCCfdo5ljmfMthifI"),
+        ),
+        Archive(
+            "cars/all_car_images.zip",
+            drive_url("1EjSOvDH2M-QpSdnxDTLzyrq1Z08m_0-N"),
+        ),
+        Archive(
+            "cars/all_car_audio.zip",
+            drive_url("11dUPwTRuCpHSTAQAo3T0GWKr73WokvZ5"),
+        ),
+        Archive(
+            "cars/nhtsa-dataset.zip",
+            drive_url("1ER5pooCIi2q6ZTYUrJw_ha_X3byNQB9M"),
+        ),
+        Archive(
+            "cars/vehicle-damage-detection.zip",
+            kaggle_url(
+                "hendrichscullen/vehide-dataset-automatic-vehicle-damage-detection"  # noqa: E501
+            ),
+        ),
+        Archive(
+            "cars/stanford-cars.zip",
+            kaggle_url("jutrera/stanford-car-dataset-by-classes-folder"),
+        ),
+        Archive(
+            "cars/car-diagnostics.zip",
+            kaggle_url("malakragaie/car-diagnostics-dataset"),
+        ),
+        Archive(
+            "medical/medical_data.zip",
+            drive_url("1v4--C7PE_SQDNZj6hZ8wNn4OvswIyu2s"),
+        ),
+        Archive(
+            "medical/raw_data.zip",
+            drive_url("1P4V_RWWDMxz4X-oG65Ph5-K2gmNGFpP-"),
+        ),
+        Archive(
+            "medical/lung-dataset.zip", kaggle_url("arashnic/lung-dataset")
+        ),
+        Archive(
+            "medical/lungcanc2024.zip",
+            kaggle_url("datasetengineer/lungcanc2024"),
+        ),
+        Archive(
+            "medical/x-ray-lung-diseases-images-9-classes.zip",
+            kaggle_url("fernando2rad/x-ray-lung-diseases-images-9-classes"),
+        ),
+        Archive(
+            "medical/symptom2disease.zip",
+            kaggle_url("niyarrbarman/symptom2disease"),
+        ),
+        Archive(
+            "medical/skin_cancer.zip",
+            kaggle_url("fanconic/skin-cancer-malignant-vs-benign"),
+        ),
+    ]
+}
+
+
+# --- Manifests ---------------------------------------------------------------
+
+
+def read_manifest(path: Path) -> Dict[str, dict]:
+    """Entries {key: {"sha256", "size"}} of a manifest file (or {})."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(path: Path, manifest: Dict[str, dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _record(path: Path, key: str, sha256: str, size: int) -> None:
+    manifest = read_manifest(path)
+    manifest[key] = {"sha256": sha256, "size": size}
+    _write_manifest(path, manifest)
+
+
+# --- Readers -----------------------------------------------------------------
+
+
+class _Prefix:
+    """Contiguous prefix of a .part file that the download has completed."""
+
+    def __init__(self) -> None:
+        self.available = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.condition = threading.Condition()
+
+    def advance(self, available: int) -> None:
+        with self.condition:
+            self.available = max(self.available, available)
+            self.condition.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+
+class _HashingReader:
+    """Sequential reader that hashes what it reads; pushed-back bytes are
+    returned again by the next read (and hashed once)."""
+
+    def __init__(self, read: Callable[[int], bytes]) -> None:
+        self._read = read
+        self._pushed = b""
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, n: int = -1) -> bytes:
+        if self._pushed:
+            size = len(self._pushed) if n < 0 else n
+            data, self._pushed = self._pushed[:size], self._pushed[size:]
+            return data
+        data = self._read(BLOCK_SIZE if n < 0 else n)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+    def unread(self, data: bytes) -> None:
+        self._pushed = data + self._pushed
+
+    def drain(self) -> str:
+        """Read to the end; the SHA-256 of all bytes."""
+        while self.read(BLOCK_SIZE):
+            pass
+        return self.sha256.hexdigest()
+
+
+def _prefix_reader(path: Path, prefix: _Prefix) -> _HashingReader:
+    """Reader of *path* that waits for the download to extend its prefix."""
+    f = open(path, "rb")
+    position = [0]
+
+    def read(n: int) -> bytes:
+        with prefix.condition:
+            while prefix.available <= position[0] and not prefix.done:
+                prefix.condition.wait()
+            if prefix.error is not None:
+                raise prefix.error
+            n = min(n, prefix.available - position[0])
+        if n <= 0:
+            f.close()
+            return b""
+        f.seek(position[0])
+        data = f.read(n)
+        position[0] += len(data)
+        return data
+
+    return _HashingReader(read)
+
+
+def _read_exact(reader: _HashingReader, n: int) -> bytes:
+    parts = []
+    while n > 0:
+        data = reader.read(min(n, BLOCK_SIZE))
+        if not data:
+            raise EOFError("Archive ends unexpectedly")
+        parts.append(data)
+        n -= len(data)
+    return b"".join(parts)
+
+
+# --- Extraction --------------------------------------------------------------
+
+
+class _NotStreamable(Exception):
+    """The archive has to be extracted after the download completes."""
+
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_LOCAL_SIGNATURE = 0x04034B50
+_END_SIGNATURES = (0x02014B50, 0x06054B50, 0x06064B50)
+_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+
+
+def _target(extract_dir: Path, name: str) -> Path:
+    target = (extract_dir / name).resolve()
+    if not target.is_relative_to(extract_dir.resolve()):
+        raise ValueError(f"Archive member outside the target folder: {name}")
+    return target
+
+
+def _zip64_sizes(
+    extra: bytes, csize: int, usize: int
+) -> Tuple[int, int, bool]:
+    """Sizes of a local header and whether it has a zip64 extra field."""
+    position = 0
+    while position + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, position)
+        if tag == 0x0001:
+            values = extra[position + 4:position + 4 + length]
+            offset = 0
+            if usize == 0xFFFFFFFF:
+                usize = struct.unpack_from("<Q", values, offset)[0]
+                offset += 8
+            if csize == 0xFFFFFFFF:
+                csize = struct.unpack_from("<Q", values, offset)[0]
+            return csize, usize, True
+        position += 4 + length
+    return csize, usize, False
+
+
+def _stream_zip(reader: _HashingReader, extract_dir: Path) -> None:
+    """Extract a zip archive from its local headers, front to back."""
+    while True:
+        header = _read_exact(reader, 4)
+        signature = struct.unpack("<I", header)[0]
+        if signature in _END_SIGNATURES:
+            return  # Central directory: all entries are extracted
+        if signature != _LOCAL_SIGNATURE:
+            raise _NotStreamable(f"unexpected signature {signature:#x}")
+        fields = _LOCAL_HEADER.unpack(
+            header + _read_exact(reader, _LOCAL_HEADER.size - 4)
+        )
+        _, _, flags, method, _, _, crc, csize, usize, name_len, extra_len = (
+            fields
+        )
+        raw_name = _read_exact(reader, name_len)
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437")
+        extra = _read_exact(reader, extra_len)
+        csize, usize, zip64 = _zip64_sizes(extra, csize, usize)
+        has_descriptor = bool(flags & 0x8)
+        if flags & 0x1 or method not in (0, 8):
+            raise _NotStreamable(f"{name}: encrypted or method {method}")
+        if has_descriptor and method == 0:
+            raise _NotStreamable(f"{name}: stored entry of unknown size")
+
+        target = _target(extract_dir, name)
+        if name.endswith("/"):
+            target.mkdir(parents=True, exist_ok=True)
+            out = None
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            out = open(target, "wb")
+        checksum = 0
+        try:
+            inflater = zlib.decompressobj(-15) if method == 8 else None
+            remaining = None if has_descriptor else csize
+            while remaining is None or remaining > 0:
+                size = BLOCK_SIZE if remaining is None else remaining
+                data = reader.read(min(size, BLOCK_SIZE))
+                if not data:
+                    raise EOFError(f"{name}: archive ends unexpectedly")
+                if remaining is not None:
+                    remaining -= len(data)
+                if inflater is not None:
+                    chunk = inflater.decompress(data)
+                else:
+                    chunk = data
+                checksum = zlib.crc32(chunk, checksum)
+                if out is not None:
+                    out.write(chunk)
+                if inflater is not None and inflater.eof:
+                    reader.unread(inflater.unused_data)
+                    break
+        finally:
+            if out is not None:
+                out.close()
+
+        if has_descriptor:
+            start = _read_exact(reader, 4)
+            if start == _DESCRIPTOR_SIGNATURE:
+                start = _read_exact(reader, 4)
+            crc = struct.unpack("<I", start)[0]
+            _read_exact(reader, 16 if zip64 else 8)
+        if checksum != crc:
+            raise zipfile.BadZipFile(f"CRC mismatch of {name}")
+
+
+def _stream_tar(reader: _HashingReader, extract_dir: Path) -> None:
+    with tarfile.open(fileobj=reader, mode="r|*") as tar:
+        for member in tar:
+            tar.extract(member, extract_dir, filter="data")
+
+
+def _extract_file(source: BinaryIO, kind: str, extract_dir: Path) -> None:
+    """Extract a complete, seekable archive."""
+    if kind == "zip":
+        with zipfile.ZipFile(source) as archive:
+            archive.extractall(extract_dir)
+    else:
+        with tarfile.open(fileobj=source, mode="r:*") as tar:
+            tar.extractall(extract_dir, filter="data")
+
+
+def _archive_kind(key: str) -> str:
+    name = key.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")):
+        return "tar"
+    raise ValueError(f"Unknown archive format: {key}")
+
+
+# --- Download ----------------------------------------------------------------
+
+
+def _request(url: str, start: Optional[int] = None, end: Optional[int] = None):
+    headers = {"User-Agent": USER_AGENT}
+    if start is not None:
+        stop = "" if end is None else str(end)
+        headers["Range"] = f"bytes={start}-{stop}"
+    request = urllib.request.Request(url, headers=headers)
+    return urllib.request.urlopen(request, timeout=TIMEOUT)
+
+
+def _confirmed_url(page: str, url: str) -> Optional[str]:
+    """Download URL behind Google Drive's "cannot scan for viruses" page."""
+    form = re.search(r'<form[^>]*action="([^"]+)"', page)
+    if form is None:
+        return None
+    inputs = re.findall(
+        r'<input[^>]*type="hidden"[^>]*name="([^"]+)"[^>]*value="([^"]*)"',
+        page,
+    )
+    action = urljoin(url, html.unescape(form.group(1)))
+    return f"{action}?{urlencode(inputs)}"
+
+
+def _probe(url: str) -> Tuple[str, Optional[int], bool]:
+    """(final URL, size, whether Range requests work) of a download."""
+    for _ in range(2):
+        with _request(url, 0, 0) as response:
+            content_type = response.headers.get("Content-Type", "")
+            if content_type.startswith("text/html"):
+                page = response.read(BLOCK_SIZE).decode("utf-8", "replace")
+                confirmed = _confirmed_url(page, url)
+                if confirmed is None:
+                    break
+                url = confirmed
+                continue
+            if response.status == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rpartition("/")[2]
+                return url, int(total) if total.isdigit() else None, True
+            length = response.headers.get("Content-Length")
+            return url, int(length) if length else None, False
+    raise RuntimeError(
+        f"{url} returns a web page instead of the archive (quota exceeded "
+        "or no access); download it by hand or use a mirror"
+    )
+
+
+def _with_retries(action: Callable[[], None], what: str) -> None:
+    for attempt in range(1, RETRIES + 1):
+        try:
+            return action()
+        except (OSError, urllib.error.URLError, EOFError) as e:
+            if attempt == RETRIES:
+                raise RuntimeError(f"{what} failed: {e}") from e
+            print(f"{what} failed ({e}), retry {attempt}/{RETRIES - 1}")
+            time.sleep(2**attempt)
+
+
+class _Progress:
+    def __init__(self, key: str, size: Optional[int]) -> None:
+        self.key = key
+        self.size = size
+        self.step = 0
+        self.lock = threading.Lock()
+
+    def update(self, done: int) -> None:
+        if not self.size:
+            return
+        with self.lock:
+            step = int(10 * done / self.size)
+            if step > self.step:
+                self.step = step
+                print(
+                    f"{self.key}: {done / 2**20:.0f} of "
+                    f"{self.size / 2**20:.0f} MB"
+                )
+
+
+def _download(
+    key: str, url: str, part: Path, prefix: _Prefix, workers: int
+) -> None:
+    """Download *url* into *part*, resuming from its state file."""
+    state_path = part.with_name(part.name + ".json")
+    url, size, ranges = _probe(url)
+    state = read_manifest(state_path)
+    progress = _Progress(key, size)
+    part.parent.mkdir(parents=True, exist_ok=True)
+
+    if not ranges or size is None or size <= CHUNK_SIZE:
+        # One sequential stream, resumed with an open-ended range
+        if not (state.get("url") == url and ranges and part.exists()):
+            part.write_bytes(b"")
+            _write_manifest(state_path, {"url": url})
+
+        def stream() -> None:
+            have = part.stat().st_size
+            if size is not None and have >= size:
+                return
+            with _request(url, have if ranges else None) as response:
+                if response.status != 206:
+                    have = 0
+                with open(part, "r+b" if have else "wb") as f:
+                    f.seek(have)
+                    while data := response.read(BLOCK_SIZE):
+                        f.write(data)
+                        f.flush()
+                        have += len(data)
+                        prefix.advance(have)
+                        progress.update(have)
+            if size is not None and have < size:
+                raise EOFError(f"{have} of {size} bytes")
+
+        prefix.advance(part.stat().st_size)
+        _with_retries(stream, f"Download of {key}")
+        return
+
+    num_chunks = math.ceil(size / CHUNK_SIZE)
+    if state.get("url") == url and state.get("size") == size and (
+        state.get("chunk_size") == CHUNK_SIZE and part.exists()
+    ):
+        done = set(state.get("done", []))
+    else:
+        done = set()
+        with open(part, "wb") as f:
+            f.truncate(size)
+    lock = threading.Lock()
+
+    def save_and_advance() -> None:
+        _write_manifest(
+            state_path,
+            {
+                "url": url,
+                "size": size,
+                "chunk_size": CHUNK_SIZE,
+                "done": sorted(done),
+            },
+        )
+        contiguous = 0
+        while contiguous in done:
+            contiguous += 1
+        prefix.advance(min(contiguous * CHUNK_SIZE, size))
+        progress.update(len(done) * CHUNK_SIZE)
+
+    def fetch_chunk(index: int) -> None:
+        start = index * CHUNK_SIZE
+        end = min(start + CHUNK_SIZE, size) - 1
+
+        def attempt() -> None:
+            with _request(url, start, end) as response:
+                if response.status != 206:
+                    raise OSError(f"no partial content ({response.status})")
+                with open(part, "r+b") as f:
+                    f.seek(start)
+                    position = start
+                    while data := response.read(BLOCK_SIZE):
+                        f.write(data)
+                        position += len(data)
+            if position != end + 1:
+                raise EOFError(f"chunk {index} ends at byte {position}")
+
+        _with_retries(attempt, f"Chunk {index} of {key}")
+        with lock:
+            done.add(index)
+            save_and_advance()
+
+    with lock:
+        save_and_advance()
+    todo = [index for index in range(num_chunks) if index not in done]
+    if done:
+        print(f"{key}: resuming, {len(todo)} of {num_chunks} chunks missing")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(fetch_chunk, todo))
+
+
+# --- Sources -----------------------------------------------------------------
+
+
+def data_mirror() -> Optional[Path]:
+    """The mirror this process reads archives from, if any."""
+    mirror = os.getenv(DATA_MIRROR_ENV)
+    return Path(mirror) if mirror else None
+
+
+def _mirror_source(
+    mirror: Path, key: str
+) -> Tuple[Callable[[], BinaryIO], Optional[str]]:
+    """(opener of the archive, manifest checksum) of *key* in *mirror*."""
+    if mirror.is_dir():
+        path = mirror / key
+        if not path.exists():
+            raise FileNotFoundError(f"{key} is not in the mirror {mirror}")
+        expected = read_manifest(mirror / MANIFEST_FILE).get(key, {})
+        return (lambda: open(path, "rb")), expected.get("sha256")
+
+    tar = tarfile.open(mirror)
+    try:
+        manifest_member = tar.extractfile(MANIFEST_FILE)
+        manifest = json.load(manifest_member)
+    except (KeyError, ValueError):
+        manifest = {}
+    try:
+        member = tar.getmember(key)
+    except KeyError:
+        raise FileNotFoundError(f"{key} is not in the mirror {mirror}")
+    return (lambda: tar.extractfile(member)), manifest.get(key, {}).get(
+        "sha256"
+    )
+
+
+def _expected_sha256(key: str) -> Optional[str]:
+    archive = ARCHIVES.get(key)
+    if archive is not None and archive.sha256:
+        return archive.sha256
+    return read_manifest(DOWNLOADS_DIR / MANIFEST_FILE).get(key, {}).get(
+        "sha256"
+    )
+
+
+def _extract_stream(
+    reader: _HashingReader,
+    reopen: Callable[[], BinaryIO],
+    kind: str,
+    extract_dir: Path,
+) -> Tuple[str, int]:
+    """Extract while reading; (SHA-256, size) of the archive."""
+    try:
+        if kind == "zip":
+            _stream_zip(reader, extract_dir)
+        else:
+            _stream_tar(reader, extract_dir)
+    except (_NotStreamable, zipfile.BadZipFile, tarfile.TarError) as e:
+        print(f"Extracting after the download ({e})")
+        digest = reader.drain()
+        with reopen() as source:
+            _extract_file(source, kind, extract_dir)
+        return digest, reader.size
+    return reader.drain(), reader.size
+
+
+def _move_into(source: Path, target: Path) -> None:
+    """Move the contents of folder *source* into folder *target*."""
+    target.mkdir(parents=True, exist_ok=True)
+    for entry in source.iterdir():
+        destination = target / entry.name
+        if entry.is_dir() and destination.is_dir():
+            _move_into(entry, destination)
+            continue
+        if destination.is_dir():
+            shutil.rmtree(destination)
+        os.replace(entry, destination)
+    source.rmdir()
+
+
+def fetch_archive(
+    key: str,
+    extract_dir,
+    url: Optional[str] = None,
+    manual_path=None,
+    workers: int = DEFAULT_WORKERS,
+) -> None:
+    """
+    Provide archive *key* and extract it into *extract_dir*.
+
+    Args:
+        key: <scenario>/<file name> of the archive
+        extract_dir: Folder the archive is extracted into
+        url: Download URL; defaults to the URL in ARCHIVES
+        manual_path: Where users may have put the archive by hand; used
+            (and deleted after extraction) if it exists
+        workers: Parallel chunk downloads
+    """
+    extract_dir = Path(extract_dir)
+    extract_dir.mkdir(parents=True, exist_ok=True)
+    kind = _archive_kind(key)
+    expected = _expected_sha256(key)
+    mirror = data_mirror()
+    part = DOWNLOADS_DIR / f"{key}.part"
+    # Extracted files stay here until the archive is verified; a staging
+    # folder left by an interrupted run is started over (the download
+    # itself resumes from the .part file)
+    staging = extract_dir / f".{Path(key).name}.staging"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir()
+    try:
+        digest, size, expected = _extract_to(
+            key, staging, kind, expected, url, manual_path, mirror, part,
+            workers,
+        )
+        if expected is not None and digest != expected:
+            if part.exists():
+                part.unlink()
+                part.with_name(part.name + ".json").unlink(missing_ok=True)
+            raise RuntimeError(
+                f"Checksum mismatch of {key}: SHA-256 {digest}, expected "
+                f"{expected}. Nothing was extracted; run again to download "
+                "it anew."
+            )
+        _move_into(staging, extract_dir)
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging)
+
+    _record(DOWNLOADS_DIR / MANIFEST_FILE, key, digest, size)
+    if part.exists():
+        part.unlink()
+        part.with_name(part.name + ".json").unlink(missing_ok=True)
+    if manual_path is not None and Path(manual_path).exists():
+        Path(manual_path).unlink()
+    print(f"{key}: extracted, SHA-256 {digest}")
+
+
+def _extract_to(
+    key: str,
+    extract_dir: Path,
+    kind: str,
+    expected: Optional[str],
+    url: Optional[str],
+    manual_path,
+    mirror: Optional[Path],
+    part: Path,
+    workers: int,
+) -> Tuple[str, int, Optional[str]]:
+    """
+    Extract archive *key* from its source (see fetch_archive).
+
+    Returns:
+        SHA-256 and size of the archive, and its expected SHA-256
+    """
+    if manual_path is not None and Path(manual_path).exists():
+        print(f"Extracting {manual_path}...")
+        source = Path(manual_path)
+        reader = _HashingReader(open(source, "rb").read)
+        digest, size = _extract_stream(
+            reader, lambda: open(source, "rb"), kind, extract_dir
+        )
+    elif mirror is not None:
+        print(f"Extracting {key} from the mirror {mirror}...")
+        opener, mirror_sha256 = _mirror_source(mirror, key)
+        expected = expected or mirror_sha256
+        with opener() as f:
+            digest, size = _extract_stream(
+                _HashingReader(f.read), opener, kind, extract_dir
+            )
+    else:
+        if url is None:
+            if key not in ARCHIVES:
+                raise KeyError(f"No URL known for archive {key}")
+            url = ARCHIVES[key].url
+        print(f"Downloading {key} and extracting it...")
+        prefix = _Prefix()
+
+        def download() -> None:
+            try:
+                _download(key, url, part, prefix, workers)
+                prefix.finish()
+            except BaseException as e:
+                prefix.finish(e)
+
+        downloader = threading.Thread(target=download, daemon=True)
+        downloader.start()
+        try:
+            part.parent.mkdir(parents=True, exist_ok=True)
+            part.touch()
+            digest, size = _extract_stream(
+                _prefix_reader(part, prefix),
+                lambda: open(part, "rb"),
+                kind,
+                extract_dir,
+            )
+        finally:
+            downloader.join()
+        if prefix.error is not None:
+            raise prefix.error
+
+    return digest, size, expected
+
+
+# --- Mirrors -----------------------------------------------------------------
+
+
+def _file_sha256(f: BinaryIO) -> Tuple[str, int]:
+    reader = _HashingReader(f.read)
+    return reader.drain(), reader.size
+
+
+def build_mirror(
+    mirror_dir: Path,
+    keys: List[str],
+    tarball: Optional[Path] = None,
+    workers: int = DEFAULT_WORKERS,
+) -> None:
+    """Download *keys* into *mirror_dir* (and pack it into *tarball*)."""
+    manifest_path = mirror_dir / MANIFEST_FILE
+    for key in keys:
+        target = mirror_dir / key
+        if not target.exists():
+            part = target.with_name(target.name + ".part")
+            prefix = _Prefix()
+            _download(key, ARCHIVES[key].url, part, prefix, workers)
+            os.replace(part, target)
+            part.with_name(part.name + ".json").unlink(missing_ok=True)
+        with open(target, "rb") as f:
+            digest, size = _file_sha256(f)
+        expected = _expected_sha256(key)
+        if expected is not None and digest != expected:
+            raise RuntimeError(f"Checksum mismatch of {key} in {mirror_dir}")
+        _record(manifest_path, key, digest, size)
+        print(f"{key}: {size / 2**20:.0f} MB, SHA-256 {digest}")
+    if tarball is not None:
+        with tarfile.open(tarball, "w") as tar:
+            tar.add(manifest_path, arcname=MANIFEST_FILE)
+            for key in keys:
+                tar.add(mirror_dir / key, arcname=key)
+        print(f"Mirror packed into {tarball}")
+
+
+def verify_mirror(mirror: Path) -> bool:
+    """Check every archive of *mirror* against its manifest."""
+    if mirror.is_dir():
+        manifest = read_manifest(mirror / MANIFEST_FILE)
+    else:
+        with tarfile.open(mirror) as tar:
+            manifest = json.load(tar.extractfile(MANIFEST_FILE))
+    ok = True
+    for key, entry in sorted(manifest.items()):
+        try:
+            opener, _ = _mirror_source(mirror, key)
+            with opener() as f:
+                digest, size = _file_sha256(f)
+            status = "OK" if digest == entry["sha256"] else "MISMATCH"
+        except FileNotFoundError:
+            status = "MISSING"
+        ok = ok and status == "OK"
+        print(f"{status:9} {key}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Download, mirror and verify the scenario source archives"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the known archives")
+    mirror = subparsers.add_parser(
+        "mirror", help="Download archives into a mirror for offline machines"
+    )
+    mirror.add_argument("folder", type=Path)
+    mirror.add_argument(
+        "--scenarios",
+        nargs="+",
+        default=None,
+        help="Only the archives of these scenarios (default: all)",
+    )
+    mirror.add_argument(
+        "--tarball", type=Path, default=None, help="Also pack into a tarball"
+    )
+    mirror.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    verify = subparsers.add_parser(
+        "verify", help="Check a mirror folder or tarball against its manifest"
+    )
+    verify.add_argument("mirror", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        recorded = read_manifest(DOWNLOADS_DIR / MANIFEST_FILE)
+        for key, archive in ARCHIVES.items():
+            sha256 = archive.sha256 or recorded.get(key, {}).get("sha256")
+            print(f"{key:52} {sha256 or '-'}")
+    elif args.command == "mirror":
+        keys = [
+            key
+            for key in ARCHIVES
+            if args.scenarios is None or key.split("/")[0] in args.scenarios
+        ]
+        build_mirror(args.folder, keys, args.tarball, args.workers)
+    elif args.command == "verify":
+        if not verify_mirror(args.mirror):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
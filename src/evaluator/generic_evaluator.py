@@ -15,7 +15,10 @@ from __future__ import annotations
 
 import abc
 import dataclasses
+import hashlib
+import inspect
 import json
+import os
 from dataclasses import dataclass
 from pathlib import Path
 import traceback
@@ -26,6 +29,21 @@ import pandas as pd
 from sklearn.metrics import adjusted_rand_score
 from sklearn.metrics import f1_score
 
+from results_store import (
+    LIVE_RUN_LABEL,
+    current_run_label,
+    get_store,
+    store_row,
+)
+
+
+@dataclass
+class _GroundTruthEntry:
+    """Cached ground truth of a query and the files its computation wrote."""
+
+    ground_truth: Any
+    exports: Dict[str, bytes]
+
 
 @dataclass
 class QueryMetricRetrieval:
@@ -91,6 +109,118 @@ class SingleAccuracyScoreWithRetrievalDetails(SingleAccuracyScore):
     f1_score: float = 0.0
 
 
+def _count_retrieval_matches(
+    system_results: pd.DataFrame, ground_truth: pd.DataFrame
+) -> int:
+    """
+    Count one-to-one matches between system rows and ground truth rows.
+
+    A system row matches the first not yet matched ground truth row (in ground
+    truth order) whose values are equal on every common column, ignoring
+    columns where either side is NaN. Ground truth rows are grouped by their
+    NaN pattern and hashed on the remaining columns, so each system row needs
+    one dict lookup per pattern instead of a scan over the whole ground truth.
+    """
+    common = [c for c in system_results.columns if c in set(ground_truth.columns)]
+    if (
+        not system_results.columns.is_unique
+        or not ground_truth.columns.is_unique
+        or any(
+            pd.api.types.is_datetime64_any_dtype(df[c])
+            or pd.api.types.is_timedelta64_dtype(df[c])
+            for df in (system_results, ground_truth)
+            for c in common
+        )
+    ):
+        # numpy datetimes compare equal to Timestamps but hash differently
+        return _count_retrieval_matches_pairwise(system_results, ground_truth)
+
+    # `.values` upcasts exactly like iterrows(), so values compare the same
+    sys_values = system_results.values[
+        :, [system_results.columns.get_loc(c) for c in common]
+    ]
+    gt_values = ground_truth.values[
+        :, [ground_truth.columns.get_loc(c) for c in common]
+    ]
+    sys_missing = pd.isna(sys_values)
+    gt_missing = pd.isna(gt_values)
+    gt_labels = ground_truth.index
+
+    # Ground truth positions (ascending) per NaN pattern
+    gt_patterns: Dict[tuple, List[int]] = {}
+    for pos in range(len(ground_truth)):
+        gt_patterns.setdefault(tuple(gt_missing[pos]), []).append(pos)
+
+    # (gt pattern, system pattern) -> (compared columns, key -> [positions, cursor])
+    indexes: Dict[tuple, tuple] = {}
+    matched_labels = set()
+    matches = 0
+    try:
+        for pos in range(len(system_results)):
+            sys_pattern = tuple(sys_missing[pos])
+            best = None
+            for gt_pattern, positions in gt_patterns.items():
+                index_key = (gt_pattern, sys_pattern)
+                if index_key not in indexes:
+                    cols = [
+                        i
+                        for i in range(len(common))
+                        if not gt_pattern[i] and not sys_pattern[i]
+                    ]
+                    buckets: Dict[tuple, list] = {}
+                    for gt_pos in positions:
+                        key = tuple(gt_values[gt_pos, cols])
+                        buckets.setdefault(key, [[], 0])[0].append(gt_pos)
+                    indexes[index_key] = (cols, buckets)
+
+                cols, buckets = indexes[index_key]
+                bucket = buckets.get(tuple(sys_values[pos, cols]))
+                if bucket is None:
+                    continue
+                candidates, cursor = bucket
+                # Everything before the cursor is already matched
+                while (
+                    cursor < len(candidates)
+                    and gt_labels[candidates[cursor]] in matched_labels
+                ):
+                    cursor += 1
+                bucket[1] = cursor
+                if cursor < len(candidates) and (
+                    best is None or candidates[cursor] < best
+                ):
+                    best = candidates[cursor]
+
+            if best is not None:
+                matches += 1
+                matched_labels.add(gt_labels[best])
+    except TypeError:
+        # Unhashable cell values (e.g. lists)
+        return _count_retrieval_matches_pairwise(system_results, ground_truth)
+    return matches
+
+
+def _count_retrieval_matches_pairwise(
+    system_results: pd.DataFrame, ground_truth: pd.DataFrame
+) -> int:
+    """Reference implementation of _count_retrieval_matches() in O(n*m)."""
+    matches = 0
+    matched_gt = set()
+    for _, srow in system_results.iterrows():
+        for gt_idx, gt_row in ground_truth.iterrows():
+            if gt_idx in matched_gt:
+                continue
+            common = set(srow.index) & set(gt_row.index)
+            if all(
+                srow[c] == gt_row[c]
+                for c in common
+                if pd.notna(srow[c]) and pd.notna(gt_row[c])
+            ):
+                matches += 1
+                matched_gt.add(gt_idx)
+                break
+    return matches
+
+
 class GenericEvaluator(abc.ABC):
     """Abstract base class for benchmark evaluators."""
 
@@ -120,8 +250,20 @@ class GenericEvaluator(abc.ABC):
         self._results_path = self._root / "raw_results"
         self._metrics_path = self._root / "metrics"
         self.scale_factor = scale_factor
-
-        self._load_domain_data()
+        # Side runs keep system results and metrics under their run label;
+        # ground truth stays shared
+        self.run_label = current_run_label()
+        self._system_results_path = self._results_path
+        if self.run_label != LIVE_RUN_LABEL:
+            self._system_results_path = self._results_path / self.run_label
+            self._metrics_path = self._metrics_path / self.run_label
+
+        # Ground truth is cached on disk next to raw_results/ground_truth,
+        # so domain data is only loaded once a ground truth has to be
+        # computed
+        self._ground_truth_cache_path = self._results_path / "ground_truth_cache"
+        self._ground_truth_memo: Dict[Any, Any] = {}
+        self._domain_data_loaded = False
 
     def evaluate_system(
         self, system_name: str, queries: Optional[Sequence[int]] = None
@@ -138,7 +280,7 @@ class GenericEvaluator(abc.ABC):
             print(f"Evaluating Q{qid} ...")
             try:
                 sys_df = self._load_system_results(system_name, qid)
-                gt_df = self._get_ground_truth(qid)
+                gt_df = self._cached_ground_truth(qid)
                 result = self._evaluate_single_query(qid, sys_df, gt_df)
 
                 # Convert dataclass → dict → row--------------------------------
@@ -170,11 +312,163 @@ class GenericEvaluator(abc.ABC):
             json.dump(store, fh, indent=2, ensure_ascii=False)
 
         print(f"[{self.__class__.__name__}] Metrics saved → {out_f}")
+        self._store_evaluations(system_name, new_rows, store)
+
+    def _store_evaluations(
+        self,
+        system_name: str,
+        rows: List[Dict[str, Any]],
+        records: Dict[str, Dict[str, Any]],
+    ) -> None:
+        """
+        Merge evaluation results into the results store, keyed like the run
+        that produced them (taken from its record in the metrics file).
+        """
+        store_rows = []
+        for row in rows:
+            key = f"Q{row['query_id']}"
+            record = records.get(key, {})
+            store_rows.append(
+                store_row(
+                    scenario=self._root.name,
+                    system=system_name,
+                    model=record.get("model_name"),
+                    scale_factor=record.get("scale_factor", self.scale_factor),
+                    repeat=record.get("repeat"),
+                    query=key,
+                    record=row,
+                    run_label=self.run_label,
+                )
+            )
+        try:
+            get_store().append(store_rows, merge=True)
+        except Exception as exc:
+            print(f"  Warning: Could not write to results store: {exc}")
+
+    # Ground-truth cache ---------------------------------------------------
+    def _ground_truth_sources(self, query_id: int) -> List[Path]:
+        """
+        Files that determine the ground truth of *query_id*. Changing any of
+        them invalidates the cached ground truth. Override to add
+        scenario-specific query definitions.
+        """
+        sources = [Path(inspect.getfile(type(self)))]
+        gold_sql = self._root / "query" / "gold_sql" / f"Q{query_id}.sql"
+        if gold_sql.exists():
+            sources.append(gold_sql)
+
+        data_path = self._root / "data"
+        for folder in (
+            data_path,
+            data_path / f"sf_{self.scale_factor}",
+            data_path / "full_data",
+        ):
+            if folder.is_dir():
+                sources.extend(sorted(f for f in folder.iterdir() if f.is_file()))
+        return sources
+
+    def _ground_truth_key(self, query_id: int) -> str:
+        """Hash of the ground-truth sources of *query_id*."""
+        base_path = self._root.parents[1]
+        digest = hashlib.sha256()
+        for source in self._ground_truth_sources(query_id):
+            if not source.exists():
+                continue
+            digest.update(str(source.resolve().relative_to(base_path)).encode())
+            stat = source.stat()
+            if stat.st_size <= 1024 * 1024:
+                # Query definitions and code: hash the content
+                digest.update(source.read_bytes())
+            else:
+                # Large data files: size and modification time
+                digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()[:16]
+
+    def _cached_ground_truth(self, query_id: int) -> Any:
+        """
+        Return the ground truth of *query_id*, computing it with
+        _get_ground_truth() only if no cached copy for the same scenario,
+        scale factor, query and sources exists.
+
+        _get_ground_truth() of several scenarios also exports the ground
+        truth to raw_results/ground_truth/, under names without the scale
+        factor. The files it wrote are cached with the ground truth and
+        written again on every cache hit, so the exports always belong to
+        the scale factor being evaluated.
+        """
+        key = self._ground_truth_key(query_id)
+        prefix = f"Q{query_id}_sf{self.scale_factor}_"
+        cache_file = self._ground_truth_cache_path / f"{prefix}{key}.pkl"
+
+        entry = self._ground_truth_memo.get(cache_file)
+        if entry is None and cache_file.exists():
+            try:
+                entry = pd.read_pickle(cache_file)
+                print(f"  Q{query_id}: ground truth loaded from cache")
+            except Exception as exc:
+                print(f"  Q{query_id}: ignoring unreadable cache entry: {exc}")
+            if not isinstance(entry, _GroundTruthEntry):
+                entry = None  # Written before exports were cached
+
+        if entry is None:
+            if not self._domain_data_loaded:
+                self._load_domain_data()
+                self._domain_data_loaded = True
+            exports_before = self._ground_truth_exports()
+            ground_truth = self._get_ground_truth(query_id)
+            entry = _GroundTruthEntry(
+                ground_truth,
+                {
+                    path.name: path.read_bytes()
+                    for path, mtime in self._ground_truth_exports().items()
+                    if exports_before.get(path) != mtime
+                },
+            )
+            self._write_ground_truth_cache(cache_file, prefix, entry)
+        else:
+            self._restore_ground_truth_exports(entry.exports)
+
+        self._ground_truth_memo[cache_file] = entry
+        # Evaluations may modify the ground truth in place
+        if isinstance(entry.ground_truth, pd.DataFrame):
+            return entry.ground_truth.copy()
+        return entry.ground_truth
+
+    def _ground_truth_exports(self) -> Dict[Path, int]:
+        """Modification times of the files in raw_results/ground_truth/."""
+        folder = self._results_path / "ground_truth"
+        if not folder.is_dir():
+            return {}
+        return {
+            path: path.stat().st_mtime_ns
+            for path in folder.iterdir()
+            if path.is_file()
+        }
+
+    def _restore_ground_truth_exports(self, exports: Dict[str, bytes]) -> None:
+        folder = self._results_path / "ground_truth"
+        for name, content in exports.items():
+            path = folder / name
+            if path.exists() and path.read_bytes() == content:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+
+    def _write_ground_truth_cache(
+        self, cache_file: Path, prefix: str, entry: _GroundTruthEntry
+    ) -> None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Entries computed from older sources are never read again
+        for stale in cache_file.parent.glob(f"{prefix}*.pkl"):
+            stale.unlink(missing_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        pd.to_pickle(entry, tmp_file)
+        os.replace(tmp_file, cache_file)
 
     def _load_system_results(
         self, system_name: str, query_id: int
     ) -> pd.DataFrame:
-        csv_f = self._results_path / system_name / f"Q{query_id}.csv"
+        csv_f = self._system_results_path / system_name / f"Q{query_id}.csv"
         if not csv_f.exists():
             raise FileNotFoundError(csv_f)
 
@@ -185,7 +479,7 @@ class GenericEvaluator(abc.ABC):
         return df
 
     def _discover_queries_for_system(self, system_name: str) -> List[int]:
-        folder = self._results_path / system_name
+        folder = self._system_results_path / system_name
         return [
             int(f.stem[1:])
             for f in folder.glob("Q*.csv")
@@ -223,6 +517,8 @@ class GenericEvaluator(abc.ABC):
         Generic evaluation for retrieval queries WITHOUT limit clauses.
 
         Compares system results with ground truth and calculates precision, recall, and F1.
+        Each system row is matched one-to-one against the first unmatched ground truth
+        row that agrees on all common columns, with NaN acting as a wildcard.
         """
 
         if len(ground_truth) == 0:
@@ -232,21 +528,7 @@ class GenericEvaluator(abc.ABC):
         if len(system_results) == 0:
             return QueryMetricRetrieval()
 
-        matches = 0
-        matched_gt = set()
-        for _, srow in system_results.iterrows():
-            for gt_idx, gt_row in ground_truth.iterrows():
-                if gt_idx in matched_gt:
-                    continue
-                common = set(srow.index) & set(gt_row.index)
-                if all(
-                    srow[c] == gt_row[c]
-                    for c in common
-                    if pd.notna(srow[c]) and pd.notna(gt_row[c])
-                ):
-                    matches += 1
-                    matched_gt.add(gt_idx)
-                    break
+        matches = _count_retrieval_matches(system_results, ground_truth)
         precision = matches / len(system_results)
         recall = matches / len(ground_truth)
         f1 = (
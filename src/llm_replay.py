@@ -0,0 +1,973 @@
+"""
+Local record/replay stand-in for the OpenAI and Gemini APIs.
+
+The server sits between the systems and the LLM providers. It speaks the
+providers' own HTTP APIs, so every client that lets its endpoint be
+overridden can use it: the OpenAI SDK and LangChain (CAESURA) through
+OPENAI_BASE_URL / OPENAI_API_BASE, and LiteLLM (LOTUS, Palimpzest,
+ThalamusDB) through the same variables plus GEMINI_API_BASE. run.py sets all
+of them with --llm-endpoint.
+
+Modes:
+    record  Forward every request to the real provider and store the
+            request/response pair, its latency and token usage.
+    replay  Answer from the recording without any network access. Identical
+            requests are answered in the order they were recorded.
+    stub    Answer every request with a fixed synthetic answer (as JSON
+            when the request asks for structured output) and no
+            recording (run.py --llm-stub starts one in-process).
+
+Replay latency (--latency):
+    none      answer immediately (measures pure engine overhead)
+    fixed     sleep --fixed-ms for every request
+    recorded  sleep as long as the recorded call took
+    sampled   sleep a latency drawn from all recorded calls of the same model
+
+The server also logs when each call was in flight. GenericRunner asks for
+the calls of every query (/_sembench/usage) and splits the query's
+execution time into time waiting for the LLM and engine overhead (planning,
+serialization, scheduling), also per LLM call. Per operator (calls that
+share their instruction) it reports the calls, the time they were in
+flight and the operator's overhead: the time between its first call's start
+and its last call's end during which none of its calls was in flight
+(batching, prompt building, parsing). Overhead before the first and after
+the last call of an operator is only in the query's total. Calls are
+matched to a query by time, so only one query may run against the server
+at a time (run.py rejects --parallel > 1 with an endpoint or stub).
+
+Usage:
+    python src/llm_replay.py record --store files/llm_recordings/run1.sqlite
+    python src/run.py --systems lotus --use-cases movie \\
+        --llm-endpoint http://127.0.0.1:8765
+    python src/llm_replay.py replay --store files/llm_recordings/run1.sqlite \\
+        --latency sampled
+    python src/llm_replay.py stats --store files/llm_recordings/run1.sqlite
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+RECORDINGS_DIR = (
+    Path(__file__).resolve().parents[1] / "files" / "llm_recordings"
+)
+DEFAULT_STORE = RECORDINGS_DIR / "default.sqlite"
+DEFAULT_PORT = 8765
+LLM_ENDPOINT_ENV = "SEMBENCH_LLM_ENDPOINT"
+USAGE_PATH = "/_sembench/usage"
+
+UPSTREAMS = {
+    "openai": os.getenv("SEMBENCH_OPENAI_UPSTREAM", "https://api.openai.com"),
+    "gemini": os.getenv(
+        "SEMBENCH_GEMINI_UPSTREAM", "https://generativelanguage.googleapis.com"
+    ),
+}
+
+# Request headers passed on to the provider (never stored)
+_FORWARDED_HEADERS = (
+    "authorization",
+    "x-goog-api-key",
+    "openai-organization",
+    "openai-project",
+    "content-type",
+    "accept",
+)
+# Query parameters that carry credentials and are not part of the key
+_SECRET_PARAMS = {"key"}
+
+
+@dataclass
+class Exchange:
+    """One recorded request/response pair."""
+
+    status: int
+    content_type: str
+    body: bytes
+    latency: float
+    model: str
+
+
+def endpoint_env(endpoint: str) -> Dict[str, str]:
+    """
+    Environment variables that point the OpenAI, LiteLLM, LangChain and
+    Gemini clients at the server running at *endpoint*.
+    """
+    endpoint = endpoint.rstrip("/")
+    return {
+        LLM_ENDPOINT_ENV: endpoint,
+        "OPENAI_BASE_URL": f"{endpoint}/v1",
+        "OPENAI_API_BASE": f"{endpoint}/v1",
+        "GEMINI_API_BASE": f"{endpoint}/v1beta",
+    }
+
+
+def provider_of(path: str) -> str:
+    return "gemini" if "/models/" in path and ":" in path else "openai"
+
+
+def request_model(provider: str, path: str, body: Dict) -> str:
+    if provider == "gemini":
+        return path.split("/models/", 1)[1].split(":", 1)[0]
+    return str(body.get("model", ""))
+
+
+def request_key(method: str, path: str, query: str, raw_body: bytes) -> str:
+    """Hash of the request without credentials, body keys sorted."""
+    params = sorted(
+        (k, v) for k, v in parse_qsl(query) if k not in _SECRET_PARAMS
+    )
+    try:
+        body = json.dumps(json.loads(raw_body or b"null"), sort_keys=True)
+    except ValueError:
+        body = raw_body.decode("utf-8", "replace")
+    payload = json.dumps([method, path, params, body])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def operator_label(body: Dict) -> str:
+    """
+    Short label of the operator that issued a request: the first words of
+    its system instruction (or of its prompt if there is none). Calls of the
+    same semantic operator share their instruction.
+    """
+    messages = body.get("messages") or body.get("contents") or []
+    system = [m for m in messages if m.get("role") == "system"]
+    instruction = body.get("system_instruction") or body.get(
+        "systemInstruction"
+    )
+    text = _first_text(instruction or system or messages or body.get("input"))
+    return " ".join(text.split()[:8]) or "unknown"
+
+
+def _first_text(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        for key in ("text", "content", "parts"):
+            if key in value:
+                found = _first_text(value[key])
+                if found:
+                    return found
+    if isinstance(value, list):
+        for item in value:
+            found = _first_text(item)
+            if found:
+                return found
+    return ""
+
+
+_OUTPUT_FIELDS = re.compile(
+    r"OUTPUT FIELDS:?\s*\n((?:[ \t]*-[ \t]*\w+[^\n]*\n?)+)", re.IGNORECASE
+)
+
+
+def stub_answer(provider: str, body: Dict, answer: str) -> str:
+    """
+    Text of the synthetic answer to a request, shaped like the answer the
+    request asks for. Requests for structured output (an OpenAI JSON
+    response_format, a Gemini JSON responseMimeType or responseSchema) get
+    a JSON value that fits their schema, with *answer* in every string
+    field. Prompts that ask for a JSON object with a list of output fields
+    (Palimpzest convert and map) get an object with those fields. Anything
+    else (filters, free-text maps) gets *answer* itself.
+    """
+    if provider == "gemini":
+        config = body.get("generationConfig") or {}
+        schema = config.get("responseSchema") or config.get(
+            "responseJsonSchema"
+        )
+        if schema is not None:
+            return json.dumps(_schema_value(schema, schema, answer))
+        if config.get("responseMimeType") == "application/json":
+            return json.dumps(_prompt_object(body, answer))
+    else:
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = (response_format.get("json_schema") or {}).get(
+                "schema"
+            ) or {}
+            return json.dumps(_schema_value(schema, schema, answer))
+        if response_format.get("type") == "json_object":
+            return json.dumps(_prompt_object(body, answer))
+    prompt = _all_text(body.get("messages") or body.get("contents"))
+    if "JSON" in prompt and _OUTPUT_FIELDS.search(prompt):
+        return json.dumps(_prompt_object(body, answer))
+    return answer
+
+
+def _schema_value(schema: Dict, root: Dict, answer: str) -> Any:
+    """Value of a JSON schema (OpenAPI-style Gemini schemas included)."""
+    ref = schema.get("$ref", "")
+    if ref.startswith("#/"):
+        target = root
+        for part in ref[2:].split("/"):
+            target = target.get(part, {})
+        return _schema_value(target, root, answer)
+    for key in ("anyOf", "oneOf", "allOf"):
+        options = [
+            option
+            for option in schema.get(key) or []
+            if str(option.get("type", "")).lower() != "null"
+        ]
+        if options:
+            return _schema_value(options[0], root, answer)
+    if schema.get("enum"):
+        return schema["enum"][0]
+    kind = schema.get("type", "object" if "properties" in schema else "")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    kind = str(kind).lower()
+    if kind == "object":
+        return {
+            name: _schema_value(prop, root, answer)
+            for name, prop in (schema.get("properties") or {}).items()
+        }
+    if kind == "array":
+        return [_schema_value(schema.get("items") or {}, root, answer)]
+    if kind == "boolean":
+        return answer.strip().lower() != "false"
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "null":
+        return None
+    return answer
+
+
+def _prompt_object(body: Dict, answer: str) -> Dict[str, str]:
+    """JSON object with the output fields a prompt lists, if any."""
+    prompt = _all_text(body.get("messages") or body.get("contents"))
+    match = _OUTPUT_FIELDS.search(prompt)
+    if not match:
+        return {}
+    fields = re.findall(r"^[ \t]*-[ \t]*(\w+)", match.group(1), re.MULTILINE)
+    return {field: answer for field in fields}
+
+
+def _all_text(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return "\n".join(
+            _all_text(value[key])
+            for key in ("text", "content", "parts")
+            if key in value
+        )
+    if isinstance(value, list):
+        return "\n".join(_all_text(item) for item in value)
+    return ""
+
+
+def stub_exchange(
+    provider: str, path: str, body: Dict, model: str, answer: str
+) -> Exchange:
+    """
+    Synthetic provider response answering *answer* to any request, shaped
+    like the answer the request asks for (see stub_answer).
+    """
+    answer = stub_answer(provider, body, answer)
+    prompt_tokens = max(1, len(json.dumps(body)) // 4)
+    completion_tokens = max(1, len(answer) // 4)
+    if provider == "gemini":
+        data = {
+            "candidates": [
+                {
+                    "content": {"role": "model", "parts": [{"text": answer}]},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }
+            ],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": completion_tokens,
+                "totalTokenCount": prompt_tokens + completion_tokens,
+            },
+            "modelVersion": model,
+        }
+        if ":streamGenerateContent" in path:
+            return _sse_exchange([data], model, done=False)
+        return _json_exchange(data, model)
+
+    if path.endswith("/embeddings"):
+        inputs = body.get("input")
+        count = len(inputs) if isinstance(inputs, list) else 1
+        data = {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": [0.0] * 8}
+                for i in range(count)
+            ],
+            "model": model,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "total_tokens": prompt_tokens,
+            },
+        }
+        return _json_exchange(data, model)
+
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+    created = int(time.time())
+    if body.get("stream"):
+        chunks = [
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": answer},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+        ]
+        return _sse_exchange(chunks, model, done=True)
+    data = {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": usage,
+    }
+    return _json_exchange(data, model)
+
+
+def _json_exchange(data: Dict, model: str) -> Exchange:
+    body = json.dumps(data).encode("utf-8")
+    return Exchange(200, "application/json", body, 0.0, model)
+
+
+def _sse_exchange(chunks: List[Dict], model: str, done: bool) -> Exchange:
+    events = [f"data: {json.dumps(chunk)}\n\n" for chunk in chunks]
+    if done:
+        events.append("data: [DONE]\n\n")
+    body = "".join(events).encode("utf-8")
+    return Exchange(200, "text/event-stream", body, 0.0, model)
+
+
+def token_usage(provider: str, body: bytes) -> Tuple[int, int]:
+    """(prompt tokens, completion tokens) reported in a response body."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return 0, 0  # Streamed (SSE) responses are stored without usage
+    if provider == "gemini":
+        usage = data.get("usageMetadata") or {}
+        return (
+            int(usage.get("promptTokenCount") or 0),
+            int(usage.get("candidatesTokenCount") or 0),
+        )
+    usage = data.get("usage") or {}
+    return (
+        int(usage.get("prompt_tokens") or 0),
+        int(usage.get("completion_tokens") or 0),
+    )
+
+
+class RecordingStore:
+    """
+    SQLite file of recorded exchanges. Bodies are zlib-compressed; requests
+    are indexed by their key and the order in which they were made.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS exchanges ("
+                " key TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " provider TEXT,"
+                " model TEXT,"
+                " path TEXT,"
+                " request BLOB,"
+                " status INTEGER,"
+                " content_type TEXT,"
+                " response BLOB,"
+                " latency REAL,"
+                " prompt_tokens INTEGER,"
+                " completion_tokens INTEGER,"
+                " recorded_at REAL,"
+                " PRIMARY KEY (key, seq))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS exchanges_model"
+                " ON exchanges (model)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add(
+        self,
+        key: str,
+        provider: str,
+        model: str,
+        path: str,
+        request: bytes,
+        exchange: Exchange,
+    ) -> None:
+        prompt_tokens, completion_tokens = token_usage(provider, exchange.body)
+        with self._lock, self._connection() as conn:
+            (seq,) = conn.execute(
+                "SELECT COUNT(*) FROM exchanges WHERE key = ?", (key,)
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO exchanges VALUES"
+                " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    seq,
+                    provider,
+                    model,
+                    path,
+                    zlib.compress(request),
+                    exchange.status,
+                    exchange.content_type,
+                    zlib.compress(exchange.body),
+                    exchange.latency,
+                    prompt_tokens,
+                    completion_tokens,
+                    time.time(),
+                ),
+            )
+
+    def get(self, key: str, seq: int) -> Optional[Exchange]:
+        """The *seq*-th recording of *key* (its last one if there are fewer)."""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT status, content_type, response, latency, model"
+                " FROM exchanges WHERE key = ? AND seq <= ?"
+                " ORDER BY seq DESC LIMIT 1",
+                (key, seq),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        status, content_type, body, latency, model = row
+        return Exchange(
+            status, content_type, zlib.decompress(body), latency, model
+        )
+
+    def latencies(self) -> Dict[str, List[float]]:
+        """Recorded latencies per model."""
+        by_model: Dict[str, List[float]] = defaultdict(list)
+        for model, latency in self._connection().execute(
+            "SELECT model, latency FROM exchanges"
+        ):
+            by_model[model].append(latency)
+        return dict(by_model)
+
+    def summary(self) -> List[Tuple]:
+        return (
+            self._connection()
+            .execute(
+                "SELECT provider, model, COUNT(*), SUM(prompt_tokens),"
+                " SUM(completion_tokens), AVG(latency), MAX(latency)"
+                " FROM exchanges GROUP BY provider, model ORDER BY model"
+            )
+            .fetchall()
+        )
+
+
+class LatencyModel:
+    """Simulated response latency of the replay server."""
+
+    def __init__(
+        self,
+        mode: str,
+        store: Optional[RecordingStore] = None,
+        fixed_ms: float = 0.0,
+        scale: float = 1.0,
+        seed: int = 42,
+    ):
+        self.mode = mode
+        self.fixed = fixed_ms / 1000
+        self.scale = scale
+        self._latencies = store.latencies() if mode == "sampled" else {}
+        self._all = [x for values in self._latencies.values() for x in values]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, exchange: Exchange) -> float:
+        if self.mode == "fixed":
+            return self.fixed
+        if self.mode == "recorded":
+            return exchange.latency * self.scale
+        if self.mode == "sampled":
+            pool = self._latencies.get(exchange.model) or self._all
+            with self._lock:
+                return self._rng.choice(pool) * self.scale
+        return 0.0
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        mode: str,
+        store: Optional[RecordingStore] = None,
+        latency: Optional[LatencyModel] = None,
+        on_miss: str = "error",
+        stub_answer: str = "True",
+        timeout: float = 600.0,
+        meter: Optional[Callable[[Dict[str, Any]], Dict[str, int]]] = None,
+        stub_selectivity: float = 1.0,
+    ):
+        """
+        Args:
+            meter: Counts the input tokens of a request body by kind (e.g.
+                cost_estimator.count_request_tokens); usage() then reports
+                the tokens per operator
+            stub_selectivity: Fraction of stubbed requests answered with
+                *stub_answer*; the others are answered "False", so filters
+                pass this fraction of their rows. Which requests pass
+                depends only on the request body.
+        """
+        super().__init__(address, ReplayHandler)
+        self.mode = mode
+        self.store = store
+        self.latency = latency or LatencyModel("none")
+        self.on_miss = on_miss
+        self.stub_answer = stub_answer
+        self.stub_selectivity = stub_selectivity
+        self.upstream_timeout = timeout
+        self.meter = meter
+        self.served = defaultdict(int)
+        self.counters = defaultdict(int)
+        # (start, end, operator label, metered tokens) of every answered
+        # LLM call
+        self.calls: List[Tuple[float, float, str, Dict[str, int]]] = []
+        self._lock = threading.Lock()
+
+    def stub_answer_to(self, raw_body: bytes) -> str:
+        """Stub answer to a request, see stub_selectivity."""
+        if self.stub_selectivity >= 1.0:
+            return self.stub_answer
+        digest = hashlib.sha256(raw_body).digest()
+        fraction = int.from_bytes(digest[:8], "big") / 2**64
+        return self.stub_answer if fraction < self.stub_selectivity else "False"
+
+    def log_call(
+        self,
+        start: float,
+        end: float,
+        label: str,
+        tokens: Optional[Dict[str, int]] = None,
+    ) -> None:
+        with self._lock:
+            self.calls.append((start, end, label, tokens or {}))
+
+    def usage(self, start: float, end: float) -> Dict:
+        """
+        LLM calls that started within [start, end]: their number, the wall
+        time during which at least one of them was in flight, and per
+        operator the calls, their in-flight time, the span from the first
+        call's start to the last call's end, the overhead (span without
+        in-flight time) and the metered tokens.
+        """
+        with self._lock:
+            calls = [c for c in self.calls if start <= c[0] <= end]
+        operators: Dict[str, Dict] = defaultdict(list)
+        for call in calls:
+            operators[call[2]].append(call)
+        summary = {}
+        for label, group in operators.items():
+            busy_time = _busy_time(group)
+            span = max(c[1] for c in group) - min(c[0] for c in group)
+            summary[label] = {
+                "calls": len(group),
+                "busy_time": round(busy_time, 4),
+                "span_time": round(span, 4),
+                "overhead_time": round(max(0.0, span - busy_time), 4),
+            }
+            tokens: Dict[str, int] = defaultdict(int)
+            for call in group:
+                for kind, count in call[3].items():
+                    tokens[kind] += count
+            if tokens:
+                summary[label]["tokens"] = dict(tokens)
+        return {
+            "calls": len(calls),
+            "busy_time": _busy_time(calls),
+            "operators": summary,
+        }
+
+    def next_seq(self, key: str) -> int:
+        with self._lock:
+            seq = self.served[key]
+            self.served[key] += 1
+            return seq
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+
+def _busy_time(calls: List[Tuple]) -> float:
+    """Length of the union of the calls' [start, end] intervals."""
+    busy, covered_until = 0.0, float("-inf")
+    for start, end, *_ in sorted(calls, key=lambda call: call[:2]):
+        if end > covered_until:
+            busy += end - max(start, covered_until)
+            covered_until = end
+    return busy
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def do_POST(self) -> None:
+        self._handle()
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # One line per LLM call would drown the runner logs
+
+    def _handle(self) -> None:
+        split = urlsplit(self.path)
+        if split.path == USAGE_PATH:
+            params = dict(parse_qsl(split.query))
+            usage = self.server.usage(
+                float(params.get("start", 0)),
+                float(params.get("end", float("inf"))),
+            )
+            body = json.dumps(usage).encode("utf-8")
+            self._respond(Exchange(200, "application/json", body, 0.0, ""))
+            return
+
+        start = time.time()
+        self._tokens: Dict[str, int] = {}
+        label = self._answer(split)
+        self.server.log_call(start, time.time(), label, self._tokens)
+
+    def _answer(self, split) -> str:
+        """Answer one LLM request; returns the operator label of the call."""
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        provider = provider_of(split.path)
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            body = {}
+        model = request_model(provider, split.path, body)
+        label = operator_label(body)
+        if self.server.meter is not None:
+            self._tokens = self.server.meter(body)
+
+        exchange = None
+        if self.server.mode == "replay":
+            key = request_key(self.command, split.path, split.query, raw_body)
+            exchange = self.server.store.get(key, self.server.next_seq(key))
+            if exchange is not None:
+                self.server.count("replayed")
+            else:
+                self.server.count("missed")
+                if self.server.on_miss == "error":
+                    self._respond_error(
+                        404,
+                        f"No recorded response for {self.command} "
+                        f"{split.path} (model {model!r})",
+                    )
+                    return label
+        if exchange is None and (
+            self.server.mode == "stub" or self.server.on_miss == "stub"
+        ):
+            exchange = stub_exchange(
+                provider,
+                split.path,
+                body,
+                model,
+                self.server.stub_answer_to(raw_body),
+            )
+            self.server.count("stubbed")
+
+        if exchange is not None:
+            delay = self.server.latency.delay(exchange)
+            if delay > 0:
+                time.sleep(delay)
+            self._respond(exchange)
+            return label
+
+        key = request_key(self.command, split.path, split.query, raw_body)
+        self.server.next_seq(key)
+        try:
+            exchange = self._forward(provider, split, raw_body, model)
+        except urllib.error.URLError as e:
+            self._respond_error(502, f"Upstream request failed: {e.reason}")
+            return label
+        if 200 <= exchange.status < 300:
+            self.server.store.add(
+                key, provider, model, split.path, raw_body, exchange
+            )
+            self.server.count("recorded")
+        self._respond(exchange)
+        return label
+
+    def _forward(
+        self, provider: str, split, raw_body: bytes, model: str
+    ) -> Exchange:
+        url = UPSTREAMS[provider] + split.path
+        if split.query:
+            url += "?" + urlencode(parse_qsl(split.query))
+        headers = {
+            name: value
+            for name, value in self.headers.items()
+            if name.lower() in _FORWARDED_HEADERS
+        }
+        request = urllib.request.Request(
+            url, data=raw_body or None, headers=headers, method=self.command
+        )
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(
+                request, timeout=self.server.upstream_timeout
+            ) as response:
+                status = response.status
+                content_type = response.headers.get("Content-Type", "")
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            # Provider errors (rate limits, bad requests) are passed through
+            # to the client but not recorded
+            status = e.code
+            content_type = e.headers.get("Content-Type", "")
+            body = e.read()
+        latency = time.perf_counter() - start
+        return Exchange(status, content_type, body, latency, model)
+
+    def _respond(self, exchange: Exchange) -> None:
+        self.send_response(exchange.status)
+        self.send_header(
+            "Content-Type", exchange.content_type or "application/json"
+        )
+        self.send_header("Content-Length", str(len(exchange.body)))
+        self.end_headers()
+        self.wfile.write(exchange.body)
+
+    def _respond_error(self, status: int, message: str) -> None:
+        body = json.dumps(
+            {"error": {"message": message, "code": status}}
+        ).encode("utf-8")
+        self._respond(Exchange(status, "application/json", body, 0.0, ""))
+
+
+def fetch_usage(endpoint: str, start: float, end: float) -> Optional[Dict]:
+    """
+    LLM calls a server at *endpoint* answered between *start* and *end*
+    (see ReplayServer.usage), None if the server cannot be reached.
+    """
+    query = urlencode({"start": repr(start), "end": repr(end)})
+    url = f"{endpoint.rstrip('/')}{USAGE_PATH}?{query}"
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+def start_stub_server(
+    latency_ms: float = 0.0,
+    answer: str = "True",
+    host: str = "127.0.0.1",
+    meter: Optional[Callable[[Dict[str, Any]], Dict[str, int]]] = None,
+    selectivity: float = 1.0,
+) -> Tuple[ReplayServer, str]:
+    """
+    Start a stub server on a free port in a background thread.
+
+    Args:
+        meter: Token counter of the requests (see ReplayServer)
+        selectivity: Fraction of requests answered *answer* (see
+            ReplayServer)
+
+    Returns:
+        The server and its endpoint URL
+    """
+    latency = LatencyModel("fixed" if latency_ms else "none", None, latency_ms)
+    server = ReplayServer(
+        (host, 0),
+        "stub",
+        latency=latency,
+        stub_answer=answer,
+        meter=meter,
+        stub_selectivity=selectivity,
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def serve(args: argparse.Namespace) -> None:
+    store = None if args.command == "stub" else RecordingStore(args.store)
+    latency = None
+    if args.command == "replay":
+        latency = LatencyModel(
+            args.latency, store, args.fixed_ms, args.latency_scale, args.seed
+        )
+    elif args.command == "stub":
+        latency = LatencyModel(
+            "fixed" if args.fixed_ms else "none", None, args.fixed_ms
+        )
+    server = ReplayServer(
+        (args.host, args.port),
+        args.command,
+        store,
+        latency=latency,
+        on_miss=getattr(args, "on_miss", "error"),
+        stub_answer=getattr(args, "answer", "True"),
+        stub_selectivity=getattr(args, "selectivity", 1.0),
+    )
+    endpoint = f"http://{args.host}:{args.port}"
+    print(f"✓ LLM {args.command} server listening on {endpoint}")
+    if store is not None:
+        print(f"  Store: {args.store}")
+    if latency is not None:
+        print(f"  Latency: {latency.mode}")
+    print(f"  Run the benchmark with: run.py ... --llm-endpoint {endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        counters = ", ".join(f"{k}={v}" for k, v in server.counters.items())
+        print(f"\nStopped ({counters or 'no requests'})")
+
+
+def print_stats(args: argparse.Namespace) -> None:
+    store = RecordingStore(args.store)
+    rows = store.summary()
+    if not rows:
+        print(f"No exchanges recorded in {args.store}")
+        return
+    print(
+        f"{'provider':<8} {'model':<28} {'calls':>7} {'prompt':>10} "
+        f"{'completion':>10} {'avg s':>7} {'max s':>7}"
+    )
+    for provider, model, calls, prompt, completion, avg, peak in rows:
+        print(
+            f"{provider:<8} {model:<28} {calls:>7} {prompt or 0:>10} "
+            f"{completion or 0:>10} {avg:>7.2f} {peak:>7.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Record/replay stand-in for the OpenAI and Gemini APIs"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command, help_text in [
+        ("record", "Forward requests to the providers and record them"),
+        ("replay", "Answer requests from a recording, without network"),
+    ]:
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("--host", default="127.0.0.1")
+        sub.add_argument("--port", type=int, default=DEFAULT_PORT)
+        sub.add_argument("--store", type=Path, default=DEFAULT_STORE)
+
+    stub = subparsers.add_parser(
+        "stub", help="Answer every request synthetically, without network"
+    )
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    replay = subparsers.choices["replay"]
+    replay.add_argument(
+        "--latency",
+        choices=["none", "fixed", "recorded", "sampled"],
+        default="none",
+        help="Simulated response latency (default: none)",
+    )
+    for sub in (replay, stub):
+        sub.add_argument(
+            "--fixed-ms",
+            type=float,
+            default=0.0,
+            help="Latency in milliseconds for --latency fixed and stub answers",  # noqa: E501
+        )
+        sub.add_argument(
+            "--answer",
+            default="True",
+            help="Text of synthetic answers (default: True)",
+        )
+        sub.add_argument(
+            "--selectivity",
+            type=float,
+            default=1.0,
+            help="Fraction of synthetic answers that are --answer, the others are False (default: 1)",  # noqa: E501
+        )
+    replay.add_argument(
+        "--latency-scale",
+        type=float,
+        default=1.0,
+        help="Factor applied to recorded and sampled latencies",
+    )
+    replay.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Random seed for --latency sampled",
+    )
+    replay.add_argument(
+        "--on-miss",
+        choices=["error", "record", "stub"],
+        default="error",
+        help="Answer unrecorded requests with an error (default), forward and record them, or a synthetic answer",  # noqa: E501
+    )
+
+    stats = subparsers.add_parser("stats", help="Summarize a recording")
+    stats.add_argument("--store", type=Path, default=DEFAULT_STORE)
+
+    args = parser.parse_args()
+    if args.command == "stats":
+        print_stats(args)
+    else:
+        serve(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+Content-addressed cache of preprocessed media (downscaled images, mono audio).
+
+The multimodal scenarios (animals, cars, ecomm, mmqa) reference images and
+audio clips by path, and every system sends the original files to the LLM on
+every run, re-decoding and re-encoding them on its own. With the media cache
+enabled (run.py --media-cache), scenario setup writes a derivative of every
+referenced file once:
+
+    images  downscaled to a maximum side and/or pixel budget, re-encoded as
+            JPEG or WebP
+    audio   (WAV) mixed down to mono and resampled to a target rate
+
+Derivatives are stored under the SHA-256 of the source content in one
+directory per preprocessing profile (files/media_cache/<profile>/objects),
+so identical files referenced by several tables or scale factors are
+converted once. Every source path gets its own link to the derivative that
+keeps the file's name (files/<path hash>/<name>), which keeps the rewrite
+reversible. The profile's rewrite table maps every source path to that link
+and records the bytes and estimated input tokens before and after. Runners opt
+in with use_media_cache: load_data then returns tables whose media paths
+point to the derivatives, and result paths are mapped back to the originals
+before they are saved, so ground truth and evaluation are unaffected.
+
+Image tokens are estimated with Gemini's rule (258 tokens for images up to
+384x384, else 258 per 768x768 tile), as the benchmark defaults to Gemini
+models. Audio tokens depend only on the duration (32 tokens per second), so
+resampling saves bytes and upload time but no tokens.
+
+Prepare and inspect a cache outside of a run:
+    python src/media_cache.py prepare files/animals/data/sf_200 --max-side 768
+    python src/media_cache.py stats --max-side 768
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from table_format import read_table
+
+MEDIA_CACHE_ENV = "SEMBENCH_MEDIA_CACHE"
+CACHE_DIR = Path(__file__).resolve().parents[1] / "files" / "media_cache"
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif"}
+AUDIO_EXTENSIONS = {".wav"}
+AUDIO_TOKENS_PER_SECOND = 32
+
+# Number of values inspected to decide whether a column holds media paths
+_SAMPLE_SIZE = 20
+
+
+@dataclass(frozen=True)
+class MediaProfile:
+    """Preprocessing applied to the media files."""
+
+    max_side: Optional[int] = 1024
+    max_pixels: Optional[int] = None
+    image_format: str = "jpeg"  # jpeg or webp
+    quality: int = 85
+    audio_rate: Optional[int] = 16000
+
+    @property
+    def name(self) -> str:
+        """Directory name of the profile, e.g. img1024-jpeg85-a16000."""
+        parts = ["img"]
+        if self.max_side:
+            parts[0] += str(self.max_side)
+        if self.max_pixels:
+            parts.append(f"px{self.max_pixels}")
+        parts.append(f"{self.image_format}{self.quality}")
+        parts.append(f"a{self.audio_rate}" if self.audio_rate else "a-orig")
+        return "-".join(parts)
+
+    @classmethod
+    def parse(cls, spec: str) -> "MediaProfile":
+        """
+        Parse a profile from "key=value,..." (e.g. "max_side=768,image_format=
+        webp"); an empty spec or "default" yields the defaults.
+        """
+        options = {}
+        names = {f.name for f in fields(cls)}
+        for item in filter(None, (spec or "").split(",")):
+            if item == "default":
+                continue
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in names:
+                raise ValueError(f"Unknown media cache option: {key}")
+            if key == "image_format":
+                options[key] = value.strip().lower()
+            else:
+                options[key] = int(value) if value.strip() else None
+        profile = cls(**options)
+        if profile.image_format not in ("jpeg", "webp"):
+            raise ValueError(
+                f"Unsupported image format: {profile.image_format}"
+            )
+        return profile
+
+
+@dataclass
+class MediaCacheStats:
+    """Totals of a rewrite table."""
+
+    files: int = 0
+    source_bytes: int = 0
+    derived_bytes: int = 0
+    source_tokens: int = 0
+    derived_tokens: int = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.source_bytes - self.derived_bytes
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.source_tokens - self.derived_tokens
+
+
+def image_tokens(width: int, height: int) -> int:
+    """Estimated input tokens of an image (Gemini's tiling rule)."""
+    if width <= 384 and height <= 384:
+        return 258
+    return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+def media_kind(path: str) -> Optional[str]:
+    """'image', 'audio' or None, judged by the file extension."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in IMAGE_EXTENSIONS:
+        return "image"
+    if suffix in AUDIO_EXTENSIONS:
+        return "audio"
+    return None
+
+
+def media_columns(table: pd.DataFrame) -> List[str]:
+    """Columns whose values are paths of existing media files."""
+    columns = []
+    for column in table.columns:
+        if table[column].dtype != object:
+            continue
+        sample = table[column].dropna().head(_SAMPLE_SIZE)
+        if len(sample) and all(
+            isinstance(v, str) and media_kind(v) and os.path.isfile(v)
+            for v in sample
+        ):
+            columns.append(column)
+    return columns
+
+
+def _file_digest(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _tmp_path(target: Path) -> Path:
+    # Unique per thread: identical sources are converted to the same target
+    return target.with_name(
+        f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+
+
+class MediaCache:
+    """
+    Derivatives of one MediaProfile plus the rewrite table pointing to them.
+
+    Usage:
+        cache = MediaCache(MediaProfile(max_side=768))
+        cache.prepare_folder(data_path)
+        images = cache.rewrite(images)  # paths now point to derivatives
+    """
+
+    def __init__(self, profile: MediaProfile, root: Path = CACHE_DIR):
+        """
+        Args:
+            profile: Preprocessing applied to the media files
+            root: Directory holding one subdirectory per profile
+        """
+        self.profile = profile
+        self.path = Path(root) / profile.name
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._rewrites: Optional[Dict[str, str]] = None
+        self._originals: Optional[Dict[str, str]] = None
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rewrites ("
+                " source TEXT PRIMARY KEY,"
+                " source_mtime_ns INTEGER,"
+                " digest TEXT,"
+                " derived TEXT,"
+                " kind TEXT,"
+                " source_bytes INTEGER,"
+                " derived_bytes INTEGER,"
+                " source_tokens INTEGER,"
+                " derived_tokens INTEGER,"
+                " created_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path / "rewrites.sqlite", timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # Preprocessing
+
+    def prepare_folder(self, folder: Path, workers: int = 8) -> int:
+        """Prepare the media referenced by all tables in *folder*."""
+        paths = set()
+        for table_path in sorted(Path(folder).glob("*.csv")):
+            table = read_table(table_path)
+            for column in media_columns(table):
+                paths.update(table[column].dropna())
+        return self.prepare(sorted(paths), workers)
+
+    def prepare(self, paths: Iterable[str], workers: int = 8) -> int:
+        """
+        Write missing derivatives of *paths* and add them to the rewrite
+        table. Sources changed since their entry was written are redone.
+
+        Returns:
+            Number of files preprocessed
+        """
+        known = {
+            source: mtime
+            for source, mtime in self._connection().execute(
+                "SELECT source, source_mtime_ns FROM rewrites"
+            )
+        }
+        todo = []
+        for path in paths:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if known.get(path) != mtime:
+                todo.append(path)
+        if not todo:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = [row for row in pool.map(self._prepare_one, todo) if row]
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO rewrites VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._rewrites = self._originals = None
+        return len(rows)
+
+    def _prepare_one(self, source: str) -> Optional[Tuple]:
+        kind = media_kind(source)
+        try:
+            stat = os.stat(source)
+            digest = _file_digest(source)
+            suffix = (
+                f".{'jpg' if self.profile.image_format == 'jpeg' else 'webp'}"
+                if kind == "image"
+                else ".wav"
+            )
+            obj = self.path / "objects" / digest[:2] / f"{digest}{suffix}"
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            if kind == "image":
+                tokens = self._convert_image(source, obj)
+            else:
+                tokens = self._convert_audio(source, obj)
+            derived_bytes = obj.stat().st_size
+            if derived_bytes >= stat.st_size and tokens[0] == tokens[1]:
+                # Nothing gained, keep sending the original
+                derived, derived_bytes = Path(source), stat.st_size
+            else:
+                derived = self._link(source, obj)
+        except Exception as e:
+            print(f"  Warning: Could not preprocess {source}: {e}")
+            return None
+        return (
+            source,
+            stat.st_mtime_ns,
+            digest,
+            str(derived),
+            kind,
+            stat.st_size,
+            derived_bytes,
+            tokens[0],
+            tokens[1],
+            time.time(),
+        )
+
+    def _link(self, source: str, obj: Path) -> Path:
+        """Link named like *source* (suffix of the derivative) to *obj*."""
+        path_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        name = Path(source).stem + obj.suffix
+        link = self.path / "files" / path_hash / name
+        link.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _tmp_path(link)
+        try:
+            os.link(obj, tmp)
+        except OSError:
+            os.symlink(obj, tmp)
+        os.replace(tmp, link)
+        return link
+
+    def _convert_image(self, source: str, target: Path) -> Tuple[int, int]:
+        from PIL import Image, ImageOps
+
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            width, height = image.size
+            scale = 1.0
+            if self.profile.max_side:
+                scale = min(scale, self.profile.max_side / max(width, height))
+            if self.profile.max_pixels:
+                scale = min(
+                    scale, math.sqrt(self.profile.max_pixels / (width * height))
+                )
+            size = (width, height)
+            if scale < 1.0:
+                size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            if not target.exists():
+                if size != (width, height):
+                    image = image.resize(size, Image.LANCZOS)
+                tmp = _tmp_path(target)
+                image.convert("RGB").save(
+                    tmp,
+                    format=self.profile.image_format.upper(),
+                    quality=self.profile.quality,
+                )
+                os.replace(tmp, target)
+        return image_tokens(width, height), image_tokens(*size)
+
+    def _convert_audio(self, source: str, target: Path) -> Tuple[int, int]:
+        with wave.open(source, "rb") as reader:
+            channels = reader.getnchannels()
+            width = reader.getsampwidth()
+            rate = reader.getframerate()
+            frames = reader.readframes(reader.getnframes())
+        tokens = math.ceil(
+            len(frames) / (channels * width * rate) * AUDIO_TOKENS_PER_SECOND
+        )
+        if target.exists():
+            return tokens, tokens
+
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+        samples = np.frombuffer(frames, dtype=dtype).astype(np.float64)
+        if width == 1:
+            samples = (samples - 128) * 256
+        else:
+            samples = samples / (1 << (8 * width - 16))
+        samples = samples.reshape(-1, channels).mean(axis=1)
+        target_rate = rate
+        if self.profile.audio_rate and rate > self.profile.audio_rate:
+            from scipy.signal import resample_poly
+
+            target_rate = self.profile.audio_rate
+            divisor = math.gcd(rate, target_rate)
+            samples = resample_poly(
+                samples, target_rate // divisor, rate // divisor
+            )
+        pcm = np.clip(np.round(samples), -32768, 32767).astype("<i2")
+
+        tmp = _tmp_path(target)
+        with wave.open(str(tmp), "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(target_rate)
+            writer.writeframes(pcm.tobytes())
+        os.replace(tmp, target)
+        return tokens, tokens
+
+    # Rewriting
+
+    def rewrites(self) -> Dict[str, str]:
+        """Source path -> derivative path of all prepared files."""
+        if self._rewrites is None:
+            self._rewrites = dict(
+                self._connection().execute(
+                    "SELECT source, derived FROM rewrites"
+                )
+            )
+            self._originals = {v: k for k, v in self._rewrites.items()}
+        return self._rewrites
+
+    def rewrite(self, table: pd.DataFrame) -> pd.DataFrame:
+        """Point the media paths of *table* to their derivatives."""
+        return self._map(table, self.rewrites())
+
+    def restore(self, table: pd.DataFrame) -> pd.DataFrame:
+        """Map derivative paths in *table* (e.g. results) back to sources."""
+        self.rewrites()
+        return self._map(table, self._originals)
+
+    @staticmethod
+    def _map(table: pd.DataFrame, mapping: Dict[str, str]) -> pd.DataFrame:
+        if not mapping or table is None:
+            return table
+        for column in table.columns:
+            values = table[column]
+            if values.dtype != object:
+                continue
+            mapped = values.map(mapping)
+            if mapped.notna().any():
+                table[column] = mapped.where(mapped.notna(), values)
+        return table
+
+    def stats(self) -> Dict[str, MediaCacheStats]:
+        """Totals of the rewrite table per media kind."""
+        result = {}
+        for row in self._connection().execute(
+            "SELECT kind, COUNT(*), SUM(source_bytes), SUM(derived_bytes),"
+            " SUM(source_tokens), SUM(derived_tokens)"
+            " FROM rewrites GROUP BY kind ORDER BY kind"
+        ):
+            result[row[0]] = MediaCacheStats(*row[1:])
+        return result
+
+
+def print_stats(cache: MediaCache) -> None:
+    stats = cache.stats()
+    if not stats:
+        print(f"Media cache {cache.path} is empty")
+        return
+    print(f"Media cache {cache.path}")
+    print(
+        f"{'kind':<6} {'files':>7} {'source MB':>10} {'cached MB':>10} "
+        f"{'saved':>6} {'tokens':>10} {'cached':>10} {'saved':>6}"
+    )
+    for kind, s in stats.items():
+        byte_ratio = s.saved_bytes / s.source_bytes if s.source_bytes else 0
+        token_ratio = (
+            s.saved_tokens / s.source_tokens if s.source_tokens else 0
+        )
+        print(
+            f"{kind:<6} {s.files:>7} {s.source_bytes / 1e6:>10.1f} "
+            f"{s.derived_bytes / 1e6:>10.1f} {byte_ratio:>6.1%} "
+            f"{s.source_tokens:>10} {s.derived_tokens:>10} {token_ratio:>6.1%}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Preprocess the media files referenced by scenario tables"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prepare = subparsers.add_parser(
+        "prepare", help="Preprocess the media referenced by data folders"
+    )
+    prepare.add_argument("folders", nargs="+", type=Path)
+    prepare.add_argument("--workers", type=int, default=8)
+    stats = subparsers.add_parser("stats", help="Show byte and token savings")
+    for sub in (prepare, stats):
+        sub.add_argument("--max-side", type=int, default=1024)
+        sub.add_argument("--max-pixels", type=int, default=None)
+        sub.add_argument(
+            "--image-format", choices=["jpeg", "webp"], default="jpeg"
+        )
+        sub.add_argument("--quality", type=int, default=85)
+        sub.add_argument("--audio-rate", type=int, default=16000)
+    args = parser.parse_args()
+
+    cache = MediaCache(
+        MediaProfile(
+            max_side=args.max_side,
+            max_pixels=args.max_pixels,
+            image_format=args.image_format,
+            quality=args.quality,
+            audio_rate=args.audio_rate,
+        )
+    )
+    if args.command == "prepare":
+        for folder in args.folders:
+            count = cache.prepare_folder(folder, args.workers)
+            print(f"✓ {folder}: preprocessed {count} file(s)")
+    print_stats(cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Nested sampling of scale factors: every sf_k is a prefix of every larger sf.
+
+By default each scenario samples sf_<N> from scratch, so the data of
+neighbouring scale factors (e.g. the sf_100 ... sf_1600 ladder of the
+scalability plots) shares no rows: the curves mix the effect of the size with
+the variance of the sample, and the predicate and media caches miss at every
+step. With nested sampling enabled (run.py --nested-sampling), the generators
+fix one order of all candidate rows per table and take its first N rows:
+
+    rank      every row gets a pseudo-random rank from a seeded hash of its
+              key (file name, id), independent of the order and of the other
+              rows of the source table
+    pinned    rows a query needs for a non-empty answer come first
+    strata    rows are interleaved so that every prefix keeps the share of
+              each stratum (e.g. cars with 1, 2 or 3 modalities)
+
+Attributes that the generators draw at random (e.g. the city of an animal
+sighting) are derived from the same row hash, so a row is identical in every
+scale factor it appears in, and the content-addressed predicate and media
+caches carry over from sf_k to sf_2k. Files that a scale factor copies are
+hard-linked from the largest smaller nested scale factor, so only the delta
+is copied. Nested data folders carry a manifest (nested_sampling.json).
+
+Usage:
+    order = nested_order(df["id"], seed=42, pinned=df["id"].isin(required))
+    sample = df.iloc[order[:scale_factor]]
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+NESTED_SAMPLING_ENV = "SEMBENCH_NESTED_SAMPLING"
+MANIFEST_FILE = "nested_sampling.json"
+DEFAULT_SEED = 42
+
+Keys = Union[pd.Series, pd.DataFrame, Sequence]
+PathLike = Union[str, Path]
+
+
+def nested_sampling_enabled() -> bool:
+    """Whether the data generators of this process sample nested."""
+    return bool(os.getenv(NESTED_SAMPLING_ENV))
+
+
+def row_hash(
+    keys: Keys, seed: int = DEFAULT_SEED, salt: str = ""
+) -> np.ndarray:
+    """
+    Seeded 64-bit hash of every key (a DataFrame hashes the values of each
+    row). Different salts give independent hashes of the same keys.
+    """
+    if not isinstance(keys, (pd.Series, pd.DataFrame)):
+        keys = pd.Series(list(keys))
+    hash_key = hashlib.blake2b(
+        f"{seed}:{salt}".encode(), digest_size=8
+    ).hexdigest()
+    return pd.util.hash_pandas_object(
+        keys, index=False, hash_key=hash_key
+    ).to_numpy(dtype=np.uint64)
+
+
+def row_uniform(
+    keys: Keys, seed: int = DEFAULT_SEED, salt: str = ""
+) -> np.ndarray:
+    """Stable uniform draw in [0, 1) per key."""
+    return (row_hash(keys, seed, salt) >> np.uint64(11)) / float(1 << 53)
+
+
+def row_choice(
+    keys: Keys,
+    options: Sequence,
+    weights: Union[Sequence[float], np.ndarray],
+    seed: int = DEFAULT_SEED,
+    salt: str = "",
+) -> np.ndarray:
+    """
+    Stable weighted choice among *options* per key.
+
+    Args:
+        keys: Row keys
+        options: Values to choose from
+        weights: One weight per option, or one row of weights per key
+        seed: Seed of the draws
+        salt: Distinguishes independent draws for the same keys
+    """
+    cumulative = np.cumsum(np.asarray(weights, dtype=float), axis=-1)
+    cumulative = cumulative / cumulative[..., -1:]
+    draws = row_uniform(keys, seed, salt)[:, None]
+    picks = np.minimum((draws >= cumulative).sum(axis=-1), len(options) - 1)
+    return np.asarray(options, dtype=object)[picks]
+
+
+def nested_order(
+    keys: Keys,
+    seed: int = DEFAULT_SEED,
+    strata: Optional[Keys] = None,
+    pinned: Optional[Union[Sequence[bool], np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Row positions in nested sampling order: the first N positions are the
+    sample of size N, for every N.
+
+    Args:
+        keys: Row keys; equal keys get equal ranks
+        seed: Seed of the ranks
+        strata: Stratum of every row; every prefix takes from each stratum in
+            proportion to its size
+        pinned: Rows that precede all others
+    """
+    ranks = row_hash(keys, seed)
+    fraction = np.zeros(len(ranks))
+    if strata is not None:
+        codes, _ = pd.factorize(pd.Series(list(strata)), sort=True)
+        by_stratum = np.lexsort((ranks, codes))
+        sizes = np.bincount(codes)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        sorted_codes = codes[by_stratum]
+        within = np.arange(len(ranks)) - starts[sorted_codes]
+        fraction[by_stratum] = (within + 0.5) / sizes[sorted_codes]
+    if pinned is None:
+        later = np.zeros(len(ranks), dtype=bool)
+    else:
+        later = ~np.asarray(pinned, dtype=bool)
+    return np.lexsort((ranks, fraction, later))
+
+
+def nested_sample(
+    df: pd.DataFrame,
+    n: int,
+    key: Union[str, Sequence[str]],
+    seed: int = DEFAULT_SEED,
+    strata: Optional[Keys] = None,
+    pinned: Optional[Union[Sequence[bool], np.ndarray]] = None,
+) -> pd.DataFrame:
+    """The first *n* rows of *df* in nested order of its *key* column(s)."""
+    order = nested_order(df[key], seed, strata, pinned)
+    return df.iloc[order[:n]].reset_index(drop=True)
+
+
+def write_manifest(
+    folder: PathLike, scale_factor: int, seed: int = DEFAULT_SEED
+) -> None:
+    """Mark *folder* as the nested sample of *scale_factor*."""
+    manifest = {"scale_factor": scale_factor, "seed": seed}
+    with open(Path(folder) / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def is_nested_folder(folder: PathLike, seed: int = DEFAULT_SEED) -> bool:
+    """Whether *folder* was generated with nested sampling and *seed*."""
+    try:
+        with open(Path(folder) / MANIFEST_FILE) as f:
+            return json.load(f).get("seed") == seed
+    except (OSError, ValueError):
+        return False
+
+
+def check_nested_folder(folder: PathLike, seed: int = DEFAULT_SEED) -> None:
+    """Warn if the existing data *folder* is reused but was not nested."""
+    if not is_nested_folder(folder, seed):
+        print(
+            f"Warning: {folder} was not generated with nested sampling "
+            f"(seed {seed}); delete it to regenerate it nested."
+        )
+
+
+def previous_nested_folder(
+    data_dir: PathLike, scale_factor: int, seed: int = DEFAULT_SEED
+) -> Optional[Path]:
+    """The largest nested sf_<k> below *data_dir* with k < *scale_factor*."""
+    best = None
+    for folder in Path(data_dir).glob("sf_*"):
+        try:
+            k = int(folder.name[len("sf_"):])
+        except ValueError:
+            continue
+        if k < scale_factor and is_nested_folder(folder, seed):
+            if best is None or k > best[0]:
+                best = (k, folder)
+    return best[1] if best else None
+
+
+def materialize_files(
+    names: Iterable[str],
+    source_dir: PathLike,
+    target_dir: PathLike,
+    previous_dir: Optional[PathLike] = None,
+) -> Tuple[int, int]:
+    """
+    Copy the files *names* from *source_dir* to *target_dir*, hard-linking
+    the ones that *previous_dir* (a smaller nested scale factor) already
+    holds instead of copying them again. Existing targets are kept.
+
+    Returns:
+        (files linked, files copied)
+    """
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    linked = copied = 0
+    for name in names:
+        target = target_dir / name
+        if target.exists():
+            continue
+        if previous_dir is not None and (Path(previous_dir) / name).exists():
+            try:
+                os.link(Path(previous_dir) / name, target)
+                linked += 1
+                continue
+            except OSError:
+                pass  # Other file system or no hard links: copy instead
+        shutil.copy2(Path(source_dir) / name, target)
+        copied += 1
+    return linked, copied
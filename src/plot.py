@@ -24,6 +24,8 @@ import tomli
 from matplotlib.lines import Line2D
 from scipy.stats import gmean
 
+from results_store import load_metrics_folder, load_metrics_folders
+
 
 # Set style for publication-quality plots
 plt.style.use("seaborn-v0_8-whitegrid")
@@ -2027,22 +2029,24 @@ class BenchmarkPlotter:
         for use_case in ["detective", "movie", "animals"]:
             # We just pick any of the folders and hope they all contain
             # duplicate data:
-            metrics_files = glob.glob(
-                os.path.join(
-                    self.files_dir,
-                    use_case,
-                    "metrics",
-                    "across_system**",  # animals uses 'across_system_*', detective and movie use 'across_systems_*' # noqa: E501
-                    "*.json",
-                ),
-                recursive=True,
-            )
-            for json_file in metrics_files:
-                with open(json_file, "r") as f:
-                    content = json.load(f)
+            metrics_folders = [
+                folder
+                for folder in glob.glob(
+                    os.path.join(
+                        self.files_dir,
+                        use_case,
+                        "metrics",
+                        "across_system*",  # animals uses 'across_system_*', detective and movie use 'across_systems_*' # noqa: E501
+                    )
+                )
+                if os.path.isdir(folder)
+            ]
+            loaded = load_metrics_folders(metrics_folders)
+            for systems in loaded.values():
+                for system_name, content in systems.items():
                     for query_id, metric in content.items():
                         metric["use_case"] = use_case
-                        metric["system"] = Path(json_file).stem
+                        metric["system"] = system_name
                         metric["query_id_str"] = query_id
                         metric_type, accuracy = self.unify_accuracy_metric(
                             metric
@@ -2183,15 +2187,9 @@ class BenchmarkPlotter:
             return
 
         # Load metrics data from the specific directory
-        metrics_data = {}
-        for json_file in data_dir.glob("*.json"):
-            system_name = json_file.stem
-            try:
-                with open(json_file, "r") as f:
-                    metrics_data[system_name] = json.load(f)
-                print(f"Loaded metrics for {system_name}")
-            except Exception as e:
-                print(f"Error loading {json_file}: {e}")
+        metrics_data = load_metrics_folder(data_dir)
+        for system_name in metrics_data:
+            print(f"Loaded metrics for {system_name}")
 
         if not metrics_data:
             print("No metrics data found!")
@@ -2503,21 +2501,14 @@ class BenchmarkPlotter:
         all_round_data = {}  # {round: {system: metrics}}
         systems = set()
 
+        loaded = load_metrics_folders(
+            [base_dir / round_folder for round_folder in round_folders]
+        )
         for round_folder in round_folders:
-            data_dir = base_dir / round_folder
-            round_data = {}
-
-            for json_file in data_dir.glob("*.json"):
-                system_name = json_file.stem
+            round_data = loaded[base_dir / round_folder]
+            for system_name in round_data:
                 systems.add(system_name)
-                try:
-                    with open(json_file, "r") as f:
-                        round_data[system_name] = json.load(f)
-                    print(
-                        f"Loaded metrics for {system_name} from {round_folder}"
-                    )
-                except Exception as e:
-                    print(f"Error loading {json_file}: {e}")
+                print(f"Loaded metrics for {system_name} from {round_folder}")
 
             all_round_data[round_folder] = round_data
 
@@ -3350,15 +3341,9 @@ class BenchmarkPlotter:
             return
 
         # Load metrics data from the specific directory
-        metrics_data = {}
-        for json_file in data_dir.glob("*.json"):
-            system_name = json_file.stem
-            try:
-                with open(json_file, "r") as f:
-                    metrics_data[system_name] = json.load(f)
-                print(f"Loaded metrics for {system_name}")
-            except Exception as e:
-                print(f"Error loading {json_file}: {e}")
+        metrics_data = load_metrics_folder(data_dir)
+        for system_name in metrics_data:
+            print(f"Loaded metrics for {system_name}")
 
         if not metrics_data:
             print("No metrics data found!")
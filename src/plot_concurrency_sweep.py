@@ -0,0 +1,320 @@
+"""
+Speedup Curves of Concurrency Sweeps
+Plots time speedup, cost and quality per LLM concurrency level from the
+folders written by `run.py --sweep-concurrency`
+(files/<scenario>/metrics/concurrency_sweep_<model>_c<level>[_repeat<n>]);
+sweeps run with --llm-stub prefix the folders with the stub's run label
+(--run-label-prefix llm_stub_<model>_<latency>ms)
+"""
+
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.gridspec import GridSpec
+
+from plot_scalability_combined import CombinedPlotter
+from results_store import load_metrics_folders
+
+_SWEEP_FOLDER = re.compile(r"_c(?P<level>\d+)(?:_repeat(?P<repeat>\d+))?$")
+
+
+def sweep_prefix(model: str, run_label_prefix: Optional[str] = None) -> str:
+    """Folder name of a sweep of *model* up to its level."""
+    prefix = f"concurrency_sweep_{model.replace('/', '_')}"
+    return f"{run_label_prefix}_{prefix}" if run_label_prefix else prefix
+
+
+class ConcurrencySweepPlotter(CombinedPlotter):
+    """Generates speedup, cost and quality curves over concurrency levels."""
+
+    # ================== Sweep Data Loading ==================
+    def load_sweep_data(
+        self,
+        scenario: str,
+        model: str = "gemini-2.5-flash",
+        run_label_prefix: Optional[str] = None,
+    ) -> Dict[int, Dict[int, Dict[str, Dict[str, dict]]]]:
+        """
+        Load the sweep folders of a scenario, of the sweep run under
+        *run_label_prefix* (e.g. the --llm-stub run label) if given.
+
+        Returns:
+            {level: {repeat: {system: {"Q1": record, ...}}}}, repeat 0 for
+            sweeps run without --repeat
+        """
+        metrics_dir = self.files_dir / scenario / "metrics"
+        prefix = sweep_prefix(model, run_label_prefix)
+        folders = sorted(metrics_dir.glob(f"{prefix}_c*"))
+        loaded = load_metrics_folders(folders)
+
+        data = defaultdict(dict)
+        for folder in folders:
+            match = _SWEEP_FOLDER.search(folder.name)
+            if not match or folder.name[: match.start()] != prefix:
+                continue
+            level = int(match.group("level"))
+            repeat = int(match.group("repeat") or 0)
+            data[level][repeat] = loaded[folder]
+        return dict(data)
+
+    def aggregate_sweep(
+        self, data: Dict[int, Dict[int, Dict[str, Dict[str, dict]]]]
+    ) -> Dict[str, Dict[int, Dict[str, Tuple[float, float]]]]:
+        """
+        Totals per system and level over the queries that succeeded at every
+        level of the system, as (mean, std) across repeats.
+
+        Returns:
+            {system: {level: {"execution_time"|"money_cost"|"quality":
+            (mean, std)}}}
+        """
+        succeeded = defaultdict(list)
+        for level, repeats in data.items():
+            for systems in repeats.values():
+                for system, queries in systems.items():
+                    succeeded[system].append(
+                        {
+                            q
+                            for q, r in queries.items()
+                            if r.get("status") == "success"
+                        }
+                    )
+        common = {
+            system: set.intersection(*query_sets)
+            for system, query_sets in succeeded.items()
+        }
+
+        aggregated = defaultdict(dict)
+        for level, repeats in data.items():
+            per_system = defaultdict(lambda: defaultdict(list))
+            for systems in repeats.values():
+                for system, queries in systems.items():
+                    records = [queries[q] for q in common[system]]
+                    if not records:
+                        continue
+                    values = per_system[system]
+                    values["execution_time"].append(
+                        sum(r.get("execution_time") or 0 for r in records)
+                    )
+                    values["money_cost"].append(
+                        sum(r.get("money_cost") or 0 for r in records)
+                    )
+                    quality = [
+                        self.extract_metric(r, "quality") for r in records
+                    ]
+                    quality = [q for q in quality if q is not None]
+                    if quality:
+                        values["quality"].append(np.mean(quality))
+            for system, values in per_system.items():
+                aggregated[system][level] = {
+                    metric: (np.mean(v), np.std(v, ddof=0))
+                    for metric, v in values.items()
+                }
+        return dict(aggregated)
+
+    # ================== Plotting ==================
+    def plot_sweep_figure(
+        self,
+        sweep_data: Dict[str, Dict[str, Dict[int, Dict[str, tuple]]]],
+        output_dir: Path,
+        model: str = "gemini-2.5-flash",
+        run_label_prefix: Optional[str] = None,
+    ):
+        """
+        Create a figure with 3 rows (Speedup, Cost, Quality) x 1 column per
+        scenario. Speedup is relative to the lowest level of each system; the
+        dashed line marks linear speedup.
+        """
+        scenarios = [s for s in self.scenario_order if s in sweep_data]
+        scenarios += sorted(set(sweep_data) - set(scenarios))
+        if not scenarios:
+            print("No concurrency sweeps to plot")
+            return
+
+        FONTSIZE_LABEL = 14
+        FONTSIZE_TICK = 12
+        FONTSIZE_LEGEND = 12
+        FONTSIZE_TITLE = 14
+        LINEWIDTH = 2.5
+        MARKERSIZE = 8
+        ERROR_ALPHA = 0.2
+
+        fig = plt.figure(figsize=(3.0 * len(scenarios), 1.8 * 3))
+        gs = GridSpec(
+            3, len(scenarios), figure=fig, hspace=0.0, wspace=0.30,
+            left=0.08, right=0.99, bottom=0.1, top=0.85,
+        )
+        metric_labels = ["Speedup", "Cost ($)", "Quality"]
+        metric_keys = ["speedup", "money_cost", "quality"]
+
+        all_systems = set()
+        for col, scenario in enumerate(scenarios):
+            systems = sweep_data[scenario]
+            all_systems.update(systems)
+            levels = sorted({lvl for s in systems.values() for lvl in s})
+            for row, metric_key in enumerate(metric_keys):
+                ax = fig.add_subplot(gs[row, col])
+                if metric_key == "speedup" and levels:
+                    ax.plot(
+                        levels, np.array(levels) / levels[0], linestyle="--",
+                        linewidth=1.2, color="gray", alpha=0.7,
+                    )
+                for system in sorted(systems):
+                    self._plot_sweep_line(
+                        ax, systems[system], metric_key, system,
+                        LINEWIDTH, MARKERSIZE, ERROR_ALPHA,
+                    )
+
+                ax.set_xscale("log")
+                if metric_key == "speedup":
+                    ax.set_yscale("log")
+                ax.grid(True, alpha=0.25, linewidth=0.8, color="gray")
+                ax.set_axisbelow(True)
+                ax.tick_params(labelsize=FONTSIZE_TICK)
+                ax.set_xticks(levels)
+                if row == len(metric_keys) - 1:
+                    ax.set_xticklabels([str(lvl) for lvl in levels])
+                    ax.set_xlabel(
+                        "Concurrency", fontsize=FONTSIZE_LABEL,
+                        fontweight="bold",
+                    )
+                else:
+                    ax.set_xticklabels([])
+                ax.minorticks_off()
+                if col == 0:
+                    ax.set_ylabel(
+                        metric_labels[row], fontsize=FONTSIZE_LABEL,
+                        fontweight="bold",
+                    )
+                if row == 0:
+                    ax.set_title(
+                        self.format_scenario_name(scenario),
+                        fontsize=FONTSIZE_TITLE, fontweight="bold", pad=4,
+                    )
+
+        legend_handles = [
+            plt.Line2D(
+                [0], [0], color=self.system_colors.get(system),
+                linewidth=LINEWIDTH,
+                marker=self.system_markers.get(system, "o"),
+                markersize=MARKERSIZE,
+            )
+            for system in sorted(all_systems)
+        ]
+        legend_labels = [
+            self.format_system_name(s) for s in sorted(all_systems)
+        ]
+        legend_handles.append(
+            plt.Line2D([0], [0], color="gray", linestyle="--", linewidth=1.2)
+        )
+        legend_labels.append("Linear")
+        fig.legend(
+            legend_handles, legend_labels, loc="upper center",
+            bbox_to_anchor=(0.5, 0.99), ncol=len(legend_handles),
+            fontsize=FONTSIZE_LEGEND, frameon=False,
+        )
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_file = (
+            output_dir / f"{sweep_prefix(model, run_label_prefix)}.pdf"
+        )
+        plt.savefig(output_file, dpi=300, bbox_inches="tight", pad_inches=0.02)
+        print(f"Saved concurrency sweep figure: {output_file}")
+        plt.close()
+
+    def _plot_sweep_line(
+        self, ax, levels_data, metric_key, system, linewidth, markersize,
+        error_alpha,
+    ):
+        """Plot one system's curve of a metric over the concurrency levels."""
+        levels = sorted(levels_data)
+        key = "execution_time" if metric_key == "speedup" else metric_key
+        points = [
+            (lvl, *levels_data[lvl][key])
+            for lvl in levels
+            if key in levels_data[lvl]
+        ]
+        if not points:
+            return
+        xs, means, stds = (np.array(v, dtype=float) for v in zip(*points))
+        if metric_key == "speedup":
+            valid = means > 0
+            xs, stds = xs[valid], stds[valid]
+            means = means[valid]
+            if not len(means):
+                return
+            # Speedup relative to the lowest level; std of the times scaled
+            base = means[0]
+            stds = base * stds / means**2
+            means = base / means
+
+        color = self.system_colors.get(system)
+        ax.plot(
+            xs, means, linestyle="-", linewidth=linewidth, color=color,
+            marker=self.system_markers.get(system, "o"),
+            markersize=markersize, markeredgecolor="white",
+            markeredgewidth=0.8,
+        )
+        ax.fill_between(
+            xs, means - stds, means + stds, color=color, alpha=error_alpha
+        )
+
+    def plot_sweeps(
+        self,
+        model: str = "gemini-2.5-flash",
+        run_label_prefix: Optional[str] = None,
+    ):
+        """Load all sweeps of *model* and generate the figure."""
+        print("Loading concurrency sweeps...")
+        sweep_data = {}
+        scenarios = sorted(
+            d.name for d in self.files_dir.iterdir() if (d / "metrics").is_dir()
+        )
+        for scenario in scenarios:
+            raw = self.load_sweep_data(scenario, model, run_label_prefix)
+            if raw:
+                sweep_data[scenario] = self.aggregate_sweep(raw)
+                levels = ", ".join(map(str, sorted(raw)))
+                print(f"  {scenario}: levels {levels}")
+        self.plot_sweep_figure(
+            sweep_data, self.figures_dir, model, run_label_prefix
+        )
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Plot speedup curves of run.py --sweep-concurrency"
+    )
+    parser.add_argument(
+        "--model",
+        default="gemini-2.5-flash",
+        help="Model of the sweep (default: gemini-2.5-flash)",
+    )
+    parser.add_argument(
+        "--run-label-prefix",
+        default=None,
+        help="Run label the sweep was nested under, e.g. llm_stub_gemini-2.5-flash_20ms for a sweep with --llm-stub 20 (default: none)",  # noqa: E501
+    )
+    parser.add_argument(
+        "--base-dir",
+        default=".",
+        help="Base directory (default: .)"
+    )
+
+    args = parser.parse_args()
+
+    plotter = ConcurrencySweepPlotter(base_dir=args.base_dir)
+    plotter.plot_sweeps(
+        model=args.model, run_label_prefix=args.run_label_prefix
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,6 @@ Combined Scalability and Memory Plotting for VLDB Conference Paper
 Creates a single figure with all scenarios and metrics
 """
 
-import json
 import os
 from collections import defaultdict
 from pathlib import Path
@@ -14,6 +13,8 @@ import numpy as np
 import matplotlib as mpl
 from matplotlib.gridspec import GridSpec
 
+from results_store import load_metrics_folders
+
 # Configure matplotlib for publication quality
 mpl.rcParams['pdf.fonttype'] = 42  # TrueType fonts for papers
 mpl.rcParams['ps.fonttype'] = 42
@@ -86,11 +87,11 @@ class CombinedPlotter:
 
         pattern = f"across_system_{model_tag}_sf*"
         sf_dirs = sorted(metrics_dir.glob(pattern))
+        loaded = load_metrics_folders(sf_dirs)
 
         all_systems = set()
-        for sf_dir in sf_dirs:
-            for system_file in sf_dir.glob("*.json"):
-                all_systems.add(system_file.stem)
+        for systems in loaded.values():
+            all_systems.update(systems)
 
         for sf_dir in sf_dirs:
             try:
@@ -104,18 +105,10 @@ class CombinedPlotter:
             except (IndexError, ValueError):
                 continue
 
-            systems_present = set()
-            for system_file in sf_dir.glob("*.json"):
-                system_name = system_file.stem
-                systems_present.add(system_name)
-                try:
-                    with open(system_file, "r") as f:
-                        system_data = json.load(f)
-                        data[scale_factor][repeat_num][system_name] = system_data
-                except Exception:
-                    pass
-
-            systems_missing = all_systems - systems_present
+            for system_name, system_data in loaded[sf_dir].items():
+                data[scale_factor][repeat_num][system_name] = system_data
+
+            systems_missing = all_systems - set(loaded[sf_dir])
             skipped_systems[scale_factor][repeat_num] = systems_missing
 
         return dict(data), dict(skipped_systems)
@@ -219,33 +212,28 @@ class CombinedPlotter:
         pattern = f"across_system_{model_tag}_sf*"
         sf_dirs = sorted(metrics_dir.glob(pattern))
 
-        for sf_dir in sf_dirs:
-            if "_repeat" in sf_dir.name:
-                continue
+        sf_dirs = [d for d in sf_dirs if "_repeat" not in d.name]
+        # Keep systems that only have a `<system>_memory.json`
+        loaded = load_metrics_folders(sf_dirs, include_memory_only=True)
 
+        for sf_dir in sf_dirs:
             try:
                 sf_str = sf_dir.name.split("_sf")[-1]
                 scale_factor = int(sf_str)
             except (IndexError, ValueError):
                 continue
 
-            for memory_file in sf_dir.glob("*_memory.json"):
-                system_name = memory_file.stem.replace("_memory", "")
-
+            # Peak memory from `<system>_memory.json` is merged into the
+            # system's records by the results store
+            for system_name, system_data in loaded[sf_dir].items():
                 if system_name.lower() == "bigquery":
                     continue
 
-                try:
-                    with open(memory_file, "r") as f:
-                        memory_data = json.load(f)
-
-                        for query_id, mem_info in memory_data.items():
-                            qid = query_id if query_id.startswith('Q') else f'Q{query_id}'
-                            peak_memory_mb = mem_info.get('peak_memory_mb')
-                            if peak_memory_mb is not None and peak_memory_mb > 0:
-                                data[scale_factor][system_name][qid] = peak_memory_mb / 1024.0
-                except Exception as e:
-                    print(f"Warning: Error loading {memory_file}: {e}")
+                for query_id, mem_info in system_data.items():
+                    qid = query_id if query_id.startswith('Q') else f'Q{query_id}'
+                    peak_memory_mb = mem_info.get('peak_memory_mb')
+                    if peak_memory_mb is not None and peak_memory_mb > 0:
+                        data[scale_factor][system_name][qid] = peak_memory_mb / 1024.0
 
         return dict(data)
 
@@ -0,0 +1,619 @@
+"""
+Append-only results store shared by runners, evaluators and analysis scripts.
+
+Every finished query and every evaluation adds one row keyed by
+(scenario, system, model, scale_factor, repeat, query, run_label) to a new
+Parquet part file under files/results_store/. Part files are never modified,
+so runners in parallel workers can write without coordination; readers scan
+all parts once and merge rows with the same key.
+
+Merge rules:
+    - A runner row replaces everything recorded before it for that key.
+    - An evaluation row (merge=True) only adds or overwrites its own fields
+      on top of the latest runner row.
+
+run_label tells runs with the same key apart. Live runs use LIVE_RUN_LABEL;
+side runs that must not replace them (a level of run.py --sweep-concurrency,
+run.py --llm-stub) get their own label through RUN_LABEL_ENV and write their
+raw results and metrics to raw_results/<label>/ and metrics/<label>/. The
+across_system_* folders written by the experiment scripts use the folder
+name and are ingested lazily the first time (or after they changed) they are
+loaded through load_metrics_folder(), so the analysis scripts keep working
+with folders that were collected before the store existed.
+
+Usage:
+    python src/results_store.py ingest [--scenarios movie animals]
+    python src/results_store.py compact
+    python src/results_store.py summary
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+FILES_DIR = Path(__file__).resolve().parents[1] / "files"
+STORE_DIR = FILES_DIR / "results_store"
+
+KEY_COLUMNS = [
+    "scenario",
+    "system",
+    "model",
+    "scale_factor",
+    "repeat",
+    "query",
+    "run_label",
+]
+# Bookkeeping columns that are not part of a metric record
+INTERNAL_COLUMNS = ["written_at", "merge", "json_fields", "source_mtime"]
+LIVE_RUN_LABEL = "live"
+# Set by run.py for side runs; read by GenericRunner and GenericEvaluator
+RUN_LABEL_ENV = "SEMBENCH_RUN_LABEL"
+
+# Compact automatically once a scan has to open more part files than this
+AUTO_COMPACT_PARTS = 64
+
+_RUN_LABEL_PATTERN = re.compile(
+    r"^across_system_(?P<tag>.+?)"
+    r"(?:_sf(?P<sf>\d+))?"
+    r"(?:_repeat(?P<repeat>\d+)|_(?P<round>\d+))?$"
+)
+
+
+def parse_run_label(
+    run_label: str,
+) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+    """
+    Split an experiment folder name into (model tag, scale factor, repeat).
+
+    across_system_2.5flash              -> ("2.5flash", None, None)
+    across_system_2.5flash_3            -> ("2.5flash", None, 3)
+    across_system_2.5flash_sf400_repeat2 -> ("2.5flash", 400, 2)
+    """
+    match = _RUN_LABEL_PATTERN.match(run_label)
+    if not match:
+        return None, None, None
+    repeat = match.group("repeat") or match.group("round")
+    return (
+        match.group("tag"),
+        int(match.group("sf")) if match.group("sf") else None,
+        int(repeat) if repeat else None,
+    )
+
+
+def current_run_label() -> str:
+    """Run label of the runs of this process (see RUN_LABEL_ENV)."""
+    return os.getenv(RUN_LABEL_ENV) or LIVE_RUN_LABEL
+
+
+def _is_json_value(value: Any) -> bool:
+    return isinstance(value, (dict, list, tuple))
+
+
+def _encode_values(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Make *frame* Parquet-safe. Nested values and columns that mix types (e.g.
+    query_id 1 and "2a") are JSON-encoded, and the encoded fields are listed
+    per row in `json_fields` so they can be decoded again. Values that are
+    already listed there are left untouched.
+    """
+    frame = frame.reset_index(drop=True)
+    if "json_fields" not in frame.columns:
+        frame["json_fields"] = ""
+    json_fields = [
+        set(filter(None, (fields or "").split(",")))
+        for fields in frame["json_fields"].astype(object).where(
+            frame["json_fields"].notna(), ""
+        )
+    ]
+
+    value_columns = [
+        c for c in frame.columns if c not in KEY_COLUMNS + INTERNAL_COLUMNS
+    ]
+    for column in value_columns:
+        values = frame[column]
+        if values.dtype != object:
+            continue
+        nested = values.map(_is_json_value)
+        kind = pd.api.types.infer_dtype(values, skipna=True)
+        if kind in ("string", "empty", "boolean") and not nested.any():
+            continue
+        encoded = []
+        for i, value in enumerate(values):
+            if column in json_fields[i] or not (nested[i] or pd.notna(value)):
+                encoded.append(value)
+                continue
+            encoded.append(json.dumps(value, default=str))
+            json_fields[i].add(column)
+        frame[column] = pd.Series(encoded, dtype="string")
+
+    frame["json_fields"] = [",".join(sorted(f)) for f in json_fields]
+    for column in ("scenario", "system", "model", "query", "run_label"):
+        frame[column] = frame[column].astype("string")
+    for column in ("scale_factor", "repeat"):
+        frame[column] = pd.to_numeric(frame[column]).astype("Int64")
+    return frame
+
+
+def _union_fields(values: pd.Series) -> str:
+    fields = set()
+    for value in values.dropna():
+        fields.update(filter(None, value.split(",")))
+    return ",".join(sorted(fields))
+
+
+def _record_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a merged store row back into a metrics JSON record."""
+    encoded = set(filter(None, (row.get("json_fields") or "").split(",")))
+    record = {}
+    for column, value in row.items():
+        if column in KEY_COLUMNS or column in INTERNAL_COLUMNS:
+            continue
+        if pd.isna(value):
+            continue
+        if column in encoded:
+            value = json.loads(value)
+        elif hasattr(value, "item"):
+            value = value.item()
+        record[column] = value
+    for column in ("scale_factor", "repeat"):
+        if not pd.isna(row.get(column)):
+            record.setdefault(column, int(row[column]))
+    return record
+
+
+class ResultsStore:
+    """Append-only Parquet store of per-query metrics and evaluations."""
+
+    def __init__(self, root: Path = STORE_DIR):
+        self.root = Path(root)
+        self._rows: Optional[pd.DataFrame] = None
+        self._runs: Optional[Dict[Tuple[str, str], Any]] = None
+
+    # Writing ---------------------------------------------------------------
+    def append(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        merge: bool = False,
+        source_mtime: Optional[float] = None,
+    ) -> int:
+        """
+        Write *rows* as one new part file.
+
+        Args:
+            rows: Dictionaries holding the KEY_COLUMNS plus metric fields
+            merge: Merge the fields into the latest row with the same key
+                instead of replacing it (used for evaluation results)
+            source_mtime: Modification time of the folder the rows were
+                ingested from
+
+        Returns:
+            Number of rows written
+        """
+        rows = [dict(row) for row in rows]
+        if not rows:
+            return 0
+
+        written_at = time.time_ns()
+        for row in rows:
+            for column in KEY_COLUMNS:
+                row.setdefault(column, None)
+            # Keep NaN values (e.g. an undefined relative error) apart from
+            # missing fields by storing them JSON-encoded
+            nan_fields = [
+                k
+                for k, v in row.items()
+                if isinstance(v, float) and v != v and k not in KEY_COLUMNS
+            ]
+            for k in nan_fields:
+                row[k] = "NaN"
+            row["json_fields"] = ",".join(nan_fields)
+            row["written_at"] = written_at
+            row["merge"] = merge
+            row["source_mtime"] = source_mtime
+
+        frame = _encode_values(pd.DataFrame(rows))
+        self._write_part(frame)
+        if self._rows is not None:
+            if self._rows.empty:
+                self._rows = frame
+            else:
+                self._rows = pd.concat([self._rows, frame], ignore_index=True)
+            self._runs = None
+        return len(rows)
+
+    def _write_part(self, frame: pd.DataFrame) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        path = self.root / name
+        tmp_path = self.root / f".{name}.tmp"
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return path
+
+    # Reading ---------------------------------------------------------------
+    def _parts(self) -> List[Path]:
+        return sorted(self.root.glob("part-*.parquet"))
+
+    def _read_parts(self, parts: List[Path]) -> pd.DataFrame:
+        frames = []
+        for part in parts:
+            try:
+                frames.append(
+                    pd.read_parquet(part, dtype_backend="numpy_nullable")
+                )
+            except FileNotFoundError:
+                # Removed by a concurrent compaction; its rows live on in
+                # the compacted part, which is picked up by the next scan
+                continue
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=KEY_COLUMNS + INTERNAL_COLUMNS)
+        return pd.concat(frames, ignore_index=True, sort=False)
+
+    @staticmethod
+    def _merge_rows(frame: pd.DataFrame) -> pd.DataFrame:
+        """Collapse all rows of a key into one, following the merge rules."""
+        if frame.empty:
+            return frame
+        # Columns of other runs are all null here; skip them
+        frame = frame.dropna(axis=1, how="all")
+        frame = frame.assign(
+            **{
+                column: None
+                for column in KEY_COLUMNS + INTERNAL_COLUMNS
+                if column not in frame.columns
+            }
+        )
+        frame = frame.sort_values("written_at", kind="stable")
+        if not frame.duplicated(KEY_COLUMNS).any():
+            return frame.reset_index(drop=True)
+        groups = frame.groupby(KEY_COLUMNS, dropna=False, sort=False)
+
+        # Generation = number of runner rows seen so far for the key; only
+        # the latest runner row and the evaluations written after it count
+        frame = frame.assign(_replaces=~frame["merge"].astype(bool))
+        generation = frame.groupby(
+            KEY_COLUMNS, dropna=False, sort=False
+        )["_replaces"].cumsum()
+        latest = generation.groupby(groups.ngroup()).transform("max")
+        frame = frame[generation == latest].drop(columns="_replaces")
+
+        groups = frame.groupby(KEY_COLUMNS, dropna=False, sort=False)
+        merged = groups.last()
+        # json_fields describe the union of the merged columns
+        merged["json_fields"] = groups["json_fields"].agg(_union_fields)
+        return merged.reset_index()
+
+    def _raw_rows(self) -> pd.DataFrame:
+        """All rows of all part files, read once per process."""
+        if self._rows is None:
+            parts = self._parts()
+            self._rows = self._read_parts(parts)
+            if len(parts) > AUTO_COMPACT_PARTS:
+                self._compact(parts, self._merge_rows(self._rows))
+            self._runs = None
+        return self._rows
+
+    def _run_rows(self, scenario: str, run_label: str) -> pd.DataFrame:
+        """Raw rows of one run, looked up through a per-process index."""
+        rows = self._raw_rows()
+        if self._runs is None:
+            self._runs = rows.groupby(
+                ["scenario", "run_label"], dropna=False, sort=False
+            ).indices
+        return rows.iloc[self._runs.get((scenario, run_label), [])]
+
+    def load(self, **filters: Any) -> pd.DataFrame:
+        """
+        Load the merged store, one row per key.
+
+        Args:
+            **filters: Key column equality filters, e.g. scenario="movie".
+                Rows are filtered before they are merged, so loading a
+                single run stays cheap on a large store.
+
+        Returns:
+            DataFrame with the KEY_COLUMNS, bookkeeping columns and one
+            column per metric field
+        """
+        scenario, run_label = filters.get("scenario"), filters.get("run_label")
+        if scenario is not None and run_label is not None:
+            frame = self._run_rows(scenario, run_label)
+        else:
+            frame = self._raw_rows()
+        for column, value in filters.items():
+            if column not in KEY_COLUMNS:
+                raise ValueError(f"Can only filter on {KEY_COLUMNS}: {column}")
+            frame = frame[(frame[column] == value).fillna(False)]
+        return self._merge_rows(frame)
+
+    def load_runs(self, scenario: str, run_labels: List[str]) -> pd.DataFrame:
+        """Load the merged rows of several runs of a scenario at once."""
+        frames = [self._run_rows(scenario, label) for label in run_labels]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return self._raw_rows().iloc[0:0]
+        return self._merge_rows(pd.concat(frames))
+
+    def records(self, **filters: Any) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Load matching rows in the layout of the metrics JSON files:
+        {system: {"Q1": record, ...}}.
+        """
+        result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for row in self.load(**filters).to_dict("records"):
+            record = _record_from_row(row)
+            result.setdefault(row["system"], {})[row["query"]] = record
+        return result
+
+    # Maintenance -----------------------------------------------------------
+    def compact(self) -> int:
+        """
+        Rewrite all part files as a single part holding the merged rows.
+
+        Returns:
+            Number of part files replaced
+        """
+        parts = self._parts()
+        if len(parts) < 2:
+            return 0
+        self._compact(parts, self._merge_rows(self._read_parts(parts)))
+        self._rows = None
+        return len(parts)
+
+    def _compact(self, parts: List[Path], merged: pd.DataFrame) -> None:
+        # Merged rows keep the written_at of their latest source row, so rows
+        # appended by other processes during compaction still win
+        merged = merged.copy()
+        merged["merge"] = False
+        self._write_part(_encode_values(merged))
+        for part in parts:
+            try:
+                part.unlink()
+            except FileNotFoundError:
+                pass
+
+    # Legacy metrics folders ------------------------------------------------
+    def ingest_metrics_folder(self, folder: Path) -> int:
+        """
+        Import an experiment folder (files/<scenario>/metrics/<run_label>)
+        holding `<system>.json` and optional `<system>_memory.json` files.
+
+        Returns:
+            Number of rows written
+        """
+        folder = Path(folder)
+        scenario = folder.parent.parent.name
+        run_label = folder.name
+        model_tag, scale_factor, repeat = parse_run_label(run_label)
+        mtime = _folder_mtime(folder)
+
+        def _key(system, query, record=None):
+            record = record or {}
+            return {
+                "scenario": scenario,
+                "system": system,
+                "model": record.get("model_name") or model_tag,
+                "scale_factor": (
+                    scale_factor
+                    if scale_factor is not None
+                    else record.get("scale_factor")
+                ),
+                "repeat": repeat,
+                "query": (
+                    f"Q{query}" if query and not query.startswith("Q") else query
+                ),
+                "run_label": run_label,
+            }
+
+        rows, memory_rows = [], []
+        base_keys: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for json_file in sorted(folder.glob("*.json")):
+            try:
+                with open(json_file, "r") as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"  Warning: Skipping {json_file}: {e}")
+                continue
+            if not isinstance(data, dict):
+                continue
+
+            if json_file.stem.endswith("_memory"):
+                system = json_file.stem[: -len("_memory")]
+                for query, usage in data.items():
+                    if isinstance(usage, dict):
+                        memory_rows.append((system, query, usage))
+                continue
+
+            for query, record in data.items():
+                if not isinstance(record, dict):
+                    continue
+                key = _key(json_file.stem, query, record)
+                base_keys[(key["system"], key["query"])] = key
+                rows.append({**record, **key})
+
+        written = self.append(rows, source_mtime=mtime)
+        # Memory files only carry resource usage; merge it into the rows of
+        # the matching system so both are loaded as one record
+        merge_rows = []
+        for system, query, usage in memory_rows:
+            key = _key(system, query)
+            key = base_keys.get((system, key["query"]), key)
+            merge_rows.append({**usage, **key})
+        written += self.append(merge_rows, merge=True, source_mtime=mtime)
+
+        if not written:
+            # Remember empty folders too, so they are not rescanned
+            self.append([_key("", "")], merge=True, source_mtime=mtime)
+        return written
+
+    def ingested_mtime(self, scenario: str, run_label: str) -> Optional[float]:
+        """Folder modification time recorded when the folder was ingested."""
+        mtimes = self._run_rows(scenario, run_label)["source_mtime"].dropna()
+        return float(mtimes.max()) if len(mtimes) else None
+
+
+def _folder_mtime(folder: Path) -> float:
+    mtimes = [folder.stat().st_mtime]
+    mtimes += [f.stat().st_mtime for f in folder.glob("*.json")]
+    return max(mtimes)
+
+
+_default_store: Optional[ResultsStore] = None
+
+
+def get_store() -> ResultsStore:
+    """Return the process-wide store at files/results_store/."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ResultsStore()
+    return _default_store
+
+
+def load_metrics_folders(
+    folders: Iterable[Path],
+    store: Optional[ResultsStore] = None,
+    include_memory_only: bool = False,
+) -> Dict[Path, Dict[str, Dict[str, Dict[str, Any]]]]:
+    """
+    Load experiment folders (e.g. files/movie/metrics/across_system_2.5flash_1)
+    through the results store, with one merge per scenario.
+
+    A folder is ingested first if the store has not seen it yet or its files
+    changed since. Memory usage from `<system>_memory.json` is merged into
+    the records of `<system>`; systems that only have a memory file are
+    dropped unless include_memory_only is set.
+
+    Returns:
+        {folder: {system: {"Q1": record, ...}}}, the same layout as loading
+        every `<system>.json` of each folder
+    """
+    store = store or get_store()
+    folders = [Path(folder) for folder in folders]
+    runs: Dict[str, Dict[str, Path]] = {}
+    for folder in folders:
+        scenario, run_label = folder.parent.parent.name, folder.name
+        runs.setdefault(scenario, {})[run_label] = folder
+        if folder.is_dir():
+            ingested = store.ingested_mtime(scenario, run_label)
+            if ingested is None or _folder_mtime(folder) > ingested:
+                store.ingest_metrics_folder(folder)
+
+    loaded: Dict[Path, Dict[str, Dict[str, Dict[str, Any]]]] = {
+        folder: {} for folder in folders
+    }
+    for scenario, labels in runs.items():
+        frame = store.load_runs(scenario, list(labels))
+        for row in frame.to_dict("records"):
+            if not row["system"]:
+                continue
+            systems = loaded[labels[row["run_label"]]]
+            systems.setdefault(row["system"], {})[row["query"]] = (
+                _record_from_row(row)
+            )
+
+    if include_memory_only:
+        return loaded
+    # Systems that only appear in memory files have no metrics of their own
+    return {
+        folder: {
+            system: queries
+            for system, queries in systems.items()
+            if any("status" in r or "query_id" in r for r in queries.values())
+        }
+        for folder, systems in loaded.items()
+    }
+
+
+def load_metrics_folder(
+    folder: Path, store: Optional[ResultsStore] = None
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Load a single experiment folder through the results store, see
+    load_metrics_folders().
+
+    Returns:
+        {system: {"Q1": record, ...}}
+    """
+    return load_metrics_folders([folder], store)[Path(folder)]
+
+
+def store_row(
+    scenario: str,
+    system: str,
+    model: Optional[str],
+    scale_factor: Optional[int],
+    repeat: Optional[int],
+    query: str,
+    record: Dict[str, Any],
+    run_label: str = LIVE_RUN_LABEL,
+) -> Dict[str, Any]:
+    """Build a store row from a metrics record and its key."""
+    row = {
+        k: v
+        for k, v in record.items()
+        if k not in ("scale_factor", "repeat")
+    }
+    row.update(
+        scenario=scenario,
+        system=system,
+        model=model,
+        scale_factor=scale_factor,
+        repeat=repeat,
+        query=query,
+        run_label=run_label,
+    )
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the results store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser(
+        "ingest", help="Import all across_system_* metrics folders"
+    )
+    ingest.add_argument(
+        "--scenarios", nargs="+", default=None, help="Scenarios to import"
+    )
+    subparsers.add_parser("compact", help="Merge all part files into one")
+    subparsers.add_parser("summary", help="Show row counts per run")
+
+    args = parser.parse_args()
+    store = get_store()
+
+    if args.command == "ingest":
+        folders = sorted(FILES_DIR.glob("*/metrics/across_system_*"))
+        if args.scenarios:
+            folders = [f for f in folders if f.parent.parent.name in args.scenarios]
+        for folder in folders:
+            if folder.is_dir():
+                systems = load_metrics_folder(folder, store)
+                print(
+                    f"✓ {folder.parent.parent.name}/{folder.name}: "
+                    f"{len(systems)} systems"
+                )
+    elif args.command == "compact":
+        print(f"✓ Compacted {store.compact()} part files")
+    elif args.command == "summary":
+        frame = store.load()
+        if frame.empty:
+            print("Results store is empty")
+            return
+        summary = (
+            frame[frame["system"] != ""]
+            .groupby(["scenario", "run_label"], dropna=False)
+            .agg(systems=("system", "nunique"), queries=("query", "count"))
+        )
+        print(summary.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -16,21 +16,72 @@ import argparse
 import importlib
 import json
 import os
-import re
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 
 # Add src directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from cost_estimator import (
+    DEFAULT_CALL_LATENCY,
+    DEFAULT_OUTPUT_TOKENS_PER_CALL,
+    DEFAULT_SELECTIVITY,
+    ESTIMATE_ENV,
+    SystemEstimate,
+    count_request_tokens,
+    estimate_system,
+    load_prices,
+    load_sample_metrics,
+    print_estimates,
+    sample_scale_factors,
+    write_estimate,
+)
+from download_manager import DATA_MIRROR_ENV
+from llm_replay import endpoint_env, start_stub_server
+from media_cache import MEDIA_CACHE_ENV, MediaProfile
+from nested_sampling import NESTED_SAMPLING_ENV
+from results_store import RUN_LABEL_ENV
+from synthetic_scaleup import SYNTHETIC_SCALEUP_ENV
+from runner.concurrency import (
+    ADAPTIVE_CONCURRENCY_ENV,
+    CONCURRENT_LLM_WORKER_ENV,
+    DEFAULT_MAX_CONCURRENCY,
+)
+from runner.llm_trace import LLM_TRACE_ENV
+from runner.predicate_cache import DEFAULT_CACHE_PATH, PREDICATE_CACHE_ENV
+from runner.rate_limiter import RATE_LIMITS_ENV, format_limits, parse_limits
+from worker_channel import read_records
+
 # Project root (parent of src/)
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 VENVS_DIR = PROJECT_ROOT / ".venvs"
 
+# Upper bound on the number of workers of one system that may run at the same
+# time when scheduling with --parallel. Systems not listed here are only
+# bounded by the size of the worker pool.
+DEFAULT_CONCURRENCY_CAPS = {
+    # All BigQuery jobs share one GCP project and its inference-log tables,
+    # which are also used to attribute token usage to a query.
+    "bigquery": 1,
+}
+
+# Concurrency group for systems that have no venv and therefore fall back to
+# running inside this process; their global state (e.g. lotus.settings) must
+# not be shared by two runners at the same time.
+IN_PROCESS_GROUP = "__in_process__"
+
 
 def get_runner_class(system: str, use_case: str):
     """Dynamically import and return the runner class for a given system."""
@@ -151,18 +202,34 @@ def run_system_isolated(
     model_name: str,
     scale_factor: Optional[int],
     skip_setup: bool,
+    log_prefix: Optional[str] = None,
+    resume: bool = False,
+    repeat: Optional[int] = None,
 ) -> Dict:
     """
     Run a system in its isolated virtual environment via subprocess.
 
+    Worker output is streamed line by line while the worker runs. Query
+    metrics arrive as newline-delimited JSON over a separate pipe (see
+    worker_channel.py) as soon as each query finishes; the worker checkpoints
+    them to disk itself, so they survive a crash and can be resumed.
+
+    Args:
+        log_prefix: Tag prepended to every line of worker output (defaults to
+            the system name)
+        resume: Skip queries that already succeeded in a previous run
+        repeat: Repeat number recorded with the results
+
     Returns:
-        Dictionary of query results, or {"error": "..."} on failure.
+        Dictionary of query results. On failure it also holds an "error"
+        entry, next to the queries that finished before the worker failed.
     """
     venv_python = get_system_venv_python(system)
     if not venv_python:
         return {"error": f"No venv found for {system} at {VENVS_DIR / system}"}
 
     worker_script = PROJECT_ROOT / "src" / "run_worker.py"
+    read_fd, write_fd = os.pipe()
 
     cmd = [
         str(venv_python),
@@ -170,6 +237,7 @@ def run_system_isolated(
         "--system", system,
         "--use-case", use_case,
         "--model", model_name,
+        "--result-fd", str(write_fd),
     ]
     if queries:
         cmd += ["--queries"] + [str(q) for q in queries]
@@ -177,56 +245,129 @@ def run_system_isolated(
         cmd += ["--scale-factor", str(scale_factor)]
     if skip_setup:
         cmd += ["--skip-setup"]
+    if resume:
+        cmd += ["--resume"]
+    if repeat is not None:
+        cmd += ["--repeat", str(repeat)]
 
+    log_prefix = log_prefix or system
     print(f"  [isolated] Using venv: {venv_python}")
 
-    result = subprocess.run(
-        cmd,
-        cwd=str(PROJECT_ROOT),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-    )
+    query_results: Dict[str, Dict] = {}
+    status: Dict[str, Optional[str]] = {"done": None, "error": None}
 
-    # Print worker output
-    if result.stdout:
-        # Filter out the worker result marker and print the rest
-        for line in result.stdout.splitlines():
-            if "__WORKER_RESULT__" in line or "__WORKER_ERROR__" in line:
-                continue
-            print(f"  [{system}] {line}")
+    def _consume_records():
+        for record in read_records(read_fd):
+            record_type = record.get("type")
+            if record_type == "query":
+                query_results[record["query"]] = record["metric"]
+            elif record_type == "done":
+                status["done"] = True
+            elif record_type == "error":
+                status["error"] = record.get("error")
 
-    # Parse worker result from stdout
-    if result.returncode == 0 and result.stdout:
-        match = re.search(
-            r"__WORKER_RESULT__(.+?)__END_WORKER_RESULT__", result.stdout
+    try:
+        process = subprocess.Popen(
+            cmd,
+            cwd=str(PROJECT_ROOT),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            pass_fds=(write_fd,),
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
         )
-        if match:
-            try:
-                return json.loads(match.group(1))
-            except json.JSONDecodeError:
-                pass
-
-    # Parse error
-    if result.stdout:
-        match = re.search(
-            r"__WORKER_ERROR__(.+?)__END_WORKER_ERROR__", result.stdout
+    finally:
+        # Only the worker keeps the write end open, so the reader sees EOF
+        # as soon as the worker exits
+        os.close(write_fd)
+
+    reader = threading.Thread(target=_consume_records, daemon=True)
+    reader.start()
+
+    # Stream worker output while it runs
+    for line in process.stdout:
+        print(f"  [{log_prefix}] {line.rstrip()}")
+    returncode = process.wait()
+    reader.join()
+
+    if status["error"] is not None:
+        error = status["error"]
+    elif returncode != 0:
+        error = f"Worker exited with code {returncode}"
+    elif not status["done"]:
+        error = "Worker exited without reporting completion"
+    else:
+        return query_results
+
+    if query_results:
+        print(
+            f"  [{log_prefix}] Kept {len(query_results)} finished queries: "
+            f"{', '.join(query_results)}"
         )
-        if match:
-            return {"error": match.group(1)}
+    return {**query_results, "error": error}
 
-    if result.returncode != 0:
-        return {"error": f"Worker exited with code {result.returncode}"}
 
-    # Fallback: try to read metrics from disk
-    metrics_file = (
-        PROJECT_ROOT / "files" / use_case / "metrics" / f"{system}.json"
+def queries_to_evaluate(
+    system_results: Dict, queries: Optional[List[int]]
+) -> Optional[List[int]]:
+    """
+    Queries to evaluate for the results of one system run: the requested
+    queries (None for all) after a successful run, the queries that finished
+    before the failure otherwise (empty if there are none).
+    """
+    if "error" not in system_results:
+        return queries
+    return sorted(
+        int(key[1:])
+        for key in system_results
+        if key.startswith("Q") and key[1:].isdigit()
     )
-    if metrics_file.exists():
-        with open(metrics_file) as f:
-            return json.load(f)
 
-    return {"error": "No results returned from worker"}
+
+def run_system_direct(
+    system: str,
+    use_case: str,
+    queries: Optional[List[int]],
+    model_name: str,
+    scale_factor: Optional[int],
+    skip_setup: bool,
+    resume: bool = False,
+    repeat: Optional[int] = None,
+) -> Optional[Dict]:
+    """
+    Run a system inside the current Python process (legacy mode).
+
+    Returns:
+        Dictionary of query results, {"error": "..."} on failure, or None if
+        the runner could not be imported.
+    """
+    runner_class = get_runner_class(system, use_case)
+    if not runner_class:
+        print(f"Skipping {system} due to import error")
+        return None
+
+    try:
+        runner = runner_class(
+            use_case=use_case,
+            scale_factor=scale_factor,
+            skip_setup=skip_setup,
+            model_name=model_name,
+        )
+        runner.repeat = repeat
+        system_metrics = runner.run_all_queries(queries=queries, resume=resume)
+
+        print(f"✓ {system} completed successfully")
+        return {
+            f"Q{query_id}": metric.to_dict()
+            for query_id, metric in system_metrics.items()
+        }
+
+    except Exception as e:
+        print(f"✗ Error running {system}: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return {"error": str(e)}
 
 
 def run_benchmark(
@@ -237,6 +378,11 @@ def run_benchmark(
     model_name: str = "gemini-2.5-flash",
     scale_factor: str = None,
     use_isolation: bool = True,
+    parallel: int = 1,
+    concurrency_caps: Optional[Dict[str, int]] = None,
+    resume: bool = False,
+    repeat: Optional[int] = None,
+    evaluate: bool = True,
 ):
     """
     Run benchmarks for specified systems and use cases.
@@ -248,7 +394,36 @@ def run_benchmark(
         skip_setup: Whether to skip setup phase
         model_name: Model name to use for systems that support it
         use_isolation: Use per-system venvs when available
+        parallel: Maximum number of (use case, system) pairs to run at the
+            same time; values above 1 require isolation
+        concurrency_caps: Per-system limits on concurrently running workers,
+            merged over DEFAULT_CONCURRENCY_CAPS
+        resume: Skip queries that already succeeded for the same system,
+            model and scale factor in a previous run
+        repeat: Repeat number recorded with the results in the results store
+        evaluate: Evaluate the systems against the ground truth after they
+            ran
     """
+    if parallel > 1:
+        if use_isolation:
+            return run_benchmark_parallel(
+                systems=systems,
+                use_cases=use_cases,
+                queries=queries,
+                skip_setup=skip_setup,
+                model_name=model_name,
+                scale_factor=scale_factor,
+                parallel=parallel,
+                concurrency_caps=concurrency_caps,
+                resume=resume,
+                repeat=repeat,
+                evaluate=evaluate,
+            )
+        print(
+            "Warning: --parallel requires per-system venvs, "
+            "running sequentially"
+        )
+
     results = {}
 
     for use_case in use_cases:
@@ -274,6 +449,8 @@ def run_benchmark(
                     model_name=model_name,
                     scale_factor=scale_factor,
                     skip_setup=skip_setup,
+                    resume=resume,
+                    repeat=repeat,
                 )
                 results[use_case][system] = system_results
 
@@ -290,33 +467,21 @@ def run_benchmark(
                         f"falling back to direct execution"
                     )
 
-                runner_class = get_runner_class(system, use_case)
-                if not runner_class:
-                    print(f"Skipping {system} due to import error")
-                    continue
-
-                try:
-                    runner = runner_class(
-                        use_case=use_case,
-                        scale_factor=scale_factor,
-                        skip_setup=skip_setup,
-                        model_name=model_name,
-                    )
-                    system_metrics = runner.run_all_queries(queries=queries)
-
-                    results[use_case][system] = {
-                        f"Q{query_id}": metric.to_dict()
-                        for query_id, metric in system_metrics.items()
-                    }
-
-                    print(f"✓ {system} completed successfully")
-
-                except Exception as e:
-                    print(f"✗ Error running {system}: {e}")
-                    import traceback
+                system_results = run_system_direct(
+                    system=system,
+                    use_case=use_case,
+                    queries=queries,
+                    model_name=model_name,
+                    scale_factor=scale_factor,
+                    skip_setup=skip_setup,
+                    resume=resume,
+                    repeat=repeat,
+                )
+                if system_results is not None:
+                    results[use_case][system] = system_results
 
-                    traceback.print_exc()
-                    results[use_case][system] = {"error": str(e)}
+        if not evaluate:
+            continue
 
         # Run evaluation
         print(f"\n--- Running evaluation for {use_case} ---")
@@ -324,14 +489,17 @@ def run_benchmark(
             evaluator_class = get_evaluator(use_case)
             evaluator = evaluator_class(use_case, scale_factor)
 
-            # Evaluate all systems
+            # Evaluate all systems, and the finished queries of failed ones
             for system in systems:
-                if (
-                    system in results[use_case]
-                    and "error" not in results[use_case][system]
-                ):
-                    print(f"Evaluating {system}...")
-                    evaluator.evaluate_system(system, queries=queries)
+                if system not in results[use_case]:
+                    continue
+                system_queries = queries_to_evaluate(
+                    results[use_case][system], queries
+                )
+                if system_queries == []:
+                    continue
+                print(f"Evaluating {system}...")
+                evaluator.evaluate_system(system, queries=system_queries)
 
             print("✓ Evaluation completed successfully")
 
@@ -344,6 +512,405 @@ def run_benchmark(
     return results
 
 
+def get_concurrency_group(system: str) -> str:
+    """
+    Return the concurrency group of a job running *system*. Groups without an
+    entry in the caps are only bounded by the size of the worker pool.
+    """
+    if get_system_venv_python(system) is None:
+        return IN_PROCESS_GROUP
+    return system
+
+
+def run_benchmark_parallel(
+    systems: List[str],
+    use_cases: List[str],
+    queries: Optional[List[int]],
+    skip_setup: bool,
+    model_name: str,
+    scale_factor: Optional[int],
+    parallel: int,
+    concurrency_caps: Optional[Dict[str, int]] = None,
+    resume: bool = False,
+    repeat: Optional[int] = None,
+    evaluate: bool = True,
+):
+    """
+    Run (use case, system) pairs concurrently on a bounded worker pool.
+
+    Isolated workers are started as soon as a pool slot is free and the cap of
+    their concurrency group allows it. Results are reported as workers finish,
+    and each finished system is handed to a single evaluation thread right
+    away, so evaluation overlaps with the workers that are still running.
+    """
+    caps = {**DEFAULT_CONCURRENCY_CAPS, **(concurrency_caps or {})}
+    caps[IN_PROCESS_GROUP] = 1
+
+    results = {use_case: {} for use_case in use_cases}
+    pending: List[Tuple[str, str]] = [
+        (use_case, system) for use_case in use_cases for system in systems
+    ]
+    running: Dict[Future, Tuple[str, str, str, float]] = {}
+    evaluations: List[Future] = []
+    active: Dict[str, int] = {}
+    evaluators = {}
+
+    def _run_job(use_case: str, system: str, group: str) -> Optional[Dict]:
+        if group == IN_PROCESS_GROUP:
+            print(
+                f"  No venv found for {system}, "
+                f"falling back to direct execution"
+            )
+            return run_system_direct(
+                system=system,
+                use_case=use_case,
+                queries=queries,
+                model_name=model_name,
+                scale_factor=scale_factor,
+                skip_setup=skip_setup,
+                resume=resume,
+                repeat=repeat,
+            )
+        return run_system_isolated(
+            system=system,
+            use_case=use_case,
+            queries=queries,
+            model_name=model_name,
+            scale_factor=scale_factor,
+            skip_setup=skip_setup,
+            log_prefix=f"{use_case}/{system}",
+            resume=resume,
+            repeat=repeat,
+        )
+
+    def _evaluate(
+        use_case: str, system: str, system_queries: Optional[List[int]]
+    ) -> None:
+        # Only ever called from the single evaluation thread, so evaluators
+        # (and the domain data they load) are shared without locking.
+        try:
+            if use_case not in evaluators:
+                evaluator_class = get_evaluator(use_case)
+                evaluators[use_case] = evaluator_class(use_case, scale_factor)
+            print(f"Evaluating {use_case}/{system}...")
+            evaluators[use_case].evaluate_system(
+                system, queries=system_queries
+            )
+            print(f"✓ Evaluation of {use_case}/{system} completed")
+        except Exception as e:
+            print(f"✗ Error during evaluation of {use_case}/{system}: {e}")
+            import traceback
+
+            traceback.print_exc()
+
+    print(f"\n{'='*60}")
+    print(
+        f"Scheduling {len(pending)} runs on {parallel} workers "
+        f"(caps: {caps})"
+    )
+    print(f"{'='*60}")
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool, ThreadPoolExecutor(
+        max_workers=1
+    ) as eval_pool:
+        while pending or running:
+            # Start every pending job that fits into the pool and its group
+            for use_case, system in list(pending):
+                if len(running) >= parallel:
+                    break
+                group = get_concurrency_group(system)
+                if group in caps and active.get(group, 0) >= caps[group]:
+                    continue
+                pending.remove((use_case, system))
+                active[group] = active.get(group, 0) + 1
+                print(f"\n--- Starting {system} on {use_case} ---")
+                future = pool.submit(_run_job, use_case, system, group)
+                running[future] = (use_case, system, group, time.time())
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                use_case, system, group, started = running.pop(future)
+                active[group] -= 1
+                elapsed = time.time() - started
+
+                try:
+                    system_results = future.result()
+                except Exception as e:
+                    system_results = {"error": str(e)}
+                if system_results is None:
+                    continue
+                results[use_case][system] = system_results
+
+                if "error" in system_results:
+                    print(
+                        f"✗ Error running {system} on {use_case} after "
+                        f"{elapsed:.1f}s: {system_results['error']}"
+                    )
+                else:
+                    print(
+                        f"✓ {system} on {use_case} completed in "
+                        f"{elapsed:.1f}s ({len(running)} running, "
+                        f"{len(pending)} pending)"
+                    )
+                # Failed workers still evaluate the queries they finished
+                system_queries = queries_to_evaluate(system_results, queries)
+                if evaluate and system_queries != []:
+                    evaluations.append(
+                        eval_pool.submit(
+                            _evaluate, use_case, system, system_queries
+                        )
+                    )
+
+        wait(evaluations)
+
+    return results
+
+
+def sweep_run_label(
+    model_name: str, level: int, repeat: Optional[int] = None
+) -> str:
+    """Metrics folder of one level of a concurrency sweep."""
+    label = f"concurrency_sweep_{model_name.replace('/', '_')}_c{level}"
+    return label if repeat is None else f"{label}_repeat{repeat}"
+
+
+def stub_run_label(model_name: str, latency_ms: float) -> str:
+    """Metrics folder of a run against the --llm-stub server."""
+    return f"llm_stub_{model_name.replace('/', '_')}_{latency_ms:g}ms"
+
+
+def load_sweep_metrics(
+    use_cases: List[str],
+    systems: List[str],
+    queries: Optional[List[int]],
+    run_label: str,
+) -> Dict[str, Dict[str, Dict]]:
+    """
+    Load the metrics of the swept queries of one level from
+    files/<use case>/metrics/<run_label>/<system>.json.
+
+    Returns:
+        {use case: {system: {"Q1": record, ...}}}
+    """
+    wanted = {f"Q{q}" for q in queries} if queries else None
+    collected: Dict[str, Dict[str, Dict]] = {}
+    for use_case in use_cases:
+        level_dir = PROJECT_ROOT / "files" / use_case / "metrics" / run_label
+        for system in systems:
+            try:
+                with open(level_dir / f"{system}.json", "r") as f:
+                    records = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                print(f"  Warning: No metrics for {use_case}/{system}")
+                continue
+            collected.setdefault(use_case, {})[system] = {
+                query: record
+                for query, record in records.items()
+                if wanted is None or query in wanted
+            }
+    return collected
+
+
+def run_concurrency_sweep(
+    levels: List[int],
+    systems: List[str],
+    use_cases: List[str],
+    queries: Optional[List[int]],
+    model_name: str,
+    repeat: Optional[int] = None,
+    **benchmark_args,
+) -> Dict[int, Dict[str, Dict[str, Dict]]]:
+    """
+    Run and evaluate the benchmark once per concurrency level.
+
+    Each level is passed to the runners as their concurrent_llm_worker
+    (LOTUS max_batch_size, Palimpzest max_workers and join_parallelism,
+    ThalamusDB dop, FlockMTL batch size). Every level runs under its own
+    run label (sweep_run_label), so its raw results, metrics and results
+    store rows stay apart from the live results and from the other levels.
+    A sweep against the --llm-stub server prefixes the stub's run label.
+
+    Args:
+        levels: Concurrency levels, run in the given order
+        benchmark_args: Further arguments of run_benchmark
+
+    Returns:
+        {level: {use case: {system: {"Q1": record, ...}}}}
+    """
+    sweep = {}
+    base_label = os.environ.get(RUN_LABEL_ENV)
+    try:
+        for level in levels:
+            print(f"\n{'#'*60}")
+            print(f"Concurrency sweep: level {level}")
+            print(f"{'#'*60}")
+            run_label = sweep_run_label(model_name, level, repeat)
+            if base_label:
+                run_label = f"{base_label}_{run_label}"
+            # Inherited by isolated workers; read by GenericRunner and, for
+            # the run label, GenericEvaluator
+            os.environ[CONCURRENT_LLM_WORKER_ENV] = str(level)
+            os.environ[RUN_LABEL_ENV] = run_label
+            run_benchmark(
+                systems=systems,
+                use_cases=use_cases,
+                queries=queries,
+                model_name=model_name,
+                repeat=repeat,
+                **benchmark_args,
+            )
+            sweep[level] = load_sweep_metrics(
+                use_cases, systems, queries, run_label
+            )
+    finally:
+        os.environ.pop(CONCURRENT_LLM_WORKER_ENV, None)
+        if base_label:
+            os.environ[RUN_LABEL_ENV] = base_label
+        else:
+            os.environ.pop(RUN_LABEL_ENV, None)
+    return sweep
+
+
+def print_sweep_summary(sweep: Dict[int, Dict[str, Dict[str, Dict]]]):
+    """Print total time and cost of every system per concurrency level."""
+    print("\n" + "=" * 60)
+    print("CONCURRENCY SWEEP SUMMARY")
+    print("=" * 60)
+    baseline: Dict[Tuple[str, str], float] = {}
+    for level, use_cases in sweep.items():
+        for use_case, systems in use_cases.items():
+            for system, records in systems.items():
+                succeeded = [
+                    r for r in records.values() if r.get("status") == "success"
+                ]
+                total_time = sum(
+                    r.get("execution_time") or 0 for r in succeeded
+                )
+                cost = sum(r.get("money_cost") or 0 for r in succeeded)
+                # Speedup relative to the first level of the sweep
+                base = baseline.setdefault((use_case, system), total_time)
+                speedup = base / total_time if total_time else 0.0
+                print(
+                    f"  c={level:<4} {use_case}/{system}: "
+                    f"{len(succeeded)}/{len(records)} queries, "
+                    f"{total_time:.2f}s ({speedup:.2f}x), ${cost:.4f}"
+                )
+
+
+def run_estimate(
+    systems: List[str],
+    use_cases: List[str],
+    queries: Optional[List[int]],
+    model_name: str,
+    scale_factor: int,
+    sample_sfs: Tuple[int, int],
+    output_tokens_per_call: float = DEFAULT_OUTPUT_TOKENS_PER_CALL,
+    call_latency: float = DEFAULT_CALL_LATENCY,
+    selectivity: float = DEFAULT_SELECTIVITY,
+    **benchmark_args,
+) -> List[SystemEstimate]:
+    """
+    Run the selected queries at the sample scale factors against a stub LLM
+    server that counts their input tokens, and project tokens, cost and wall
+    time to *scale_factor* (see cost_estimator).
+
+    Args:
+        sample_sfs: The two sample scale factors
+        selectivity: Fraction of the stubbed LLM requests answered "True"
+        benchmark_args: Further arguments of run_benchmark
+
+    Returns:
+        One estimate per (use case, system); the estimates of systems
+        without sample metrics only carry the error
+    """
+    server, endpoint = start_stub_server(
+        meter=count_request_tokens, selectivity=selectivity
+    )
+    overrides = {
+        **endpoint_env(endpoint),
+        ESTIMATE_ENV: "1",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "replay",
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY") or "replay",
+    }
+    saved = {
+        name: os.environ.get(name)
+        for name in (*overrides, PREDICATE_CACHE_ENV)
+    }
+    # Inherited by isolated workers; stub answers must not reach the cache
+    os.environ.update(overrides)
+    os.environ.pop(PREDICATE_CACHE_ENV, None)
+    try:
+        for sample_sf in sample_sfs:
+            print(f"\n{'#'*60}")
+            print(f"Cost estimate: sample scale factor {sample_sf}")
+            print(f"{'#'*60}")
+            run_benchmark(
+                systems=systems,
+                use_cases=use_cases,
+                queries=queries,
+                model_name=model_name,
+                scale_factor=sample_sf,
+                evaluate=False,
+                **benchmark_args,
+            )
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        server.shutdown()
+        server.server_close()
+
+    prices = load_prices()
+    wanted = {f"Q{q}" for q in queries} if queries else None
+    estimates = []
+    for use_case in use_cases:
+        use_case_dir = PROJECT_ROOT / "files" / use_case
+        for system in systems:
+            samples = load_sample_metrics(use_case_dir, system, sample_sfs)
+            # Drop records left by estimates of other queries or models
+            samples = {
+                sf: {
+                    query: record
+                    for query, record in records.items()
+                    if (wanted is None or query in wanted)
+                    and record.get("model_name") == model_name
+                }
+                for sf, records in samples.items()
+            }
+            if not samples or not all(samples.values()):
+                print(f"  Warning: No sample metrics for {use_case}/{system}")
+                estimates.append(
+                    SystemEstimate(
+                        use_case,
+                        system,
+                        model_name,
+                        scale_factor,
+                        sample_sfs,
+                        [],
+                        selectivity,
+                        error="no sample metrics",
+                    )
+                )
+                continue
+            estimate = estimate_system(
+                use_case,
+                system,
+                model_name,
+                scale_factor,
+                samples,
+                prices,
+                output_tokens_per_call,
+                call_latency,
+                selectivity,
+                wanted,
+            )
+            write_estimate(use_case_dir, estimate)
+            estimates.append(estimate)
+    return estimates
+
+
 def main():
     load_dotenv()
 
@@ -363,6 +930,21 @@ Examples:
 
   # Force direct execution (skip venv isolation)
   python run.py --systems lotus --no-isolation
+
+  # Run up to 4 isolated workers at the same time
+  python run.py --systems lotus palimpzest thalamusdb --use-cases movie animals --parallel 4
+
+  # Continue an interrupted run, re-running only failed or missing queries
+  python run.py --systems palimpzest --use-cases animals --resume
+
+  # Rerun queries at several LLM concurrency levels (speedup curves)
+  python run.py --systems lotus palimpzest --queries 1 3 --sweep-concurrency 1,5,10,20,50
+
+  # Estimate tokens, cost and time of a large run from small samples
+  python run.py --systems lotus --use-cases animals --scale-factor 1600 --estimate
+
+  # Run only if the estimated cost stays within $50
+  python run.py --systems lotus --use-cases cars --scale-factor 157376 --budget 50
         """,
     )
 
@@ -416,8 +998,182 @@ Examples:
         help="Disable per-system venv isolation (run all systems in current process)",
     )
 
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of (use case, system) pairs to run at the same time in isolated workers (default: 1)",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--concurrency-cap",
+        action="append",
+        default=[],
+        metavar="SYSTEM=N",
+        help="Limit how many workers of SYSTEM may run at the same time with --parallel (default: bigquery=1). Can be given multiple times.",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip queries that already succeeded for the same system, model, scale factor and concurrency; only failed or missing queries are run again.",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=None,
+        help="Repeat number of this run, recorded with every result in the results store (files/results_store)",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--sweep-concurrency",
+        type=str,
+        default=None,
+        metavar="LEVELS",
+        help="Rerun the selected queries once per concurrency level, e.g. 1,5,10,20,50 (LOTUS max_batch_size, Palimpzest max_workers/join_parallelism, ThalamusDB dop, FlockMTL batch size). Time, cost and quality of each level are collected in files/<use case>/metrics/concurrency_sweep_<model>_c<level>; plot them with src/plot_concurrency_sweep.py.",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--predicate-cache",
+        nargs="?",
+        const=str(DEFAULT_CACHE_PATH),
+        default=None,
+        metavar="PATH",
+        help=f"Answer repeated LLM calls (same model, prompt and media) from a persistent cache shared by all queries, systems and runs (default file: {DEFAULT_CACHE_PATH.relative_to(PROJECT_ROOT)}). Metrics report the cache hits; token usage and cost stay the cold numbers.",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--llm-endpoint",
+        type=str,
+        default=None,
+        metavar="URL",
+        help="Send all OpenAI/Gemini calls to a local record/replay server (src/llm_replay.py), e.g. http://127.0.0.1:8765",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--adaptive-concurrency",
+        type=int,
+        nargs="?",
+        const=DEFAULT_MAX_CONCURRENCY,
+        default=None,
+        metavar="MAX",
+        help=f"Adapt the number of in-flight LLM calls per model (LiteLLM-based systems): grow until latency rises or calls are throttled (429/503), then back off (AIMD), up to MAX (default: {DEFAULT_MAX_CONCURRENCY}). Metrics report the limits reached.",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        default=None,
+        metavar="MODEL=RPM:TPM",
+        help="Share request/token per-minute quotas between all benchmark processes of the host (LiteLLM-based systems and CAESURA); MODEL is a model name, PROVIDER/* or *, e.g. gemini/*=1000:1000000. Repeatable. Metrics report the time calls waited for quota separately.",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--media-cache",
+        nargs="?",
+        const="default",
+        default=None,
+        metavar="OPTIONS",
+        help="Send preprocessed media to the LLM (LOTUS, Palimpzest): images downscaled and re-encoded, audio mono and resampled, cached by content under files/media_cache. OPTIONS like max_side=768,max_pixels=500000,image_format=webp,quality=80,audio_rate=16000",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--nested-sampling",
+        action="store_true",
+        help="Generate missing scale factors nested (animals, cars, ecomm, mmqa): every sf is a prefix of the larger nested ones under a fixed seed, rows keep their attributes, and files are copied only for the rows a smaller nested sf does not hold, so per-row caches carry over between scale factors",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--synthetic-scaleup",
+        action="store_true",
+        help="Allow scale factors beyond the source data (animals, cars, mmqa): missing rows are perturbed copies of source rows (cropped and mirrored images, time-shifted audio, paraphrased text, remapped ids) that keep the labels of their source, so the ground truth stays derivable",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--data-mirror",
+        default=None,
+        metavar="PATH",
+        help="Read source archives from a mirror (folder or tarball written by `python3 src/download_manager.py mirror`) instead of downloading them; archives are checked against the mirror's checksums",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--trace-llm",
+        action="store_true",
+        help="Trace every LLM call (LiteLLM-based systems): writes a Chrome/Perfetto trace per query next to the raw results and adds latency percentiles, in-flight calls and idle gaps to the metrics",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--llm-stub",
+        type=float,
+        nargs="?",
+        const=0.0,
+        default=None,
+        metavar="LATENCY_MS",
+        help="Answer all OpenAI/Gemini calls from an in-process stub server (optionally after LATENCY_MS) to measure engine overhead without LLM cost; results go to raw_results/ and metrics/llm_stub_<model>_<latency>ms and are not evaluated",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Do not run; estimate the tokens, cost (src/models.toml prices) and wall time at --scale-factor from runs at two small sample scale factors whose LLM calls are answered by a token-counting stub. Estimates are written to files/<use case>/estimates.",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--estimate-samples",
+        type=int,
+        nargs=2,
+        default=None,
+        metavar=("SF1", "SF2"),
+        help="Sample scale factors of the estimate (default: 1%% and 4%% of --scale-factor, at least 10)",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--estimate-output-tokens",
+        type=float,
+        default=DEFAULT_OUTPUT_TOKENS_PER_CALL,
+        metavar="N",
+        help=f"Output tokens assumed per LLM call in the estimate (default: {DEFAULT_OUTPUT_TOKENS_PER_CALL})",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--estimate-latency",
+        type=float,
+        default=DEFAULT_CALL_LATENCY,
+        metavar="SECONDS",
+        help=f"Latency assumed per LLM call in the estimate (default: {DEFAULT_CALL_LATENCY:g})",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--estimate-selectivity",
+        type=float,
+        default=DEFAULT_SELECTIVITY,
+        metavar="FRACTION",
+        help=f"Fraction of the rows semantic filters pass in the estimate's sample runs; at the default ({DEFAULT_SELECTIVITY:g}) operators after a filter are projected as an upper bound",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        metavar="USD",
+        help="Estimate the run first (see --estimate) and only start it if the projected cost is within USD; with --estimate, flag estimates above USD",  # noqa: E501
+    )
+
     args = parser.parse_args()
 
+    if args.parallel < 1:
+        print("Error: --parallel must be at least 1")
+        sys.exit(1)
+
+    concurrency_caps = {}
+    for cap in args.concurrency_cap:
+        system, _, limit = cap.partition("=")
+        if not system or not limit.isdigit() or int(limit) < 1:
+            print(f"Error: Invalid --concurrency-cap '{cap}', expected SYSTEM=N")
+            sys.exit(1)
+        concurrency_caps[system] = int(limit)
+
     # Parse query IDs
     query_ids = None
     if args.queries:
@@ -448,6 +1204,205 @@ Examples:
     print(f"Queries: {', '.join(map(str, query_ids)) if query_ids else 'All'}")
     print(f"Scale factor: {args.scale_factor}")
     print(f"Isolation: {'enabled' if use_isolation else 'disabled'}")
+    print(f"Parallel workers: {args.parallel}")
+
+    if args.llm_endpoint and args.llm_stub is not None:
+        print("Error: --llm-endpoint and --llm-stub are mutually exclusive")
+        sys.exit(1)
+    if args.parallel > 1 and (
+        args.llm_endpoint
+        or args.llm_stub is not None
+        or args.estimate
+        or args.budget is not None
+    ):
+        # The server attributes calls to queries by their time window, so
+        # the calls of concurrently running queries would mix
+        print(
+            "Error: --llm-endpoint, --llm-stub, --estimate and --budget "
+            "need --parallel 1"
+        )
+        sys.exit(1)
+
+    sample_sfs = None
+    if args.estimate or args.budget is not None:
+        if args.scale_factor is None:
+            print(
+                "Error: --estimate and --budget need the target "
+                "--scale-factor"
+            )
+            sys.exit(1)
+        if args.llm_endpoint or args.llm_stub is not None:
+            print(
+                "Error: --estimate and --budget cannot be combined with "
+                "--llm-endpoint or --llm-stub"
+            )
+            sys.exit(1)
+        if args.sweep_concurrency:
+            print(
+                "Error: --estimate and --budget cannot be combined with "
+                "--sweep-concurrency"
+            )
+            sys.exit(1)
+        if not 0 < args.estimate_selectivity <= 1:
+            print(
+                f"Error: Invalid --estimate-selectivity "
+                f"{args.estimate_selectivity:g}, expected a fraction in (0, 1]"
+            )
+            sys.exit(1)
+        sample_sfs = tuple(
+            sorted(
+                args.estimate_samples
+                or sample_scale_factors(args.scale_factor)
+            )
+        )
+        if sample_sfs[0] < 1 or sample_sfs[0] == sample_sfs[1]:
+            print(
+                f"Error: Invalid --estimate-samples "
+                f"{sample_sfs[0]} {sample_sfs[1]}, expected two different "
+                f"positive scale factors"
+            )
+            sys.exit(1)
+        print(
+            f"Cost estimate: sf {args.scale_factor} from samples "
+            f"{sample_sfs[0]}, {sample_sfs[1]}, filter selectivity "
+            f"{args.estimate_selectivity:g}"
+        )
+    if args.llm_stub is not None:
+        _, args.llm_endpoint = start_stub_server(latency_ms=args.llm_stub)
+        print(f"LLM stub latency: {args.llm_stub:g} ms")
+        # Inherited by isolated workers; read by GenericRunner and
+        # GenericEvaluator. Stub answers are no quality numbers, so stub
+        # runs write to their own folders and are not evaluated.
+        os.environ[RUN_LABEL_ENV] = stub_run_label(args.model, args.llm_stub)
+        print(f"Run label: {os.environ[RUN_LABEL_ENV]} (no evaluation)")
+
+    if args.llm_endpoint:
+        # Inherited by isolated workers and picked up by the LLM clients
+        os.environ.update(endpoint_env(args.llm_endpoint))
+        # Replayed runs need no credentials, but the clients insist on a key
+        for key_name in ("OPENAI_API_KEY", "GEMINI_API_KEY"):
+            os.environ.setdefault(key_name, "replay")
+        print(f"LLM endpoint: {args.llm_endpoint}")
+
+    if args.predicate_cache:
+        # Inherited by isolated workers; read by GenericRunner
+        os.environ[PREDICATE_CACHE_ENV] = os.path.abspath(args.predicate_cache)
+        print(f"Predicate cache: {args.predicate_cache}")
+
+    sweep_levels = None
+    if args.sweep_concurrency:
+        try:
+            sweep_levels = [int(x) for x in args.sweep_concurrency.split(",")]
+        except ValueError:
+            sweep_levels = []
+        if not sweep_levels or min(sweep_levels) < 1:
+            print(
+                f"Error: Invalid --sweep-concurrency "
+                f"'{args.sweep_concurrency}', expected levels like 1,5,10"
+            )
+            sys.exit(1)
+        if args.adaptive_concurrency is not None:
+            print(
+                "Error: --sweep-concurrency and --adaptive-concurrency are "
+                "mutually exclusive"
+            )
+            sys.exit(1)
+        print(f"Concurrency sweep: {', '.join(map(str, sweep_levels))}")
+
+    if args.adaptive_concurrency is not None:
+        if args.adaptive_concurrency < 1:
+            print("Error: --adaptive-concurrency must be at least 1")
+            sys.exit(1)
+        # Inherited by isolated workers; read by GenericRunner
+        os.environ[ADAPTIVE_CONCURRENCY_ENV] = str(args.adaptive_concurrency)
+        print(f"Adaptive concurrency: up to {args.adaptive_concurrency}")
+
+    if args.rate_limit:
+        try:
+            limits = parse_limits(",".join(args.rate_limit))
+        except ValueError as e:
+            print(f"Error: --rate-limit: {e}")
+            sys.exit(1)
+        # Inherited by isolated workers; read by GenericRunner
+        os.environ[RATE_LIMITS_ENV] = format_limits(limits)
+        print(f"Rate limits: {os.environ[RATE_LIMITS_ENV]}")
+
+    if args.media_cache:
+        try:
+            MediaProfile.parse(args.media_cache)
+        except ValueError as e:
+            print(f"Error: --media-cache: {e}")
+            sys.exit(1)
+        # Inherited by isolated workers; read by GenericRunner
+        os.environ[MEDIA_CACHE_ENV] = args.media_cache
+        print(f"Media cache: {args.media_cache}")
+
+    if args.nested_sampling:
+        # Inherited by isolated workers; read by the scenario data generators
+        os.environ[NESTED_SAMPLING_ENV] = "1"
+        print("Nested sampling: enabled")
+
+    if args.synthetic_scaleup:
+        # Inherited by isolated workers; read by the scenario data generators
+        os.environ[SYNTHETIC_SCALEUP_ENV] = "1"
+        print("Synthetic scale-up: enabled")
+
+    if args.data_mirror:
+        if not os.path.exists(args.data_mirror):
+            print(f"Error: --data-mirror: {args.data_mirror} does not exist")
+            sys.exit(1)
+        # Inherited by isolated workers; read by download_manager
+        os.environ[DATA_MIRROR_ENV] = os.path.abspath(args.data_mirror)
+        print(f"Data mirror: {os.environ[DATA_MIRROR_ENV]}")
+
+    if args.trace_llm:
+        # Inherited by isolated workers; read by GenericRunner
+        os.environ[LLM_TRACE_ENV] = "1"
+        print("LLM call tracing: enabled")
+
+    if sample_sfs:
+        estimates = run_estimate(
+            systems=args.systems,
+            use_cases=args.use_cases,
+            queries=query_ids,
+            model_name=args.model,
+            scale_factor=args.scale_factor,
+            sample_sfs=sample_sfs,
+            output_tokens_per_call=args.estimate_output_tokens,
+            call_latency=args.estimate_latency,
+            selectivity=args.estimate_selectivity,
+            use_isolation=use_isolation,
+            parallel=args.parallel,
+            concurrency_caps=concurrency_caps,
+        )
+        over_budget = print_estimates(estimates, args.budget)
+        if args.estimate or over_budget:
+            if over_budget and not args.estimate:
+                print("Not starting the run")
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(2 if over_budget else 0)
+
+    if sweep_levels:
+        sweep = run_concurrency_sweep(
+            levels=sweep_levels,
+            systems=args.systems,
+            use_cases=args.use_cases,
+            queries=query_ids,
+            model_name=args.model,
+            repeat=args.repeat,
+            skip_setup=args.skip_setup,
+            scale_factor=args.scale_factor,
+            use_isolation=use_isolation,
+            parallel=args.parallel,
+            concurrency_caps=concurrency_caps,
+            resume=args.resume,
+            evaluate=args.llm_stub is None,
+        )
+        print_sweep_summary(sweep)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(0)
 
     # Run benchmark
     results = run_benchmark(
@@ -458,6 +1413,11 @@ Examples:
         model_name=args.model,
         scale_factor=args.scale_factor,
         use_isolation=use_isolation,
+        parallel=args.parallel,
+        concurrency_caps=concurrency_caps,
+        resume=args.resume,
+        repeat=args.repeat,
+        evaluate=args.llm_stub is None,
     )
 
     # Print summary
@@ -472,54 +1432,56 @@ Examples:
                 print(f"  {system}: ❌ Failed - {system_results['error']}")
             else:
                 print(f"  {system}: ✅ Completed")
-                if system_results:
-                    # Sort by query ID for consistent output
-                    sorted_results = sorted(
-                        system_results.items(),
-                        key=lambda x: (
-                            x[0][1:] if x[0].startswith("Q") else x[0]
-                        ),
-                    )
+            # Per-query results; failed isolated workers keep the queries
+            # they finished before the failure
+            if system_results:
+                # Sort by query ID for consistent output
+                sorted_results = sorted(
+                    system_results.items(),
+                    key=lambda x: (
+                        x[0][1:] if x[0].startswith("Q") else x[0]
+                    ),
+                )
 
-                    for query_key, metrics in sorted_results:
-                        if isinstance(metrics, dict):
-                            query_id = metrics.get("query_id", query_key)
-                            # Handle both formats: integer ID or "Q{id}" string
-                            if isinstance(
-                                query_id, str
-                            ) and query_id.startswith("Q"):
-                                display_id = query_id
-                            else:
-                                display_id = f"Q{query_id}"
-
-                            status = metrics.get("status", "unknown")
-                            time_str = (
-                                f"{metrics.get('execution_time', 0):.2f}s"
+                for query_key, metrics in sorted_results:
+                    if isinstance(metrics, dict):
+                        query_id = metrics.get("query_id", query_key)
+                        # Handle both formats: integer ID or "Q{id}" string
+                        if isinstance(
+                            query_id, str
+                        ) and query_id.startswith("Q"):
+                            display_id = query_id
+                        else:
+                            display_id = f"Q{query_id}"
+
+                        status = metrics.get("status", "unknown")
+                        time_str = (
+                            f"{metrics.get('execution_time', 0):.2f}s"
+                        )
+
+                        if status == "success":
+                            row_count = metrics.get("row_count", 0)
+                            token_usage = metrics.get("token_usage", 0)
+                            cost = metrics.get("money_cost", 0.0)
+
+                            print(
+                                f"    {display_id}: ✅ {time_str}, {row_count} rows",  # noqa: E501
+                                end="",
                             )
-
-                            if status == "success":
-                                row_count = metrics.get("row_count", 0)
-                                token_usage = metrics.get("token_usage", 0)
-                                cost = metrics.get("money_cost", 0.0)
-
-                                print(
-                                    f"    {display_id}: ✅ {time_str}, {row_count} rows",  # noqa: E501
-                                    end="",
-                                )
-                                if token_usage > 0:
-                                    print(f", {token_usage} tokens", end="")
-                                if cost > 0:
-                                    print(f", ${cost:.4f}", end="")
-                                print()
-                            elif status == "failed":
-                                error_msg = metrics.get(
-                                    "error", "Unknown error"
-                                )
-                                print(
-                                    f"    {display_id}: ❌ {time_str}, Error: {error_msg}"  # noqa: E501
-                                )
-                            else:
-                                print(f"    {display_id}: {time_str}")
+                            if token_usage > 0:
+                                print(f", {token_usage} tokens", end="")
+                            if cost > 0:
+                                print(f", ${cost:.4f}", end="")
+                            print()
+                        elif status == "failed":
+                            error_msg = metrics.get(
+                                "error", "Unknown error"
+                            )
+                            print(
+                                f"    {display_id}: ❌ {time_str}, Error: {error_msg}"  # noqa: E501
+                            )
+                        else:
+                            print(f"    {display_id}: {time_str}")
 
     # Flush output before force-terminating (os._exit skips buffer flush)
     sys.stdout.flush()
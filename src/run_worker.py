@@ -3,7 +3,9 @@ Subprocess worker for running a single system in an isolated environment.
 
 This script is invoked by run.py when per-system virtual environments are
 detected. It runs a single system's queries and saves results to disk.
-The main run.py process then reads those results for evaluation.
+Each finished query is also reported to the parent over the result channel
+(see worker_channel.py), so the main run.py process can persist metrics while
+the worker is still running and then evaluate the results.
 
 Usage (called automatically by run.py):
     .venvs/lotus/bin/python src/run_worker.py \
@@ -12,7 +14,6 @@ Usage (called automatically by run.py):
 """
 
 import argparse
-import json
 import os
 import sys
 
@@ -21,6 +22,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from dotenv import load_dotenv
 
+from worker_channel import WorkerChannel
+
 
 def main():
     load_dotenv()
@@ -46,8 +49,26 @@ def main():
     parser.add_argument(
         "--skip-setup", action="store_true", help="Skip data setup phase"
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip queries that already succeeded in a previous run",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=None,
+        help="Repeat number recorded with the results",
+    )
+    parser.add_argument(
+        "--result-fd",
+        type=int,
+        default=None,
+        help="File descriptor of the result channel opened by run.py",
+    )
 
     args = parser.parse_args()
+    channel = WorkerChannel(args.result_fd) if args.result_fd else None
 
     # Import runner infrastructure
     from run import get_runner_class, parse_query_ids
@@ -61,6 +82,8 @@ def main():
     runner_class = get_runner_class(args.system, args.use_case)
     if not runner_class:
         print(f"Failed to import runner for {args.system}")
+        if channel:
+            channel.send("error", error=f"Failed to import runner for {args.system}")
         sys.exit(1)
 
     # Initialize and run
@@ -71,21 +94,20 @@ def main():
             skip_setup=args.skip_setup,
             model_name=args.model,
         )
-        metrics = runner.run_all_queries(queries=query_ids)
-
-        # Write a completion marker with summary for the parent process
-        summary = {}
-        for query_id, metric in metrics.items():
-            summary[f"Q{query_id}"] = metric.to_dict()
+        runner.repeat = args.repeat
+        if channel:
+            runner.add_query_listener(channel.send_query)
+        runner.run_all_queries(queries=query_ids, resume=args.resume)
 
-        # Print summary as JSON to stdout for parent process
-        print(f"\n__WORKER_RESULT__{json.dumps(summary)}__END_WORKER_RESULT__")
+        if channel:
+            channel.send("done")
 
     except Exception as e:
         import traceback
 
         traceback.print_exc()
-        print(f"\n__WORKER_ERROR__{str(e)}__END_WORKER_ERROR__")
+        if channel:
+            channel.send("error", error=str(e))
         sys.exit(1)
 
 
@@ -0,0 +1,330 @@
+"""
+Adaptive (AIMD) limit on the LLM calls a runner has in flight.
+
+Runners are configured with a fixed concurrent_llm_worker (LOTUS
+max_batch_size, Palimpzest max_workers, ThalamusDB dop). Too low wastes
+quota, too high runs into 429/503 responses and retries. With adaptive
+concurrency enabled (run.py --adaptive-concurrency), the worker pools of the
+systems are sized to a ceiling and the governor decides how many of their
+calls may actually be in flight, separately for every model:
+
+    slow start  the limit grows by one per successful call until the first
+                backoff
+    increase    afterwards by one per limit successful calls (about one per
+                round trip)
+    decrease    the limit is multiplied by beta when a call is throttled
+                (429, 503, RateLimitError) or when the smoothed latency rises
+                above latency_tolerance times its baseline; at most once per
+                round trip, so a burst of errors counts as one congestion
+                event
+
+The governor gates calls through LiteLLM callbacks: the pre-call hook blocks
+until a slot is free, the success and failure events release it. Systems
+that do not call LLMs through LiteLLM (CAESURA, FlockMTL, BigQuery) keep
+their static limits.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+ADAPTIVE_CONCURRENCY_ENV = "SEMBENCH_ADAPTIVE_CONCURRENCY"
+# Fixed concurrent_llm_worker of all runners, set for each level of run.py
+# --sweep-concurrency
+CONCURRENT_LLM_WORKER_ENV = "SEMBENCH_CONCURRENT_LLM_WORKER"
+DEFAULT_MAX_CONCURRENCY = 64
+
+# Status codes and exception names that signal provider-side throttling
+_THROTTLE_STATUS = {429, 503}
+_THROTTLE_ERRORS = {"RateLimitError", "ServiceUnavailableError"}
+
+
+@dataclass
+class LaneStats:
+    """State and counters of the limit of one model."""
+
+    limit: float = 0.0
+    limit_min: float = 0.0
+    limit_max: float = 0.0
+    in_flight: int = 0
+    calls: int = 0
+    throttled: int = 0
+    backoffs: int = 0
+    wait_time: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "limit_min": int(self.limit_min),
+            "limit_max": int(self.limit_max),
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "backoffs": self.backoffs,
+            "wait_time": round(self.wait_time, 3),
+        }
+
+
+class _Lane:
+    def __init__(self, initial: float):
+        self.stats = LaneStats(
+            limit=initial, limit_min=initial, limit_max=initial
+        )
+        self.slow_start = True
+        self.smoothed: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.last_decrease = 0.0
+
+
+def is_throttled(error: Any) -> bool:
+    """Whether a failed call was rejected for exceeding the provider quota."""
+    if error is None:
+        return False
+    if getattr(error, "status_code", None) in _THROTTLE_STATUS:
+        return True
+    if type(error).__name__ in _THROTTLE_ERRORS:
+        return True
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text
+
+
+class ConcurrencyGovernor:
+    """
+    AIMD limits on concurrent LLM calls, one per model.
+
+    Usage:
+        governor = ConcurrencyGovernor(initial=20, maximum=64)
+        governor.install()  # gate all LiteLLM calls of this process
+        ...
+        print(governor.snapshot())
+    """
+
+    def __init__(
+        self,
+        initial: int = 20,
+        minimum: int = 1,
+        maximum: int = DEFAULT_MAX_CONCURRENCY,
+        beta: float = 0.5,
+        latency_tolerance: float = 2.0,
+        stale_after: float = 600.0,
+    ):
+        """
+        Args:
+            initial: Limit of a model before its first call
+            minimum: Lowest limit a backoff can reach
+            maximum: Highest limit (the size of the systems' worker pools)
+            beta: Factor applied to the limit on congestion
+            latency_tolerance: Back off once the smoothed latency exceeds
+                this multiple of the baseline (lowest smoothed) latency
+            stale_after: Seconds after which a slot whose call never
+                reported back is reclaimed
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.initial = max(minimum, min(initial, maximum))
+        self.beta = beta
+        self.latency_tolerance = latency_tolerance
+        self.stale_after = stale_after
+        self._lanes: Dict[str, _Lane] = {}
+        self._active: Dict[str, Tuple[str, float]] = {}
+        self._condition = threading.Condition()
+        self._installed = False
+
+    def _lane(self, model: str) -> _Lane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _Lane(float(self.initial))
+        return lane
+
+    def acquire(self, model: str, call_id: str) -> None:
+        """Block until *model* has a free slot and take it for *call_id*."""
+        start = time.time()
+        with self._condition:
+            if call_id in self._active:
+                return  # Hook fired twice for the same call
+            lane = self._lane(model)
+            while lane.stats.in_flight >= int(lane.stats.limit):
+                self._reclaim_stale()
+                if lane.stats.in_flight < int(lane.stats.limit):
+                    break
+                self._condition.wait(timeout=1.0)
+            lane.stats.in_flight += 1
+            lane.stats.wait_time += time.time() - start
+            self._active[call_id] = (model, time.time())
+
+    def release(self, call_id: str, error: Any = None) -> None:
+        """
+        Free the slot of *call_id* and adapt the limit of its model.
+
+        Args:
+            call_id: Call passed to acquire (unknown calls are ignored,
+                e.g. answers served from a cache without an API call)
+            error: Exception of a failed call, None on success
+        """
+        now = time.time()
+        with self._condition:
+            entry = self._active.pop(call_id, None)
+            if entry is None:
+                return
+            model, started = entry
+            lane = self._lane(model)
+            lane.stats.in_flight -= 1
+            lane.stats.calls += 1
+            if is_throttled(error):
+                lane.stats.throttled += 1
+                self._decrease(lane, now)
+            elif error is None:
+                self._observe(lane, now - started, now)
+            self._condition.notify_all()
+
+    def _observe(self, lane: _Lane, latency: float, now: float) -> None:
+        if lane.smoothed is None:
+            lane.smoothed = latency
+        else:
+            lane.smoothed = 0.8 * lane.smoothed + 0.2 * latency
+        if lane.baseline is None or lane.smoothed < lane.baseline:
+            lane.baseline = lane.smoothed
+        else:
+            # Let the baseline follow lasting changes (e.g. longer prompts)
+            lane.baseline *= 1.001
+
+        if lane.smoothed > self.latency_tolerance * lane.baseline:
+            self._decrease(lane, now)
+        elif lane.slow_start:
+            self._set_limit(lane, lane.stats.limit + 1)
+        else:
+            self._set_limit(lane, lane.stats.limit + 1 / lane.stats.limit)
+
+    def _decrease(self, lane: _Lane, now: float) -> None:
+        if now - lane.last_decrease < (lane.smoothed or 1.0):
+            return
+        lane.last_decrease = now
+        lane.slow_start = False
+        lane.stats.backoffs += 1
+        self._set_limit(lane, lane.stats.limit * self.beta)
+
+    def _set_limit(self, lane: _Lane, limit: float) -> None:
+        limit = max(self.minimum, min(self.maximum, limit))
+        lane.stats.limit = limit
+        lane.stats.limit_min = min(lane.stats.limit_min, limit)
+        lane.stats.limit_max = max(lane.stats.limit_max, limit)
+
+    def _reclaim_stale(self) -> None:
+        deadline = time.time() - self.stale_after
+        for call_id, (model, started) in list(self._active.items()):
+            if started < deadline:
+                del self._active[call_id]
+                self._lanes[model].stats.in_flight -= 1
+
+    def snapshot(self) -> Dict[str, LaneStats]:
+        with self._condition:
+            return {
+                model: LaneStats(**vars(lane.stats))
+                for model, lane in self._lanes.items()
+            }
+
+    def mark(self) -> Dict[str, LaneStats]:
+        """
+        Snapshot and restart the limit range of every model, so the next
+        snapshot reports the range reached since this call.
+        """
+        with self._condition:
+            stats = {
+                model: LaneStats(**vars(lane.stats))
+                for model, lane in self._lanes.items()
+            }
+            for lane in self._lanes.values():
+                lane.stats.limit_min = lane.stats.limit
+                lane.stats.limit_max = lane.stats.limit
+            return stats
+
+    def install(self) -> bool:
+        """
+        Gate all LiteLLM calls of this process.
+
+        Returns:
+            False if LiteLLM is not installed
+        """
+        if self._installed:
+            return True  # Shared by all runners of the process
+        try:
+            import litellm
+            from litellm.integrations.custom_logger import CustomLogger
+        except ImportError:
+            return False
+
+        governor = self
+
+        def call_id(kwargs: Dict[str, Any]) -> str:
+            return str(kwargs.get("litellm_call_id") or id(kwargs))
+
+        class _Callback(CustomLogger):
+            def log_pre_api_call(self, model, messages, kwargs):
+                governor.acquire(str(model), call_id(kwargs))
+
+            def log_success_event(self, kwargs, response, start, end):
+                governor.release(call_id(kwargs))
+
+            def log_failure_event(self, kwargs, response, start, end):
+                governor.release(call_id(kwargs), _error(kwargs, response))
+
+            async def async_log_success_event(
+                self, kwargs, response, start, end
+            ):
+                governor.release(call_id(kwargs))
+
+            async def async_log_failure_event(
+                self, kwargs, response, start, end
+            ):
+                governor.release(call_id(kwargs), _error(kwargs, response))
+
+        litellm.callbacks = list(litellm.callbacks or []) + [_Callback()]
+        self._installed = True
+        return True
+
+
+_governor: Optional[ConcurrencyGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_concurrency_governor(
+    initial: int, maximum: int = DEFAULT_MAX_CONCURRENCY
+) -> ConcurrencyGovernor:
+    """
+    Governor of this process, created by the first runner that enables
+    adaptive concurrency. Later runners (run.py without isolation runs
+    several in one process) share it and the limits it has learnt, so
+    every LiteLLM call passes exactly one governor.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ConcurrencyGovernor(initial=initial, maximum=maximum)
+        return _governor
+
+
+def _error(kwargs: Dict[str, Any], response: Any) -> Any:
+    return kwargs.get("exception") or response or RuntimeError("LLM failure")
+
+
+def query_concurrency(
+    before: Dict[str, LaneStats], after: Dict[str, LaneStats]
+) -> Dict[str, Dict[str, Any]]:
+    """Per-model governor state of one query (counters since *before*)."""
+    result = {}
+    for model, stats in after.items():
+        prev = before.get(model, LaneStats())
+        calls = stats.calls - prev.calls
+        if not calls:
+            continue
+        delta = LaneStats(
+            limit=stats.limit,
+            limit_min=stats.limit_min,
+            limit_max=stats.limit_max,
+            calls=calls,
+            throttled=stats.throttled - prev.throttled,
+            backoffs=stats.backoffs - prev.backoffs,
+            wait_time=stats.wait_time - prev.wait_time,
+        )
+        result[model] = delta.to_dict()
+    return result
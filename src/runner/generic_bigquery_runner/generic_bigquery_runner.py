@@ -180,6 +180,7 @@ class GenericBigQueryRunner(GenericRunner):
 
         for query_id, metrics in query_metrics.items():
             if metrics.status == "failed":
+                self._finish_query(metrics)
                 continue
 
             # Wait a moment for inference logs to materialize in BigQuery
@@ -282,4 +283,6 @@ class GenericBigQueryRunner(GenericRunner):
                 metrics.token_usage = 0
                 metrics.money_cost = 0.0
 
+            self._finish_query(metrics)
+
         return query_metrics
@@ -7,6 +7,8 @@ from openai import Completion
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts.chat import ChatPromptTemplate
 
+from runner.rate_limiter import get_rate_limiter
+
 
 logger = logging.getLogger(__name__)
 
@@ -92,6 +94,11 @@ class MyOpenAI(ChatOpenAI):
         print(sleep_time)
         time.sleep(sleep_time)
 
+        # Quotas shared with the other benchmark processes (run.py --rate-limit)
+        rate_limiter = get_rate_limiter()
+        if rate_limiter is not None:
+            rate_limiter.acquire(self.model_name, num_tokens)
+
         logger.debug(f"Request: {prompts}")
         result = super()._generate(prompts, *args, **kwargs)
         logger.debug(f"Response: {result}")
@@ -102,6 +109,8 @@ class MyOpenAI(ChatOpenAI):
             self.total_prompt_tokens += usage.get('prompt_tokens', 0)
             self.total_completion_tokens += usage.get('completion_tokens', 0) 
             self.total_tokens += usage.get('total_tokens', 0)
+            if rate_limiter is not None and usage.get('total_tokens'):
+                rate_limiter.settle(self.model_name, num_tokens, usage['total_tokens'])
             logger.debug(f"Token usage - Prompt: {usage.get('prompt_tokens', 0)}, "
                         f"Completion: {usage.get('completion_tokens', 0)}, "
                         f"Total: {usage.get('total_tokens', 0)}")
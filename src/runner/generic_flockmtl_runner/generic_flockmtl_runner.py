@@ -9,9 +9,13 @@ from jinja2 import Environment
 from overrides import override
 
 from runner.generic_runner import GenericQueryMetric, GenericRunner
+from runner.resource_profiler import ResourceProfiler
 
 jinja_env = Environment(variable_start_string="<<", variable_end_string=">>")
 
+# Tuples per LLM request of the models created by the scenario setups
+DEFAULT_BATCH_SIZE = 32
+
 
 class GenericFlockMTLRunner(GenericRunner):
     """Runner for FlockMTL."""
@@ -63,6 +67,45 @@ class GenericFlockMTLRunner(GenericRunner):
             for query_id in query_ids
         }
 
+        # FlockMTL batches tuples into its LLM requests instead of running
+        # them concurrently; a concurrency sweep varies the batch size
+        if self.concurrency_level is not None:
+            self._set_batch_size(self.concurrency_level)
+        try:
+            self._execute_templated(query_texts, query_metrics)
+        finally:
+            if self.concurrency_level is not None:
+                # The model is stored in the database, restore the default
+                self._set_batch_size(DEFAULT_BATCH_SIZE)
+        print(query_metrics.items())
+
+        return query_metrics
+
+    def _set_batch_size(self, batch_size: int) -> None:
+        """Set the number of tuples FlockMTL sends per LLM request."""
+        self.flockmtl_conn.execute(
+            """
+            UPDATE MODEL(
+                'model_name',
+                'model_name',
+                'openai',
+                {
+                    "tuple_format": "json",
+                    "batch_size": BATCH_SIZE,
+                    "model_parameters": {"temperature": 0.7}
+                }
+            );
+            """.replace("model_name", self.model_name).replace(
+                "BATCH_SIZE", str(batch_size)
+            )
+        )
+        print(f"  FlockMTL batch size: {batch_size}")
+
+    def _execute_templated(
+        self,
+        query_texts: Dict[int, str],
+        query_metrics: Dict[int, GenericQueryMetric],
+    ) -> None:
         for query_id, query_text in query_texts.items():
             try:
                 # Replace variable names in the query text
@@ -72,26 +115,24 @@ class GenericFlockMTLRunner(GenericRunner):
 
                 print(templated_query)
 
-                start_time = time.time()
-                query_job = self.flockmtl_conn.execute(templated_query)
-                df = query_job.fetchdf()
-                execution_time = time.time() - start_time
+                with ResourceProfiler() as profiler:
+                    start_time = time.time()
+                    query_job = self.flockmtl_conn.execute(templated_query)
+                    df = query_job.fetchdf()
+                    execution_time = time.time() - start_time
+                query_metrics[query_id].set_resource_usage(profiler.usage)
 
                 query_metrics[query_id].results = df
                 query_metrics[query_id].execution_time = execution_time
                 query_metrics[query_id].status = "success"
+                # TODO: Implement token usage and cost calculation
+                # Currently no way to extract token usage from FlockMTL
+                query_metrics[query_id].token_usage = 0
+                query_metrics[query_id].money_cost = 0.0
             except Exception as e:
                 print(
                     f"  Error executing query {query_id}: {type(e).__name__}: {e}"  # noqa: E501
                 )
                 query_metrics[query_id].status = "failed"
                 query_metrics[query_id].error = str(e)
-        print(query_metrics.items())
-        for query_id, metrics in query_metrics.items():
-            if metrics.status != "failed":
-                # TODO: Implement token usage and cost calculation
-                # Currently no way to extract token usage from FlockMTL
-                metrics.token_usage = 0
-                metrics.money_cost = 0.0
-
-        return query_metrics
+            self._finish_query(query_metrics[query_id])
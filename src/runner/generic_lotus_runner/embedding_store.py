@@ -0,0 +1,262 @@
+"""
+Disk-backed embeddings and FAISS indexes for the LOTUS approximate policy.
+
+Approximate sem_join (CascadeArgs) embeds the join columns with a
+SentenceTransformers model and builds a FAISS index over one of them, in
+every query of every run. The classes here plug into lotus.settings in
+place of SentenceTransformersRM and FaissVS and keep both on disk
+(files/embedding_cache/<model>/):
+
+    columns/<hash>.npy    embeddings of a whole column, keyed by model and
+                          the content of the column, loaded memory-mapped
+    vectors.sqlite        embeddings of single documents, so a column that
+                          was never seen as a whole (e.g. the same reviews at
+                          another scale factor) only embeds its new rows
+    ../indexes/<hash>/    FAISS index and vectors, keyed by index type and
+                          the embeddings' content
+
+Documents are keyed by their text; images by their pixels (PIL images) or
+file content (paths). The embedding model is only loaded when a document
+actually has to be embedded.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from lotus.models import SentenceTransformersRM
+from lotus.vector_store import FaissVS
+
+from media_cache import media_kind
+
+EMBEDDING_CACHE_DIR = (
+    Path(__file__).resolve().parents[3] / "files" / "embedding_cache"
+)
+
+_file_digests: Dict[tuple, str] = {}
+
+
+def document_digest(doc: Any) -> str:
+    """Content hash of one document passed to an embedding model."""
+    hasher = hashlib.sha256()
+    if isinstance(doc, str):
+        if media_kind(doc) and os.path.isfile(doc):
+            return _file_digest(doc)
+        hasher.update(b"s" + doc.encode("utf-8"))
+    elif hasattr(doc, "tobytes") and hasattr(doc, "size"):
+        # PIL image (ImageArray elements)
+        hasher.update(f"i{doc.mode}{doc.size}".encode() + doc.tobytes())
+    else:
+        hasher.update(b"r" + repr(doc).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _file_digest(path: str) -> str:
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    digest = _file_digests.get(memo_key)
+    if digest is None:
+        hasher = hashlib.sha256(b"f")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+        digest = _file_digests[memo_key] = hasher.hexdigest()
+    return digest
+
+
+class EmbeddingStore:
+    """
+    Embeddings of one model, per column (memory-mapped .npy files) and per
+    document (SQLite).
+    """
+
+    def __init__(self, model: str, root: Path = EMBEDDING_CACHE_DIR):
+        """
+        Args:
+            model: Name of the embedding model
+            root: Directory holding one subdirectory per model
+        """
+        self.model = model
+        self.path = Path(root) / re.sub(r"[^\w.-]+", "_", model)
+        (self.path / "columns").mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                " digest TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path / "vectors.sqlite", timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def embed(
+        self,
+        docs: Sequence[Any],
+        compute: Callable[[List[Any]], np.ndarray],
+    ) -> np.ndarray:
+        """
+        Embeddings of *docs*, computing only those not stored yet.
+
+        Args:
+            docs: Documents (texts, image paths or images)
+            compute: Embeds a list of documents with the model
+
+        Returns:
+            Memory-mapped matrix with one row per document (copy-on-write)
+        """
+        if not len(docs):
+            return compute(list(docs))
+        digests = [document_digest(doc) for doc in docs]
+        column = hashlib.sha256(
+            "\n".join([self.model] + digests).encode()
+        ).hexdigest()
+        column_file = self.path / "columns" / f"{column}.npy"
+        if column_file.exists():
+            return np.load(column_file, mmap_mode="c")
+
+        vectors = self._lookup(set(digests))
+        missing = {}
+        for doc, digest in zip(docs, digests):
+            if digest not in vectors:
+                missing.setdefault(digest, doc)
+        if missing:
+            computed = np.asarray(compute(list(missing.values())))
+            new = dict(zip(missing, computed))
+            self._insert(new)
+            vectors.update(new)
+
+        matrix = np.stack([vectors[digest] for digest in digests])
+        tmp = column_file.with_name(f".{column}.{os.getpid()}.tmp.npy")
+        np.save(tmp, matrix)
+        os.replace(tmp, column_file)
+        return np.load(column_file, mmap_mode="c")
+
+    def _lookup(self, digests: set) -> Dict[str, np.ndarray]:
+        found = {}
+        conn = self._connection()
+        pending = list(digests)
+        # Stay below SQLite's limit of host parameters per statement
+        for start in range(0, len(pending), 900):
+            batch = pending[start : start + 900]
+            placeholders = ",".join("?" * len(batch))
+            for digest, blob in conn.execute(
+                f"SELECT digest, vector FROM vectors "
+                f"WHERE digest IN ({placeholders})",
+                batch,
+            ):
+                found[digest] = _from_blob(blob)
+        return found
+
+    def _insert(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                [(d, _to_blob(v)) for d, v in vectors.items()],
+            )
+
+
+def _to_blob(vector: np.ndarray) -> bytes:
+    vector = np.ascontiguousarray(vector)
+    return f"{vector.dtype.str}|".encode() + vector.tobytes()
+
+
+def _from_blob(blob: bytes) -> np.ndarray:
+    dtype, _, data = blob.partition(b"|")
+    return np.frombuffer(data, dtype=np.dtype(dtype.decode()))
+
+
+class CachedSentenceTransformersRM(SentenceTransformersRM):
+    """
+    SentenceTransformersRM that loads its model on first use and serves
+    embeddings from an EmbeddingStore.
+    """
+
+    def __init__(
+        self,
+        model: str = "intfloat/e5-base-v2",
+        max_batch_size: int = 64,
+        normalize_embeddings: bool = True,
+        device: Optional[str] = None,
+        root: Path = EMBEDDING_CACHE_DIR,
+    ):
+        # Skip SentenceTransformersRM.__init__, which loads the model
+        super(SentenceTransformersRM, self).__init__()
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.normalize_embeddings = normalize_embeddings
+        self.device = device
+        self.store = EmbeddingStore(model, root)
+        self._transformer = None
+        self._lock = threading.Lock()
+
+    @property
+    def transformer(self):
+        with self._lock:
+            if self._transformer is None:
+                from sentence_transformers import SentenceTransformer
+
+                print(f"  Loading embedding model {self.model}")
+                self._transformer = SentenceTransformer(
+                    self.model, device=self.device
+                )
+        return self._transformer
+
+    @transformer.setter
+    def transformer(self, value) -> None:
+        self._transformer = value
+
+    def _embed(self, docs) -> np.ndarray:
+        docs = docs.tolist() if hasattr(docs, "tolist") else list(docs)
+        return self.store.embed(docs, super()._embed)
+
+
+class CachedFaissVS(FaissVS):
+    """
+    FaissVS that reuses the index built for the same embeddings before, by
+    any query, run or scale factor.
+    """
+
+    def __init__(self, *args: Any, root: Path = EMBEDDING_CACHE_DIR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_path = Path(root) / "indexes"
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+
+    def index(self, docs, embeddings, index_dir: str, **kwargs: Any) -> None:
+        embeddings = np.ascontiguousarray(embeddings)
+        hasher = hashlib.sha256(
+            f"{getattr(self, 'factory_string', '')}|"
+            f"{getattr(self, 'metric', '')}|{embeddings.shape}".encode()
+        )
+        hasher.update(memoryview(embeddings).cast("B"))
+        cached = self.cache_path / hasher.hexdigest()
+        if not (cached / "index").exists():
+            tmp = cached.with_name(f".{cached.name}.{os.getpid()}.tmp")
+            super().index(docs, embeddings, str(tmp), **kwargs)
+            try:
+                os.replace(tmp, cached)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)  # Built concurrently
+
+        # LOTUS reads the index back from the directory it asked for
+        os.makedirs(index_dir, exist_ok=True)
+        for name in ("index", "vecs"):
+            target = os.path.join(index_dir, name)
+            if os.path.lexists(target):
+                os.remove(target)
+            try:
+                os.link(cached / name, target)
+            except OSError:
+                shutil.copyfile(cached / name, target)
+        self.load_index(index_dir)
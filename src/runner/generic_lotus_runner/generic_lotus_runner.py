@@ -57,6 +57,9 @@ PRICING = {
 class GenericLotusRunner(GenericRunner):
     """GenericRunner for LOTUS system."""
 
+    # ImageArray columns are built from the media paths returned by load_data
+    use_media_cache = True
+
     # thinking for gemini-2.5-pro can not be disabled, but always has issues
     def __init__(
         self,
@@ -114,6 +117,11 @@ class GenericLotusRunner(GenericRunner):
         if "gemini-2.5-pro" in model_lower or "gemini_2_5_pro" in model_lower:
             # gemini-2.5-pro: reasoning_effort="low", solve the "no content due to length" issue
             # but does not work when concurrent_llm_worker is 20, try using rate_limit to control
+            if self.concurrency_governor is not None:
+                # The adaptive governor backs off on throttling instead
+                return LM(
+                    self.model_name, **base_config, reasoning_effort="low"
+                )
             return LM(
                 self.model_name,
                 rate_limit=2000,
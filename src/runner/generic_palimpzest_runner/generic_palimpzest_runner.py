@@ -27,6 +27,9 @@ litellm.drop_params = True
 class GenericPalimpzestRunner(GenericRunner):
     """GenericRunner for Palimpzest system."""
 
+    # Image and audio fields are read from the paths returned by load_data
+    use_media_cache = True
+
     def __init__(
         self,
         use_case: str,
@@ -194,6 +197,10 @@ class GenericPalimpzestRunner(GenericRunner):
 
         # Use configuration data if available, otherwise use defaults
         if self.config_data:
+            # A concurrency sweep level overrides the configured parallelism
+            parallelism = (
+                self.config_data if self.concurrency_level is None else {}
+            )
             config_kwargs = {
                 "policy": self._get_policy_from_config(
                     self.config_data["policy"]
@@ -201,10 +208,10 @@ class GenericPalimpzestRunner(GenericRunner):
                 "execution_strategy": self.config_data.get(
                     "execution_strategy", "parallel"
                 ),
-                "max_workers": self.config_data.get(
+                "max_workers": parallelism.get(
                     "max_workers", self.concurrent_llm_worker
                 ),
-                "join_parallelism": self.config_data.get(
+                "join_parallelism": parallelism.get(
                     "join_parallelism", self.concurrent_llm_worker
                 ),
                 "verbose": self.config_data.get("verbose", False),
@@ -8,15 +8,56 @@ execute_query(query_id: int) -> GenericQueryMetric in your system
 implementations
 """
 
+import fcntl
 import json
 import os
+import time
 from abc import ABC, abstractmethod
-from dataclasses import asdict, dataclass, field
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, fields
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import pandas as pd
 
+from cost_estimator import ESTIMATE_ENV, ESTIMATES_DIR
+from llm_replay import LLM_ENDPOINT_ENV, fetch_usage
+from media_cache import MEDIA_CACHE_ENV, MediaCache, MediaProfile
+from results_store import (
+    LIVE_RUN_LABEL,
+    current_run_label,
+    get_store,
+    store_row,
+)
+from runner.predicate_cache import (
+    PREDICATE_CACHE_ENV,
+    PredicateCache,
+    PredicateCacheStats,
+)
+from runner.concurrency import (
+    ADAPTIVE_CONCURRENCY_ENV,
+    CONCURRENT_LLM_WORKER_ENV,
+    ConcurrencyGovernor,
+    get_concurrency_governor,
+    query_concurrency,
+)
+from runner.llm_trace import (
+    LLM_TRACE_ENV,
+    LLMTracer,
+    TraceSummary,
+    get_llm_tracer,
+    summarize,
+    write_chrome_trace,
+)
+from runner.rate_limiter import (
+    RateLimiter,
+    format_limits,
+    get_rate_limiter,
+)
+from runner.resource_profiler import ResourceProfiler, ResourceUsage
+from runner.table_cache import TableCache
+from table_format import resolve_table
+
 
 @dataclass
 class GenericQueryMetric:
@@ -29,6 +70,50 @@ class GenericQueryMetric:
     token_usage: int = None
     money_cost: float = None
     error: Optional[str] = None
+    # Resource usage of the runner's process tree while the query ran
+    peak_memory_mb: float = None
+    cpu_user_time: float = None
+    cpu_system_time: float = None
+    num_threads: int = None
+    num_fds: int = None
+    # Predicate cache lookups of the query (run.py --predicate-cache);
+    # token_usage and money_cost include the answers served from the cache
+    cache_hits: int = None
+    cache_misses: int = None
+    cache_hit_rate: float = None
+    cache_saved_tokens: int = None
+    # Split of execution_time into LLM calls and engine overhead, reported
+    # when the LLM calls go through llm_replay (run.py --llm-endpoint or
+    # --llm-stub); llm_operator_calls maps operator (prompt) labels to their
+    # calls, LLM time and overhead between their first and last call
+    llm_calls: int = None
+    llm_busy_time: float = None
+    engine_overhead_time: float = None
+    engine_overhead_ms_per_call: float = None
+    llm_operator_calls: Dict[str, Dict[str, float]] = None
+    # LLM call trace of the query (run.py --trace-llm): call latencies,
+    # in-flight calls relative to concurrent_llm_worker and idle gaps
+    traced_calls: int = None
+    llm_retries: int = None
+    call_latency_p50: float = None
+    call_latency_p95: float = None
+    mean_in_flight_calls: float = None
+    peak_in_flight_calls: int = None
+    llm_slot_utilization: float = None
+    llm_idle_time: float = None
+    llm_idle_gaps: int = None
+    llm_max_idle_gap: float = None
+    # Adaptive concurrency (run.py --adaptive-concurrency) per model: limit
+    # at the end of the query, its range, calls, throttled calls, backoffs
+    # and time spent waiting for a slot
+    adaptive_concurrency: Dict[str, Dict[str, Any]] = None
+    # Host-wide rate limits (run.py --rate-limit): requests that waited for
+    # quota and the wall time during which at least one of them waited.
+    # execution_time includes the waits; execution_time_excl_rate_limit
+    # does not, for comparing runs made under different quotas
+    rate_limited_calls: int = None
+    rate_limit_wait_time: float = None
+    execution_time_excl_rate_limit: float = None
 
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -43,10 +128,95 @@ class GenericQueryMetric:
         data["row_count"] = len(self.results) if self.results is not None else 0
         return data
 
+    @classmethod
+    def from_record(
+        cls, record: Dict[str, Any], results: pd.DataFrame
+    ) -> "GenericQueryMetric":
+        """
+        Rebuild a metric from its record in the metrics file (which may also
+        hold evaluation fields) and its saved results.
+        """
+        names = {f.name for f in fields(cls)} - {"results"}
+        return cls(
+            results=results, **{k: v for k, v in record.items() if k in names}
+        )
+
+    def set_resource_usage(self, usage: ResourceUsage) -> None:
+        """Copy the profiled resource usage of the query into the metric."""
+        self.peak_memory_mb = usage.peak_memory_mb
+        self.cpu_user_time = usage.cpu_user_time
+        self.cpu_system_time = usage.cpu_system_time
+        self.num_threads = usage.num_threads
+        self.num_fds = usage.num_fds
+
+    def set_cache_stats(self, stats: PredicateCacheStats) -> None:
+        """Copy the predicate cache lookups of the query into the metric."""
+        self.cache_hits = stats.hits
+        self.cache_misses = stats.misses
+        self.cache_hit_rate = round(stats.hit_rate, 4)
+        self.cache_saved_tokens = stats.saved_tokens
+
+    def set_trace_summary(self, summary: TraceSummary) -> None:
+        """Copy the LLM call trace statistics of the query into the metric."""
+        self.traced_calls = summary.calls
+        self.llm_retries = summary.retries
+        self.call_latency_p50 = round(summary.latency_p50, 4)
+        self.call_latency_p95 = round(summary.latency_p95, 4)
+        self.mean_in_flight_calls = round(summary.mean_in_flight, 3)
+        self.peak_in_flight_calls = summary.peak_in_flight
+        if summary.utilization is not None:
+            self.llm_slot_utilization = round(summary.utilization, 4)
+        self.llm_idle_time = round(summary.idle_time, 4)
+        self.llm_idle_gaps = summary.idle_gaps
+        self.llm_max_idle_gap = round(summary.max_idle_gap, 4)
+
+    def set_rate_limit_waits(self, calls: int, wait_time: float) -> None:
+        """Copy the rate limit waits of the query into the metric."""
+        self.rate_limited_calls = calls
+        self.rate_limit_wait_time = round(wait_time, 4)
+        if self.execution_time is not None:
+            self.execution_time_excl_rate_limit = round(
+                max(0.0, self.execution_time - wait_time), 4
+            )
+
+    def set_llm_usage(self, usage: Dict[str, Any]) -> None:
+        """
+        Copy the LLM calls of the query, as reported by the llm_replay
+        server, into the metric and derive the engine overhead: the part of
+        execution_time during which no LLM call was in flight.
+        """
+        self.llm_calls = usage["calls"]
+        self.llm_busy_time = round(usage["busy_time"], 4)
+        self.llm_operator_calls = usage["operators"] or None
+        if self.execution_time is None:
+            return
+        overhead = max(0.0, self.execution_time - usage["busy_time"])
+        self.engine_overhead_time = round(overhead, 4)
+        if self.llm_calls:
+            self.engine_overhead_ms_per_call = round(
+                overhead * 1000 / self.llm_calls, 3
+            )
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]):
+    """Write *data* to *path* so readers never see a partially written file."""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
 
 class GenericRunner(ABC):
     """Base class for all system runners."""
 
+    # Table cache behind load_data; runners override these to bound the
+    # memory of large scale factors or to parse CSV files with PyArrow
+    table_cache_memory_mb: Optional[float] = None
+    table_cache_engine: Optional[str] = None
+    # Runners that pass media files to the LLM by path set this to receive
+    # preprocessed copies from load_data when run.py --media-cache is used
+    use_media_cache: bool = False
+
     def __init__(
         self,
         use_case: str,
@@ -71,6 +241,26 @@ class GenericRunner(ABC):
         self.query_path = self.files_path / "query"
         self.results_path = self.files_path / "raw_results" / self.system_name
         self.metrics_path = self.files_path / "metrics"
+        # Side runs (a concurrency sweep level, a stub LLM run) keep their
+        # raw results and metrics apart under their own run label
+        self.run_label = current_run_label()
+        if self.run_label != LIVE_RUN_LABEL:
+            self.results_path = (
+                self.files_path / "raw_results" / self.run_label
+                / self.system_name
+            )
+            self.metrics_path = self.files_path / "metrics" / self.run_label
+        # Set by workload.py, whose concurrent requests share this runner;
+        # the driver writes the outputs of the workload itself
+        self.workload_mode = False
+        # Sample runs of run.py --estimate keep out of the regular results
+        self.estimate_mode = bool(os.getenv(ESTIMATE_ENV))
+        if self.estimate_mode:
+            sample_path = (
+                self.files_path / ESTIMATES_DIR / f"sf_{scale_factor}"
+            )
+            self.results_path = sample_path / "raw_results" / self.system_name
+            self.metrics_path = sample_path / "metrics"
 
         # Create directories if they don't exist
         self.results_path.mkdir(parents=True, exist_ok=True)
@@ -78,16 +268,80 @@ class GenericRunner(ABC):
 
         # Initialize metrics storage
         self.metrics: Dict[int, GenericQueryMetric] = {}
+        self._query_listeners: List[Callable[[int, Dict[str, Any]], None]] = []
         self.model_name = model_name
         self.scale_factor = scale_factor
+        # Level of a concurrency sweep (run.py --sweep-concurrency); replaces
+        # the runner's default and any parallelism in the system configs
+        level = os.getenv(CONCURRENT_LLM_WORKER_ENV)
+        self.concurrency_level: Optional[int] = int(level) if level else None
+        if self.concurrency_level is not None:
+            concurrent_llm_worker = self.concurrency_level
         self.concurrent_llm_worker = concurrent_llm_worker
+        # Adaptive limit on in-flight LLM calls, enabled by run.py
+        # --adaptive-concurrency; sizes the systems' worker pools to its
+        # ceiling, so it has to be set up before the subclasses use
+        # concurrent_llm_worker
+        self.concurrency_governor: Optional[ConcurrencyGovernor] = None
+        self._governor_mark: Dict[str, Any] = {}
+        max_concurrency = os.getenv(ADAPTIVE_CONCURRENCY_ENV)
+        if max_concurrency:
+            self.enable_adaptive_concurrency(int(max_concurrency))
+        # Host-wide request/token quotas, configured by run.py --rate-limit
+        self.rate_limiter: Optional[RateLimiter] = None
+        if get_rate_limiter() is not None:
+            self.enable_rate_limits()
+        # Repeat number of the run (set by run.py --repeat), part of the
+        # results store key
+        self.repeat: Optional[int] = None
+        self.table_cache = TableCache(
+            max_memory_mb=self.table_cache_memory_mb,
+            engine=self.table_cache_engine,
+        )
+        # Persistent LLM answer cache, enabled by run.py --predicate-cache
+        self.predicate_cache: Optional[PredicateCache] = None
+        self._cache_mark = PredicateCacheStats()
+        cache_path = os.getenv(PREDICATE_CACHE_ENV)
+        if cache_path:
+            self.enable_predicate_cache(Path(cache_path))
+        # llm_replay server answering the LLM calls, asked for the calls of
+        # each query to split its time into LLM time and engine overhead
+        self.llm_endpoint = os.getenv(LLM_ENDPOINT_ENV)
+        self._query_start = time.time()
+        # Per-call LLM tracing, enabled by run.py --trace-llm
+        self.llm_tracer: Optional[LLMTracer] = None
+        if os.getenv(LLM_TRACE_ENV):
+            self.enable_llm_trace()
 
         # Manage scenario-specific data
         self.scenario_handler = GenericRunner.get_scenario_handler(
             self.use_case, self.scale_factor
         )
         if not skip_setup and self.scenario_handler is not None:
-            self.scenario_handler.setup_scenario([self.get_system_name()])
+            with self._setup_lock():
+                self.scenario_handler.setup_scenario([self.get_system_name()])
+
+        # Preprocessed media (downscaled images, mono audio), see media_cache
+        self.media_cache: Optional[MediaCache] = None
+        media_spec = os.getenv(MEDIA_CACHE_ENV)
+        if media_spec is not None and self.use_media_cache:
+            self.enable_media_cache(MediaProfile.parse(media_spec))
+
+    @contextmanager
+    def _setup_lock(self):
+        """
+        Hold an exclusive lock on the use case's data directory while setting
+        up the scenario, so workers started in parallel (run.py --parallel)
+        do not generate the same dataset concurrently.
+        """
+        lock_dir = self.files_path / "data"
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        with open(lock_dir / ".setup.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
     @abstractmethod
     def get_system_name(self) -> str:
@@ -125,6 +379,9 @@ class GenericRunner(ABC):
         """
         results = {}
         for query_id in query_ids:
+            self._mark_query_start()
+            profiler = ResourceProfiler()
+            profiler.start()
             try:
                 results[query_id] = self.execute_query(query_id)
             except Exception as e:
@@ -135,16 +392,22 @@ class GenericRunner(ABC):
                     status="failed",
                     error=str(e),
                 )
+            finally:
+                usage = profiler.stop()
+            results[query_id].set_resource_usage(usage)
+            self._finish_query(results[query_id])
         return results
 
     def run_all_queries(
-        self, queries: Optional[List[int]] = None
+        self, queries: Optional[List[int]] = None, resume: bool = False
     ) -> Dict[int, GenericQueryMetric]:
         """
         Run all queries for this system.
 
         Args:
             queries: Optional list of specific query IDs to run
+            resume: Skip queries that already succeeded for the same model
+                and scale factor according to the checkpointed metrics
 
         Returns:
             Dictionary mapping query IDs to metrics
@@ -153,12 +416,64 @@ class GenericRunner(ABC):
         if queries is None:
             queries = self._discover_queries()
 
-        print(f"\nRunning {len(queries)} queries for {self.system_name}")
-        self.metrics = self.execute_queries(queries)
+        resumed = self._load_checkpoint(queries) if resume else {}
+        for metric in resumed.values():
+            self._notify_query_listeners(metric)
+        if resumed:
+            print(
+                f"\nResuming: skipping {len(resumed)} finished queries "
+                f"({', '.join(f'Q{q}' for q in resumed)})"
+            )
+
+        remaining = [q for q in queries if q not in resumed]
+        print(f"\nRunning {len(remaining)} queries for {self.system_name}")
+        executed = self.execute_queries(remaining)
+        self.metrics = {
+            q: resumed[q] if q in resumed else executed[q]
+            for q in queries
+            if q in resumed or q in executed
+        }
         self.save_metrics()
 
         return self.metrics
 
+    def _load_checkpoint(
+        self, queries: List[int]
+    ) -> Dict[int, GenericQueryMetric]:
+        """
+        Return metrics of *queries* that already succeeded for this model,
+        scale factor and concurrency and whose results are still on disk.
+        """
+        metrics_file = self.metrics_path / f"{self.system_name}.json"
+        if not metrics_file.exists():
+            return {}
+        try:
+            with open(metrics_file, "r") as f:
+                store = json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+        resumed = {}
+        for query_id in queries:
+            record = store.get(f"Q{query_id}")
+            results_file = self.results_path / f"Q{query_id}.csv"
+            if (
+                record is None
+                or record.get("status") != "success"
+                or record.get("model_name") != self.model_name
+                or record.get("scale_factor") != self.scale_factor
+                or record.get("concurrent_llm_worker")
+                != self.concurrent_llm_worker
+                or not results_file.exists()
+            ):
+                continue
+            try:
+                results = pd.read_csv(results_file)
+            except pd.errors.EmptyDataError:
+                results = pd.DataFrame()
+            resumed[query_id] = GenericQueryMetric.from_record(record, results)
+        return resumed
+
     def get_query_text(
         self, query_id: int, query_type: str = "natural_language"
     ) -> str:
@@ -193,29 +508,299 @@ class GenericRunner(ABC):
         results.to_csv(output_file, index=False)
         print(f"Results saved to: {output_file}")
 
+    def add_query_listener(
+        self, listener: Callable[[int, Dict[str, Any]], None]
+    ):
+        """
+        Register a callback invoked with (query_id, metric record) as soon as
+        a query has finished and its results have been written to disk.
+        """
+        self._query_listeners.append(listener)
+
+    def metric_record(self, metric: GenericQueryMetric) -> Dict[str, Any]:
+        """Return the JSON record stored for *metric* in the metrics file."""
+        record = metric.to_dict()
+        record["model_name"] = self.model_name
+        record["concurrent_llm_worker"] = self.concurrent_llm_worker
+        record["scale_factor"] = self.scale_factor
+        if self.repeat is not None:
+            record["repeat"] = self.repeat
+        return record
+
+    def _finish_query(self, metric: GenericQueryMetric):
+        """
+        Checkpoint a finished query (results CSV plus its record, including
+        token usage and cost, in the metrics file) and notify listeners.
+        Runners that override execute_queries() must call this once per
+        query, after its metric is complete.
+        """
+        if self.workload_mode:
+            # The per-query counters and files below assume one query at a
+            # time; workload.py measures and writes its requests itself
+            return
+        if self.predicate_cache is not None:
+            stats = self.predicate_cache.snapshot()
+            metric.set_cache_stats(stats - self._cache_mark)
+            self._cache_mark = stats
+            print(
+                f"  Predicate cache: {metric.cache_hits} hits, "
+                f"{metric.cache_misses} misses "
+                f"({metric.cache_saved_tokens} tokens served from cache)"
+            )
+        query_end = time.time()
+        if self.concurrency_governor is not None:
+            before = self._governor_mark
+            self._governor_mark = self.concurrency_governor.mark()
+            metric.adaptive_concurrency = (
+                query_concurrency(before, self._governor_mark) or None
+            )
+            for model, state in (metric.adaptive_concurrency or {}).items():
+                print(
+                    f"  Concurrency {model}: limit {state['limit']} "
+                    f"(range {state['limit_min']}-{state['limit_max']}), "
+                    f"{state['throttled']} throttled, "
+                    f"{state['backoffs']} backoffs"
+                )
+        if self.rate_limiter is not None:
+            calls, wait_time = self.rate_limiter.waits_between(
+                self._query_start, query_end
+            )
+            metric.set_rate_limit_waits(calls, wait_time)
+            if calls:
+                print(
+                    f"  Rate limits: {calls} calls waited "
+                    f"{wait_time:.2f}s for quota"
+                )
+        if self.llm_tracer is not None:
+            self._save_trace(metric, query_end)
+        if self.llm_endpoint:
+            usage = fetch_usage(self.llm_endpoint, self._query_start, query_end)
+            if usage is not None:
+                metric.set_llm_usage(usage)
+                print(
+                    f"  LLM calls: {metric.llm_calls} "
+                    f"({metric.llm_busy_time:.2f}s in flight, engine overhead "
+                    f"{metric.engine_overhead_time}s)"
+                )
+        self._query_start = time.time()
+
+        results = metric.results
+        if results is None:
+            results = self._get_empty_results_dataframe(metric.query_id)
+        elif self.media_cache is not None:
+            results = self.media_cache.restore(results)
+        self.save_results(metric.query_id, results)
+        self._checkpoint_metric(metric)
+        self._store_metric(metric)
+        self._notify_query_listeners(metric)
+
+    def enable_predicate_cache(self, path: Path) -> None:
+        """Answer repeated LLM calls of this runner from the cache at *path*."""
+        cache = PredicateCache(path)
+        if not cache.install():
+            print(
+                f"  Warning: LiteLLM is not available, predicate cache "
+                f"disabled for {self.system_name}"
+            )
+            return
+        self.predicate_cache = cache
+        self._cache_mark = cache.snapshot()
+        print(f"✓ Predicate cache enabled: {path}")
+
+    def enable_adaptive_concurrency(self, maximum: int) -> None:
+        """
+        Let an AIMD governor limit the in-flight LLM calls of this runner,
+        starting at concurrent_llm_worker, and raise concurrent_llm_worker
+        to *maximum* so the systems' worker pools never cap the governor.
+        """
+        governor = get_concurrency_governor(
+            initial=self.concurrent_llm_worker, maximum=maximum
+        )
+        if not governor.install():
+            print(
+                f"  Warning: LiteLLM is not available, adaptive concurrency "
+                f"disabled for {self.system_name}"
+            )
+            return
+        self.concurrency_governor = governor
+        self.concurrent_llm_worker = maximum
+        print(
+            f"✓ Adaptive concurrency enabled (start {governor.initial}, "
+            f"max {maximum})"
+        )
+
+    def enable_rate_limits(self) -> None:
+        """
+        Take the LLM calls of this runner from the host-wide token buckets
+        (see runner.rate_limiter).
+        """
+        limiter = get_rate_limiter()
+        if not limiter.install():
+            # Clients that acquire on their own (CAESURA) are still limited
+            print(
+                f"  Warning: LiteLLM is not available, rate limits only "
+                f"apply to direct clients for {self.system_name}"
+            )
+        self.rate_limiter = limiter
+        print(
+            f"✓ Rate limits enabled: {format_limits(limiter.limits)} "
+            f"({limiter.state_dir})"
+        )
+
+    def enable_media_cache(self, profile: MediaProfile) -> None:
+        """
+        Preprocess the media referenced by the scenario tables and serve the
+        tables of load_data with paths pointing to the preprocessed copies.
+        """
+        if not self.data_path.is_dir():
+            print(
+                f"  Warning: No data tables at {self.data_path}, media cache "
+                f"disabled for {self.system_name}"
+            )
+            return
+        cache = MediaCache(profile)
+        with self._setup_lock():
+            count = cache.prepare_folder(self.data_path)
+        self.media_cache = cache
+        print(f"✓ Media cache enabled: {cache.path} ({count} new file(s))")
+        for kind, stats in cache.stats().items():
+            print(
+                f"  {kind}: {stats.files} files, saves "
+                f"{stats.saved_bytes / max(stats.source_bytes, 1):.0%} of "
+                f"the bytes and "
+                f"{stats.saved_tokens / max(stats.source_tokens, 1):.0%} of "
+                f"the tokens"
+            )
+
+    def enable_llm_trace(self) -> None:
+        """Trace the LLM calls of this runner (see runner.llm_trace)."""
+        tracer = get_llm_tracer()
+        if not tracer.install():
+            print(
+                f"  Warning: LiteLLM is not available, LLM call tracing "
+                f"disabled for {self.system_name}"
+            )
+            return
+        self.llm_tracer = tracer
+        print("✓ LLM call tracing enabled")
+
+    def _save_trace(self, metric: GenericQueryMetric, query_end: float):
+        """Write the call trace of a finished query next to its results."""
+        calls = self.llm_tracer.calls_between(self._query_start, query_end)
+        summary = summarize(
+            calls, self._query_start, query_end, self.concurrent_llm_worker
+        )
+        metric.set_trace_summary(summary)
+        trace_file = self.results_path / f"Q{metric.query_id}.trace.json"
+        write_chrome_trace(
+            calls,
+            trace_file,
+            self._query_start,
+            summary,
+            name=f"{self.system_name} Q{metric.query_id}",
+        )
+        print(
+            f"  LLM trace: {summary.calls} calls, p50 "
+            f"{summary.latency_p50:.2f}s, p95 {summary.latency_p95:.2f}s, "
+            f"{summary.mean_in_flight:.1f} in flight on average, "
+            f"idle {summary.idle_time:.2f}s -> {trace_file}"
+        )
+
+    def _mark_query_start(self):
+        """
+        Start counting the predicate cache lookups and LLM calls of the next
+        query. Without a mark, a query's count starts when the previous one
+        finished.
+        """
+        self._query_start = time.time()
+        if self.concurrency_governor is not None:
+            self._governor_mark = self.concurrency_governor.mark()
+        if self.predicate_cache is not None:
+            self._cache_mark = self.predicate_cache.snapshot()
+
+    def _checkpoint_metric(self, metric: GenericQueryMetric):
+        """Merge the record of *metric* into the metrics file."""
+        metrics_file = self.metrics_path / f"{self.system_name}.json"
+        store = {}
+        if metrics_file.exists():
+            try:
+                with open(metrics_file, "r") as f:
+                    store = json.load(f)
+            except json.JSONDecodeError:
+                store = {}
+        store[f"Q{metric.query_id}"] = self.metric_record(metric)
+        _write_json_atomic(metrics_file, store)
+
+    def _store_metric(self, metric: GenericQueryMetric):
+        """Append the record of *metric* to the shared results store."""
+        if self.estimate_mode:
+            return
+        row = store_row(
+            scenario=self.use_case,
+            system=self.system_name,
+            model=self.model_name,
+            scale_factor=self.scale_factor,
+            repeat=self.repeat,
+            query=f"Q{metric.query_id}",
+            record=self.metric_record(metric),
+            run_label=self.run_label,
+        )
+        try:
+            get_store().append([row])
+        except Exception as e:
+            # The metrics file stays the source of truth for this run
+            print(f"  Warning: Could not write to results store: {e}")
+
+    def _notify_query_listeners(self, metric: GenericQueryMetric):
+        record = self.metric_record(metric)
+        for listener in self._query_listeners:
+            try:
+                listener(metric.query_id, record)
+            except Exception as e:
+                print(f"  Warning: Query listener failed: {e}")
+
     def save_metrics(self):
-        """Save metrics to JSON file."""
+        """
+        Save metrics to JSON file. Query results are already written by
+        _finish_query() when each query completes.
+        """
         metrics_file = self.metrics_path / f"{self.system_name}.json"
 
         # Convert metrics to dict format
-        metrics_dict = {}
-        for query_id, metric in self.metrics.items():
-            query_name = f"Q{query_id}"
-            metrics_dict[query_name] = metric.to_dict()
-            metrics_dict[query_name]["model_name"] = self.model_name
-            metrics_dict[query_name][
-                "concurrent_llm_worker"
-            ] = self.concurrent_llm_worker
-            self.save_results(query_id, metric.results)
-
-        # # write query results to csv files
-        # for query_id, metric in self.metrics.items():
-        #     self.save_results(query_id, metric.results)
-
-        with open(metrics_file, "w") as f:
-            json.dump(metrics_dict, f, indent=2)
+        metrics_dict = {
+            f"Q{query_id}": self.metric_record(metric)
+            for query_id, metric in self.metrics.items()
+        }
+
+        _write_json_atomic(metrics_file, metrics_dict)
         print(f"Metrics saved to: {metrics_file}")
 
+        self.save_memory_metrics()
+
+    def save_memory_metrics(self):
+        """
+        Save per-query resource usage to `<system>_memory.json`, the format
+        read by plot_scalability_combined.py and aggregate_table_generator.py.
+        """
+        memory_dict = {
+            f"Q{query_id}": {
+                "peak_memory_mb": metric.peak_memory_mb,
+                "cpu_user_time": metric.cpu_user_time,
+                "cpu_system_time": metric.cpu_system_time,
+                "num_threads": metric.num_threads,
+                "num_fds": metric.num_fds,
+            }
+            for query_id, metric in self.metrics.items()
+            if metric.peak_memory_mb is not None
+        }
+        if not memory_dict:
+            return
+
+        memory_file = self.metrics_path / f"{self.system_name}_memory.json"
+        with open(memory_file, "w") as f:
+            json.dump(memory_dict, f, indent=2)
+        print(f"Memory metrics saved to: {memory_file}")
+
     def _get_empty_results_dataframe(self, query_id: int) -> pd.DataFrame:
         """
         Get empty DataFrame with correct columns for a query.
@@ -291,21 +876,39 @@ class GenericRunner(ABC):
                 f"Query {query_id} not implemented for {self.system_name}."
             )
 
-    def load_data(self, filename: str, **kwargs) -> pd.DataFrame:
+    def load_data(
+        self,
+        filename: str,
+        categories: Optional[List[str]] = None,
+        **kwargs,
+    ) -> pd.DataFrame:
         """
         Load data file from the data directory.
 
+        Files are parsed once per runner and served from the table cache
+        afterwards, so every query can load its tables without paying for
+        parsing again. The returned DataFrame is a private view and may be
+        modified freely. With the media cache enabled, media paths point to
+        the preprocessed copies.
+
         Args:
-            filename: Name of the data file
+            filename: Name of the data file (CSV or Parquet)
+            categories: Columns to load with the pandas category dtype
+            **kwargs: read_csv options, e.g. dtype or usecols
 
         Returns:
             DataFrame containing the data
         """
         data_file = self.data_path / filename
-        if not data_file.exists():
+        if not resolve_table(data_file).exists():
             raise FileNotFoundError(f"Data file not found: {data_file}")
 
-        return pd.read_csv(data_file, **kwargs)
+        table = self.table_cache.load(
+            data_file, categories=categories, **kwargs
+        )
+        if self.media_cache is not None:
+            table = self.media_cache.rewrite(table)
+        return table
 
     def get_scenario_handler(use_case: str, scale_factor: int = None):
         """
@@ -74,7 +74,7 @@ class GenericThalamusDBRunner(GenericRunner):
         }
         self.engine = ExecutionEngine(
             self.db,
-            dop=20,
+            dop=self.concurrent_llm_worker,
             model_config_path=f"{Path(__file__).resolve().parents[3]}/config/system/thalamusdb/{model_name_to_file_name[self.model_name]}.json",
         )
         self.constraints = Constraints(max_calls=100000000000, max_seconds=6000, max_tokens=10000000000000000000000)
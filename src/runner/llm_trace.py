@@ -0,0 +1,404 @@
+"""
+Per-call tracing of the LLM calls a query makes.
+
+The systems are configured with concurrent_llm_worker parallel LLM calls
+(LOTUS max_batch_size, Palimpzest max_workers, ThalamusDB dop), but the
+metrics alone do not show whether those slots are actually busy. With
+tracing enabled (run.py --trace-llm), a LiteLLM callback records every call
+of the runner's process:
+
+    start/end, queue wait (time LiteLLM spent before sending the request),
+    model, modality, prompt/completion tokens, cache hit, status, retries
+
+For every query GenericRunner writes the calls as a Chrome trace next to the
+raw results (raw_results/<system>/Q<id>.trace.json, open it in Perfetto or
+chrome://tracing). Each call is placed on the first free slot, so the slots
+of the timeline show how many calls were in flight, and a counter track plots
+the in-flight count over time. The metrics get the summary: call latency
+percentiles, mean and peak in-flight calls, slot utilization and the idle
+gaps during which no call was in flight.
+
+Retries are the failed attempts of the same request (same model and
+messages) earlier in the query. Retries done inside the provider SDKs never
+reach LiteLLM's callbacks and are not counted.
+"""
+
+import json
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from runner.predicate_cache import request_key
+
+LLM_TRACE_ENV = "SEMBENCH_LLM_TRACE"
+
+# Message content part types and the modality they carry
+_PART_MODALITIES = {
+    "image_url": "image",
+    "input_audio": "audio",
+    "file": "file",
+    "text": "text",
+}
+
+
+@dataclass
+class LLMCall:
+    """One LLM call (attempt) as reported by LiteLLM."""
+
+    start: float
+    end: float
+    queue_wait: float
+    model: str
+    modality: str
+    status: str  # 'success' or 'failed'
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit: bool = False
+    retries: int = 0
+    key: str = ""
+
+    @property
+    def latency(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class TraceSummary:
+    """Latency and concurrency statistics of the calls of one query."""
+
+    calls: int
+    failed_calls: int
+    retries: int
+    latency_p50: float
+    latency_p95: float
+    latency_max: float
+    mean_in_flight: float
+    peak_in_flight: int
+    utilization: Optional[float]
+    idle_time: float
+    idle_gaps: int
+    max_idle_gap: float
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def call_modality(kwargs: Dict[str, Any]) -> str:
+    """Modalities in the request of a call, e.g. "image+text"."""
+    if kwargs.get("call_type") in ("embedding", "aembedding"):
+        return "embedding"
+    found = set()
+    for message in kwargs.get("messages") or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            found.add("text")
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict):
+                    found.add(_PART_MODALITIES.get(part.get("type"), "text"))
+    return "+".join(sorted(found)) or "text"
+
+
+def _token_counts(response: Any) -> tuple:
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return (
+            usage.get("prompt_tokens") or 0,
+            usage.get("completion_tokens") or 0,
+        )
+    return (
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+    )
+
+
+class LLMTracer:
+    """
+    Collects the LLM calls of this process through LiteLLM callbacks.
+
+    Usage:
+        tracer = LLMTracer()
+        tracer.install()
+        start = time.time()
+        run_query()
+        calls = tracer.calls_between(start, time.time())
+        write_chrome_trace(calls, "Q1.trace.json")
+    """
+
+    def __init__(self):
+        self._calls: List[LLMCall] = []
+        self._lock = threading.Lock()
+        self._installed = False
+
+    def install(self) -> bool:
+        """
+        Register the tracer as LiteLLM callback.
+
+        Returns:
+            False if LiteLLM is not installed (e.g. FlockMTL or BigQuery
+            workers, whose LLM calls happen inside the database)
+        """
+        if self._installed:
+            return True  # Shared by all runners of the process
+        try:
+            import litellm
+            from litellm.integrations.custom_logger import CustomLogger
+        except ImportError:
+            return False
+
+        tracer = self
+
+        class _Callback(CustomLogger):
+            def log_success_event(self, kwargs, response, start, end):
+                tracer.record(kwargs, response, start, end, "success")
+
+            def log_failure_event(self, kwargs, response, start, end):
+                tracer.record(kwargs, response, start, end, "failed")
+
+            async def async_log_success_event(
+                self, kwargs, response, start, end
+            ):
+                tracer.record(kwargs, response, start, end, "success")
+
+            async def async_log_failure_event(
+                self, kwargs, response, start, end
+            ):
+                tracer.record(kwargs, response, start, end, "failed")
+
+        litellm.callbacks = list(litellm.callbacks or []) + [_Callback()]
+        self._installed = True
+        return True
+
+    def record(
+        self,
+        kwargs: Dict[str, Any],
+        response: Any,
+        start_time: Any,
+        end_time: Any,
+        status: str,
+    ) -> None:
+        """Add one call reported by LiteLLM."""
+        start = _timestamp(start_time)
+        end = _timestamp(end_time)
+        if start is None or end is None:
+            return
+        api_start = _timestamp(kwargs.get("api_call_start_time"))
+        queue_wait = max(0.0, api_start - start) if api_start else 0.0
+        prompt_tokens, completion_tokens = _token_counts(response)
+        try:
+            key = request_key(kwargs)
+        except Exception:
+            key = ""
+        call = LLMCall(
+            start=start,
+            end=end,
+            queue_wait=queue_wait,
+            model=str(kwargs.get("model") or ""),
+            modality=call_modality(kwargs),
+            status=status,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cache_hit=bool(kwargs.get("cache_hit")),
+            key=key,
+        )
+        with self._lock:
+            self._calls.append(call)
+
+    def calls_between(self, start: float, end: float) -> List[LLMCall]:
+        """
+        Calls that started within [start, end], ordered by start, with their
+        retry counts. Older calls are dropped from the tracer.
+        """
+        with self._lock:
+            calls = [c for c in self._calls if start <= c.start <= end]
+            self._calls = [c for c in self._calls if c.start > end]
+        calls.sort(key=lambda c: c.start)
+        failed: Dict[str, int] = {}
+        for call in calls:
+            if call.key:
+                call.retries = failed.get(call.key, 0)
+                if call.status == "failed":
+                    failed[call.key] = call.retries + 1
+        return calls
+
+
+_tracer: Optional[LLMTracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_llm_tracer() -> LLMTracer:
+    """
+    Tracer of this process, shared by all its runners, so every LiteLLM
+    call is recorded once.
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = LLMTracer()
+        return _tracer
+
+
+def summarize(
+    calls: List[LLMCall],
+    start: float,
+    end: float,
+    slots: Optional[int] = None,
+) -> TraceSummary:
+    """
+    Statistics of the calls of a query that ran from *start* to *end*.
+
+    Args:
+        calls: Calls of the query
+        start: Start of the query (epoch seconds)
+        end: End of the query (epoch seconds)
+        slots: Configured number of concurrent LLM calls, for utilization
+
+    Returns:
+        Summary; idle time counts the parts of the query without any call in
+        flight, including the time before the first and after the last call
+    """
+    window = max(end - start, 1e-9)
+    latencies = np.array([c.latency for c in calls]) if calls else None
+
+    # Sweep over call boundaries for the in-flight count and idle gaps
+    events = sorted(
+        [(c.start, 1) for c in calls] + [(c.end, -1) for c in calls]
+    )
+    in_flight, peak = 0, 0
+    idle_time, idle_gaps, max_gap = 0.0, 0, 0.0
+    idle_since = start
+    for t, delta in events:
+        if in_flight == 0 and delta > 0:
+            gap = max(0.0, t - idle_since)
+            if gap > 0:
+                idle_time += gap
+                idle_gaps += 1
+                max_gap = max(max_gap, gap)
+        in_flight += delta
+        peak = max(peak, in_flight)
+        if in_flight == 0:
+            idle_since = t
+    tail = max(0.0, end - idle_since) if in_flight == 0 else 0.0
+    if tail > 0:
+        idle_time += tail
+        idle_gaps += 1
+        max_gap = max(max_gap, tail)
+
+    mean_in_flight = sum(c.latency for c in calls) / window
+    return TraceSummary(
+        calls=len(calls),
+        failed_calls=sum(c.status == "failed" for c in calls),
+        retries=sum(c.retries for c in calls),
+        latency_p50=float(np.percentile(latencies, 50)) if calls else 0.0,
+        latency_p95=float(np.percentile(latencies, 95)) if calls else 0.0,
+        latency_max=float(latencies.max()) if calls else 0.0,
+        mean_in_flight=mean_in_flight,
+        peak_in_flight=peak,
+        utilization=mean_in_flight / slots if slots else None,
+        idle_time=idle_time,
+        idle_gaps=idle_gaps,
+        max_idle_gap=max_gap,
+    )
+
+
+def _assign_slots(calls: List[LLMCall]) -> List[int]:
+    """Put each call on the lowest slot that is free when it starts."""
+    slot_ends: List[float] = []
+    slots = []
+    for call in calls:
+        for slot, busy_until in enumerate(slot_ends):
+            if busy_until <= call.start:
+                break
+        else:
+            slot = len(slot_ends)
+            slot_ends.append(0.0)
+        slot_ends[slot] = call.end
+        slots.append(slot)
+    return slots
+
+
+def write_chrome_trace(
+    calls: List[LLMCall],
+    path: Path,
+    start: float,
+    summary: Optional[TraceSummary] = None,
+    name: str = "query",
+) -> None:
+    """
+    Write *calls* in the Chrome trace event format (Perfetto, chrome://tracing).
+
+    Args:
+        calls: Calls ordered by start
+        path: Target JSON file
+        start: Start of the query; trace timestamps are relative to it
+        summary: Summary stored in the trace metadata
+        name: Name of the trace process (e.g. "lotus Q3")
+    """
+
+    def micros(t: float) -> int:
+        return int(round((t - start) * 1e6))
+
+    events: List[Dict[str, Any]] = [
+        {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": name}}
+    ]
+    slots = _assign_slots(calls)
+    for slot in sorted(set(slots)):
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": slot,
+                "args": {"name": f"slot {slot}"},
+            }
+        )
+    for call, slot in zip(calls, slots):
+        args = asdict(call)
+        del args["key"]
+        events.append(
+            {
+                "name": f"{call.modality} {call.model}",
+                "cat": "llm" if call.status == "success" else "llm,failed",
+                "ph": "X",
+                "ts": micros(call.start),
+                "dur": max(1, micros(call.end) - micros(call.start)),
+                "pid": 1,
+                "tid": slot,
+                "args": args,
+            }
+        )
+
+    boundaries = sorted(
+        [(c.start, 1) for c in calls] + [(c.end, -1) for c in calls]
+    )
+    in_flight = 0
+    for t, delta in boundaries:
+        in_flight += delta
+        events.append(
+            {
+                "name": "in flight",
+                "ph": "C",
+                "ts": micros(t),
+                "pid": 1,
+                "args": {"calls": in_flight},
+            }
+        )
+
+    trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+    if summary is not None:
+        trace["metadata"] = asdict(summary)
+    with open(path, "w") as f:
+        json.dump(trace, f)
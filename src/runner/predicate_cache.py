@@ -0,0 +1,278 @@
+"""
+Persistent, content-addressed cache of LLM answers shared by all runners.
+
+Many queries of a scenario evaluate the same semantic predicate over the same
+rows (e.g. "contains a zebra" in animals Q1, Q3 and Q7). With the cache
+enabled (run.py --predicate-cache), every LLM call made through LiteLLM (the
+client used by LOTUS, Palimpzest and ThalamusDB) is looked up by
+
+    (model, normalized prompt, hash of the attached media, answer options)
+
+and answered from disk if the same request was made before, by any query,
+system or earlier run. The prompt already contains the input tuple, so the key
+covers it; media (base64 payloads or local files) is keyed by its content, not
+by its name.
+
+Cached answers keep the token usage of the original call, so token_usage and
+money_cost of a query stay the "cold" numbers (the cost without the cache).
+The metrics additionally report the cache hits and misses of each query and
+the tokens that were served from the cache instead of being paid for.
+
+The cache is a single SQLite file, safe to share between the threads of a
+runner and between parallel worker processes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+PREDICATE_CACHE_ENV = "SEMBENCH_PREDICATE_CACHE"
+DEFAULT_CACHE_PATH = (
+    Path(__file__).resolve().parents[2] / "files" / "predicate_cache.sqlite"
+)
+
+# Request options that change the answer and are therefore part of the key
+_ANSWER_OPTIONS = (
+    "temperature",
+    "top_p",
+    "max_tokens",
+    "max_completion_tokens",
+    "n",
+    "seed",
+    "stop",
+    "response_format",
+    "reasoning_effort",
+    "logprobs",
+    "top_logprobs",
+    "tools",
+    "tool_choice",
+)
+
+# Message fields holding media payloads (image_url, input_audio, file parts)
+_PAYLOAD_FIELDS = {"url", "data", "file_data", "image_url", "file"}
+
+
+@dataclass
+class PredicateCacheStats:
+    """Lookup counters of a PredicateCache."""
+
+    hits: int = 0
+    misses: int = 0
+    saved_tokens: int = 0
+
+    def __sub__(self, other: "PredicateCacheStats") -> "PredicateCacheStats":
+        return PredicateCacheStats(
+            hits=self.hits - other.hits,
+            misses=self.misses - other.misses,
+            saved_tokens=self.saved_tokens - other.saved_tokens,
+        )
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """
+    Content-addressed key of an LLM request given as LiteLLM call kwargs
+    (model, messages or input, and answer options).
+    """
+    payload = {
+        "model": request.get("model"),
+        "messages": _normalize(request.get("messages")),
+        "input": _normalize(request.get("input")),
+        "options": {
+            name: _normalize(request[name])
+            for name in _ANSWER_OPTIONS
+            if request.get(name) is not None
+        },
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _normalize(value: Any, field: Optional[str] = None) -> Any:
+    """Collapse whitespace in prompt text and replace media by its digest."""
+    if isinstance(value, dict):
+        return {k: _normalize(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v, field) for v in value]
+    if isinstance(value, bytes):
+        return "sha256:" + hashlib.sha256(value).hexdigest()
+    if not isinstance(value, str):
+        return value
+    if field in _PAYLOAD_FIELDS:
+        if value.startswith("data:") or len(value) > 4096:
+            return "sha256:" + hashlib.sha256(value.encode()).hexdigest()
+        if os.path.isfile(value):
+            return _file_digest(value)
+    return " ".join(value.split())
+
+
+_file_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def _file_digest(path: str) -> str:
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    digest = _file_digests.get(memo_key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+        digest = "sha256:" + hasher.hexdigest()
+        _file_digests[memo_key] = digest
+    return digest
+
+
+def _total_tokens(value: Any) -> int:
+    """Token usage recorded in a cached LiteLLM response (0 if unknown)."""
+    try:
+        if isinstance(value, str):
+            value = json.loads(value)
+        response = value.get("response", value)
+        if isinstance(response, str):
+            response = json.loads(response)
+        return int((response.get("usage") or {}).get("total_tokens") or 0)
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+class PredicateCache:
+    """
+    SQLite store of LLM answers, usable as a LiteLLM cache backend.
+
+    Usage:
+        cache = PredicateCache(DEFAULT_CACHE_PATH)
+        cache.install()  # all LiteLLM calls of this process use the cache
+        ...
+        print(cache.stats.hit_rate)
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH):
+        """
+        Args:
+            path: SQLite file holding the cached answers
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.stats = PredicateCacheStats()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " total_tokens INTEGER,"
+                " created_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value, total_tokens FROM answers WHERE key = ?", (key,)
+            )
+            .fetchone()
+        )
+        with self._lock:
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self.stats.saved_tokens += row[1] or 0
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(value, default=str),
+                    _total_tokens(value),
+                    time.time(),
+                ),
+            )
+
+    def snapshot(self) -> PredicateCacheStats:
+        with self._lock:
+            return PredicateCacheStats(**vars(self.stats))
+
+    def install(self) -> bool:
+        """
+        Route all LiteLLM calls of this process through the cache.
+
+        Returns:
+            False if LiteLLM is not installed (e.g. FlockMTL or BigQuery
+            workers, whose LLM calls happen inside the database)
+        """
+        try:
+            import litellm
+            from litellm.caching.caching import Cache
+        except ImportError:
+            return False
+
+        litellm_cache = Cache()
+        litellm_cache.cache = self
+        litellm_cache.get_cache_key = lambda *args, **kwargs: request_key(
+            kwargs
+        )
+        litellm.cache = litellm_cache
+        return True
+
+    # LiteLLM cache backend interface
+
+    def get_cache(self, key: str, **kwargs: Any) -> Optional[Any]:
+        return self.get(key)
+
+    def set_cache(self, key: str, value: Any, **kwargs: Any) -> None:
+        self.put(key, value)
+
+    async def async_get_cache(self, key: str, **kwargs: Any) -> Optional[Any]:
+        return self.get(key)
+
+    async def async_set_cache(self, key: str, value: Any, **kwargs: Any):
+        self.put(key, value)
+
+    async def async_set_cache_pipeline(
+        self, cache_list: Iterable[Tuple[str, Any]], **kwargs: Any
+    ) -> None:
+        for key, value in cache_list:
+            self.put(key, value)
+
+    async def batch_cache_write(self, key: str, value: Any, **kwargs: Any):
+        self.put(key, value)
+
+    def delete_cache(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+
+    def flush_cache(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM answers")
+
+    async def disconnect(self) -> None:
+        pass
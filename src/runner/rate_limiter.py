@@ -0,0 +1,334 @@
+"""
+Host-wide token-bucket rate limits on LLM requests and tokens per minute.
+
+Each worker process (run.py --parallel, isolated workers, concurrent repeat
+runs) otherwise paces only itself, so several of them together exhaust the
+quota of a Gemini/OpenAI project and spend the run in retries. With rate
+limits configured (run.py --rate-limit MODEL=RPM:TPM), every process takes
+its LLM requests from buckets shared through files:
+
+    <state dir>/<limit pattern>.bucket   requests and tokens left, and the
+                                         time they were last refilled
+
+A bucket holds up to one minute of quota and refills continuously. Access is
+serialized with an exclusive file lock (fcntl), so the buckets are shared by
+all processes of the host without a daemon. Tokens are reserved from an
+estimate of the prompt before the request and settled with the reported
+usage afterwards.
+
+Limits are given as "MODEL=RPM:TPM"; MODEL is a model name as passed to the
+client ("gemini/gemini-2.5-flash", "gpt-4o"), "PROVIDER/*" or "*". Either
+number may be empty for no limit on it. A bucket belongs to the pattern that
+matched, so all models matched by "gemini/*" share one provider quota.
+
+LiteLLM-based runners (LOTUS, Palimpzest, ThalamusDB) acquire through a
+LiteLLM callback, CAESURA in its OpenAI client wrapper. The time requests
+waited for quota is reported per query (rate_limit_wait_time) apart from the
+execution time.
+"""
+
+import fcntl
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+RATE_LIMITS_ENV = "SEMBENCH_RATE_LIMITS"
+RATE_LIMIT_DIR_ENV = "SEMBENCH_RATE_LIMIT_DIR"
+DEFAULT_STATE_DIR = Path(tempfile.gettempdir()) / (
+    f"sembench-rate-limits-{os.getuid()}"
+)
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Requests and tokens per minute (None = unlimited)."""
+
+    rpm: Optional[float] = None
+    tpm: Optional[float] = None
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """Parse "MODEL=RPM:TPM,..." into limits per model pattern."""
+    limits = {}
+    for item in filter(None, (x.strip() for x in (spec or "").split(","))):
+        pattern, sep, numbers = item.rpartition("=")
+        if not sep or not pattern:
+            raise ValueError(f"Expected MODEL=RPM:TPM, got {item!r}")
+        rpm, _, tpm = numbers.partition(":")
+        limit = Limit(
+            rpm=float(rpm) if rpm.strip() else None,
+            tpm=float(tpm) if tpm.strip() else None,
+        )
+        if any(v is not None and v <= 0 for v in (limit.rpm, limit.tpm)):
+            raise ValueError(f"Limits must be positive, got {item!r}")
+        limits[pattern.strip()] = limit
+    return limits
+
+
+def format_limits(limits: Dict[str, Limit]) -> str:
+    """Inverse of parse_limits."""
+
+    def number(value: Optional[float]) -> str:
+        return "" if value is None else f"{value:g}"
+
+    return ",".join(
+        f"{pattern}={number(limit.rpm)}:{number(limit.tpm)}"
+        for pattern, limit in limits.items()
+    )
+
+
+def provider_of(model: str) -> str:
+    """Provider of a model name as used by LiteLLM."""
+    if "/" in model:
+        return model.split("/", 1)[0]
+    if model.startswith("gemini"):
+        return "gemini"
+    return "openai"
+
+
+def estimate_tokens(messages: Any) -> int:
+    """Rough prompt size (4 characters per token) of a request."""
+    return max(1, len(json.dumps(messages, default=str)) // 4)
+
+
+class RateLimiter:
+    """
+    Token buckets shared by all processes of the host.
+
+    Usage:
+        limiter = RateLimiter(parse_limits("gemini/*=1000:1000000"))
+        limiter.acquire("gemini/gemini-2.5-flash", tokens=1200)
+        ...
+        limiter.settle("gemini/gemini-2.5-flash", reserved=1200, used=1350)
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Limit],
+        state_dir: Optional[Path] = None,
+    ):
+        """
+        Args:
+            limits: Limits per model pattern (see parse_limits)
+            state_dir: Directory of the shared bucket files
+        """
+        self.limits = limits
+        self.state_dir = Path(
+            state_dir or os.getenv(RATE_LIMIT_DIR_ENV) or DEFAULT_STATE_DIR
+        )
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        # (start, end) of every wait of this process
+        self._waits: List[Tuple[float, float]] = []
+        self._lock = threading.Lock()
+        self._installed = False
+
+    def _match(self, model: str) -> Optional[str]:
+        """The most specific limit pattern matching *model*."""
+        provider = provider_of(model)
+        bare = model.split("/", 1)[-1]
+        for pattern in (model, bare, f"{provider}/*", "*"):
+            if pattern in self.limits:
+                return pattern
+        return None
+
+    def limit_for(self, model: str) -> Optional[Limit]:
+        pattern = self._match(model)
+        return None if pattern is None else self.limits[pattern]
+
+    def _bucket_file(self, model: str) -> Path:
+        # Keyed by the matched pattern: models under "PROVIDER/*" or "*"
+        # draw from one shared bucket
+        key = self._match(model).replace("*", "all")
+        return self.state_dir / (re.sub(r"[^\w.-]+", "_", key) + ".bucket")
+
+    def acquire(self, model: str, tokens: int = 0) -> float:
+        """
+        Block until *model* has quota for one request of *tokens* tokens.
+
+        Returns:
+            Seconds waited
+        """
+        limit = self.limit_for(model)
+        if limit is None:
+            return 0.0
+        start = time.time()
+        waited = False
+        while True:
+            delay = self._take(model, limit, tokens)
+            if delay <= 0:
+                break
+            waited = True
+            time.sleep(min(delay, 1.0))
+        if not waited:
+            return 0.0
+        end = time.time()
+        with self._lock:
+            self._waits.append((start, end))
+        return end - start
+
+    def settle(self, model: str, reserved: int, used: int) -> None:
+        """Charge (or refund) the difference between reserved and used."""
+        limit = self.limit_for(model)
+        if limit is None or limit.tpm is None or used == reserved:
+            return
+        with self._locked_state(model, limit) as state:
+            state["tokens"] -= used - reserved
+
+    def _take(self, model: str, limit: Limit, tokens: int) -> float:
+        """Take the quota if available, else return the seconds to wait."""
+        with self._locked_state(model, limit) as state:
+            waits = []
+            if limit.rpm is not None and state["requests"] < 1:
+                waits.append((1 - state["requests"]) * 60 / limit.rpm)
+            if limit.tpm is not None:
+                # A request larger than the whole bucket waits for a full one
+                needed = min(tokens, limit.tpm)
+                if state["tokens"] < needed:
+                    waits.append((needed - state["tokens"]) * 60 / limit.tpm)
+            if waits:
+                return max(waits)
+            if limit.rpm is not None:
+                state["requests"] -= 1
+            if limit.tpm is not None:
+                state["tokens"] -= tokens
+            return 0.0
+
+    def _locked_state(self, model: str, limit: Limit) -> "_BucketState":
+        return _BucketState(self._bucket_file(model), limit)
+
+    def waits_between(self, start: float, end: float) -> Tuple[int, float]:
+        """
+        Waits of this process that started within [start, end].
+
+        Returns:
+            Number of waiting requests and the wall time during which at
+            least one request was waiting
+        """
+        with self._lock:
+            waits = sorted(w for w in self._waits if start <= w[0] <= end)
+            self._waits = [w for w in self._waits if w[0] > end]
+        total, covered_until = 0.0, float("-inf")
+        for wait_start, wait_end in waits:
+            if wait_end > covered_until:
+                total += wait_end - max(wait_start, covered_until)
+                covered_until = wait_end
+        return len(waits), total
+
+    def install(self) -> bool:
+        """
+        Acquire quota for all LiteLLM calls of this process.
+
+        Returns:
+            False if LiteLLM is not installed
+        """
+        if self._installed:
+            return True  # Shared by all runners of the process
+        try:
+            import litellm
+            from litellm.integrations.custom_logger import CustomLogger
+        except ImportError:
+            return False
+
+        limiter = self
+        reserved: Dict[str, Tuple[str, int]] = {}
+
+        def settle(kwargs: Dict[str, Any], response: Any) -> None:
+            entry = reserved.pop(str(kwargs.get("litellm_call_id")), None)
+            if entry is None:
+                return
+            usage = getattr(response, "usage", None)
+            used = getattr(usage, "total_tokens", None) if usage else None
+            if used is not None:
+                limiter.settle(entry[0], entry[1], int(used))
+
+        class _Callback(CustomLogger):
+            def log_pre_api_call(self, model, messages, kwargs):
+                model = str(kwargs.get("model") or model)
+                tokens = estimate_tokens(messages)
+                limiter.acquire(model, tokens)
+                reserved[str(kwargs.get("litellm_call_id"))] = (model, tokens)
+
+            def log_success_event(self, kwargs, response, start, end):
+                settle(kwargs, response)
+
+            def log_failure_event(self, kwargs, response, start, end):
+                reserved.pop(str(kwargs.get("litellm_call_id")), None)
+
+            async def async_log_success_event(
+                self, kwargs, response, start, end
+            ):
+                settle(kwargs, response)
+
+            async def async_log_failure_event(
+                self, kwargs, response, start, end
+            ):
+                reserved.pop(str(kwargs.get("litellm_call_id")), None)
+
+        litellm.callbacks = list(litellm.callbacks or []) + [_Callback()]
+        self._installed = True
+        return True
+
+
+class _BucketState:
+    """Context manager holding the lock of a bucket file and its state."""
+
+    def __init__(self, path: Path, limit: Limit):
+        self.path = path
+        self.limit = limit
+
+    def __enter__(self) -> Dict[str, float]:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.file = os.fdopen(fd, "r+")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        now = time.time()
+        try:
+            self.state = json.loads(self.file.read() or "{}")
+        except ValueError:
+            self.state = {}
+        rpm = self.limit.rpm or 0.0
+        tpm = self.limit.tpm or 0.0
+        elapsed = max(0.0, now - self.state.get("updated", now))
+        # Refill; a bucket holds at most one minute of quota
+        self.state["requests"] = min(
+            rpm, self.state.get("requests", rpm) + elapsed * rpm / 60
+        )
+        self.state["tokens"] = min(
+            tpm, self.state.get("tokens", tpm) + elapsed * tpm / 60
+        )
+        self.state["updated"] = now
+        return self.state
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.file.seek(0)
+            self.file.write(json.dumps(self.state))
+            self.file.truncate()
+            self.file.flush()
+        finally:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """
+    Rate limiter of this process, configured from the environment (set by
+    run.py --rate-limit), or None if no limits are configured.
+    """
+    global _limiter
+    spec = os.getenv(RATE_LIMITS_ENV)
+    if not spec:
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(parse_limits(spec))
+        return _limiter
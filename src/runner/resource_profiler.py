@@ -0,0 +1,122 @@
+"""
+Sampling resource profiler used by GenericRunner to attach peak memory and CPU
+usage to every query metric.
+
+A background thread polls the current process and all of its children (LLM
+client pools, DuckDB threads, subprocesses spawned by a system) at a fixed
+interval. Polling only reads /proc via psutil, so the overhead stays well below
+the timing noise of LLM-bound queries.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import psutil
+
+
+@dataclass
+class ResourceUsage:
+    """Resource usage of the process tree while a single query ran."""
+
+    peak_memory_mb: float = 0.0
+    cpu_user_time: float = 0.0
+    cpu_system_time: float = 0.0
+    num_threads: int = 0
+    num_fds: int = 0
+
+
+class ResourceProfiler:
+    """
+    Records peak RSS (including child processes), CPU user/system time,
+    maximum thread count and maximum number of open file descriptors between
+    start() and stop().
+
+    Usage:
+        with ResourceProfiler() as profiler:
+            run_query()
+        usage = profiler.usage
+    """
+
+    def __init__(self, interval: float = 0.1):
+        """
+        Args:
+            interval: Seconds between two samples
+        """
+        self.interval = interval
+        self.usage: Optional[ResourceUsage] = None
+        self._process = psutil.Process()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_cpu = None
+        self._peak_rss = 0
+        self._peak_threads = 0
+        self._peak_fds = 0
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._peak_rss = self._peak_threads = self._peak_fds = 0
+        self._start_cpu = self._process.cpu_times()
+        self._sample()
+        self._thread = threading.Thread(
+            target=self._run, name="resource-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> ResourceUsage:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sample()
+
+        # children_* only cover children that have terminated and been waited
+        # for, which is exactly the CPU time not visible in user/system.
+        end_cpu = self._process.cpu_times()
+        user = (end_cpu.user - self._start_cpu.user) + (
+            end_cpu.children_user - self._start_cpu.children_user
+        )
+        system = (end_cpu.system - self._start_cpu.system) + (
+            end_cpu.children_system - self._start_cpu.children_system
+        )
+
+        self.usage = ResourceUsage(
+            peak_memory_mb=round(self._peak_rss / (1024 * 1024), 2),
+            cpu_user_time=round(user, 3),
+            cpu_system_time=round(system, 3),
+            num_threads=self._peak_threads,
+            num_fds=self._peak_fds,
+        )
+        return self.usage
+
+    def __enter__(self) -> "ResourceProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        rss, threads, fds = 0, 0, 0
+        for proc in [self._process] + self._children():
+            try:
+                with proc.oneshot():
+                    rss += proc.memory_info().rss
+                    threads += proc.num_threads()
+                    fds += proc.num_fds()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                # Children may exit between listing and sampling them
+                continue
+        self._peak_rss = max(self._peak_rss, rss)
+        self._peak_threads = max(self._peak_threads, threads)
+        self._peak_fds = max(self._peak_fds, fds)
+
+    def _children(self):
+        try:
+            return self._process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
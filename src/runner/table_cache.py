@@ -0,0 +1,159 @@
+"""
+In-process table cache behind GenericRunner.load_data.
+
+Runner query implementations load their tables at the start of every query
+(e.g. each _execute_qN of the movie LOTUS runner reads Reviews.csv again).
+The cache parses each file once per runner and hands out views of the cached
+frame, so repeated loads skip parsing entirely.
+
+The cached frame itself is never handed out. With pandas copy-on-write
+enabled, a view is a lazy copy that shares the cached buffers until it is
+written to. Otherwise a view copies the column buffers (for string columns
+only the object pointers), which is still far cheaper than parsing the file
+again and keeps in-place writes of one query from leaking into the next.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from table_format import read_table, resolve_table
+
+# read_csv options the pyarrow engine understands; loads using anything else
+# fall back to the default C parser
+_PYARROW_CSV_OPTIONS = {
+    "sep",
+    "delimiter",
+    "quotechar",
+    "header",
+    "names",
+    "usecols",
+    "dtype",
+    "skiprows",
+    "na_values",
+    "encoding",
+}
+
+
+@dataclass
+class TableCacheStats:
+    """Hit/miss counters of a TableCache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    cached_bytes: int = 0
+
+
+class TableCache:
+    """
+    LRU cache of parsed tables keyed by file, file version and load options.
+
+    Usage:
+        cache = TableCache(max_memory_mb=2048)
+        reviews = cache.load(data_path / "Reviews.csv")
+    """
+
+    def __init__(
+        self,
+        max_memory_mb: Optional[float] = None,
+        engine: Optional[str] = None,
+    ):
+        """
+        Args:
+            max_memory_mb: Evict least recently used tables once the cached
+                tables take more memory than this (None = no limit). The most
+                recently loaded table is always kept.
+            engine: "pyarrow" to parse CSV files with the multi-threaded
+                PyArrow reader, None for the pandas default
+        """
+        self.max_bytes = (
+            int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+        )
+        self.engine = engine
+        self.stats = TableCacheStats()
+        self._tables: "OrderedDict[Tuple, Tuple[pd.DataFrame, int]]" = (
+            OrderedDict()
+        )
+
+    def load(
+        self,
+        path: Path,
+        categories: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> pd.DataFrame:
+        """
+        Return a view of the table stored at *path*.
+
+        Args:
+            path: CSV or Parquet file; a CSV table is loaded from its
+                Parquet copy when one is up to date (see table_format)
+            categories: Columns to convert to the pandas category dtype,
+                which shrinks repeated string values (labels, species, ...)
+            **kwargs: read_csv options, e.g. dtype (see read_table)
+
+        Returns:
+            View of the cached table that can be modified freely
+        """
+        path = Path(path)
+        source = resolve_table(path)
+        stat = source.stat()
+        categories = tuple(categories or ())
+        key = (
+            str(source.resolve()),
+            stat.st_mtime_ns,
+            stat.st_size,
+            categories,
+            repr(sorted(kwargs.items())),
+        )
+
+        entry = self._tables.get(key)
+        if entry is not None:
+            self._tables.move_to_end(key)
+            self.stats.hits += 1
+            return self._view(entry[0])
+
+        self.stats.misses += 1
+        table = self._read(path, source, kwargs)
+        for column in categories:
+            if column in table.columns:
+                table[column] = table[column].astype("category")
+
+        size = int(table.memory_usage(deep=True).sum())
+        self._tables[key] = (table, size)
+        self.stats.cached_bytes += size
+        self._evict()
+        return self._view(table)
+
+    def clear(self) -> None:
+        self._tables.clear()
+        self.stats.cached_bytes = 0
+
+    def _read(
+        self, path: Path, source: Path, kwargs: Dict[str, Any]
+    ) -> pd.DataFrame:
+        if (
+            source.suffix == ".csv"
+            and self.engine == "pyarrow"
+            and set(kwargs) <= _PYARROW_CSV_OPTIONS
+        ):
+            return pd.read_csv(source, engine="pyarrow", **kwargs)
+        return read_table(path, **kwargs)
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        while (
+            self.stats.cached_bytes > self.max_bytes and len(self._tables) > 1
+        ):
+            _, (_, size) = self._tables.popitem(last=False)
+            self.stats.cached_bytes -= size
+            self.stats.evictions += 1
+
+    @staticmethod
+    def _view(table: pd.DataFrame) -> pd.DataFrame:
+        # Under copy-on-write a shallow copy is copied lazily on first write
+        return table.copy(deep=pd.options.mode.copy_on_write is not True)
@@ -2,6 +2,8 @@ import os
 from typing import List
 import glob
 
+from table_format import write_table
+
 from scenario.animals.preparation.generate_data import download_from_google_drive
 
 
@@ -31,6 +33,17 @@ class AnimalsScenario:
             _ensure_cooccurrence_patterns,
             _ensure_q9_pattern,
             _ensure_q6_pattern,
+            _generate_nested_tables,
+            _scale_up_tables,
+        )
+        from nested_sampling import (
+            check_nested_folder,
+            nested_sampling_enabled,
+            write_manifest,
+        )
+        from synthetic_scaleup import (
+            SYNTHETIC_MEDIA_DIR,
+            synthetic_scaleup_enabled,
         )
         from pathlib import Path
         import random
@@ -45,6 +58,8 @@ class AnimalsScenario:
 
         if audio_file.exists() and image_file.exists():
             print(f"Data already exists at {data_folder}, skipping generation.")
+            if nested_sampling_enabled():
+                check_nested_folder(data_folder)
             self.data_dir = str(data_folder)
         else:
             # Download source data
@@ -57,10 +72,22 @@ class AnimalsScenario:
             image_size = min(self.scale_factor, max_image_files)
 
             print(f"Generating tables: Audio={audio_size}, Image={image_size}")
+            if synthetic_scaleup_enabled() and (
+                audio_size < self.scale_factor // 3 or image_size < self.scale_factor
+            ):
+                print(
+                    f"Synthetic scale-up to Audio={self.scale_factor // 3}, "
+                    f"Image={self.scale_factor}"
+                )
 
             # Generate tables
-            audio_table = _generate_audio_table(audio_path, audio_size)
-            image_table = _generate_image_table(image_path, image_size)
+            if nested_sampling_enabled():
+                audio_table, image_table = _generate_nested_tables(
+                    audio_path, image_path, audio_size, image_size
+                )
+            else:
+                audio_table = _generate_audio_table(audio_path, audio_size)
+                image_table = _generate_image_table(image_path, image_size)
 
             # Ensure co-occurrence patterns
             audio_table, image_table = _ensure_cooccurrence_patterns(
@@ -68,11 +95,21 @@ class AnimalsScenario:
             )
             audio_table, image_table = _ensure_q9_pattern(audio_table, image_table)
             audio_table, image_table = _ensure_q6_pattern(audio_table, image_table)
+            if synthetic_scaleup_enabled():
+                audio_table, image_table = _scale_up_tables(
+                    audio_table,
+                    image_table,
+                    self.scale_factor // 3,
+                    self.scale_factor,
+                    str(Path(ANIMALS_FILES_DIR) / "data" / SYNTHETIC_MEDIA_DIR),
+                )
 
             # Save to data directory
             os.makedirs(data_folder, exist_ok=True)
-            audio_table.to_csv(audio_file, index=False)
-            image_table.to_csv(image_file, index=False)
+            write_table(audio_table, audio_file)
+            write_table(image_table, image_file)
+            if nested_sampling_enabled():
+                write_manifest(data_folder, self.scale_factor)
 
             print(f"Data saved to {data_folder}")
             self.data_dir = str(data_folder)
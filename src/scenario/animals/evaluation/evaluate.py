@@ -17,6 +17,7 @@ import duckdb
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from evaluator.generic_evaluator import GenericEvaluator, QueryMetricRetrieval, QueryMetricAggregation
+from table_format import read_table
 
 class AnimalsEvaluator(GenericEvaluator):
     """Evaluator for the animals benchmark using the reusable framework."""
@@ -27,8 +28,8 @@ class AnimalsEvaluator(GenericEvaluator):
     def _load_domain_data(self) -> None:
         """Load the animals data CSV files."""
         data_path = self._root / "data" / f"sf_{self.scale_factor}"
-        self.image_data_df = pd.read_csv(data_path / "image_data.csv")
-        self.audio_data_df = pd.read_csv(data_path / "audio_data.csv")
+        self.image_data_df = read_table(data_path / "image_data.csv")
+        self.audio_data_df = read_table(data_path / "audio_data.csv")
 
     def _get_ground_truth(self, query_id: int) -> pd.DataFrame:  
         """Generate ground truth using DuckDB and gold SQL files."""
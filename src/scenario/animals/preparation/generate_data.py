@@ -14,12 +14,21 @@ Or to use Google Drive download:
 python3 generate_data.py --download-from-drive --scale-factor 500
 '''
 import argparse
+import numpy as np
 import pandas as pd
 import random
 import os
+import sys
 
 from pathlib import Path
 
+# src/ holds the shared table_format module (needed when run as a script)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from download_manager import fetch_archive  # noqa: E402
+from nested_sampling import nested_order, row_choice, write_manifest  # noqa: E402
+from synthetic_scaleup import SYNTHETIC_MEDIA_DIR, augment_media, scaleup_plan  # noqa: E402
+from table_format import write_table  # noqa: E402
+
 
 def download_from_google_drive():
     """Download wildlife.zip from Google Drive and extract it."""
@@ -39,80 +48,11 @@ def download_from_google_drive():
         print("Skipping download and extraction.")
         return str(audio_path), str(image_path)
 
-    # Download wildlife.zip directly using file ID
-    zip_file = source_data_dir / "wildlife.zip"
-
-    if not zip_file.exists():
-        print("Downloading animals data from Google Drive...")
-        print("Downloading wildlife.zip...")
-        # File ID: 1HG6tvXIA0BtpqbZqCR46oNSeY2yZ4Lko
-        file_id = "1HG6tvXIA0BtpqbZqCR46oNSeY2yZ4Lko"
-
-        # Try multiple download methods
-        success = False
-
-        # Method 1: Try gdown with fuzzy flag (handles large files better)
-        print("Attempting download with gdown (handles large files)...")
-        result = os.system(f"gdown --fuzzy 'https://drive.google.com/file/d/{file_id}/view?usp=sharing' -O {zip_file}")
-        if result == 0 and zip_file.exists() and zip_file.stat().st_size > 1000000:  # At least 1MB
-            success = True
-            print(f"Download successful with gdown (size: {zip_file.stat().st_size / 1024 / 1024:.1f}MB)")
-        else:
-            if zip_file.exists():
-                os.remove(zip_file)
-
-        # Method 2: Try wget with cookie handling for large files
-        if not success:
-            print("Attempting download with wget (handling Google Drive large file)...")
-            cookie_file = source_data_dir / "cookie.txt"
-            # First get the confirmation token
-            os.system(f"wget --save-cookies {cookie_file} --keep-session-cookies --no-check-certificate 'https://drive.google.com/uc?export=download&id={file_id}' -O- 2>&1 | grep -o 'confirm=[^&]*' | sed 's/confirm=//' > {source_data_dir}/confirm.txt")
-
-            # Read confirm token if exists
-            confirm_file = source_data_dir / "confirm.txt"
-            if confirm_file.exists():
-                with open(confirm_file, 'r') as f:
-                    confirm = f.read().strip()
-                if confirm:
-                    result = os.system(f"wget --load-cookies {cookie_file} --no-check-certificate 'https://drive.google.com/uc?export=download&confirm={confirm}&id={file_id}' -O {zip_file}")
-                    # Clean up
-                    os.remove(cookie_file)
-                    os.remove(confirm_file)
-
-                    if result == 0 and zip_file.exists() and zip_file.stat().st_size > 1000000:
-                        success = True
-                        print(f"Download successful with wget (size: {zip_file.stat().st_size / 1024 / 1024:.1f}MB)")
-                    else:
-                        if zip_file.exists():
-                            os.remove(zip_file)
-
-        # Method 3: Try curl with redirect handling
-        if not success:
-            print("Attempting download with curl...")
-            result = os.system(f"curl -L -o {zip_file} 'https://drive.google.com/uc?export=download&id={file_id}'")
-            if result == 0 and zip_file.exists() and zip_file.stat().st_size > 1000000:
-                success = True
-                print(f"Download successful with curl (size: {zip_file.stat().st_size / 1024 / 1024:.1f}MB)")
-            else:
-                if zip_file.exists():
-                    os.remove(zip_file)
-
-        if not success:
-            raise RuntimeError(
-                f"Failed to download wildlife.zip from Google Drive using all methods.\n"
-                f"The file might be too large for automated download.\n"
-                f"Please manually download from: https://drive.google.com/file/d/{file_id}/view\n"
-                f"And save it to: {zip_file}"
-            )
-    else:
-        print(f"Archive file already exists at: {zip_file}")
-        print("Skipping download.")
-
-    print(f"Unzipping {zip_file}...")
-    os.system(f"unzip -o {zip_file} -d {source_data_dir}")
-
-    # Clean up zip file after extraction
-    os.system(f"rm {zip_file}")
+    # Download wildlife.zip (or read it from the data mirror) and extract it;
+    # an archive downloaded by hand to source_data is used instead
+    fetch_archive(
+        "animals/wildlife.zip", source_data_dir,
+        manual_path=source_data_dir / "wildlife.zip")
 
     if not audio_path.exists():
         raise RuntimeError(f"Download completed but expected audio data not found at {audio_path}")
@@ -127,85 +67,131 @@ def download_from_google_drive():
 
 
 
-def _add_strategic_locations(df: pd.DataFrame, data_type: str) -> pd.DataFrame:
+CITIES = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret']
+STATIONS = ['Station_A', 'Station_B', 'Station_C', 'Station_D']
+
+# Strategic distribution of the cities based on species and data type.
+# random.choices pairs the weights with CITIES by position, not by the keys.
+CITY_WEIGHTS = {
+    # For images: ensure Nairobi has most zebras, Mombasa most elephants
+    'image': {
+        'zebra': {'Nairobi': 0.4, 'Mombasa': 0.2, 'Kisumu': 0.15, 'Nakuru': 0.15, 'Eldoret': 0.1},
+        'elephant': {'Mombasa': 0.4, 'Nairobi': 0.2, 'Kisumu': 0.15, 'Nakuru': 0.15, 'Eldoret': 0.1},
+        'impala': {'Kisumu': 0.3, 'Nairobi': 0.25, 'Mombasa': 0.2, 'Nakuru': 0.15, 'Eldoret': 0.1},
+        'monkey': {'Nakuru': 0.4, 'Nairobi': 0.3, 'Mombasa': 0.15, 'Kisumu': 0.1, 'Eldoret': 0.05},
+        # Add distributions for new species
+        'warthog': {'Eldoret': 0.3, 'Nakuru': 0.25, 'Kisumu': 0.2, 'Nairobi': 0.15, 'Mombasa': 0.1},
+        'waterbuck': {'Kisumu': 0.35, 'Mombasa': 0.25, 'Nairobi': 0.2, 'Nakuru': 0.15, 'Eldoret': 0.05},
+        'bushbuck': {'Nakuru': 0.3, 'Eldoret': 0.25, 'Nairobi': 0.2, 'Kisumu': 0.15, 'Mombasa': 0.1},
+        'default': {'Nairobi': 0.28, 'Mombasa': 0.22, 'Kisumu': 0.2, 'Nakuru': 0.18, 'Eldoret': 0.12}
+    },
+    # For audio: ensure Kisumu has most elephants, Nakuru most monkeys
+    'audio': {
+        'elephant': {'Kisumu': 0.4, 'Mombasa': 0.2, 'Nairobi': 0.15, 'Nakuru': 0.15, 'Eldoret': 0.1},
+        'monkey': {'Nakuru': 0.45, 'Nairobi': 0.25, 'Mombasa': 0.2, 'Kisumu': 0.05, 'Eldoret': 0.05},
+        'default': {'Nairobi': 0.28, 'Mombasa': 0.22, 'Kisumu': 0.2, 'Nakuru': 0.18, 'Eldoret': 0.12}
+    }
+}
+
+# Station distribution varies by city to ensure unique (city, station) combinations
+STATION_WEIGHTS = {
+    'Nairobi': [0.4, 0.3, 0.2, 0.1],    # Favor Station_A
+    'Mombasa': [0.3, 0.4, 0.2, 0.1],    # Favor Station_B
+    'Kisumu': [0.2, 0.3, 0.4, 0.1],     # Favor Station_C
+    'Nakuru': [0.1, 0.2, 0.3, 0.4],     # Favor Station_D
+    'Eldoret': [0.25, 0.25, 0.25, 0.25] # Even distribution
+}
+
+# Species checked (in this order) in the Species column of the image table
+IMAGE_SPECIES = ['zebra', 'elephant', 'impala', 'monkey', 'warthog', 'waterbuck', 'bushbuck']
+
+
+def _species_key(row, data_type: str) -> str:
+    """ Species that selects the city distribution of a row. """
+    if data_type == 'audio':
+        return row['Animal'].lower() if 'Animal' in row else 'default'
+    species_list = str(row['Species']).lower() if 'Species' in row else ''
+    # Handle multiple species in single entry (e.g., "ZEBRA, IMPALA")
+    for species in IMAGE_SPECIES:
+        if species in species_list:
+            return species
+    return 'default'
+
+
+def _species_keys(df: pd.DataFrame, data_type: str) -> pd.Series:
+    """ _species_key of all rows of df at once. """
+    if data_type == 'audio':
+        if 'Animal' not in df:
+            return pd.Series('default', index=df.index)
+        return df['Animal'].str.lower()
+    if 'Species' not in df:
+        return pd.Series('default', index=df.index)
+    # Few distinct entries: key each of them once
+    codes, entries = pd.factorize(df['Species'].astype(str))
+    keys = np.array([_species_key({'Species': entry}, 'image') for entry in entries], dtype=object)
+    return pd.Series(keys[codes], index=df.index)
+
+
+def _city_weights(keys: pd.Series, data_type: str) -> np.ndarray:
+    """ CITY_WEIGHTS row of every species key, in the order of CITIES. """
+    distributions = CITY_WEIGHTS[data_type]
+    table = {
+        key: list(weights.values()) for key, weights in distributions.items()}
+    default = table['default']
+    return np.array([table.get(key, default) for key in keys], dtype=float)
+
+
+def _add_strategic_locations(
+        df: pd.DataFrame, data_type: str, legacy: bool = False) -> pd.DataFrame:
     """ Adds strategic locations to ensure deterministic query results.
     
+    Draws the city of every species group and then the station of every city
+    group with one NumPy Generator.choice call each, seeded from the state of
+    the random module.
+    
     Args:
         df: DataFrame to which locations are added.
         data_type: Either 'audio' or 'image' to determine distribution strategy.
+        legacy: Draw with random.choices row by row, as older versions did.
+            Reproduces the tables generated by them exactly, but is slow.
     
     Returns:
         DataFrame with additional columns for city and station ID.
     """
-    cities = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret']
-    stations = ['Station_A', 'Station_B', 'Station_C', 'Station_D']
-    
-    # Define strategic distribution based on species and data type
-    distribution_strategy = {
-        # For images: ensure Nairobi has most zebras, Mombasa most elephants
-        'image': {
-            'zebra': {'Nairobi': 0.4, 'Mombasa': 0.2, 'Kisumu': 0.15, 'Nakuru': 0.15, 'Eldoret': 0.1},
-            'elephant': {'Mombasa': 0.4, 'Nairobi': 0.2, 'Kisumu': 0.15, 'Nakuru': 0.15, 'Eldoret': 0.1},
-            'impala': {'Kisumu': 0.3, 'Nairobi': 0.25, 'Mombasa': 0.2, 'Nakuru': 0.15, 'Eldoret': 0.1},
-            'monkey': {'Nakuru': 0.4, 'Nairobi': 0.3, 'Mombasa': 0.15, 'Kisumu': 0.1, 'Eldoret': 0.05},
-            # Add distributions for new species
-            'warthog': {'Eldoret': 0.3, 'Nakuru': 0.25, 'Kisumu': 0.2, 'Nairobi': 0.15, 'Mombasa': 0.1},
-            'waterbuck': {'Kisumu': 0.35, 'Mombasa': 0.25, 'Nairobi': 0.2, 'Nakuru': 0.15, 'Eldoret': 0.05},
-            'bushbuck': {'Nakuru': 0.3, 'Eldoret': 0.25, 'Nairobi': 0.2, 'Kisumu': 0.15, 'Mombasa': 0.1},
-            'default': {'Nairobi': 0.28, 'Mombasa': 0.22, 'Kisumu': 0.2, 'Nakuru': 0.18, 'Eldoret': 0.12}
-        },
-        # For audio: ensure Kisumu has most elephants, Nakuru most monkeys
-        'audio': {
-            'elephant': {'Kisumu': 0.4, 'Mombasa': 0.2, 'Nairobi': 0.15, 'Nakuru': 0.15, 'Eldoret': 0.1},
-            'monkey': {'Nakuru': 0.45, 'Nairobi': 0.25, 'Mombasa': 0.2, 'Kisumu': 0.05, 'Eldoret': 0.05},
-            'default': {'Nairobi': 0.28, 'Mombasa': 0.22, 'Kisumu': 0.2, 'Nakuru': 0.18, 'Eldoret': 0.12}
-        }
-    }
-    
+    if legacy:
+        return _add_strategic_locations_legacy(df, data_type)
+    
+    rng = np.random.default_rng(random.getrandbits(64))
+    keys = _species_keys(df, data_type).to_numpy()
+    cities = np.empty(len(df), dtype=object)
+    for key in sorted(set(keys)):
+        rows = keys == key
+        weights = _city_weights([key], data_type)[0]
+        cities[rows] = rng.choice(CITIES, size=rows.sum(), p=weights / weights.sum())
+    stations = np.empty(len(df), dtype=object)
+    for city in CITIES:
+        rows = cities == city
+        weights = np.asarray(STATION_WEIGHTS[city])
+        stations[rows] = rng.choice(STATIONS, size=rows.sum(), p=weights / weights.sum())
+    
+    df['City'] = cities
+    df['StationID'] = stations
+    return df
+
+
+def _add_strategic_locations_legacy(df: pd.DataFrame, data_type: str) -> pd.DataFrame:
+    """ Row-by-row variant of _add_strategic_locations (legacy=True). """
     city_assignments = []
     station_assignments = []
     
     for idx, row in df.iterrows():
-        # Determine species from the row
-        if data_type == 'audio':
-            species_key = row['Animal'].lower() if 'Animal' in row else 'default'
-        else:  # image
-            species_list = str(row['Species']).lower() if 'Species' in row else ''
-            # Handle multiple species in single entry (e.g., "ZEBRA, IMPALA")
-            if 'zebra' in species_list:
-                species_key = 'zebra'
-            elif 'elephant' in species_list:
-                species_key = 'elephant'
-            elif 'impala' in species_list:
-                species_key = 'impala'
-            elif 'monkey' in species_list:
-                species_key = 'monkey'
-            # Add handling for other species found in the dataset
-            elif 'warthog' in species_list:
-                species_key = 'warthog'
-            elif 'waterbuck' in species_list:
-                species_key = 'waterbuck'
-            elif 'bushbuck' in species_list:
-                species_key = 'bushbuck'
-            else:
-                species_key = 'default'
-        
         # Get distribution weights for this species
-        weights = distribution_strategy[data_type].get(species_key, distribution_strategy[data_type]['default'])
+        species_key = _species_key(row, data_type)
+        weights = CITY_WEIGHTS[data_type].get(species_key, CITY_WEIGHTS[data_type]['default'])
         
         # Choose city based on weights
-        city = random.choices(cities, weights=list(weights.values()))[0]
-        
-        # Station distribution varies by city to ensure unique (city, station) combinations
-        station_weights = {
-            'Nairobi': [0.4, 0.3, 0.2, 0.1],    # Favor Station_A
-            'Mombasa': [0.3, 0.4, 0.2, 0.1],    # Favor Station_B
-            'Kisumu': [0.2, 0.3, 0.4, 0.1],     # Favor Station_C
-            'Nakuru': [0.1, 0.2, 0.3, 0.4],     # Favor Station_D
-            'Eldoret': [0.25, 0.25, 0.25, 0.25] # Even distribution
-        }
-        
-        station = random.choices(stations, weights=station_weights[city])[0]
+        city = random.choices(CITIES, weights=list(weights.values()))[0]
+        station = random.choices(STATIONS, weights=STATION_WEIGHTS[city])[0]
         
         city_assignments.append(city)
         station_assignments.append(station)
@@ -215,6 +201,22 @@ def _add_strategic_locations(df: pd.DataFrame, data_type: str) -> pd.DataFrame:
     return df
 
 
+def _species_mask(df: pd.DataFrame, column: str, species: str) -> pd.Series:
+    """ Rows of df whose column mentions species (case-insensitive). """
+    # Few distinct entries: match each of them once
+    codes, entries = pd.factorize(df[column])
+    matches = pd.Series(entries).str.contains(species, case=False, na=False).to_numpy(dtype=bool)
+    return pd.Series(matches[codes] & (codes >= 0), index=df.index)
+
+
+def _ensure_species_in_city(
+        df: pd.DataFrame, column: str, species: str, city: str, station: str) -> None:
+    """ Moves the first row of species to (city, station) unless city has one. """
+    rows = df.index[_species_mask(df, column, species)]
+    if len(rows) > 0 and not (df.loc[rows, 'City'] == city).any():
+        df.loc[rows[0], ['City', 'StationID']] = [city, station]
+
+
 def _ensure_q6_pattern(audio_df: pd.DataFrame, image_df: pd.DataFrame) -> tuple:
     """ Ensures Q6 pattern: cities with monkey images but no monkey audio.
     
@@ -227,42 +229,29 @@ def _ensure_q6_pattern(audio_df: pd.DataFrame, image_df: pd.DataFrame) -> tuple:
     """
     # Q6: Ensure Kisumu, Eldoret, and Mombasa have monkey images but no monkey audio
     target_cities = ['Kisumu', 'Eldoret', 'Mombasa']
+    is_monkey_image = _species_mask(image_df, 'Species', 'monkey')
+    is_monkey_audio = _species_mask(audio_df, 'Animal', 'monkey')
     
     # First, ensure these cities have monkey images
-    monkey_images = image_df[image_df['Species'].str.contains('monkey', case=False, na=False)]
+    monkey_images = list(image_df.index[is_monkey_image])
     
     for city in target_cities:
-        city_monkey_images = image_df[
-            (image_df['Species'].str.contains('monkey', case=False, na=False)) & 
-            (image_df['City'] == city)
-        ]
-        
-        if len(city_monkey_images) == 0:
+        if not (is_monkey_image & (image_df['City'] == city)).any():
             # Find a monkey image and assign it to this city
             if len(monkey_images) > 0:
-                # Get the first available monkey image
-                idx = monkey_images.index[0]
-                image_df.loc[idx, 'City'] = city
+                # Take the first available monkey image, not again for the next city
+                idx = monkey_images.pop(0)
                 station_map = {'Kisumu': 'Station_C', 'Eldoret': 'Station_D', 'Mombasa': 'Station_B'}
-                image_df.loc[idx, 'StationID'] = station_map[city]
-                # Remove this image from available monkey images for next city
-                monkey_images = monkey_images.drop(idx)
+                image_df.loc[idx, ['City', 'StationID']] = [city, station_map[city]]
     
     # Second, ensure these cities have NO monkey audio recordings
     for city in target_cities:
-        # Find all monkey audio in these cities and move them to other cities
-        city_monkey_audio = audio_df[
-            (audio_df['Animal'].str.contains('monkey', case=False, na=False)) & 
-            (audio_df['City'] == city)
-        ]
-        
-        if len(city_monkey_audio) > 0:
-            # Move these audio recordings to Nakuru or Nairobi (which should have monkey audio)
-            target_audio_cities = ['Nakuru', 'Nairobi']
-            for i, idx in enumerate(city_monkey_audio.index):
-                target_city = target_audio_cities[i % len(target_audio_cities)]
-                audio_df.loc[idx, 'City'] = target_city
-                audio_df.loc[idx, 'StationID'] = 'Station_A' if target_city == 'Nairobi' else 'Station_D'
+        # Move all monkey audio in these cities, alternately to Nakuru and
+        # Nairobi (which should have monkey audio)
+        moved = audio_df.index[is_monkey_audio & (audio_df['City'] == city)]
+        to_nakuru = np.arange(len(moved)) % 2 == 0
+        audio_df.loc[moved, 'City'] = np.where(to_nakuru, 'Nakuru', 'Nairobi')
+        audio_df.loc[moved, 'StationID'] = np.where(to_nakuru, 'Station_D', 'Station_A')
     
     return audio_df, image_df
 
@@ -279,51 +268,30 @@ def _ensure_q9_pattern(audio_df: pd.DataFrame, image_df: pd.DataFrame) -> tuple:
     """
     # Q9: Ensure Nakuru and Nairobi have both monkey images and audio
     target_cities = ['Nakuru', 'Nairobi']
+    is_monkey_image = _species_mask(image_df, 'Species', 'monkey')
+    is_monkey_audio = _species_mask(audio_df, 'Animal', 'monkey')
     
     # Ensure each target city has both monkey images and audio
     for city in target_cities:
-        # Ensure monkey images in this city
-        city_monkey_images = image_df[
-            (image_df['Species'].str.contains('monkey', case=False, na=False)) & 
-            (image_df['City'] == city)
-        ]
+        station = 'Station_A' if city == 'Nairobi' else 'Station_D'
         
-        if len(city_monkey_images) == 0:
+        # Ensure monkey images in this city
+        if not (is_monkey_image & (image_df['City'] == city)).any():
             # Find any monkey image not already assigned to Q6 cities and assign it to this city
             q6_cities = ['Kisumu', 'Eldoret', 'Mombasa']
-            available_monkey_images = image_df[
-                (image_df['Species'].str.contains('monkey', case=False, na=False)) &
-                (~image_df['City'].isin(q6_cities))
-            ]
+            available_monkey_images = image_df.index[is_monkey_image & ~image_df['City'].isin(q6_cities)]
             if len(available_monkey_images) == 0:
                 # If no available images outside Q6 cities, take from any city
-                available_monkey_images = image_df[
-                    image_df['Species'].str.contains('monkey', case=False, na=False)
-                ]
+                available_monkey_images = image_df.index[is_monkey_image]
             
             if len(available_monkey_images) > 0:
-                idx = available_monkey_images.index[0]
-                image_df.loc[idx, 'City'] = city
-                image_df.loc[idx, 'StationID'] = 'Station_A' if city == 'Nairobi' else 'Station_D'
-        
-        # Ensure monkey audio in this city  
-        city_monkey_audio = audio_df[
-            (audio_df['Animal'].str.contains('monkey', case=False, na=False)) & 
-            (audio_df['City'] == city)
-        ]
+                image_df.loc[available_monkey_images[0], ['City', 'StationID']] = [city, station]
         
-        if len(city_monkey_audio) == 0:
-            # Find any monkey audio and assign it to this city
-            available_monkey_audio = audio_df[
-                audio_df['Animal'].str.contains('monkey', case=False, na=False)
-            ]
+        # Ensure monkey audio in this city: move the first one from elsewhere
+        if not (is_monkey_audio & (audio_df['City'] == city)).any():
+            available_monkey_audio = audio_df.index[is_monkey_audio & (audio_df['City'] != city)]
             if len(available_monkey_audio) > 0:
-                # Find one not already in this city
-                for idx in available_monkey_audio.index:
-                    if audio_df.loc[idx, 'City'] != city:
-                        audio_df.loc[idx, 'City'] = city
-                        audio_df.loc[idx, 'StationID'] = 'Station_A' if city == 'Nairobi' else 'Station_D'
-                        break
+                audio_df.loc[available_monkey_audio[0], ['City', 'StationID']] = [city, station]
     
     return audio_df, image_df
 
@@ -345,67 +313,27 @@ def _ensure_cooccurrence_patterns(audio_df: pd.DataFrame, image_df: pd.DataFrame
     
     for city in cooccurrence_cities:
         # Ensure zebra images in this city
-        zebra_rows = image_df[image_df['Species'].str.contains('zebra', case=False, na=False)]
-        if len(zebra_rows[zebra_rows['City'] == city]) == 0:
-            # Find a zebra row and assign it to this city
-            if len(zebra_rows) > 0:
-                idx = zebra_rows.index[0]
-                image_df.loc[idx, 'City'] = city
-                image_df.loc[idx, 'StationID'] = 'Station_A'
-        
+        _ensure_species_in_city(image_df, 'Species', 'zebra', city, 'Station_A')
         # Ensure impala images in this city
-        impala_rows = image_df[image_df['Species'].str.contains('impala', case=False, na=False)]
-        if len(impala_rows[impala_rows['City'] == city]) == 0:
-            # Find an impala row and assign it to this city
-            if len(impala_rows) > 0:
-                idx = impala_rows.index[0]
-                image_df.loc[idx, 'City'] = city
-                image_df.loc[idx, 'StationID'] = 'Station_B'
+        _ensure_species_in_city(image_df, 'Species', 'impala', city, 'Station_B')
     
     # Query 8: Ensure elephant and monkey co-occur in both image and audio in Nairobi
     target_city = 'Nairobi'
     target_station = 'Station_A'
     
     # Ensure elephant presence in both modalities
-    elephant_audio = audio_df[audio_df['Animal'].str.contains('elephant', case=False, na=False)]
-    if len(elephant_audio[elephant_audio['City'] == target_city]) == 0 and len(elephant_audio) > 0:
-        idx = elephant_audio.index[0]
-        audio_df.loc[idx, 'City'] = target_city
-        audio_df.loc[idx, 'StationID'] = target_station
-    
-    elephant_image = image_df[image_df['Species'].str.contains('elephant', case=False, na=False)]
-    if len(elephant_image[elephant_image['City'] == target_city]) == 0 and len(elephant_image) > 0:
-        idx = elephant_image.index[0]
-        image_df.loc[idx, 'City'] = target_city
-        image_df.loc[idx, 'StationID'] = target_station
+    _ensure_species_in_city(audio_df, 'Animal', 'elephant', target_city, target_station)
+    _ensure_species_in_city(image_df, 'Species', 'elephant', target_city, target_station)
     
     # Ensure monkey presence in both modalities
-    monkey_audio = audio_df[audio_df['Animal'].str.contains('monkey', case=False, na=False)]
-    if len(monkey_audio[monkey_audio['City'] == target_city]) == 0 and len(monkey_audio) > 0:
-        idx = monkey_audio.index[0]
-        audio_df.loc[idx, 'City'] = target_city
-        audio_df.loc[idx, 'StationID'] = target_station
-    
-    monkey_image = image_df[image_df['Species'].str.contains('monkey', case=False, na=False)]
-    if len(monkey_image[monkey_image['City'] == target_city]) == 0 and len(monkey_image) > 0:
-        idx = monkey_image.index[0]
-        image_df.loc[idx, 'City'] = target_city
-        image_df.loc[idx, 'StationID'] = target_station
+    _ensure_species_in_city(audio_df, 'Animal', 'monkey', target_city, target_station)
+    _ensure_species_in_city(image_df, 'Species', 'monkey', target_city, target_station)
     
     return audio_df, image_df
 
 
-def _generate_audio_table(
-        audio_path: str, scaling_factor: int) -> pd.DataFrame:
-    """ Generates a table referencing audio data from Kaggle.
-    
-    Args:
-        audio_path: Path to Kaggle data with audio files recording animals.
-        scaling_factor: The number of rows in the generated table.
-    
-    Returns:
-        DataFrame with audio data.
-    """
+def _list_audio_recordings(audio_path: str) -> list:
+    """ Lists (animal, full file path) of all recordings in the Kaggle audio data. """
     # Get all directories in the audio path
     audio_path = Path(audio_path) / 'Animal-Soundprepros'
     directories = list(audio_path.glob('*/'))
@@ -417,6 +345,22 @@ def _generate_audio_table(
             file_path = str(file.resolve())
             animal_recording.append(
                 (directory.name, file_path))
+    return animal_recording
+
+
+def _generate_audio_table(
+        audio_path: str, scaling_factor: int, legacy_locations: bool = False) -> pd.DataFrame:
+    """ Generates a table referencing audio data from Kaggle.
+    
+    Args:
+        audio_path: Path to Kaggle data with audio files recording animals.
+        scaling_factor: The number of rows in the generated table.
+        legacy_locations: Draw locations as older versions did (see _add_strategic_locations).
+    
+    Returns:
+        DataFrame with audio data.
+    """
+    animal_recording = _list_audio_recordings(audio_path)
     # Shuffle the list of animal recordings
     random.shuffle(animal_recording)
     # Generate DataFrame containing requested number of rows
@@ -424,7 +368,7 @@ def _generate_audio_table(
         animal_recording[:scaling_factor],
         columns=['Animal', 'AudioPath'])
     # Add column with strategically chosen city and station ID
-    return _add_strategic_locations(df, 'audio')
+    return _add_strategic_locations(df, 'audio', legacy_locations)
 
 
 def _find_image_path(image_path: Path, filename: str, device: str) -> str:
@@ -454,16 +398,16 @@ def _find_image_path(image_path: Path, filename: str, device: str) -> str:
         return str(image_path / filename)
 
 
-def _generate_image_table(
+def _load_image_annotations(
         image_path: str, scaling_factor: int) -> pd.DataFrame:
-    """ Generates a table referencing image data from Kaggle.
+    """ Loads the ImagePath and Species of the annotated camera trap images.
     
     Args:
         image_path: Path to Kaggle data with images (camera traps to record animals).
-        scaling_factor: The number of rows in the generated table.
+        scaling_factor: The number of rows needed; all entries are used if fewer image files exist.
     
     Returns:
-        DataFrame with image data.
+        DataFrame with image paths and species.
     """
     # Extract annotations from .xls file
     image_path = Path(image_path) / "DSAIL-Porini Annotated camera trap images of wildlife species from a conservancy in Kenya"
@@ -497,7 +441,22 @@ def _generate_image_table(
         df_filtered = df_existing.copy()
     
     # Drop all columns except "ImagePath" and "Species"
-    df_filtered = df_filtered[['ImagePath', 'Species']]
+    return df_filtered[['ImagePath', 'Species']]
+
+
+def _generate_image_table(
+        image_path: str, scaling_factor: int, legacy_locations: bool = False) -> pd.DataFrame:
+    """ Generates a table referencing image data from Kaggle.
+    
+    Args:
+        image_path: Path to Kaggle data with images (camera traps to record animals).
+        scaling_factor: The number of rows in the generated table.
+        legacy_locations: Draw locations as older versions did (see _add_strategic_locations).
+    
+    Returns:
+        DataFrame with image data.
+    """
+    df_filtered = _load_image_annotations(image_path, scaling_factor)
     
     # Ensure sufficient monkey images for Q6 and Q9 (need at least 10 total)
     monkey_rows = df_filtered[df_filtered['Species'].str.contains('monkey', case=False, na=False)]
@@ -521,10 +480,125 @@ def _generate_image_table(
         df_filtered = df_filtered.sample(n=min(scaling_factor, len(df_filtered)), random_state=42).reset_index(drop=True)
     
     # Add column with strategically chosen city and station ID
-    df_filtered = _add_strategic_locations(df_filtered, 'image')
+    df_filtered = _add_strategic_locations(df_filtered, 'image', legacy_locations)
     
     # Return DataFrame with image data
     return df_filtered
+
+
+# Rows placed first in nested samples, with the location that gives the
+# pattern queries an answer at every scale factor: (species, city, station)
+NESTED_AUDIO_PATTERNS = [
+    ('monkey', 'Nakuru', 'Station_D'),  # Q9
+    ('monkey', 'Nairobi', 'Station_A'),  # Q8, Q9
+    ('elephant', 'Nairobi', 'Station_A'),  # Q8
+]
+NESTED_IMAGE_PATTERNS = [
+    ('monkey', 'Kisumu', 'Station_C'),  # Q6
+    ('monkey', 'Eldoret', 'Station_D'),  # Q6
+    ('monkey', 'Mombasa', 'Station_B'),  # Q6
+    ('monkey', 'Nakuru', 'Station_D'),  # Q9
+    ('monkey', 'Nairobi', 'Station_A'),  # Q8, Q9
+    ('zebra', 'Nairobi', 'Station_A'),  # Q7
+    ('zebra', 'Kisumu', 'Station_A'),  # Q7
+    ('impala', 'Nairobi', 'Station_B'),  # Q7
+    ('impala', 'Kisumu', 'Station_B'),  # Q7
+    ('elephant', 'Nairobi', 'Station_A'),  # Q8
+]
+
+
+def _nested_table(
+        df: pd.DataFrame, path_column: str, species_column: str,
+        data_type: str, patterns: list, size: int, seed: int) -> pd.DataFrame:
+    """ Takes the first rows of df in nested order (see nested_sampling).
+    
+    Every row is keyed by its parent folder and file name and gets a city and
+    station drawn from CITY_WEIGHTS and STATION_WEIGHTS with the row hash, so
+    it has the same location in every scale factor. The first row of each
+    pattern species (in nested order) is pinned to the pattern's location.
+    
+    Args:
+        df: All candidate rows.
+        path_column: Column with the media file path.
+        species_column: Column with the species.
+        data_type: Either 'audio' or 'image'.
+        patterns: (species, city, station) of the pinned rows.
+        size: The number of rows in the generated table.
+        seed: Seed of the nested order and the locations.
+    
+    Returns:
+        DataFrame with the sampled rows and their city and station ID.
+    """
+    df = df.reset_index(drop=True)
+    keys = df[path_column].map(lambda path: f"{Path(path).parent.name}/{Path(path).name}")
+    weights = _city_weights(_species_keys(df, data_type), data_type)
+    df['City'] = row_choice(keys, CITIES, weights, seed, salt='city')
+    df['StationID'] = row_choice(
+        keys, STATIONS, [STATION_WEIGHTS[city] for city in df['City']], seed, salt='station')
+    
+    order = nested_order(keys, seed)
+    species = df[species_column].astype(str).str.lower().to_numpy()
+    pinned = np.zeros(len(df), dtype=bool)
+    for name, city, station in patterns:
+        for position in order:
+            if not pinned[position] and name in species[position]:
+                df.loc[position, ['City', 'StationID']] = [city, station]
+                pinned[position] = True
+                break
+    
+    order = nested_order(keys, seed, pinned=pinned)
+    return df.iloc[order[:size]].reset_index(drop=True)
+
+
+def _generate_nested_tables(
+        audio_path: str, image_path: str, audio_size: int, image_size: int,
+        seed: int = 42) -> tuple:
+    """ Generates the audio and image tables with nested sampling.
+    
+    The tables of a scale factor are prefixes of the tables of every larger
+    one, and each row has the same city and station in all of them. The
+    _ensure_*_pattern helpers find the patterns in the pinned rows and only
+    move monkey recordings out of the Q6 cities, row by row.
+    
+    Returns:
+        Tuple of (audio_df, image_df)
+    """
+    recordings = pd.DataFrame(_list_audio_recordings(audio_path), columns=['Animal', 'AudioPath'])
+    audio_table = _nested_table(
+        recordings, 'AudioPath', 'Animal', 'audio', NESTED_AUDIO_PATTERNS, audio_size, seed)
+    images = _load_image_annotations(image_path, image_size)
+    image_table = _nested_table(
+        images, 'ImagePath', 'Species', 'image', NESTED_IMAGE_PATTERNS, image_size, seed)
+    return audio_table, image_table
+
+
+def _scale_up_table(df: pd.DataFrame, size: int, path_column: str, media_dir: str) -> pd.DataFrame:
+    """ Extends df to size rows with perturbed copies of its rows (see synthetic_scaleup).
+    
+    Copies keep the species, city and station of their source row, so the
+    patterns ensured for the queries still hold at any size.
+    """
+    if len(df) >= size:
+        return df
+    positions, variants = scaleup_plan(len(df), size)
+    df = df.iloc[positions].reset_index(drop=True)
+    df[path_column] = augment_media(df[path_column].tolist(), variants, media_dir)
+    return df
+
+
+def _scale_up_tables(
+        audio_df: pd.DataFrame, image_df: pd.DataFrame, audio_size: int,
+        image_size: int, media_dir: str) -> tuple:
+    """ Scales the final tables (after the _ensure_*_pattern helpers) up to
+    audio_size and image_size rows.
+    
+    Returns:
+        Tuple of (audio_df, image_df)
+    """
+    return (
+        _scale_up_table(audio_df, audio_size, 'AudioPath', media_dir),
+        _scale_up_table(image_df, image_size, 'ImagePath', media_dir),
+    )
     
 if __name__ == '__main__':
 
@@ -553,6 +627,18 @@ if __name__ == '__main__':
         '--seed', type=int, default=42,
         help='Random seed for reproducible results'
         )
+    parser.add_argument(
+        '--nested', action='store_true',
+        help='Nested sampling: the tables are prefixes of every larger nested scale factor'
+        )
+    parser.add_argument(
+        '--legacy-locations', action='store_true',
+        help='Draw cities and stations row by row with random.choices, reproducing tables of older versions exactly'
+        )
+    parser.add_argument(
+        '--synthetic', action='store_true',
+        help='Scale up beyond the source data with perturbed copies of its rows'
+        )
     args = parser.parse_args()
 
     # Determine data paths
@@ -584,13 +670,17 @@ if __name__ == '__main__':
     print(f"Generating tables: Audio={audio_size}, Image={image_size}")
 
     # Validate scaling factor bounds
-    if scaling_factor > max_image_files:
+    if scaling_factor > max_image_files and not args.synthetic:
         print(f"Warning: scaling_factor ({scaling_factor}) exceeds available images ({max_image_files})")
         print(f"Using maximum available images: {max_image_files}")
         image_size = max_image_files
 
-    audio_table = _generate_audio_table(audio_path, audio_size)
-    image_table = _generate_image_table(image_path, image_size)
+    if args.nested:
+        audio_table, image_table = _generate_nested_tables(
+            audio_path, image_path, audio_size, image_size, args.seed)
+    else:
+        audio_table = _generate_audio_table(audio_path, audio_size, args.legacy_locations)
+        image_table = _generate_image_table(image_path, image_size, args.legacy_locations)
     
     
     # Ensure co-occurrence patterns for complex queries
@@ -602,6 +692,12 @@ if __name__ == '__main__':
     # Ensure Q6 pattern: cities with monkey images but no monkey audio (must come after Q9)
     audio_table, image_table = _ensure_q6_pattern(audio_table, image_table)
     
+    base_folder = Path(__file__).resolve().parents[4] / "files" / "animals" / "data"
+    if args.synthetic:
+        audio_table, image_table = _scale_up_tables(
+            audio_table, image_table, scaling_factor // 3, scaling_factor,
+            str(base_folder / SYNTHETIC_MEDIA_DIR))
+    
     # Validation: Print Q6 and Q9 results
     print("\nValidation Results:")
     
@@ -616,11 +712,12 @@ if __name__ == '__main__':
     print(f"Q9 - Cities with both monkey images and audio: {sorted(q9_cities)} (count: {len(q9_cities)})")
     
     # Save to data/sf_{scaling_factor}/ directory
-    base_folder = Path(__file__).resolve().parents[4] / "files" / "animals" / "data"
     folder = base_folder / f"sf_{scaling_factor}"
     os.makedirs(folder, exist_ok=True)
-    audio_table.to_csv(f'{folder}/audio_data.csv', index=False)
-    image_table.to_csv(f'{folder}/image_data.csv', index=False)
+    write_table(audio_table, f'{folder}/audio_data.csv')
+    write_table(image_table, f'{folder}/image_data.csv')
+    if args.nested:
+        write_manifest(folder, scaling_factor, args.seed)
 
     print(f"\n=== Tables saved to {folder} ===")
     print(f"\n=== Generated Tables Summary ===")
@@ -10,7 +10,6 @@ import os
 from typing import Dict, Any
 from pathlib import Path
 import duckdb
-import pandas as pd
 
 # if you use local thalamusdb codes, please uncomment the following codes
 # import sys
@@ -27,6 +26,7 @@ import pandas as pd
 from runner.generic_thalamusdb_runner.generic_thalamusdb_runner import (
     GenericThalamusDBRunner,
 )
+from table_format import read_table
 
 
 class ThalamusDBRunner(GenericThalamusDBRunner):
@@ -57,8 +57,8 @@ class ThalamusDBRunner(GenericThalamusDBRunner):
 
         if not os.path.exists(db_path):
             # Step 1: Read CSVs
-            image_data_df = pd.read_csv(f"{db_folder}/image_data.csv")
-            audio_data_df = pd.read_csv(f"{db_folder}/audio_data.csv")
+            image_data_df = read_table(f"{db_folder}/image_data.csv")
+            audio_data_df = read_table(f"{db_folder}/audio_data.csv")
 
             # Step 2: Connect to a persistent DuckDB file
             conn = duckdb.connect(
@@ -1,6 +1,8 @@
 import os
 from typing import List
 
+from nested_sampling import nested_sampling_enabled
+from synthetic_scaleup import synthetic_scaleup_enabled
 from scenario.cars.preparation.generate_data import prepare_data
 import glob
 
@@ -27,7 +29,11 @@ class CarsScenario:
 
     def setup_scenario(self, systems: List[str]) -> None:
         # Download and prepare data if not already done
-        prepare_data(scaling_factor=self.scale_factor)
+        prepare_data(
+            scaling_factor=self.scale_factor,
+            nested=nested_sampling_enabled(),
+            synthetic=synthetic_scaleup_enabled(),
+        )
 
         # Load data into the specified systems
         for system in systems:
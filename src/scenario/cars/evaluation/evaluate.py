@@ -5,7 +5,7 @@ Created on Jun 28, 2025
 """
 
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 import sys
 import pandas as pd
 import numpy as np
@@ -19,6 +19,7 @@ from evaluator.generic_evaluator import (
     QueryMetricRetrieval,
     QueryMetricAggregation,
 )
+from table_format import read_table
 
 
 class CarsEvaluator(GenericEvaluator):
@@ -30,18 +31,22 @@ class CarsEvaluator(GenericEvaluator):
     def _load_domain_data(self) -> None:
         #  Read full data w/ labels
         full_data_path = self._root / "data" / "full_data"
-        cars_df = pd.read_csv(full_data_path / f"car_data_full.csv")
-        audio_df = pd.read_csv(full_data_path / f"audio_data_full.csv")
-        image_df = pd.read_csv(full_data_path / f"image_data_full.csv")
-        text_df = pd.read_csv(full_data_path / f"text_complaints_data_full.csv")
+        synthetic_labels_path = self._root / "data" / f"sf_{int(self.scale_factor)}" / "synthetic_labels"
+        if synthetic_labels_path.exists():
+            # Synthetic scale-up: copies of cars come with their own labels
+            full_data_path = synthetic_labels_path
+        cars_df = read_table(full_data_path / f"car_data_full.csv")
+        audio_df = read_table(full_data_path / f"audio_data_full.csv")
+        image_df = read_table(full_data_path / f"image_data_full.csv")
+        text_df = read_table(full_data_path / f"text_complaints_data_full.csv")
 
         if self.scale_factor != 157376:
             #  Read sample data w/o labels
             data_path = self._root / "data" / f"sf_{int(self.scale_factor)}"
-            cars_sample_df = pd.read_csv(data_path / f"car_data_{int(self.scale_factor)}.csv")
-            audio_sample_df = pd.read_csv(data_path / f"audio_car_data_{int(self.scale_factor)}.csv")
-            image_sample_df = pd.read_csv(data_path / f"image_car_data_{int(self.scale_factor)}.csv")
-            text_sample_df = pd.read_csv(data_path / f"text_complaints_data_{int(self.scale_factor)}.csv")
+            cars_sample_df = read_table(data_path / f"car_data_{int(self.scale_factor)}.csv")
+            audio_sample_df = read_table(data_path / f"audio_car_data_{int(self.scale_factor)}.csv")
+            image_sample_df = read_table(data_path / f"image_car_data_{int(self.scale_factor)}.csv")
+            text_sample_df = read_table(data_path / f"text_complaints_data_{int(self.scale_factor)}.csv")
 
             cars_df = cars_df[ cars_df["car_id"].isin(cars_sample_df["car_id"])]
             audio_df = audio_df[audio_df["audio_id"].isin(audio_sample_df["audio_id"])]
@@ -54,6 +59,14 @@ class CarsEvaluator(GenericEvaluator):
         self.text_df = text_df
 
 
+    def _ground_truth_sources(self, query_id: int) -> List[Path]:
+        # Labels of synthetic scale-up copies replace full_data
+        labels_path = self._root / "data" / f"sf_{int(self.scale_factor)}" / "synthetic_labels"
+        sources = super()._ground_truth_sources(query_id)
+        if labels_path.is_dir():
+            sources += sorted(f for f in labels_path.iterdir() if f.is_file())
+        return sources
+
     def _get_ground_truth(self, query_id: int) -> pd.DataFrame:
         query_name = f"Q{query_id}"
         # gt_path = self._results_path / "ground_truth" / f"{query_name}.csv"
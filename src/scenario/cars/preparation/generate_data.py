@@ -20,10 +20,28 @@ import pandas as pd
 import random
 import os
 import shutil
+import sys
 from pathlib import Path
 from os import listdir
 from os.path import isdir, join
 
+# src/ holds the shared table_format module (needed when run as a script)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from download_manager import drive_url, fetch_archive  # noqa: E402
+from nested_sampling import (  # noqa: E402
+    check_nested_folder,
+    nested_order,
+    write_manifest,
+)
+from synthetic_scaleup import (  # noqa: E402
+    SYNTHETIC_MEDIA_DIR,
+    augment_media,
+    paraphrase,
+    remap_ids,
+    scaleup_plan,
+)
+from table_format import write_table  # noqa: E402
+
 
 def _download_from_drive(id: str, file_name: str = "raw_data.zip", folder: str = None):
     """Download and extract data from Google Drive.
@@ -72,22 +90,14 @@ def _download_from_drive(id: str, file_name: str = "raw_data.zip", folder: str =
     # Ensure folder exists
     os.makedirs(folder, exist_ok=True)
 
-    # Download to the target folder
-    zip_path = os.path.join(folder, file_name)
-
-    if not os.path.exists(zip_path):
-        print(f"Downloading {file_name} from Google Drive to {folder}...")
-        os.system(f"gdown --id {id} -O {zip_path}")
-    else:
-        print(f"Archive file already exists at: {zip_path}")
-        print("Skipping download.")
-
-    # Use -o flag to overwrite files without prompting
-    print(f"Extracting {zip_path} to {folder}...")
-    # Extract to parent directory first
+    # Stream the archive into the parent directory while it downloads (or
+    # read it from the data mirror); an archive put into folder by hand is
+    # used instead
     parent_folder = os.path.dirname(folder)
-    os.system(f"unzip -o {zip_path} -d {parent_folder}")
-    os.system(f"rm {zip_path}")
+    fetch_archive(
+        f"cars/{file_name}", parent_folder,
+        url=drive_url(id.rstrip("/")),
+        manual_path=os.path.join(folder, file_name))
 
 
 def _download_kaggle_datasets():
@@ -103,43 +113,25 @@ def _download_kaggle_datasets():
     damage_path = raw_data_path / "vehicle-damage-detection"
     if not os.path.exists(damage_path):
         print("Downloading vehicle damage detection dataset...")
-        os.system(
-            f"curl -L -o {raw_data_path}/vehicle-damage-detection.zip https://www.kaggle.com/api/v1/datasets/download/hendrichscullen/vehide-dataset-automatic-vehicle-damage-detection"
-        )
-        os.system(
-            f"unzip -o {raw_data_path}/vehicle-damage-detection.zip -d {damage_path}"
-        )
-        os.system(f"rm {raw_data_path}/vehicle-damage-detection.zip")
+        fetch_archive("cars/vehicle-damage-detection.zip", damage_path)
 
     # Download Stanford car dataset
     stanford_cars_path = raw_data_path / "stanford-cars"
     if not os.path.exists(stanford_cars_path):
         print("Downloading Stanford car dataset...")
-        os.system(
-            f"curl -L -o {raw_data_path}/stanford-cars.zip https://www.kaggle.com/api/v1/datasets/download/jutrera/stanford-car-dataset-by-classes-folder"
-        )
-        os.system(
-            f"unzip -o {raw_data_path}/stanford-cars.zip -d {stanford_cars_path}"
-        )
-        os.system(f"rm {raw_data_path}/stanford-cars.zip")
+        fetch_archive("cars/stanford-cars.zip", stanford_cars_path)
 
     # Download car diagnostics dataset
     diagnostics_path = raw_data_path / "car-diagnostics"
     if not os.path.exists(diagnostics_path):
         print("Downloading car diagnostics dataset...")
-        os.system(
-            f"curl -L -o {raw_data_path}/car-diagnostics.zip https://www.kaggle.com/api/v1/datasets/download/malakragaie/car-diagnostics-dataset"
-        )
-        os.system(
-            f"unzip -o {raw_data_path}/car-diagnostics.zip -d {diagnostics_path}"
-        )
-        os.system(f"rm {raw_data_path}/car-diagnostics.zip")
+        fetch_archive("cars/car-diagnostics.zip", diagnostics_path)
 
     # Download NHTSA complaints dataset
     nhtsa_path = raw_data_path / "nhtsa-dataset"
     if not os.path.exists(nhtsa_path):
         print("Downloading NHTSA complaints dataset...")
-        _download_from_drive(id="1ER5pooCIi2q6ZTYUrJw_ha_X3byNQB9M/", file_name="nhtsa-dataset.zip")
+        _download_from_drive(id="1ER5pooCIi2q6ZTYUrJw_ha_X3byNQB9M", file_name="nhtsa-dataset.zip")
 
 
 def _generate_synthetic_car_data(num_cars: int, seed: int = 42) -> pd.DataFrame:
@@ -1079,6 +1071,45 @@ def _shuffle_tables(df: pd.DataFrame) -> pd.DataFrame:
     return df.sample(frac=1, random_state=42).reset_index(drop=True)
 
 
+def _nested_scale_down(
+    car_table: pd.DataFrame,
+    image_table: pd.DataFrame,
+    audio_table: pd.DataFrame,
+    complaints_table: pd.DataFrame,
+    scaling_factor: int,
+    seed: int = 42,
+) -> tuple:
+    """
+    Nested variant of scale_down_data: the cars of a scale factor are a prefix
+    of the cars of every larger one, interleaved by modality count so that
+    every prefix keeps the ratios of cars with 3, 2 and 1 modalities.
+    Related rows follow the order of their cars.
+    """
+    modality_count = (
+        car_table["car_id"].isin(audio_table["car_id"]).astype(int)
+        + car_table["car_id"].isin(image_table["car_id"]).astype(int)
+        + car_table["car_id"].isin(complaints_table["car_id"]).astype(int)
+    )
+    candidates = car_table[modality_count > 0]
+    order = nested_order(
+        candidates["car_id"], seed, strata=modality_count[modality_count > 0]
+    )
+    car_table_sf = candidates.iloc[order[:scaling_factor]].reset_index(drop=True)
+    position = pd.Series(np.arange(len(car_table_sf)), index=car_table_sf["car_id"])
+
+    def follow_cars(table: pd.DataFrame) -> pd.DataFrame:
+        table = table[table["car_id"].isin(position.index)]
+        rank = table["car_id"].map(position).to_numpy()
+        return table.iloc[np.argsort(rank, kind="stable")].reset_index(drop=True)
+
+    return (
+        car_table_sf,
+        follow_cars(image_table),
+        follow_cars(audio_table),
+        follow_cars(complaints_table),
+    )
+
+
 def scale_down_data(
     car_table: pd.DataFrame,
     image_table: pd.DataFrame,
@@ -1086,13 +1117,21 @@ def scale_down_data(
     complaints_table: pd.DataFrame,
     scaling_factor: int,
     seed: int = 42,
+    nested: bool = False,
 ) -> tuple:
     """
     Scales down all tables to the necessary size while maintaining the ratios of 
     cars with 3 modalities, 2 modalities, and 1 modality.
+    With nested=True, smaller scale factors are prefixes of larger ones.
     """
     if car_table.shape[0] <= scaling_factor:
         return car_table, image_table, audio_table, complaints_table
+
+    if nested:
+        return _nested_scale_down(
+            car_table, image_table, audio_table, complaints_table,
+            scaling_factor, seed
+        )
     
     np.random.seed(seed)
     random.seed(seed)
@@ -1186,6 +1225,66 @@ def scale_down_data(
     return car_table_sf, image_table_sf, audio_table_sf, complaints_table_sf
 
 
+def scale_up_data(
+    car_table: pd.DataFrame,
+    image_table: pd.DataFrame,
+    audio_table: pd.DataFrame,
+    complaints_table: pd.DataFrame,
+    scaling_factor: int,
+    media_dir: Path,
+) -> tuple:
+    """
+    Scales all tables up beyond the source data with synthetic copies of cars.
+    Copy v of a car gets car_id + v * stride and copies of its images, audio
+    and complaints, with remapped ids, perturbed media and paraphrased
+    summaries. Copies keep all labels of their source rows.
+    """
+    base_path = Path(__file__).resolve().parents[4]
+    positions, variants = scaleup_plan(len(car_table), scaling_factor)
+    car_stride = int(car_table["car_id"].max()) + 1
+    copies = pd.DataFrame({
+        "car_id": car_table["car_id"].to_numpy()[positions],
+        "variant": variants,
+    })
+    car_table_sf = car_table.iloc[positions].reset_index(drop=True)
+    car_table_sf["car_id"] = remap_ids(car_table_sf["car_id"], variants, car_stride)
+
+    def copy_related(table: pd.DataFrame, id_column: str) -> pd.DataFrame:
+        stride = int(table[id_column].max()) + 1
+        table = table.merge(copies, on="car_id")
+        table = table.sort_values("variant", kind="stable").reset_index(drop=True)
+        table[id_column] = remap_ids(table[id_column], table["variant"], stride)
+        table["car_id"] = remap_ids(table["car_id"], table["variant"], car_stride)
+        return table
+
+    def copy_media(table: pd.DataFrame, path_column: str) -> None:
+        # Paths are relative to the project root, like the source paths
+        paths = augment_media(
+            [str(base_path / path) for path in table[path_column]],
+            table["variant"].to_numpy(), media_dir
+        )
+        table[path_column] = [
+            source if variant == 0 else os.path.relpath(path, base_path)
+            for source, path, variant in zip(table[path_column], paths, table["variant"])
+        ]
+
+    image_table_sf = copy_related(image_table, "image_id")
+    copy_media(image_table_sf, "image_path")
+    audio_table_sf = copy_related(audio_table, "audio_id")
+    copy_media(audio_table_sf, "audio_path")
+    complaints_table_sf = copy_related(complaints_table, "complaint_id")
+    complaints_table_sf["summary"] = paraphrase(
+        complaints_table_sf["summary"], complaints_table_sf["variant"].to_numpy()
+    )
+
+    return (
+        car_table_sf,
+        image_table_sf.drop(columns="variant"),
+        audio_table_sf.drop(columns="variant"),
+        complaints_table_sf.drop(columns="variant"),
+    )
+
+
 def _prepare_data_from_scratch(args: argparse.Namespace) -> None:
     """Prepares the cars data from scratch by downloading datasets and creating tables."""
     _download_kaggle_datasets()
@@ -1257,10 +1356,10 @@ def _prepare_data_from_scratch(args: argparse.Namespace) -> None:
     audio_table_with_links = _shuffle_tables(audio_table_with_links)
     complaints_table_with_links = _shuffle_tables(complaints_table_with_links)
 
-    car_table_with_links.to_csv(f"{base_folder}/car_data_full.csv", index=False)
-    image_table_with_links.to_csv(f"{base_folder}/image_data_full.csv", index=False)
-    audio_table_with_links.to_csv(f"{base_folder}/audio_data_full.csv", index=False)
-    complaints_table_with_links.to_csv(f"{base_folder}/text_complaints_data_full.csv", index=False)
+    write_table(car_table_with_links, f"{base_folder}/car_data_full.csv")
+    write_table(image_table_with_links, f"{base_folder}/image_data_full.csv")
+    write_table(audio_table_with_links, f"{base_folder}/audio_data_full.csv")
+    write_table(complaints_table_with_links, f"{base_folder}/text_complaints_data_full.csv")
     
     # Create output folder
     base_folder = Path(__file__).resolve().parents[4] / "files" / "cars" / "data"
@@ -1282,16 +1381,26 @@ def _prepare_data_from_scratch(args: argparse.Namespace) -> None:
         num_cars = car_table_with_links.shape[0]
     
     # Save
-    car_table_sf.to_csv(f"{base_folder}/car_data_{num_cars}.csv", index=False)
-    image_table_sf.to_csv(f"{base_folder}/image_car_data_{num_cars}.csv", index=False)
-    audio_table_sf.to_csv(f"{base_folder}/audio_car_data_{num_cars}.csv", index=False)
-    complaints_table_sf.to_csv(f"{base_folder}/text_complaints_data_{num_cars}.csv", index=False)
+    write_table(car_table_sf, f"{base_folder}/car_data_{num_cars}.csv")
+    write_table(image_table_sf, f"{base_folder}/image_car_data_{num_cars}.csv")
+    write_table(audio_table_sf, f"{base_folder}/audio_car_data_{num_cars}.csv")
+    write_table(complaints_table_sf, f"{base_folder}/text_complaints_data_{num_cars}.csv")
     
     print(f"Data preparation complete! Files saved to {base_folder}.")
 
 
-def prepare_data(scaling_factor: int = 157376) -> None:
-    """Main function to prepare cars data."""
+def prepare_data(
+    scaling_factor: int = 157376, nested: bool = False, synthetic: bool = False
+) -> None:
+    """
+    Main function to prepare cars data.
+
+    Args:
+        scaling_factor: Number of cars
+        nested: Sample nested, so smaller scale factors are prefixes of larger ones
+        synthetic: Scale up beyond the source data with copies of cars; their
+            labels are written to sf_<scaling_factor>/synthetic_labels
+    """
     if scaling_factor < 1:
         raise ValueError("scaling_factor should be at least 1")
     
@@ -1311,6 +1420,8 @@ def prepare_data(scaling_factor: int = 157376) -> None:
     # If scaled data exists, we're done
     if all(os.path.exists(base_folder_sf / f) for f in scaled_csv_files):
         print(f"Scaled data for sf={scaling_factor} already exists, skipping preparation.")
+        if nested:
+            check_nested_folder(base_folder_sf)
         return
 
     # Otherwise, check if full data exists
@@ -1341,8 +1452,23 @@ def prepare_data(scaling_factor: int = 157376) -> None:
         car_table_sf, image_table_sf, audio_table_sf, complaints_table_sf = scale_down_data(
             car_table_with_links, image_table_with_links, audio_table_with_links, complaints_table_with_links,
             scaling_factor=scaling_factor,
-            seed=42
+            seed=42,
+            nested=nested
         )
+
+    elif synthetic and scaling_factor > len(car_table_with_links):
+        car_table_sf, image_table_sf, audio_table_sf, complaints_table_sf = scale_up_data(
+            car_table_with_links, image_table_with_links, audio_table_with_links, complaints_table_with_links,
+            scaling_factor=scaling_factor,
+            media_dir=base_folder / SYNTHETIC_MEDIA_DIR
+        )
+        # The evaluator reads the labels of the copies from here
+        labels_folder = base_folder_sf / "synthetic_labels"
+        os.makedirs(labels_folder, exist_ok=True)
+        write_table(car_table_sf, labels_folder / "car_data_full.csv")
+        write_table(image_table_sf, labels_folder / "image_data_full.csv")
+        write_table(audio_table_sf, labels_folder / "audio_data_full.csv")
+        write_table(complaints_table_sf, labels_folder / "text_complaints_data_full.csv")
         
     else:
         car_table_sf = car_table_with_links
@@ -1354,10 +1480,12 @@ def prepare_data(scaling_factor: int = 157376) -> None:
     
     # Save
     os.makedirs(base_folder_sf, exist_ok=True)
-    car_table_sf.to_csv(base_folder_sf / f"car_data_{scaling_factor}.csv", index=False)
-    image_table_sf.to_csv(base_folder_sf / f"image_car_data_{scaling_factor}.csv", index=False, columns=["image_path","image_id", "car_id"])
-    audio_table_sf.to_csv(base_folder_sf / f"audio_car_data_{scaling_factor}.csv", index=False, columns=["audio_path","audio_id", "car_id"])
-    complaints_table_sf.to_csv(base_folder_sf / f"text_complaints_data_{scaling_factor}.csv", index=False, columns=["summary","complaint_id", "car_id"])
+    write_table(car_table_sf, base_folder_sf / f"car_data_{scaling_factor}.csv")
+    write_table(image_table_sf, base_folder_sf / f"image_car_data_{scaling_factor}.csv", columns=["image_path","image_id", "car_id"])
+    write_table(audio_table_sf, base_folder_sf / f"audio_car_data_{scaling_factor}.csv", columns=["audio_path","audio_id", "car_id"])
+    write_table(complaints_table_sf, base_folder_sf / f"text_complaints_data_{scaling_factor}.csv", columns=["summary","complaint_id", "car_id"])
+    if nested:
+        write_manifest(base_folder_sf, scaling_factor, seed=42)
 
 
 def main():
@@ -1407,6 +1535,18 @@ def main():
         default=str(raw_data / "nhtsa-dataset"),
         help="Path to NHTSA complaints dataset"
     )
+
+    parser.add_argument(
+        "--nested",
+        action="store_true",
+        help="Nested sampling: the data is a prefix of every larger nested scale factor"
+    )
+
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="Scale up beyond the 157376 source cars with synthetic copies"
+    )
     
     args = parser.parse_args()
     
@@ -1415,7 +1555,11 @@ def main():
     
     download_data_from_drive = True
     if download_data_from_drive:
-        prepare_data(scaling_factor=args.scaling_factor)
+        prepare_data(
+            scaling_factor=args.scaling_factor,
+            nested=args.nested,
+            synthetic=args.synthetic,
+        )
     else:
         _prepare_data_from_scratch(args)
 
@@ -9,6 +9,7 @@ import pandas as pd
 
 sys.path.append(str(Path(__file__).parent.parent.parent.parent))
 from runner.generic_thalamusdb_runner.generic_thalamusdb_runner import GenericThalamusDBRunner
+from table_format import read_table
 
 
 class ThalamusDBRunner(GenericThalamusDBRunner):
@@ -39,10 +40,10 @@ class ThalamusDBRunner(GenericThalamusDBRunner):
 
         if len(tables) == 0:
             # Read CSVs and create tables
-            cars_df = pd.read_csv(f"{db_folder}/car_data_{scale_factor}.csv")
-            audio_df = pd.read_csv(f"{db_folder}/audio_car_data_{scale_factor}.csv")
-            complaints_df = pd.read_csv(f"{db_folder}/text_complaints_data_{scale_factor}.csv")
-            images_df = pd.read_csv(f"{db_folder}/image_car_data_{scale_factor}.csv")
+            cars_df = read_table(f"{db_folder}/car_data_{scale_factor}.csv")
+            audio_df = read_table(f"{db_folder}/audio_car_data_{scale_factor}.csv")
+            complaints_df = read_table(f"{db_folder}/text_complaints_data_{scale_factor}.csv")
+            images_df = read_table(f"{db_folder}/image_car_data_{scale_factor}.csv")
 
             # Convert relative paths to absolute paths
             # The paths in CSVs are relative to the repository root
@@ -6,11 +6,17 @@ Standalone script for downloading and processing the Fashion Product Images data
 
 import os
 import argparse
+import shutil
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 import duckdb
 import pyarrow.parquet as pq
 
+# src/ holds the shared download_manager module (needed when run as a script)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from download_manager import fetch_archive  # noqa: E402
+
 
 def download_from_google_drive():
     """Download ecomm.tar.gz from Google Drive and extract it."""
@@ -27,89 +33,20 @@ def download_from_google_drive():
         print("Skipping download and extraction.")
         return str(data_path)
 
-    # Download ecomm.tar.gz directly using file ID
-    tar_file = source_data_dir / "ecomm.tar.gz"
-
-    if not tar_file.exists():
-        print("Downloading ecomm data from Google Drive...")
-        print("Downloading ecomm.tar.gz...")
-        # File ID: 1fVV9PLgIMT-e-zxFM5ksdnN8xQlfgnmb
-        file_id = "1fVV9PLgIMT-e-zxFM5ksdnN8xQlfgnmb"
-
-        # Try multiple download methods
-        success = False
-
-        # Method 1: Try gdown with fuzzy flag (handles large files better)
-        print("Attempting download with gdown (handles large files)...")
-        result = os.system(f"gdown --fuzzy 'https://drive.google.com/file/d/{file_id}/view?usp=sharing' -O {tar_file}")
-        if result == 0 and tar_file.exists() and tar_file.stat().st_size > 1000000:  # At least 1MB
-            success = True
-            print(f"Download successful with gdown (size: {tar_file.stat().st_size / 1024 / 1024:.1f}MB)")
-        else:
-            if tar_file.exists():
-                os.remove(tar_file)
-
-        # Method 2: Try wget with cookie handling for large files
-        if not success:
-            print("Attempting download with wget (handling Google Drive large file)...")
-            cookie_file = source_data_dir / "cookie.txt"
-            # First get the confirmation token
-            os.system(f"wget --save-cookies {cookie_file} --keep-session-cookies --no-check-certificate 'https://drive.google.com/uc?export=download&id={file_id}' -O- 2>&1 | grep -o 'confirm=[^&]*' | sed 's/confirm=//' > {source_data_dir}/confirm.txt")
-
-            # Read confirm token if exists
-            confirm_file = source_data_dir / "confirm.txt"
-            if confirm_file.exists():
-                with open(confirm_file, 'r') as f:
-                    confirm = f.read().strip()
-                if confirm:
-                    result = os.system(f"wget --load-cookies {cookie_file} --no-check-certificate 'https://drive.google.com/uc?export=download&confirm={confirm}&id={file_id}' -O {tar_file}")
-                    # Clean up
-                    os.remove(cookie_file)
-                    os.remove(confirm_file)
-
-                    if result == 0 and tar_file.exists() and tar_file.stat().st_size > 1000000:
-                        success = True
-                        print(f"Download successful with wget (size: {tar_file.stat().st_size / 1024 / 1024:.1f}MB)")
-                    else:
-                        if tar_file.exists():
-                            os.remove(tar_file)
-
-        # Method 3: Try curl with redirect handling
-        if not success:
-            print("Attempting download with curl...")
-            result = os.system(f"curl -L -o {tar_file} 'https://drive.google.com/uc?export=download&id={file_id}'")
-            if result == 0 and tar_file.exists() and tar_file.stat().st_size > 1000000:
-                success = True
-                print(f"Download successful with curl (size: {tar_file.stat().st_size / 1024 / 1024:.1f}MB)")
-            else:
-                if tar_file.exists():
-                    os.remove(tar_file)
-
-        if not success:
-            raise RuntimeError(
-                f"Failed to download ecomm.tar.gz from Google Drive using all methods.\n"
-                f"The file might be too large for automated download.\n"
-                f"Please manually download from: https://drive.google.com/file/d/{file_id}/view\n"
-                f"And save it to: {tar_file}"
-            )
-    else:
-        print(f"Archive file already exists at: {tar_file}")
-        print("Skipping download.")
-
-    print(f"Extracting {tar_file}...")
-    os.system(f"tar -xzf {tar_file} -C {source_data_dir}")
-
-    # Clean up tar file after extraction
-    os.system(f"rm {tar_file}")
+    # Download ecomm.tar.gz (or read it from the data mirror) and extract it;
+    # an archive downloaded by hand to source_data is used instead
+    fetch_archive(
+        "ecomm/ecomm.tar.gz", source_data_dir,
+        manual_path=source_data_dir / "ecomm.tar.gz")
 
     # The tar file extracts to source_data/1/fashion-dataset
     # Move it to source_data/fashion-dataset for consistency
     extracted_path = source_data_dir / "1" / "fashion-dataset"
     if extracted_path.exists() and not data_path.exists():
         print(f"Moving data from {extracted_path} to {data_path}...")
-        os.system(f"mv {extracted_path} {data_path}")
+        shutil.move(str(extracted_path), str(data_path))
         # Clean up the intermediate directory
-        os.system(f"rm -rf {source_data_dir / '1'}")
+        shutil.rmtree(source_data_dir / "1", ignore_errors=True)
 
     if not data_path.exists():
         raise RuntimeError(
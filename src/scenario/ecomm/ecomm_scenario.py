@@ -1,6 +1,7 @@
 import os
 from typing import Any, Dict, List
 import pandas as pd
+from nested_sampling import nested_sampling_enabled
 from .preparation.generate_data import prepare_data
 import glob
 import tomli
@@ -80,7 +81,9 @@ class EcommScenario:
 
     def setup_scenario(self, systems: List[str]) -> None:
         # Download and prepare data
-        self.data_dir = prepare_data(scale_factor=self.scale_factor)
+        self.data_dir = prepare_data(
+            scale_factor=self.scale_factor, nested=nested_sampling_enabled()
+        )
 
         # Load data into the specified systems
         for system in systems:
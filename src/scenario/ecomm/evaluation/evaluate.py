@@ -1,5 +1,6 @@
+import inspect
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 import sys
 import pandas as pd
 import numpy as np
@@ -30,6 +31,13 @@ class EcommEvaluator(GenericEvaluator):
     def _get_ground_truth(self, query_id: int) -> pd.DataFrame:
         return self.scenario_handler.get_ground_truth(query_id)
 
+    def _ground_truth_sources(self, query_id: int) -> List[Path]:
+        # Ground truth SQL is part of the query definition
+        return super()._ground_truth_sources(query_id) + [
+            self._root / "queries" / f"q{query_id}.toml",
+            Path(inspect.getfile(EcommScenario)),
+        ]
+
     def _evaluate_single_query(
         self,
         query_id: int,
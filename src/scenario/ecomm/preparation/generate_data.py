@@ -7,11 +7,38 @@ Handles downloading and processing the Fashion Product Images dataset.
 
 import os
 import argparse
+import shutil
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 import duckdb
+import numpy as np
+import pandas as pd
 import pyarrow.parquet as pq
 
+# src/ holds the shared nested_sampling module (needed when run as a script)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from download_manager import fetch_archive  # noqa: E402
+from nested_sampling import (  # noqa: E402
+    check_nested_folder,
+    nested_order,
+    write_manifest,
+)
+
+# Rows that are definitely included and bypass the random sampling such that
+# certain queries have a solution
+SOLUTION_ROW_IDS = [
+    5299, 5300, 5301, 1623, 1624, 5303, 5314,  # Q1
+    10037, 10102, 3312, 41825, 3462,  # Q2
+    3351, 30292, 10689, 8419,  # Q7
+    12799, 2048, 2606, 2607, 3479, 4038, 4800, 4805, 4817, 2045, 43047, 4811,  # Q8
+    6241, 1891, 53126, 1563, 15779, 47525,  # Q9
+    6100, 7935, 10579,  # Q10
+    8103, 13112, 8402, 3470,  # Q11
+    43047, 12799, 4811,  # Q13
+    18345, 29202,  # Q14
+]
+
 
 def download_from_google_drive():
     """Download ecomm.tar.gz from Google Drive and extract it."""
@@ -28,89 +55,20 @@ def download_from_google_drive():
         print("Skipping download and extraction.")
         return str(data_path)
 
-    # Download ecomm.tar.gz directly using file ID
-    tar_file = source_data_dir / "ecomm.tar.gz"
-
-    if not tar_file.exists():
-        print("Downloading ecomm data from Google Drive...")
-        print("Downloading ecomm.tar.gz...")
-        # File ID: 1fVV9PLgIMT-e-zxFM5ksdnN8xQlfgnmb
-        file_id = "1fVV9PLgIMT-e-zxFM5ksdnN8xQlfgnmb"
-
-        # Try multiple download methods
-        success = False
-
-        # Method 1: Try gdown with fuzzy flag (handles large files better)
-        print("Attempting download with gdown (handles large files)...")
-        result = os.system(f"gdown --fuzzy 'https://drive.google.com/file/d/{file_id}/view?usp=sharing' -O {tar_file}")
-        if result == 0 and tar_file.exists() and tar_file.stat().st_size > 1000000:  # At least 1MB
-            success = True
-            print(f"Download successful with gdown (size: {tar_file.stat().st_size / 1024 / 1024:.1f}MB)")
-        else:
-            if tar_file.exists():
-                os.remove(tar_file)
-
-        # Method 2: Try wget with cookie handling for large files
-        if not success:
-            print("Attempting download with wget (handling Google Drive large file)...")
-            cookie_file = source_data_dir / "cookie.txt"
-            # First get the confirmation token
-            os.system(f"wget --save-cookies {cookie_file} --keep-session-cookies --no-check-certificate 'https://drive.google.com/uc?export=download&id={file_id}' -O- 2>&1 | grep -o 'confirm=[^&]*' | sed 's/confirm=//' > {source_data_dir}/confirm.txt")
-
-            # Read confirm token if exists
-            confirm_file = source_data_dir / "confirm.txt"
-            if confirm_file.exists():
-                with open(confirm_file, 'r') as f:
-                    confirm = f.read().strip()
-                if confirm:
-                    result = os.system(f"wget --load-cookies {cookie_file} --no-check-certificate 'https://drive.google.com/uc?export=download&confirm={confirm}&id={file_id}' -O {tar_file}")
-                    # Clean up
-                    os.remove(cookie_file)
-                    os.remove(confirm_file)
-
-                    if result == 0 and tar_file.exists() and tar_file.stat().st_size > 1000000:
-                        success = True
-                        print(f"Download successful with wget (size: {tar_file.stat().st_size / 1024 / 1024:.1f}MB)")
-                    else:
-                        if tar_file.exists():
-                            os.remove(tar_file)
-
-        # Method 3: Try curl with redirect handling
-        if not success:
-            print("Attempting download with curl...")
-            result = os.system(f"curl -L -o {tar_file} 'https://drive.google.com/uc?export=download&id={file_id}'")
-            if result == 0 and tar_file.exists() and tar_file.stat().st_size > 1000000:
-                success = True
-                print(f"Download successful with curl (size: {tar_file.stat().st_size / 1024 / 1024:.1f}MB)")
-            else:
-                if tar_file.exists():
-                    os.remove(tar_file)
-
-        if not success:
-            raise RuntimeError(
-                f"Failed to download ecomm.tar.gz from Google Drive using all methods.\n"
-                f"The file might be too large for automated download.\n"
-                f"Please manually download from: https://drive.google.com/file/d/{file_id}/view\n"
-                f"And save it to: {tar_file}"
-            )
-    else:
-        print(f"Archive file already exists at: {tar_file}")
-        print("Skipping download.")
-
-    print(f"Extracting {tar_file}...")
-    os.system(f"tar -xzf {tar_file} -C {source_data_dir}")
-
-    # Clean up tar file after extraction
-    os.system(f"rm {tar_file}")
+    # Download ecomm.tar.gz (or read it from the data mirror) and extract it;
+    # an archive downloaded by hand to source_data is used instead
+    fetch_archive(
+        "ecomm/ecomm.tar.gz", source_data_dir,
+        manual_path=source_data_dir / "ecomm.tar.gz")
 
     # The tar file extracts to source_data/1/fashion-dataset
     # Move it to source_data/fashion-dataset for consistency
     extracted_path = source_data_dir / "1" / "fashion-dataset"
     if extracted_path.exists() and not data_path.exists():
         print(f"Moving data from {extracted_path} to {data_path}...")
-        os.system(f"mv {extracted_path} {data_path}")
+        shutil.move(str(extracted_path), str(data_path))
         # Clean up the intermediate directory
-        os.system(f"rm -rf {source_data_dir / '1'}")
+        shutil.rmtree(source_data_dir / "1", ignore_errors=True)
 
     if not data_path.exists():
         raise RuntimeError(
@@ -139,13 +97,15 @@ def _download_fashion_product_images():
         )
 
 
-def _create_sample(target_dir: str, scale_factor: int, seed: int) -> str:
+def _create_sample(target_dir: str, scale_factor: int, seed: int, nested: bool = False) -> str:
     """
     Creates a deterministic sample of the Fashion Product Images dataset based on the specified sampling factor.
 
     Args:
         target_dir: Base data directory (will create target_dir/sf_{scale_factor}/)
         scale_factor: The number of rows that will be included in the dataset.
+        seed: Seed of the sample.
+        nested: If True, the sample is a prefix of every larger nested sample (styles rows in nested order).
 
     Returns:
         The path to the directory containing the sampled dataset.
@@ -158,46 +118,54 @@ def _create_sample(target_dir: str, scale_factor: int, seed: int) -> str:
         print(
             f"Sample directory {out_dir} already exists. Skipping sample creation."
         )
+        if nested:
+            check_nested_folder(out_dir, seed)
         return out_dir
 
     os.makedirs(out_dir, exist_ok=True)
     print(f"Creating sample with size: {scale_factor} at: {out_dir}")
 
-    num_extra_rows = 43  # Number of rows that are definitely included and bypass the random sampling such that certain queries have a solution
+    num_extra_rows = len(set(SOLUTION_ROW_IDS))
     if scale_factor <= num_extra_rows:
         raise ValueError(
             f"Scale factor must be greater than {num_extra_rows} to ensure query solutions."
         )
 
     # Create a sample from one table; the others can then be joined to it.
-    duckdb.sql(
-        f"""
-        COPY (
-            SELECT *
-            FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}')
-            USING SAMPLE {scale_factor - num_extra_rows} (reservoir, {seed})
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (5299, 5300, 5301, 1623, 1624, 5303, 5314)  -- Ensure solution for Q1
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (10037, 10102, 3312, 41825, 3462) -- Ensure solution for Q2
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (3351, 30292, 10689, 8419) -- Ensure solution for Q7
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (12799, 2048, 2606, 2607, 3479, 4038, 4800, 4805, 4817, 2045, 43047, 4811) -- Ensure solution for Q8
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (6241, 1891, 53126, 1563, 15779, 47525) -- Ensure solution for Q9
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (6100, 7935, 10579) -- Ensure solution for Q10
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (8103, 13112, 8402, 3470) -- Ensure solution for Q11
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (43047, 12799, 4811) -- Ensure solution for Q13
-            UNION
-            SELECT * FROM read_parquet('{os.path.join(input_dir, 'styles.parquet')}') WHERE id IN (18345, 29202) -- Ensure solution for Q14
+    styles_path = os.path.join(input_dir, 'styles.parquet')
+    if nested:
+        # Solution rows first, then all other rows in nested order
+        ids = pq.read_table(styles_path, columns=["id"]).column("id").to_pandas()
+        order = nested_order(ids, seed, pinned=ids.isin(SOLUTION_ROW_IDS))
+        selected_ids = ids.iloc[order[:scale_factor]].to_numpy()
+        selection = pd.DataFrame(
+            {"id": selected_ids, "position": np.arange(len(selected_ids))}
+        )
+        duckdb.sql(
+            f"""
+            COPY (
+                SELECT styles.*
+                FROM read_parquet('{styles_path}') AS styles
+                JOIN selection ON styles.id = selection.id
+                ORDER BY selection.position
+            )
+            TO '{os.path.join(out_dir, 'styles.parquet')}' (FORMAT PARQUET)
+        """
+        )
+    else:
+        solution_ids = ", ".join(str(i) for i in SOLUTION_ROW_IDS)
+        duckdb.sql(
+            f"""
+            COPY (
+                SELECT *
+                FROM read_parquet('{styles_path}')
+                USING SAMPLE {scale_factor - num_extra_rows} (reservoir, {seed})
+                UNION
+                SELECT * FROM read_parquet('{styles_path}') WHERE id IN ({solution_ids})
+            )
+            TO '{os.path.join(out_dir, 'styles.parquet')}' (FORMAT PARQUET)
+        """
         )
-        TO '{os.path.join(out_dir, 'styles.parquet')}' (FORMAT PARQUET)
-    """
-    )
 
     duckdb.sql(
         f"""
@@ -252,10 +220,13 @@ def _create_sample(target_dir: str, scale_factor: int, seed: int) -> str:
     """
     )
 
+    if nested:
+        write_manifest(out_dir, scale_factor, seed)
+
     return out_dir
 
 
-def prepare_data(scale_factor: int = None, use_google_drive: bool = True) -> str:
+def prepare_data(scale_factor: int = None, use_google_drive: bool = True, nested: bool = False) -> str:
     """
     Downloads the Fashion Product Images dataset and processes it into Parquet files.
     Optionally creates a sample of the dataset based on the provided scale factor.
@@ -263,6 +234,7 @@ def prepare_data(scale_factor: int = None, use_google_drive: bool = True) -> str
     Args:
         scale_factor: Number of rows that will be included in the dataset or None if the maximum dataset size should be used.
         use_google_drive: If True, download from Google Drive instead of Kaggle.
+        nested: If True, the sample is a prefix of every larger nested sample.
 
     Returns:
         The path to the directory containing the processed dataset.
@@ -337,7 +309,7 @@ def prepare_data(scale_factor: int = None, use_google_drive: bool = True) -> str
         )
 
     if scale_factor is not None:
-        sample_dir = _create_sample(str(target_dir), scale_factor, 12345600)
+        sample_dir = _create_sample(str(target_dir), scale_factor, 12345600, nested)
         return sample_dir
     else:
         return out_dir
@@ -360,10 +332,16 @@ if __name__ == "__main__":
         default=None,
         help='Number of rows to include in the dataset (None for full dataset)'
     )
+    parser.add_argument(
+        '--nested',
+        action='store_true',
+        help='Nested sampling: the sample is a prefix of every larger nested sample'
+    )
     args = parser.parse_args()
 
     data_dir = prepare_data(
         scale_factor=args.scale_factor,
-        use_google_drive=args.download_from_drive or True
+        use_google_drive=args.download_from_drive or True,
+        nested=args.nested
     )
     print(f"Data prepared at: {data_dir}")
@@ -16,9 +16,11 @@ sys.path.append(str(Path(__file__).parent.parent.parent.parent))
 from runner.generic_lotus_runner.generic_lotus_runner import GenericLotusRunner
 
 # Import additional modules for approximate policy
-from lotus.models import SentenceTransformersRM
 from lotus.types import CascadeArgs
-from lotus.vector_store import FaissVS
+from runner.generic_lotus_runner.embedding_store import (
+    CachedFaissVS,
+    CachedSentenceTransformersRM,
+)
 
 
 class LotusRunner(GenericLotusRunner):
@@ -36,10 +38,14 @@ class LotusRunner(GenericLotusRunner):
 
         # Initialize components for approximate policy
         if hasattr(self, "policy") and self.policy == "approximate":
+            # Models load on first use; embeddings and FAISS indexes are
+            # reused from files/embedding_cache (see embedding_store)
             # Initialize both embedding models for mixed modality support
-            self.rm_text = SentenceTransformersRM(model="intfloat/e5-base-v2")
-            self.rm_image = SentenceTransformersRM("clip-ViT-B-32")
-            self.vs = FaissVS()
+            self.rm_text = CachedSentenceTransformersRM(
+                model="intfloat/e5-base-v2"
+            )
+            self.rm_image = CachedSentenceTransformersRM("clip-ViT-B-32")
+            self.vs = CachedFaissVS()
             self.cascade_args = CascadeArgs(
                 recall_target=0.8, precision_target=0.8
             )
@@ -5,7 +5,7 @@ Created on Jun 28, 2025
 """
 
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 import sys
 import pandas as pd
 import numpy as np
@@ -19,6 +19,7 @@ from evaluator.generic_evaluator import (
     QueryMetricRetrieval,
     QueryMetricAggregation,
 )
+from table_format import read_table
 
 
 class MedicalEvaluator(GenericEvaluator):
@@ -29,15 +30,24 @@ class MedicalEvaluator(GenericEvaluator):
 
     def _load_domain_data(self) -> None:
         data_path = self._root / "data"
-        self.patient_df = pd.read_csv(data_path / f"patient_data_with_labels{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
-        self.audio_df = pd.read_csv(data_path / f"audio_lung_data{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
-        self.image_x_ray_df = pd.read_csv(data_path / f"image_x_ray_data{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
-        self.symptoms_text_df = pd.read_csv(data_path / f"text_symptoms_data{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
-        self.skin_cancer_df = pd.read_csv(data_path / f"image_skin_data{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
+        self.patient_df = read_table(data_path / f"patient_data_with_labels{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
+        self.audio_df = read_table(data_path / f"audio_lung_data{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
+        self.image_x_ray_df = read_table(data_path / f"image_x_ray_data{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
+        self.symptoms_text_df = read_table(data_path / f"text_symptoms_data{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
+        self.skin_cancer_df = read_table(data_path / f"image_skin_data{"" if self.scale_factor == 11112 else f"_{int(self.scale_factor)}"}.csv")
 
-    def _get_ground_truth(self, query_id: int) -> pd.DataFrame:
+    def _ground_truth_csv(self, query_id: int) -> Path:
         query_name = f"Q{query_id}" if self.scale_factor == 11112 else f"Q{query_id}_{int(self.scale_factor)}"
-        gt_path = self._results_path / "ground_truth" / f"{query_name}.csv"
+        return self._results_path / "ground_truth" / f"{query_name}.csv"
+
+    def _ground_truth_sources(self, query_id: int) -> List[Path]:
+        # A precomputed ground truth CSV is returned as is
+        return super()._ground_truth_sources(query_id) + [
+            self._ground_truth_csv(query_id)
+        ]
+
+    def _get_ground_truth(self, query_id: int) -> pd.DataFrame:
+        gt_path = self._ground_truth_csv(query_id)
         if gt_path.exists():
             return pd.read_csv(gt_path)
 
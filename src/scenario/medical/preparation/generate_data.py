@@ -27,10 +27,16 @@ import pandas as pd
 import random
 import os
 import shutil
+import sys
 from pathlib import Path
 from os import listdir
 from os.path import isdir, join
 
+# src/ holds the shared table_format module (needed when run as a script)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from download_manager import drive_url, fetch_archive  # noqa: E402
+from table_format import write_table  # noqa: E402
+
 
 def replace_multiple(text, replacements):
     for key, val in replacements.items():
@@ -72,29 +78,19 @@ def _download_from_drive(id: str, file_name: str = "raw_data.zip", folder: str =
     # Ensure folder exists
     os.makedirs(folder, exist_ok=True)
 
-    # Download to the target folder
-    zip_path = os.path.join(folder, file_name)
-
-    if not os.path.exists(zip_path):
-        print(f"Downloading {file_name} from Google Drive to {folder}...")
-        os.system(f"gdown --id {id} -O {zip_path}")
-    else:
-        print(f"Archive file already exists at: {zip_path}")
-        print("Skipping download.")
-
-    # Use -o flag to overwrite files without prompting
-    print(f"Extracting {zip_path} to {folder}...")
-    os.system(
-        f"unzip -o {zip_path} -d {folder}"
-    )
-    os.system(f"rm {zip_path}")
+    # Stream the archive into folder while it downloads (or read it from the
+    # data mirror); an archive put into folder by hand is used instead
+    fetch_archive(
+        f"medical/{file_name}", folder,
+        url=drive_url(id),
+        manual_path=os.path.join(folder, file_name))
 
 
 def _download_kaggle_datasets():
     """Downloads the required Kaggle datasets.
 
-    Note: For the X-ray dataset, there can be error when trying to fully download the dataset via cURL.
-    Solution is to download the dataset manually from Kaggle and place it in the correct folder.
+    Note: For the X-ray dataset, there can be error when trying to fully download the dataset.
+    Solution is to download the zip file manually from Kaggle and place it in source_data/raw_data.
     """
     # Use absolute paths
     base_path = Path(__file__).resolve().parents[4]
@@ -105,55 +101,33 @@ def _download_kaggle_datasets():
 
     lung_dataset_path = source_data_path / "lung-dataset"
     if not os.path.exists(lung_dataset_path):
-        os.system(
-            f"curl -L -o {source_data_path}/lung-dataset.zip https://www.kaggle.com/api/v1/datasets/download/arashnic/lung-dataset"
-        )
-        os.system(
-            f"unzip {source_data_path}/lung-dataset.zip -d {lung_dataset_path}"
-        )
-        os.system(f"rm {source_data_path}/lung-dataset.zip")
+        fetch_archive(
+            "medical/lung-dataset.zip", lung_dataset_path,
+            manual_path=source_data_path / "lung-dataset.zip")
 
     lungcanc_path = source_data_path / "lungcanc2024"
     if not os.path.exists(lungcanc_path):
-        os.system(
-            f"curl -L -o {source_data_path}/lungcanc2024.zip https://www.kaggle.com/api/v1/datasets/download/datasetengineer/lungcanc2024"
-        )
-        os.system(
-            f"unzip {source_data_path}/lungcanc2024.zip -d {lungcanc_path}"
-        )
-        os.system(f"rm {source_data_path}/lungcanc2024.zip")
+        fetch_archive(
+            "medical/lungcanc2024.zip", lungcanc_path,
+            manual_path=source_data_path / "lungcanc2024.zip")
 
     xray_path = source_data_path / "x-ray"
     if not os.path.exists(xray_path):
-        os.system(
-            f"curl -L -o {source_data_path}/x-ray-lung-diseases-images-9-classes.zip https://www.kaggle.com/api/v1/datasets/download/fernando2rad/x-ray-lung-diseases-images-9-classes"
-        )
-        os.system(
-            f"unzip {source_data_path}/x-ray-lung-diseases-images-9-classes.zip -d {xray_path}"
-        )
-        os.system(
-            f"rm {source_data_path}/x-ray-lung-diseases-images-9-classes.zip"
-        )
+        fetch_archive(
+            "medical/x-ray-lung-diseases-images-9-classes.zip", xray_path,
+            manual_path=source_data_path / "x-ray-lung-diseases-images-9-classes.zip")
 
     diagnosis_path = source_data_path / "diagnosis"
     if not os.path.exists(diagnosis_path):
-        os.system(
-            f"curl -L -o {source_data_path}/symptom2disease.zip https://www.kaggle.com/api/v1/datasets/download/niyarrbarman/symptom2disease"
-        )
-        os.system(
-            f"unzip {source_data_path}/symptom2disease.zip -d {diagnosis_path}"
-        )
-        os.system(f"rm {source_data_path}/symptom2disease.zip")
+        fetch_archive(
+            "medical/symptom2disease.zip", diagnosis_path,
+            manual_path=source_data_path / "symptom2disease.zip")
 
     skin_cancer_path = source_data_path / "skin_cancer"
     if not os.path.exists(skin_cancer_path):
-        os.system(
-            f"curl -L -o {source_data_path}/skin_cancer.zip https://www.kaggle.com/api/v1/datasets/download/fanconic/skin-cancer-malignant-vs-benign"
-        )
-        os.system(
-            f"unzip {source_data_path}/skin_cancer.zip -d {skin_cancer_path}"
-        )
-        os.system(f"rm {source_data_path}/skin_cancer.zip")
+        fetch_archive(
+            "medical/skin_cancer.zip", skin_cancer_path,
+            manual_path=source_data_path / "skin_cancer.zip")
 
 def _add_random_patient_history(
     df: pd.DataFrame, smoking, family_cancer
@@ -745,18 +719,18 @@ def _prepare_data_from_scratch(args: argparse.Namespace) -> None:
         )
 
         # Save patient table with labels
-        patient_table_sf.to_csv(f"{folder}/patient_data_with_labels.csv", index=False)
+        write_table(patient_table_sf, f"{folder}/patient_data_with_labels.csv")
         patient_table_sf.drop(
             columns=["audio_diagnosis", "x_ray_diagnosis", "text_diagnosis", "skin_cancer_diagnosis", "is_sick"],
             inplace=True,
         )
 
         # Save tables to CSV files
-        patient_table_sf.to_csv(f"{folder}/patient_data.csv", index=False)
-        audio_table_sf.to_csv(f"{folder}/audio_lung_data.csv", index=False)
-        lung_x_ray_table_sf.to_csv(f"{folder}/image_x_ray_data.csv", index=False)
-        text_symptoms_table_sf.to_csv(f"{folder}/text_symptoms_data.csv", index=False)
-        skin_image_table_sf.to_csv(f"{folder}/image_skin_data.csv", index=False)
+        write_table(patient_table_sf, f"{folder}/patient_data.csv")
+        write_table(audio_table_sf, f"{folder}/audio_lung_data.csv")
+        write_table(lung_x_ray_table_sf, f"{folder}/image_x_ray_data.csv")
+        write_table(text_symptoms_table_sf, f"{folder}/text_symptoms_data.csv")
+        write_table(skin_image_table_sf, f"{folder}/image_skin_data.csv")
 
     patient_table, audio_table, lung_x_ray_table, text_symptoms_table, skin_image_table = (
         _shuffle_tables(patient_table),
@@ -767,18 +741,18 @@ def _prepare_data_from_scratch(args: argparse.Namespace) -> None:
     )
 
     # Save patient table with labels
-    patient_table.to_csv(f"{folder}/patient_data_with_labels.csv", index=False)
+    write_table(patient_table, f"{folder}/patient_data_with_labels.csv")
     patient_table.drop(
         columns=["audio_diagnosis", "x_ray_diagnosis", "text_diagnosis", "skin_cancer_diagnosis", "is_sick"],
         inplace=True,
     )
 
     # Save tables to CSV files
-    patient_table.to_csv(f"{folder}/patient_data.csv", index=False)
-    audio_table.to_csv(f"{folder}/audio_lung_data.csv", index=False)
-    lung_x_ray_table.to_csv(f"{folder}/image_x_ray_data.csv", index=False)
-    text_symptoms_table.to_csv(f"{folder}/text_symptoms_data.csv", index=False)
-    skin_image_table.to_csv(f"{folder}/image_skin_data.csv", index=False)
+    write_table(patient_table, f"{folder}/patient_data.csv")
+    write_table(audio_table, f"{folder}/audio_lung_data.csv")
+    write_table(lung_x_ray_table, f"{folder}/image_x_ray_data.csv")
+    write_table(text_symptoms_table, f"{folder}/text_symptoms_data.csv")
+    write_table(skin_image_table, f"{folder}/image_skin_data.csv")
 
 
 def prepare_data(scaling_factor: int = 11112) -> None:
@@ -852,32 +826,32 @@ def prepare_data(scaling_factor: int = 11112) -> None:
         )
 
         # Save patient table with labels
-        patient_table_sf.to_csv(f"{folder}/patient_data_with_labels_{scaling_factor}.csv", index=False)
+        write_table(patient_table_sf, f"{folder}/patient_data_with_labels_{scaling_factor}.csv")
         patient_table_sf.drop(
             columns=["audio_diagnosis", "x_ray_diagnosis", "text_diagnosis", "skin_cancer_diagnosis", "is_sick"],
             inplace=True,
         )
 
         # Save tables to CSV files
-        patient_table_sf.to_csv(f"{folder}/patient_data_{scaling_factor}.csv", index=False)
-        audio_table_sf.to_csv(f"{folder}/audio_lung_data_{scaling_factor}.csv", index=False)
-        lung_x_ray_table_sf.to_csv(f"{folder}/image_x_ray_data_{scaling_factor}.csv", index=False)
-        text_symptoms_table_sf.to_csv(f"{folder}/text_symptoms_data_{scaling_factor}.csv", index=False)
-        skin_image_table_sf.to_csv(f"{folder}/image_skin_data_{scaling_factor}.csv", index=False)
+        write_table(patient_table_sf, f"{folder}/patient_data_{scaling_factor}.csv")
+        write_table(audio_table_sf, f"{folder}/audio_lung_data_{scaling_factor}.csv")
+        write_table(lung_x_ray_table_sf, f"{folder}/image_x_ray_data_{scaling_factor}.csv")
+        write_table(text_symptoms_table_sf, f"{folder}/text_symptoms_data_{scaling_factor}.csv")
+        write_table(skin_image_table_sf, f"{folder}/image_skin_data_{scaling_factor}.csv")
 
     # Save patient table with labels
-    patient_table.to_csv(f"{folder}/patient_data_with_labels.csv", index=False)
+    write_table(patient_table, f"{folder}/patient_data_with_labels.csv")
     patient_table.drop(
         columns=["audio_diagnosis", "x_ray_diagnosis", "text_diagnosis", "skin_cancer_diagnosis", "is_sick"],
         inplace=True,
     )
 
     # Save tables to CSV files
-    patient_table.to_csv(f"{folder}/patient_data.csv", index=False)
-    audio_table.to_csv(f"{folder}/audio_lung_data.csv", index=False)
-    lung_x_ray_table.to_csv(f"{folder}/image_x_ray_data.csv", index=False)
-    text_symptoms_table.to_csv(f"{folder}/text_symptoms_data.csv", index=False)
-    skin_image_table.to_csv(f"{folder}/image_skin_data.csv", index=False)
+    write_table(patient_table, f"{folder}/patient_data.csv")
+    write_table(audio_table, f"{folder}/audio_lung_data.csv")
+    write_table(lung_x_ray_table, f"{folder}/image_x_ray_data.csv")
+    write_table(text_symptoms_table, f"{folder}/text_symptoms_data.csv")
+    write_table(skin_image_table, f"{folder}/image_skin_data.csv")
 
 
 def main():
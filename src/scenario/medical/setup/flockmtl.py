@@ -8,6 +8,8 @@ import duckdb
 import pyarrow as pa
 import pyarrow.parquet as pq
 
+from table_format import duckdb_scan
+
 MEDICAL_FILES_DIR = os.path.abspath(
     Path(__file__).resolve().parents[4] / "files" / "medical" / "data"
 )
@@ -47,7 +49,7 @@ class FlockMTLMedicalSetup:
             raise FileNotFoundError(f"File not found at path: {csv_path}. Please run the download script first.")
 
         self.flockmtl_conn.execute(f"""
-            CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM read_csv_auto('{csv_path}');
+            CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM {duckdb_scan(csv_path)};
             """)
 
 
@@ -23,6 +23,11 @@ class MMQAScenario:
 
     def setup_scenario(self, systems: List[str]) -> None:
         # Download and prepare data if not already done
+        from nested_sampling import (
+            check_nested_folder,
+            nested_sampling_enabled,
+        )
+        from synthetic_scaleup import synthetic_scaleup_enabled
         from scenario.mmqa.preparation.generate_data import MMQADataGenerator
         from pathlib import Path
 
@@ -34,6 +39,8 @@ class MMQAScenario:
 
         if data_folder.exists() and len(list(data_folder.glob("*.csv"))) > 0:
             print(f"Data already exists at {data_folder}, skipping generation.")
+            if nested_sampling_enabled():
+                check_nested_folder(data_folder)
             self.data_dir = str(data_folder)
         else:
             # Generate data
@@ -41,6 +48,8 @@ class MMQAScenario:
                 working_dir=str(working_dir),
                 scale_factor=self.scale_factor,
                 skip_download=False,
+                nested=nested_sampling_enabled(),
+                synthetic=synthetic_scaleup_enabled(),
             )
             data_generator.generate_data()
             self.data_dir = data_generator.output_data_dir
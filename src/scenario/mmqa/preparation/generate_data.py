@@ -1,8 +1,29 @@
 import argparse
 import os
+import shutil
+import sys
+from pathlib import Path
 
 import pandas as pd
 
+# src/ holds the shared table_format module (needed when run as a script)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from download_manager import fetch_archive  # noqa: E402
+from nested_sampling import (  # noqa: E402
+    materialize_files,
+    nested_order,
+    previous_nested_folder,
+    write_manifest,
+)
+from synthetic_scaleup import (  # noqa: E402
+    augment_media,
+    paraphrase,
+    remap_ids,
+    scaleup_plan,
+    suffix_names,
+)
+from table_format import write_parquet_copy, write_table  # noqa: E402
+
 
 RANDOM_SEED = 42
 FIXED_FILES = ["ben_piazza.csv", "ap_warrior.csv"]
@@ -26,14 +47,26 @@ FIXED_IMAGE_FILENAMES = [
 
 class MMQADataGenerator:
     def __init__(
-        self, working_dir: str, scale_factor: int, skip_download: bool = False
+        self,
+        working_dir: str,
+        scale_factor: int,
+        skip_download: bool = False,
+        nested: bool = False,
+        synthetic: bool = False,
     ):
-        assert scale_factor in range(
-            25, 1001
-        ), "Scale factor must be in the range [25, 1000]."
+        if synthetic:
+            assert scale_factor >= 25, "Scale factor must be at least 25."
+        else:
+            assert scale_factor in range(
+                25, 1001
+            ), "Scale factor must be in the range [25, 1000]."
 
         self.working_dir = working_dir
         self.scale_factor = scale_factor
+        # Nested sampling: sf_k is a prefix of every larger nested sf
+        self.nested = nested
+        # Synthetic scale-up: copies of additional rows beyond the source size
+        self.synthetic = synthetic
         self.source_data_dir = os.path.join(
             self.working_dir, "files/mmqa/source_data"
         )
@@ -64,28 +97,94 @@ class MMQADataGenerator:
             print("Skipping download and extraction.")
             return
 
-        zip_file = os.path.join(self.source_data_dir, "mmqa_source_data.zip")
+        # Stream the archive into source_data while it downloads (or read it
+        # from the data mirror); an archive put there by hand is used instead
+        fetch_archive(
+            "mmqa/mmqa_source_data.zip",
+            self.source_data_dir,
+            manual_path=os.path.join(
+                self.source_data_dir, "mmqa_source_data.zip"
+            ),
+        )
+        shutil.rmtree(
+            os.path.join(self.source_data_dir, "__MACOSX"), ignore_errors=True
+        )
+        # The archive nests everything in mmqa_data/
+        nested_dir = os.path.join(self.source_data_dir, "mmqa_data")
+        if os.path.isdir(nested_dir):
+            for name in os.listdir(nested_dir):
+                target = os.path.join(self.source_data_dir, name)
+                if not os.path.exists(target):
+                    shutil.move(os.path.join(nested_dir, name), target)
+            shutil.rmtree(nested_dir, ignore_errors=True)
 
-        if not os.path.exists(zip_file):
-            print(f"Downloading source data to {self.source_data_dir}...")
-            os.system(
-                f"gdown 1oHXq5oxIfsyoNy9aCQ0V9G3W4puqHC6i -O {zip_file}"  # noqa: E501
-            )
-        else:
-            print(f"Archive file already exists at: {zip_file}")
-            print("Skipping download.")
+        print("Download completed.")
 
-        os.system(
-            f"unzip {zip_file} -d {self.source_data_dir}"  # noqa: E501
+    def _synthetic_rows(
+        self,
+        additional_df: pd.DataFrame,
+        num_rows: int,
+        name_column: str,
+        text_column: str = None,
+    ) -> pd.DataFrame:
+        """
+        Perturbed copies of additional rows beyond the size of the source.
+
+        Only the additional rows are copied: they do not answer any query,
+        so the fixed answers of the queries hold at every scale factor.
+        """
+        num_rows = max(0, num_rows - len(additional_df))
+        if not self.synthetic or num_rows == 0:
+            return additional_df.iloc[:0]
+        positions, variants = scaleup_plan(
+            len(additional_df), len(additional_df) + num_rows
         )
-        os.system(f"rm {zip_file}")
-        os.system(f"rm -r {self.source_data_dir}/__MACOSX 2>/dev/null || true")
-        os.system(
-            f"mv {self.source_data_dir}/mmqa_data/* {self.source_data_dir}/ 2>/dev/null || true"
+        positions = positions[len(additional_df):]
+        variants = variants[len(additional_df):]
+        copies = additional_df.iloc[positions].reset_index(drop=True)
+        copies[name_column] = suffix_names(copies[name_column], variants)
+        if text_column is not None:
+            copies[text_column] = paraphrase(copies[text_column], variants)
+        if "id" in copies and pd.api.types.is_integer_dtype(copies["id"]):
+            stride = int(additional_df["id"].max()) + 1
+            copies["id"] = remap_ids(copies["id"], variants, stride)
+        return copies
+
+    def _extend_base_rows(
+        self,
+        base_df: pd.DataFrame,
+        additional_df: pd.DataFrame,
+        name_column: str,
+        text_column: str = None,
+    ) -> pd.DataFrame:
+        """Base rows plus sampled additional rows, scale_factor rows in all."""
+        num_rows_to_add = self.scale_factor - len(base_df)
+        copies = self._synthetic_rows(
+            additional_df, num_rows_to_add, name_column, text_column
         )
-        os.system(f"rm -r {self.source_data_dir}/mmqa_data 2>/dev/null || true")
+        if self.nested:
+            # Base rows first, then the additional rows in nested order,
+            # then synthetic copies
+            combined = pd.concat([base_df, additional_df], ignore_index=True)
+            order = nested_order(
+                combined, RANDOM_SEED, pinned=combined.index < len(base_df)
+            )
+            combined = pd.concat(
+                [combined.iloc[order], copies], ignore_index=True
+            )
+            return combined.iloc[: self.scale_factor].reset_index(drop=True)
 
-        print("Download completed.")
+        rows_to_add = additional_df.sample(
+            n=num_rows_to_add - len(copies),
+            replace=False,
+            random_state=RANDOM_SEED,
+        )
+        final_df = pd.concat(
+            [base_df, rows_to_add, copies], ignore_index=True
+        )
+        return final_df.sample(
+            frac=1, random_state=RANDOM_SEED
+        ).reset_index(drop=True)
 
     def _copy_fixed_files(self):
         for filename in FIXED_FILES:
@@ -93,6 +192,7 @@ class MMQADataGenerator:
             dst = os.path.join(self.output_data_dir, filename)
             if os.path.exists(src):
                 os.system(f"cp {src} {dst}")
+                write_parquet_copy(dst)
             else:
                 raise FileNotFoundError(
                     f"Source data file '{filename}' not found in source data directory: {self.source_data_dir}"  # noqa: E501
@@ -117,19 +217,13 @@ class MMQADataGenerator:
 
         base_df = pd.read_csv(base_filepath)
         additional_df = pd.read_csv(additional_filepath)
-        num_rows = len(base_df)
-        num_rows_to_add = self.scale_factor - num_rows
-
-        rows_to_add = additional_df.sample(
-            n=num_rows_to_add, replace=False, random_state=RANDOM_SEED
+        final_df = self._extend_base_rows(
+            base_df, additional_df, "title", "text"
         )
-        final_df = pd.concat([base_df, rows_to_add], ignore_index=True)
-        final_df = final_df.sample(
-            frac=1, random_state=RANDOM_SEED
-        ).reset_index(drop=True)
 
         final_df.index.name = "row_id"
-        final_df.to_csv(
+        write_table(
+            final_df,
             os.path.join(self.output_data_dir, "ben_piazza_text_data.csv"),
             index=True,
         )
@@ -154,19 +248,13 @@ class MMQADataGenerator:
         base_df = pd.read_csv(base_filepath)
         additional_df = pd.read_csv(additional_filepath)
         additional_df = additional_df.drop("id", axis=1)
-        num_rows = len(base_df)
-        num_rows_to_add = self.scale_factor - num_rows
-
-        rows_to_add = additional_df.sample(
-            n=num_rows_to_add, replace=False, random_state=RANDOM_SEED
+        final_df = self._extend_base_rows(
+            base_df, additional_df, "title", "text"
         )
-        final_df = pd.concat([base_df, rows_to_add], ignore_index=True)
-        final_df = final_df.sample(
-            frac=1, random_state=RANDOM_SEED
-        ).reset_index(drop=True)
 
         final_df.index.name = "row_id"
-        final_df.to_csv(
+        write_table(
+            final_df,
             os.path.join(self.output_data_dir, "lizzy_caplan_text_data.csv"),
             index=True,
         )
@@ -192,19 +280,11 @@ class MMQADataGenerator:
         base_df = base_df.drop("ID", axis=1)
         base_df = base_df.drop("Seasonal Destinations", axis=1)
         additional_df = pd.read_csv(additional_filepath)
-        num_rows = len(base_df)
-        num_rows_to_add = self.scale_factor - num_rows
-
-        rows_to_add = additional_df.sample(
-            n=num_rows_to_add, replace=False, random_state=RANDOM_SEED
-        )
-        final_df = pd.concat([base_df, rows_to_add], ignore_index=True)
-        final_df = final_df.sample(
-            frac=1, random_state=RANDOM_SEED
-        ).reset_index(drop=True)
+        final_df = self._extend_base_rows(base_df, additional_df, "Airlines")
 
         final_df.index.name = "row_id"
-        final_df.to_csv(
+        write_table(
+            final_df,
             os.path.join(
                 self.output_data_dir, "tampa_international_airport.csv"
             ),
@@ -225,7 +305,8 @@ class MMQADataGenerator:
             src = os.path.join(source_image_dir, filename)
             dst = os.path.join(output_image_dir, filename)
             if os.path.exists(src):
-                os.system(f"cp {src} {dst}")
+                if not self.nested:
+                    os.system(f"cp {src} {dst}")
             else:
                 raise FileNotFoundError(
                     f"Source image file '{filename}' not found in source image directory: {source_image_dir}."  # noqa: E501
@@ -237,21 +318,73 @@ class MMQADataGenerator:
             for f in os.listdir(source_image_dir)
             if f not in FIXED_IMAGE_FILENAMES and f.endswith((".png", ".jpg"))
         ]
+        num_synthetic_images = 0
         if num_images_to_add > 0:
             if num_images_to_add > len(additional_images):
-                raise ValueError(
-                    f"Not enough additional images to reach the desired scale factor of {self.scale_factor}."  # noqa: E501
+                if not self.synthetic:
+                    raise ValueError(
+                        f"Not enough additional images to reach the desired scale factor of {self.scale_factor}."  # noqa: E501
+                    )
+                num_synthetic_images = num_images_to_add - len(
+                    additional_images
+                )
+                num_images_to_add = len(additional_images)
+            if self.nested:
+                order = nested_order(additional_images, RANDOM_SEED)
+                selected_images = pd.Series(additional_images).iloc[
+                    order[:num_images_to_add]
+                ]
+            else:
+                selected_images = pd.Series(additional_images).sample(
+                    n=num_images_to_add,
+                    replace=False,
+                    random_state=RANDOM_SEED,
                 )
-            selected_images = pd.Series(additional_images).sample(
-                n=num_images_to_add, replace=False, random_state=RANDOM_SEED
+                for filename in selected_images:
+                    src = os.path.join(source_image_dir, filename)
+                    dst = os.path.join(output_image_dir, filename)
+                    os.system(f"cp {src} {dst}")
+
+        if self.nested:
+            # Only copy the images that no smaller nested sf holds
+            previous = previous_nested_folder(
+                os.path.dirname(self.output_data_dir),
+                self.scale_factor,
+                RANDOM_SEED,
             )
-            for filename in selected_images:
-                src = os.path.join(source_image_dir, filename)
-                dst = os.path.join(output_image_dir, filename)
-                os.system(f"cp {src} {dst}")
+            linked, copied = materialize_files(
+                FIXED_IMAGE_FILENAMES + selected_images.tolist(),
+                source_image_dir,
+                output_image_dir,
+                previous / "images" if previous is not None else None,
+            )
+            print(f"Images: {linked} linked from {previous}, {copied} copied")
+
+        synthetic_images = []
+        if num_synthetic_images > 0:
+            # Perturbed copies of the additional images, written right into
+            # the images folder of this scale factor
+            positions, variants = scaleup_plan(
+                len(selected_images),
+                len(selected_images) + num_synthetic_images,
+            )
+            sources = [
+                os.path.join(source_image_dir, selected_images.iloc[i])
+                for i in positions[len(selected_images):]
+            ]
+            synthetic_images = [
+                os.path.basename(path)
+                for path in augment_media(
+                    sources,
+                    variants[len(selected_images):],
+                    output_image_dir,
+                )
+            ]
 
         # Generate a csv file of image metadata needed for ThalamusDB
-        all_images = FIXED_IMAGE_FILENAMES + selected_images.tolist()
+        all_images = (
+            FIXED_IMAGE_FILENAMES + selected_images.tolist() + synthetic_images
+        )
         all_image_filepaths = [
             os.path.join(output_image_dir, f) for f in all_images
         ]
@@ -262,7 +395,8 @@ class MMQADataGenerator:
             }
         )
         image_df.index.name = "row_id"
-        image_df.to_csv(
+        write_table(
+            image_df,
             os.path.join(self.output_data_dir, "thalamusdb_images.csv"),
             index=True,
         )
@@ -278,6 +412,8 @@ class MMQADataGenerator:
 
         self._copy_fixed_files()
         self._generate_data_per_scale_factor()
+        if self.nested:
+            write_manifest(self.output_data_dir, self.scale_factor, RANDOM_SEED)
 
         print("Data generation completed.")
 
@@ -296,7 +432,7 @@ if __name__ == "__main__":
         "--scale_factor",
         type=int,
         required=True,
-        help="The scale factor for the generated data. Valid range: [25, 1000]",
+        help="The scale factor for the generated data. Valid range: [25, 1000], no upper bound with --synthetic",  # noqa: E501
     )
 
     parser.add_argument(
@@ -305,11 +441,25 @@ if __name__ == "__main__":
         help="Skip downloading source data.",
     )
 
+    parser.add_argument(
+        "--nested",
+        action="store_true",
+        help="Nested sampling: the data is a prefix of every larger nested scale factor",  # noqa: E501
+    )
+
+    parser.add_argument(
+        "--synthetic",
+        action="store_true",
+        help="Allow scale factors above 1000 with perturbed copies of additional rows",  # noqa: E501
+    )
+
     args = parser.parse_args()
 
     data_generator = MMQADataGenerator(
         working_dir=args.working_dir,
         scale_factor=args.scale_factor,
         skip_download=False,
+        nested=args.nested,
+        synthetic=args.synthetic,
     )
     data_generator.generate_data()
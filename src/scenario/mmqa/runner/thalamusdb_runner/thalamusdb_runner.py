@@ -7,6 +7,7 @@ import duckdb
 from runner.generic_thalamusdb_runner.generic_thalamusdb_runner import (
     GenericThalamusDBRunner,
 )
+from table_format import duckdb_scan
 
 
 class ThalamusDBRunner(GenericThalamusDBRunner):
@@ -60,7 +61,7 @@ class ThalamusDBRunner(GenericThalamusDBRunner):
             raise FileNotFoundError(f"CSV file not found: {csv_filepath}")
 
         self.conn.execute(
-            f"CREATE TABLE IF NOT EXISTS {table_name} AS SELECT * FROM read_csv_auto('{csv_filepath}')"  # noqa: E501
+            f"CREATE TABLE IF NOT EXISTS {table_name} AS SELECT * FROM {duckdb_scan(csv_filepath)}"  # noqa: E501
         )
 
     def _setup_data(self, data_dir: str) -> None:
@@ -3,6 +3,8 @@ from pathlib import Path
 
 import duckdb
 
+from table_format import duckdb_scan
+
 MMQA_FILES_DIR = os.path.abspath(
     Path(__file__).resolve().parents[4] / "files" / "mmqa" / "data"
 )
@@ -61,7 +63,7 @@ class FlockMTLMMQASetup:
 
         self.flockmtl_conn.execute(
             f"""
-            CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM read_csv_auto('{csv_path}');
+            CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM {duckdb_scan(csv_path)};
             """  # noqa: E501
         )
 
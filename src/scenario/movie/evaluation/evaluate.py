@@ -18,6 +18,7 @@ from scipy.stats import spearmanr, kendalltau
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from evaluator.generic_evaluator import GenericEvaluator, QueryMetricRetrieval, QueryMetricAggregation, QueryMetricRank
+from table_format import read_table
 
 class MovieEvaluator(GenericEvaluator):
     """Evaluator for the movie benchmark using the reusable framework."""
@@ -28,8 +29,8 @@ class MovieEvaluator(GenericEvaluator):
     def _load_domain_data(self) -> None:
         """Load the movie data CSV files."""
         data_path = self._root / "data" / f"sf_{self.scale_factor}"
-        self.movies_df = pd.read_csv(data_path / "Movies.csv")
-        self.reviews_df = pd.read_csv(data_path / "Reviews.csv")
+        self.movies_df = read_table(data_path / "Movies.csv")
+        self.reviews_df = read_table(data_path / "Reviews.csv")
 
     def _get_ground_truth(self, query_id: int) -> pd.DataFrame:  
         """Generate ground truth using DuckDB and gold SQL files."""
@@ -26,11 +26,7 @@ class MovieScenario:
         from scenario.movie.preparation.generate_data import (
             download_from_google_drive,
             load_data,
-            find_pattern_movie,
-            get_negative_movie,
-            get_top_movies_fast,
-            sample_reviews,
-            generate_movies_table,
+            generate_scale_factors,
         )
         from pathlib import Path
 
@@ -49,40 +45,15 @@ class MovieScenario:
             # Load data
             movies_df, reviews_df = load_data(data_path)
 
-            # Find special movies
-            pattern_movie, pattern_pattern = find_pattern_movie(reviews_df)
-            negative_movie = get_negative_movie()
-
-            # Get top movies
-            top_movies = get_top_movies_fast(reviews_df)
-
-            # Sample reviews
-            selected_reviews = sample_reviews(
+            # Sample reviews and movies, save to the data directory
+            generate_scale_factors(
+                movies_df,
                 reviews_df,
-                pattern_movie,
-                pattern_pattern,
-                negative_movie,
-                top_movies,
-                self.scale_factor,
+                [self.scale_factor],
+                data_folder.parent,
+                statistics=False,
             )
 
-            # Generate movies table
-            selected_movies = generate_movies_table(movies_df, selected_reviews)
-
-            # Save to data directory
-            os.makedirs(data_folder, exist_ok=True)
-
-            # Clean reviewText to prevent CSV formatting issues
-            selected_reviews = selected_reviews.copy()
-            selected_reviews["reviewText"] = (
-                selected_reviews["reviewText"]
-                .str.replace("\n", " ", regex=False)
-                .str.replace("\r", " ", regex=False)
-            )
-
-            selected_movies.to_csv(movies_file, index=False)
-            selected_reviews.to_csv(reviews_file, index=False)
-
             print(f"Data saved to {data_folder}")
             self.data_dir = str(data_folder)
 
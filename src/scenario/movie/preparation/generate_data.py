@@ -17,6 +17,9 @@ python3 generate_data.py .cache/kagglehub/datasets/andrezaza/clapper-massive-rot
 
 Or to use Google Drive download:
 python3 generate_data.py --download-from-drive --scale-factor 2000
+
+Several scale factors can be generated in one pass over the source data:
+python3 generate_data.py --download-from-drive --scale-factors 100 200 400 800 1600
 """
 
 import argparse
@@ -25,7 +28,12 @@ import numpy as np
 from pathlib import Path
 from collections import Counter
 import re
-import os
+import sys
+
+# src/ holds the shared table_format module (needed when run as a script)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from download_manager import fetch_archive  # noqa: E402
+from table_format import write_table  # noqa: E402
 
 
 def download_from_google_drive():
@@ -45,80 +53,11 @@ def download_from_google_drive():
         print("Skipping download and extraction.")
         return str(data_path)
 
-    # Download movie.zip directly using file ID
-    zip_file = source_data_dir / "movie.zip"
-
-    if not zip_file.exists():
-        print("Downloading movie data from Google Drive...")
-        print("Downloading movie.zip...")
-        # File ID: 1WkeXN3V5A6h-D_oeWvv2G_xs2PgzcQu0
-        file_id = "1WkeXN3V5A6h-D_oeWvv2G_xs2PgzcQu0"
-
-        # Try multiple download methods
-        success = False
-
-        # Method 1: Try gdown with fuzzy flag (handles large files better)
-        print("Attempting download with gdown (handles large files)...")
-        result = os.system(f"gdown --fuzzy 'https://drive.google.com/file/d/{file_id}/view?usp=sharing' -O {zip_file}")
-        if result == 0 and zip_file.exists() and zip_file.stat().st_size > 1000000:  # At least 1MB
-            success = True
-            print(f"Download successful with gdown (size: {zip_file.stat().st_size / 1024 / 1024:.1f}MB)")
-        else:
-            if zip_file.exists():
-                os.remove(zip_file)
-
-        # Method 2: Try wget with cookie handling for large files
-        if not success:
-            print("Attempting download with wget (handling Google Drive large file)...")
-            cookie_file = source_data_dir / "cookie.txt"
-            # First get the confirmation token
-            os.system(f"wget --save-cookies {cookie_file} --keep-session-cookies --no-check-certificate 'https://drive.google.com/uc?export=download&id={file_id}' -O- 2>&1 | grep -o 'confirm=[^&]*' | sed 's/confirm=//' > {source_data_dir}/confirm.txt")
-
-            # Read confirm token if exists
-            confirm_file = source_data_dir / "confirm.txt"
-            if confirm_file.exists():
-                with open(confirm_file, 'r') as f:
-                    confirm = f.read().strip()
-                if confirm:
-                    result = os.system(f"wget --load-cookies {cookie_file} --no-check-certificate 'https://drive.google.com/uc?export=download&confirm={confirm}&id={file_id}' -O {zip_file}")
-                    # Clean up
-                    os.remove(cookie_file)
-                    os.remove(confirm_file)
-
-                    if result == 0 and zip_file.exists() and zip_file.stat().st_size > 1000000:
-                        success = True
-                        print(f"Download successful with wget (size: {zip_file.stat().st_size / 1024 / 1024:.1f}MB)")
-                    else:
-                        if zip_file.exists():
-                            os.remove(zip_file)
-
-        # Method 3: Try curl with redirect handling
-        if not success:
-            print("Attempting download with curl...")
-            result = os.system(f"curl -L -o {zip_file} 'https://drive.google.com/uc?export=download&id={file_id}'")
-            if result == 0 and zip_file.exists() and zip_file.stat().st_size > 1000000:
-                success = True
-                print(f"Download successful with curl (size: {zip_file.stat().st_size / 1024 / 1024:.1f}MB)")
-            else:
-                if zip_file.exists():
-                    os.remove(zip_file)
-
-        if not success:
-            raise RuntimeError(
-                f"Failed to download movie.zip from Google Drive using all methods.\n"
-                f"The file might be too large for automated download.\n"
-                f"Please manually download from: https://drive.google.com/file/d/{file_id}/view\n"
-                f"And save it to: {zip_file}"
-            )
-    else:
-        print(f"Archive file already exists at: {zip_file}")
-        print("Skipping download.")
-
-    print(f"Unzipping {zip_file}...")
-    os.system(f"unzip -o {zip_file} -d {source_data_dir}")
-
-    # Clean up zip file after extraction
-    os.system(f"rm {zip_file}")
+    # Download movie.zip (or read it from the data mirror) and extract it;
+    # an archive downloaded by hand to source_data is used instead
+    fetch_archive(
+        "movie/movie.zip", source_data_dir,
+        manual_path=source_data_dir / "movie.zip")
 
     # Verify files exist
     if not reviews_file.exists() or not movies_file.exists():
@@ -153,37 +92,27 @@ def find_pattern_movie(reviews_df):
     """Find the movie with largest number of reviews following same score pattern."""
     print("Finding movie with consistent score pattern...")
     
-    # Pre-filter for /5 and /10 patterns only
-    pattern_5_reviews = reviews_df[reviews_df['originalScore'].str.contains('/5', na=False)]
-    pattern_10_reviews = reviews_df[reviews_df['originalScore'].str.contains('/10', na=False)]
-    
     best_movie = None
     best_pattern = None
     best_score = 0
     
-    # Check /5 pattern
-    if len(pattern_5_reviews) > 0:
-        movie_counts = pattern_5_reviews.groupby('id').size()
-        for movie_id, count in movie_counts.items():
-            if count >= 50:  # Need at least 50 reviews
-                unique_scores = pattern_5_reviews[pattern_5_reviews['id'] == movie_id]['originalScore'].nunique()
-                score = count * unique_scores  # Prefer more reviews with more diversity
-                if score > best_score:
-                    best_movie = movie_id
-                    best_pattern = '/5'
-                    best_score = score
-    
-    # Check /10 pattern
-    if len(pattern_10_reviews) > 0:
-        movie_counts = pattern_10_reviews.groupby('id').size()
-        for movie_id, count in movie_counts.items():
-            if count >= 50:  # Need at least 50 reviews
-                unique_scores = pattern_10_reviews[pattern_10_reviews['id'] == movie_id]['originalScore'].nunique()
-                score = count * unique_scores
-                if score > best_score:
-                    best_movie = movie_id
-                    best_pattern = '/10'
-                    best_score = score
+    # Check /5, then /10 pattern; a later pattern only wins with a higher score
+    for pattern in ['/5', '/10']:
+        pattern_reviews = reviews_df[reviews_df['originalScore'].str.contains(pattern, na=False)]
+        if len(pattern_reviews) == 0:
+            continue
+        # One pass over the pattern subset for counts and distinct scores
+        per_movie = pattern_reviews.groupby('id')['originalScore'].agg(['size', 'nunique'])
+        per_movie = per_movie[per_movie['size'] >= 50]  # Need at least 50 reviews
+        if per_movie.empty:
+            continue
+        scores = per_movie['size'] * per_movie['nunique']  # Prefer more reviews with more diversity
+        # idxmax returns the first maximum in id order, like a strict > scan
+        movie_id = scores.idxmax()
+        if scores[movie_id] > best_score:
+            best_movie = movie_id
+            best_pattern = pattern
+            best_score = scores[movie_id]
     
     print(f"Selected pattern movie: {best_movie} with {best_pattern} pattern")
     return best_movie, best_pattern
@@ -202,32 +131,54 @@ def get_top_movies_fast(reviews_df, top_n=200):
     return movie_counts.head(top_n).index.tolist()
 
 
-def sample_reviews(reviews_df, pattern_movie, pattern_pattern, negative_movie, top_movies, scale_factor):
-    """Sample reviews using movie-first strategy."""
+def build_review_index(reviews_df):
+    """
+    Map every movie id to the row positions of its reviews (in table order),
+    so sampling a movie costs O(its reviews) instead of a scan of all rows.
+    Build it once and pass it to every sample_reviews call on the same table.
+    """
+    return reviews_df.groupby('id', sort=False).indices
+
+
+def _sample_positions(positions, n, seed=42):
+    """Row positions picked by DataFrame.sample(n=n, random_state=seed) on the rows at *positions*."""
+    return positions[np.random.RandomState(seed).choice(len(positions), size=n, replace=False)]
+
+
+def sample_reviews(reviews_df, pattern_movie, pattern_pattern, negative_movie, top_movies, scale_factor,
+                   review_index=None):
+    """
+    Sample reviews using movie-first strategy.
+
+    Rows are selected as positions through the per-movie index (see
+    build_review_index) and taken from reviews_df once; the result is the
+    same as sampling each movie's sub-frame with random_state=42.
+    """
     print(f"Sampling {scale_factor} reviews using movie-first strategy...")
+    if review_index is None:
+        review_index = build_review_index(reviews_df)
+    no_reviews = np.empty(0, dtype=np.intp)
     
-    selected_reviews = []
+    selected_positions = []
     used_movies = set()
     
     # Step 1: Add pattern movie reviews (ONLY those matching the pattern)
     print(f"Step 1: Adding pattern movie {pattern_movie} (only {pattern_pattern} reviews)")
-    pattern_movie_reviews = reviews_df[
-        (reviews_df['id'] == pattern_movie) & 
-        (reviews_df['originalScore'].str.contains(pattern_pattern, na=False))
-    ]
-    selected_reviews.append(pattern_movie_reviews)
+    positions = review_index.get(pattern_movie, no_reviews)
+    matches = reviews_df['originalScore'].iloc[positions].str.contains(pattern_pattern, na=False)
+    pattern_positions = positions[matches.to_numpy(dtype=bool)]
+    selected_positions.append(pattern_positions)
     used_movies.add(pattern_movie)
-    remaining = scale_factor - len(pattern_movie_reviews)
-    print(f"Added {len(pattern_movie_reviews)} pattern reviews, remaining: {remaining}")
+    remaining = scale_factor - len(pattern_positions)
+    print(f"Added {len(pattern_positions)} pattern reviews, remaining: {remaining}")
     
     # Step 2: Add negative movie reviews (ALL reviews, no pattern filtering)
     if negative_movie != pattern_movie and remaining > 0:
         print(f"Step 2: Adding negative movie {negative_movie} (all reviews)")
-        negative_movie_reviews = reviews_df[reviews_df['id'] == negative_movie]
-        if len(negative_movie_reviews) > 0:
-            sample_size = min(len(negative_movie_reviews), remaining // 3)  # Use up to 1/3 of remaining
-            sampled = negative_movie_reviews.sample(n=sample_size, random_state=42)
-            selected_reviews.append(sampled)
+        positions = review_index.get(negative_movie, no_reviews)
+        if len(positions) > 0:
+            sample_size = min(len(positions), remaining // 3)  # Use up to 1/3 of remaining
+            selected_positions.append(_sample_positions(positions, sample_size))
             used_movies.add(negative_movie)
             remaining -= sample_size
             print(f"Added {sample_size} negative reviews, remaining: {remaining}")
@@ -240,21 +191,20 @@ def sample_reviews(reviews_df, pattern_movie, pattern_pattern, negative_movie, t
         if movie_id in used_movies:
             continue
             
-        movie_reviews = reviews_df[reviews_df['id'] == movie_id]
-        if len(movie_reviews) == 0:
+        positions = review_index.get(movie_id, no_reviews)
+        if len(positions) == 0:
             continue
             
         # Sample 5-15 reviews per movie for diversity
-        sample_size = min(len(movie_reviews), max(5, remaining // 30), remaining)
-        sampled = movie_reviews.sample(n=sample_size, random_state=42)
-        selected_reviews.append(sampled)
+        sample_size = min(len(positions), max(5, remaining // 30), remaining)
+        selected_positions.append(_sample_positions(positions, sample_size))
         used_movies.add(movie_id)
         remaining -= sample_size
     
     print(f"Final step: added reviews from {len(used_movies)} total movies")
     
     # Combine and shuffle
-    final_reviews = pd.concat(selected_reviews, ignore_index=True)
+    final_reviews = reviews_df.take(np.concatenate(selected_positions)).reset_index(drop=True)
     final_reviews = final_reviews.sample(frac=1, random_state=42).reset_index(drop=True)
     
     # Trim to exact scale factor
@@ -270,6 +220,63 @@ def generate_movies_table(movies_df, reviews_df):
     return selected_movies
 
 
+def save_tables(selected_movies, selected_reviews, output_dir):
+    """Write Movies.csv and Reviews.csv (plus typed copies) to *output_dir*."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    movies_file = output_dir / "Movies.csv"
+    reviews_file = output_dir / "Reviews.csv"
+
+    # Clean reviewText to prevent CSV formatting issues
+    selected_reviews = selected_reviews.copy()
+    selected_reviews['reviewText'] = selected_reviews['reviewText'].str.replace('\n', ' ', regex=False).str.replace('\r', ' ', regex=False)
+
+    write_table(selected_movies, movies_file)
+    write_table(selected_reviews, reviews_file)
+    return movies_file, reviews_file
+
+
+def generate_scale_factors(movies_df, reviews_df, scale_factors, base_output_dir, statistics=True):
+    """
+    Generate sf_<N>/ below *base_output_dir* for every scale factor in one
+    pass over the source data: the special movies, the top movies and the
+    per-movie review index are computed once and shared by all scale
+    factors. Each scale factor gets the same tables as a separate run.
+
+    Returns:
+        {scale factor: output directory}
+    """
+    pattern_movie, pattern_pattern = find_pattern_movie(reviews_df)
+    negative_movie = get_negative_movie()
+    top_movies = get_top_movies_fast(reviews_df)
+    review_index = build_review_index(reviews_df)
+
+    output_dirs = {}
+    for scale_factor in scale_factors:
+        selected_reviews = sample_reviews(
+            reviews_df, pattern_movie, pattern_pattern, negative_movie,
+            top_movies, scale_factor, review_index
+        )
+        selected_movies = generate_movies_table(movies_df, selected_reviews)
+        if statistics:
+            print_statistics(selected_movies, selected_reviews, pattern_movie, pattern_pattern, negative_movie)
+
+        output_dir = Path(base_output_dir) / f"sf_{scale_factor}"
+        movies_file, reviews_file = save_tables(selected_movies, selected_reviews, output_dir)
+        output_dirs[scale_factor] = output_dir
+
+        print(f"\nFiles saved:")
+        print(f"  {movies_file}")
+        print(f"  {reviews_file}")
+
+        print(f"\n=== Generated Tables Summary (sf {scale_factor}) ===")
+        print(f"Movies.csv: {len(selected_movies)} rows")
+        print(f"Reviews.csv: {len(selected_reviews)} rows")
+        print(f"Maximum table size: {max(len(selected_movies), len(selected_reviews))} rows")
+    return output_dirs
+
+
 def print_statistics(movies_df, reviews_df, pattern_movie, pattern_pattern, negative_movie):
     """Print comprehensive statistics to verify requirements."""
     print("\n" + "="*50)
@@ -331,6 +338,7 @@ def main():
     parser.add_argument('scale_factor', nargs='?', type=int, help='Number of reviews to generate (up to 1375738 after filtering nulls)')
     parser.add_argument('--download-from-drive', action='store_true', help='Download data from Google Drive')
     parser.add_argument('--scale-factor', type=int, dest='scale_factor_flag', help='Scale factor (alternative to positional argument)')
+    parser.add_argument('--scale-factors', type=int, nargs='+', help='Generate several scale factors in one pass over the source data (e.g. 100 200 400 800 1600)')
     args = parser.parse_args()
 
     # Determine data path
@@ -341,63 +349,27 @@ def main():
     else:
         parser.error("Either provide data_path or use --download-from-drive")
 
-    # Determine scale factor
+    # Determine scale factors
     scale_factor = args.scale_factor_flag if args.scale_factor_flag is not None else args.scale_factor
-    if scale_factor is None:
-        parser.error("scale_factor is required (either positional or --scale-factor)")
+    scale_factors = args.scale_factors or ([scale_factor] if scale_factor is not None else [])
+    if not scale_factors:
+        parser.error("scale_factor is required (either positional, --scale-factor or --scale-factors)")
 
     # Load data
     movies_df, reviews_df = load_data(data_path)
     
     # Validate scale_factor bounds
     max_reviews = len(reviews_df)  # Already filtered for nulls in load_data
-    if scale_factor > max_reviews:
-        print(f"Warning: scale_factor ({scale_factor}) exceeds available reviews ({max_reviews})")
-        print(f"Using maximum available reviews: {max_reviews}")
-        scale_factor = max_reviews
-    
-    # Find special movies
-    pattern_movie, pattern_pattern = find_pattern_movie(reviews_df)
-    negative_movie = get_negative_movie()
-    
-    # Get top movies by review count (much faster than ranking all movies)
-    top_movies = get_top_movies_fast(reviews_df)
+    for i, scale_factor in enumerate(scale_factors):
+        if scale_factor > max_reviews:
+            print(f"Warning: scale_factor ({scale_factor}) exceeds available reviews ({max_reviews})")
+            print(f"Using maximum available reviews: {max_reviews}")
+            scale_factors[i] = max_reviews
+    scale_factors = list(dict.fromkeys(scale_factors))
     
-    # Sample reviews
-    selected_reviews = sample_reviews(
-        reviews_df, pattern_movie, pattern_pattern, negative_movie,
-        top_movies, scale_factor
-    )
-    
-    # Generate movies table
-    selected_movies = generate_movies_table(movies_df, selected_reviews)
-    
-    # Print statistics
-    print_statistics(selected_movies, selected_reviews, pattern_movie, pattern_pattern, negative_movie)
-    
-    # Save files to data/sf_{scale_factor}/ directory
+    # Sample, print statistics and save files to data/sf_{scale_factor}/
     base_output_dir = Path(__file__).resolve().parents[4] / "files" / "movie" / "data"
-    output_dir = base_output_dir / f"sf_{scale_factor}"
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    movies_file = output_dir / "Movies.csv"
-    reviews_file = output_dir / "Reviews.csv"
-
-    # Clean reviewText to prevent CSV formatting issues
-    selected_reviews = selected_reviews.copy()
-    selected_reviews['reviewText'] = selected_reviews['reviewText'].str.replace('\n', ' ', regex=False).str.replace('\r', ' ', regex=False)
-
-    selected_movies.to_csv(movies_file, index=False)
-    selected_reviews.to_csv(reviews_file, index=False)
-
-    print(f"\nFiles saved:")
-    print(f"  {movies_file}")
-    print(f"  {reviews_file}")
-
-    print(f"\n=== Generated Tables Summary ===")
-    print(f"Movies.csv: {len(selected_movies)} rows")
-    print(f"Reviews.csv: {len(selected_reviews)} rows")
-    print(f"Maximum table size: {max(len(selected_movies), len(selected_reviews))} rows")
+    generate_scale_factors(movies_df, reviews_df, scale_factors, base_output_dir)
 
 
 if __name__ == "__main__":
@@ -10,7 +10,6 @@ import os
 from typing import Dict, Any
 from pathlib import Path
 import duckdb
-import pandas as pd
 
 # if you use local thalamusdb codes, please uncomment the following codes
 # import sys
@@ -27,6 +26,7 @@ import pandas as pd
 from runner.generic_thalamusdb_runner.generic_thalamusdb_runner import (
     GenericThalamusDBRunner,
 )
+from table_format import read_table
 
 
 class ThalamusDBRunner(GenericThalamusDBRunner):
@@ -70,8 +70,8 @@ class ThalamusDBRunner(GenericThalamusDBRunner):
 
         if len(tables) == 0:
             # Step 1: Read CSVs (these should exist now after setup_scenario)
-            movies_df = pd.read_csv(f"{db_folder}/Movies.csv")
-            reviews_df = pd.read_csv(f"{db_folder}/Reviews.csv")
+            movies_df = read_table(f"{db_folder}/Movies.csv")
+            reviews_df = read_table(f"{db_folder}/Reviews.csv")
 
             # Step 2: Save DataFrames as persistent tables
             conn.register("movies_df", movies_df)
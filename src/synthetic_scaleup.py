@@ -0,0 +1,198 @@
+"""
+Synthetic scale-up of scenario data beyond the size of its source dataset.
+
+Scale factors are capped by the source data (animals: 650 recordings and
+8718 images, mmqa: 1000 rows, cars: 157376 cars). With synthetic scale-up
+enabled (run.py --synthetic-scaleup), a generator asked for more rows than
+its source holds fills the remainder with perturbed copies of source rows.
+Copy number v of a row (its variant; variant 0 is the row itself) gets:
+
+    images  mirrored (odd variants) and cropped to 88-98% of each side
+    audio   (WAV) rotated in time by 5-45% of its duration
+    text    wrapped in one of PARAPHRASE_TEMPLATES
+    keys    integer ids remapped to id + v * stride, names suffixed with #v
+
+The amounts depend on the source and the variant only, so a copy is the same
+in every scale factor. None of the perturbations changes what a row shows,
+says or is labeled with: every copy inherits the labels of its source row,
+so the gold SQL and the evaluators derive the ground truth of any scale
+factor from the generated tables. Perturbed media files are written once per
+(source, variant) to a synthetic_media folder of the scenario's data.
+
+Usage:
+    positions, variants = scaleup_plan(len(source), scale_factor)
+    table = source.iloc[positions].reset_index(drop=True)
+    table["path"] = augment_media(table["path"], variants, media_dir)
+"""
+
+import os
+import shutil
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+from media_cache import media_kind
+from nested_sampling import row_uniform
+
+SYNTHETIC_SCALEUP_ENV = "SEMBENCH_SYNTHETIC_SCALEUP"
+SYNTHETIC_MEDIA_DIR = "synthetic_media"
+
+# Applied to text columns of copies: variant v uses template
+# 1 + (v - 1) % (len - 1), so copies never repeat the source text verbatim
+PARAPHRASE_TEMPLATES = [
+    "{text}",
+    "In summary: {text}",
+    "{text} (as reported)",
+    "Description: {text}",
+    "According to the record, {text}",
+    "{text} - end of description",
+]
+
+PathLike = Union[str, Path]
+
+
+def synthetic_scaleup_enabled() -> bool:
+    """Whether the data generators of this process may scale up."""
+    return bool(os.getenv(SYNTHETIC_SCALEUP_ENV))
+
+
+def scaleup_plan(num_source: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Source position and variant of every row of an *n*-row table built from
+    *num_source* rows: all source rows first, then copy 1 of every row, ...
+    Smaller plans are prefixes of larger ones.
+    """
+    if num_source <= 0:
+        raise ValueError("Cannot scale up an empty table")
+    rows = np.arange(n)
+    return rows % num_source, rows // num_source
+
+
+def remap_ids(
+    ids: Sequence[int], variants: np.ndarray, stride: int
+) -> np.ndarray:
+    """Unique integer keys of copies: id + variant * stride (> max id)."""
+    return np.asarray(ids, dtype=np.int64) + np.asarray(variants) * stride
+
+
+def suffix_names(names: Sequence, variants: np.ndarray) -> List:
+    """Names of copies: '<name> #<variant>', the source name for variant 0."""
+    return [
+        name if variant == 0 or not isinstance(name, str)
+        else f"{name} #{variant}"
+        for name, variant in zip(names, variants)
+    ]
+
+
+def paraphrase(texts: Sequence, variants: np.ndarray) -> List:
+    """Texts of copies wrapped in a template picked by the variant."""
+    count = len(PARAPHRASE_TEMPLATES) - 1
+    return [
+        text if variant == 0 or not isinstance(text, str)
+        else PARAPHRASE_TEMPLATES[1 + (variant - 1) % count].format(text=text)
+        for text, variant in zip(texts, variants)
+    ]
+
+
+def variant_path(path: PathLike, variant: int, media_dir: PathLike) -> Path:
+    """File of copy *variant* of *path* in *media_dir*."""
+    path = Path(path)
+    name = f"{path.parent.name}_{path.stem}_v{variant}{path.suffix}"
+    return Path(media_dir) / name
+
+
+def _draws(path: PathLike, variant: int, count: int) -> np.ndarray:
+    key = f"{Path(path).parent.name}/{Path(path).name}:{variant}"
+    return np.array(
+        [row_uniform([key], salt=f"augment{i}")[0] for i in range(count)]
+    )
+
+
+def augment_image(src: PathLike, dst: PathLike, variant: int) -> None:
+    """Write copy *variant* of image *src*: mirrored and/or cropped."""
+    from PIL import Image
+
+    u = _draws(src, variant, 4)
+    with Image.open(src) as image:
+        width, height = image.size
+        crop_width = max(1, int(width * (0.88 + 0.1 * u[0])))
+        crop_height = max(1, int(height * (0.88 + 0.1 * u[1])))
+        left = int((width - crop_width) * u[2])
+        top = int((height - crop_height) * u[3])
+        result = image.crop(
+            (left, top, left + crop_width, top + crop_height)
+        )
+        if variant % 2:
+            result = result.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        if Path(dst).suffix.lower() in (".jpg", ".jpeg"):
+            result.convert("RGB").save(dst, quality=95)
+        else:
+            result.save(dst)
+
+
+def augment_audio(src: PathLike, dst: PathLike, variant: int) -> None:
+    """Write copy *variant* of WAV *src*, rotated in time."""
+    u = _draws(src, variant, 1)
+    with wave.open(str(src), "rb") as reader:
+        params = reader.getparams()
+        frames = reader.readframes(params.nframes)
+    frame_size = params.nchannels * params.sampwidth
+    samples = np.frombuffer(frames, dtype=np.uint8).reshape(-1, frame_size)
+    shift = int(len(samples) * (0.05 + 0.4 * u[0]))
+    with wave.open(str(dst), "wb") as writer:
+        writer.setparams(params)
+        writer.writeframes(np.roll(samples, shift, axis=0).tobytes())
+
+
+def _tmp_path(target: Path) -> Path:
+    return target.with_name(
+        f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+
+
+def _augment_one(job: Tuple[str, int, Path]) -> None:
+    src, variant, dst = job
+    if dst.exists():
+        return
+    tmp = _tmp_path(dst).with_suffix(dst.suffix)
+    kind = media_kind(src)
+    if kind == "image":
+        augment_image(src, tmp, variant)
+    elif kind == "audio":
+        augment_audio(src, tmp, variant)
+    else:
+        shutil.copyfile(src, tmp)  # Unknown format: an unperturbed copy
+    os.replace(tmp, dst)
+
+
+def augment_media(
+    paths: Sequence[str],
+    variants: np.ndarray,
+    media_dir: PathLike,
+    workers: int = 8,
+) -> List[str]:
+    """
+    Paths of the media of copies; variant 0 keeps the source path, missing
+    files of other variants are written to *media_dir*.
+    """
+    media_dir = Path(media_dir)
+    media_dir.mkdir(parents=True, exist_ok=True)
+    result = []
+    jobs = {}
+    for path, variant in zip(paths, variants):
+        if variant == 0 or not isinstance(path, str):
+            result.append(path)
+            continue
+        target = variant_path(path, variant, media_dir)
+        jobs[target] = (path, int(variant), target)
+        result.append(str(target))
+    todo = [job for target, job in jobs.items() if not target.exists()]
+    if todo:
+        print(f"Writing {len(todo)} synthetic media files to {media_dir}")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_augment_one, todo))
+    return result
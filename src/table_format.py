@@ -0,0 +1,248 @@
+"""
+Typed Parquet copies of the scenario CSV tables.
+
+The data generators write every table as CSV (the canonical format that all
+systems and the gold SQL can read) and, through write_table, also as a typed
+Parquet file next to it (Reviews.csv -> Reviews.parquet). Readers resolve a
+CSV path with resolve_table and load the Parquet copy instead whenever it is
+at least as new as the CSV, which skips text parsing for the large movie and
+cars tables.
+
+The Parquet schema is the one DuckDB's read_csv_auto infers for the CSV
+file, so the SQL-based systems see the same column types (including DATE
+columns) from either file. read_table returns date and time columns as the
+text pd.read_csv would have produced, so pandas-based runners and evaluators
+get the same DataFrame from either file as well.
+
+Convert the CSV tables of existing data folders:
+    python src/table_format.py convert                  # files/*/data
+    python src/table_format.py convert files/movie/data
+"""
+
+import argparse
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+FILES_DIR = Path(__file__).resolve().parents[1] / "files"
+
+PathLike = Union[str, Path]
+
+# read_csv options that only describe the text format and have no meaning for
+# Parquet; loads using any other option are served from the CSV file
+_CSV_FORMAT_OPTIONS = {
+    "sep",
+    "delimiter",
+    "quotechar",
+    "escapechar",
+    "encoding",
+    "low_memory",
+}
+
+
+def parquet_path(csv_path: PathLike) -> Path:
+    """Path of the Parquet copy that belongs to *csv_path*."""
+    return Path(csv_path).with_suffix(".parquet")
+
+
+def write_table(df: pd.DataFrame, csv_path: PathLike, **kwargs: Any) -> None:
+    """
+    Write *df* as CSV and add a typed Parquet copy next to it.
+
+    Args:
+        df: Table to write
+        csv_path: Target CSV file
+        **kwargs: Passed to DataFrame.to_csv (index=False unless given)
+    """
+    kwargs.setdefault("index", False)
+    df.to_csv(csv_path, **kwargs)
+    write_parquet_copy(csv_path)
+
+
+def write_parquet_copy(csv_path: PathLike) -> Path:
+    """
+    Write the Parquet copy of an existing CSV table.
+
+    Returns:
+        Path of the Parquet file
+    """
+    csv_path = Path(csv_path)
+    target = parquet_path(csv_path)
+    tmp = target.with_name(f".{target.name}.tmp")
+    with duckdb.connect() as conn:
+        conn.execute(
+            f"COPY (SELECT * FROM read_csv_auto({_sql_literal(csv_path)})) "
+            f"TO {_sql_literal(tmp)} (FORMAT PARQUET)"
+        )
+    os.replace(tmp, target)
+    return target
+
+
+def resolve_table(path: PathLike) -> Path:
+    """
+    Return the file to load for the table at *path*.
+
+    Args:
+        path: CSV file of the table
+
+    Returns:
+        The Parquet copy if it exists and is not older than the CSV file,
+        otherwise *path* itself
+    """
+    path = Path(path)
+    if path.suffix != ".csv":
+        return path
+    candidate = parquet_path(path)
+    try:
+        parquet_mtime = candidate.stat().st_mtime_ns
+    except FileNotFoundError:
+        return path
+    try:
+        if parquet_mtime < path.stat().st_mtime_ns:
+            return path
+    except FileNotFoundError:
+        pass  # Only the Parquet copy exists
+    return candidate
+
+
+def read_table(path: PathLike, **kwargs: Any) -> pd.DataFrame:
+    """
+    Load a table, preferring its Parquet copy (see resolve_table).
+
+    Args:
+        path: CSV (or Parquet) file of the table
+        **kwargs: read_csv options; usecols and dtype are honoured for
+            Parquet as well, other options fall back to parsing the CSV file
+
+    Returns:
+        DataFrame containing the table
+    """
+    path = Path(path)
+    resolved = resolve_table(path)
+    if resolved.suffix != ".parquet":
+        return pd.read_csv(resolved, **kwargs)
+
+    options = _parquet_options(kwargs)
+    if options is None:
+        return pd.read_csv(path, **kwargs)
+    return read_parquet_table(resolved, **options)
+
+
+def read_parquet_table(
+    path: PathLike,
+    columns: Optional[list] = None,
+    dtype: Optional[Any] = None,
+) -> pd.DataFrame:
+    """
+    Read a Parquet table the way pd.read_csv would have returned the CSV.
+
+    Date and time columns are turned back into their ISO text and missing
+    strings (None in Parquet) into NaN, both as read_csv returns them.
+    """
+    table = pd.read_parquet(path, columns=columns)
+    schema = pq.read_schema(path)
+    for column in table.columns:
+        field_type = schema.field(column).type
+        if _is_temporal(field_type):
+            values = table[column]
+            table[column] = values.astype(str).where(values.notna(), np.nan)
+        elif table[column].dtype == object:
+            values = table[column]
+            if values.isna().any():
+                table[column] = values.where(values.notna(), np.nan)
+    if dtype is not None:
+        table = table.astype(dtype)
+    return table
+
+
+def duckdb_scan(path: PathLike) -> str:
+    """
+    DuckDB table function reading the table at *path*, e.g. for
+    CREATE TABLE t AS SELECT * FROM {duckdb_scan(path)}.
+    """
+    resolved = resolve_table(path)
+    if resolved.suffix == ".parquet":
+        return f"read_parquet({_sql_literal(resolved)})"
+    return f"read_csv_auto({_sql_literal(resolved)})"
+
+
+def _sql_literal(path: PathLike) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def _is_temporal(field_type: pa.DataType) -> bool:
+    return (
+        pa.types.is_date(field_type)
+        or pa.types.is_timestamp(field_type)
+        or pa.types.is_time(field_type)
+    )
+
+
+def _parquet_options(kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Translate read_csv options to read_parquet_table, None if impossible."""
+    options: Dict[str, Any] = {}
+    for key, value in kwargs.items():
+        if key == "usecols" and not callable(value):
+            options["columns"] = list(value)
+        elif key == "dtype":
+            options["dtype"] = value
+        elif key not in _CSV_FORMAT_OPTIONS:
+            return None
+    return options
+
+
+def convert_folder(folder: Path, force: bool = False) -> int:
+    """
+    Write missing or stale Parquet copies for all CSV tables below *folder*.
+
+    Returns:
+        Number of Parquet files written
+    """
+    written = 0
+    for csv_path in sorted(folder.rglob("*.csv")):
+        if not force and resolve_table(csv_path) != csv_path:
+            continue
+        try:
+            write_parquet_copy(csv_path)
+        except Exception as e:
+            print(f"✗ {csv_path}: {e}")
+            continue
+        print(f"✓ {parquet_path(csv_path)}")
+        written += 1
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Manage the Parquet copies of the scenario CSV tables"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser(
+        "convert", help="Write Parquet copies of the CSV tables in folders"
+    )
+    convert.add_argument(
+        "folders",
+        nargs="*",
+        type=Path,
+        help="Data folders to convert (default: files/*/data)",
+    )
+    convert.add_argument(
+        "--force",
+        action="store_true",
+        help="Rewrite Parquet copies that are already up to date",
+    )
+    args = parser.parse_args()
+
+    folders = args.folders or sorted(FILES_DIR.glob("*/data"))
+    written = sum(convert_folder(folder, args.force) for folder in folders)
+    print(f"Wrote {written} Parquet file(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Result channel between run.py and run_worker.py.
+
+The parent process creates a pipe and hands its write end to the worker
+(`--result-fd`). The worker sends one newline-delimited JSON record per event,
+so the parent can persist metrics while the worker is still running and keeps
+everything that was sent before a crash. Worker stdout/stderr stay free for
+logs, which the parent streams line by line.
+
+Record types:
+    {"type": "query", "query": "Q1", "metric": {...}}  one finished query
+    {"type": "done"}                                    all queries finished
+    {"type": "error", "error": "..."}                  worker failed
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterator
+
+
+class WorkerChannel:
+    """Write end of the result channel, used inside run_worker.py."""
+
+    def __init__(self, fd: int):
+        self._file = os.fdopen(fd, "w", buffering=1, encoding="utf-8")
+
+    def send(self, record_type: str, **payload: Any) -> None:
+        record = {"type": record_type, **payload}
+        # default=str keeps numpy scalars and timestamps from breaking a run
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+
+    def send_query(self, query_id: int, metric: Dict[str, Any]) -> None:
+        self.send("query", query=f"Q{query_id}", metric=metric)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_records(fd: int) -> Iterator[Dict[str, Any]]:
+    """
+    Yield records from the read end of the result channel until the worker
+    closes it. Lines that are not valid JSON (e.g. a record cut off by a
+    crash) are skipped.
+    """
+    with os.fdopen(fd, "r", encoding="utf-8") as channel:
+        for line in channel:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
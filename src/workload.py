@@ -0,0 +1,726 @@
+"""
+Multi-query workload driver: one system serving a mix of scenario queries
+issued by concurrent users.
+
+run.py executes one query at a time. The driver instead keeps several
+queries of one runner in flight and measures what users of a shared engine
+would see. Queries are executed with the runner's own execute_query (or
+execute_queries for systems that only run batches), so the same _execute_qN
+methods and dialect files are used as in a normal run.
+
+Arrival processes:
+    poisson  open loop: queries arrive at --qps on average (exponential
+             inter-arrival times), independent of completions; at most
+             --max-in-flight run at the same time, later arrivals queue
+    closed   --clients users each issue a query, wait for its answer and
+             think for an exponential time before the next one; with --qps
+             the mean think time is chosen so the users would reach that
+             rate if queries took no time
+
+Reported per request: queueing delay (arrival to start), service time (start
+to end, inflated by contention), latency (arrival to end), cost and tokens.
+Per workload: throughput and latency p50/p95/p99.
+
+The runner's own token and cost counters are per process (LOTUS resets and
+reads the global lm.stats around every query), so with several requests in
+flight they mix up the requests. For LiteLLM-based systems a UsageMeter
+instead attributes every LLM call to the request that issued it, also when
+the system makes the call from one of its worker threads. Systems whose LLM
+calls happen inside the database (FlockMTL, BigQuery) report the runner's
+numbers, which are only exact with --max-in-flight 1. The runner runs in
+workload mode: it does not write its raw results, metrics file or results
+store rows, which would be rewritten by every request.
+
+Outputs (label defaults to <system>_<arrival>_<rate>):
+    files/<use case>/metrics/workload_<label>/<system>.json
+        one record per query of the mix, in the layout of the run.py metrics
+        (execution_time is the mean service time, money_cost the mean cost
+        per request), so the plotting code and the results store read it
+    files/<use case>/workloads/<label>.json          summary and settings
+    files/<use case>/workloads/<label>.requests.csv  one row per request
+
+Queries of the mix run concurrently in threads of one process; systems whose
+queries reconfigure process-wide state per query need --max-in-flight 1.
+
+Usage:
+    python src/workload.py --system lotus --use-case movie \\
+        --queries 1 3 5 --arrival poisson --qps 0.2 --requests 50
+    python src/workload.py --system palimpzest --use-case animals \\
+        --queries 1 2 --weights 3 1 --arrival closed --clients 4
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from runner.generic_runner import GenericRunner
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+@dataclass
+class Request:
+    """One query issued by the workload."""
+
+    seq: int
+    query_id: int
+    client: int
+    arrival: float  # seconds since the start of the workload
+    start: Optional[float] = None
+    end: Optional[float] = None
+    status: str = "pending"
+    execution_time: Optional[float] = None  # as measured by the runner
+    token_usage: Optional[int] = None
+    money_cost: Optional[float] = None
+    row_count: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def queueing_delay(self) -> float:
+        return self.start - self.arrival
+
+    @property
+    def service_time(self) -> float:
+        return self.end - self.start
+
+    @property
+    def latency(self) -> float:
+        return self.end - self.arrival
+
+
+@dataclass
+class WorkloadSummary:
+    """Throughput and latency of a finished workload."""
+
+    requests: int
+    succeeded: int
+    failed: int
+    duration: float
+    throughput: float  # completed requests per second
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    latency_mean: float
+    queueing_delay_mean: float
+    queueing_delay_p95: float
+    service_time_mean: float
+    total_cost: float
+    cost_per_query: float
+    total_tokens: int
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+@dataclass
+class RequestUsage:
+    """LLM calls, tokens and cost of one request."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+# Usage of the request the current thread (or the task it runs) works for
+_request_usage: contextvars.ContextVar[Optional[RequestUsage]] = (
+    contextvars.ContextVar("sembench_request_usage", default=None)
+)
+
+
+def _submit_in_context(submit):
+    def submit_in_context(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return submit(self, context.run, fn, *args, **kwargs)
+
+    submit_in_context.in_context = True
+    return submit_in_context
+
+
+class UsageMeter:
+    """
+    Attributes the tokens and cost of LiteLLM calls to the request that
+    issued them.
+
+    A call is tied to its request when LiteLLM starts it (by its call ID),
+    so calls of concurrent requests never mix. Tasks submitted to a thread
+    pool run in the context of the submitting thread, so calls made from
+    the worker threads of LOTUS, Palimpzest or LiteLLM itself are counted
+    for the request that started them. The cost is LiteLLM's response_cost.
+
+    Usage:
+        meter = UsageMeter()
+        meter.install()
+        with meter.request() as usage:
+            runner.execute_query(1)
+        print(usage.total_tokens, usage.cost)
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, RequestUsage] = {}
+        self._lock = threading.Lock()
+
+    def install(self) -> bool:
+        """
+        Register the meter as LiteLLM callback.
+
+        Returns:
+            False if LiteLLM is not installed (e.g. FlockMTL or BigQuery
+            workers, whose LLM calls happen inside the database)
+        """
+        try:
+            import litellm
+            from litellm.integrations.custom_logger import CustomLogger
+        except ImportError:
+            return False
+
+        if not getattr(ThreadPoolExecutor.submit, "in_context", False):
+            ThreadPoolExecutor.submit = _submit_in_context(
+                ThreadPoolExecutor.submit
+            )
+        meter = self
+
+        class _Callback(CustomLogger):
+            def log_pre_api_call(self, model, messages, kwargs):
+                meter.start(kwargs)
+
+            def log_success_event(self, kwargs, response, start, end):
+                meter.finish(kwargs, response)
+
+            def log_failure_event(self, kwargs, response, start, end):
+                meter.finish(kwargs, None)
+
+            async def async_log_success_event(
+                self, kwargs, response, start, end
+            ):
+                meter.finish(kwargs, response)
+
+            async def async_log_failure_event(
+                self, kwargs, response, start, end
+            ):
+                meter.finish(kwargs, None)
+
+        litellm.callbacks = list(litellm.callbacks or []) + [_Callback()]
+        return True
+
+    @contextmanager
+    def request(self) -> Iterator[RequestUsage]:
+        """Count the LLM calls made inside the block for one request."""
+        usage = RequestUsage()
+        token = _request_usage.set(usage)
+        try:
+            yield usage
+        finally:
+            _request_usage.reset(token)
+
+    def start(self, kwargs: Dict[str, Any]) -> None:
+        """Tie a call LiteLLM is about to send to the current request."""
+        usage = _request_usage.get()
+        if usage is not None:
+            with self._lock:
+                self._calls[self._call_id(kwargs)] = usage
+
+    def finish(self, kwargs: Dict[str, Any], response: Any) -> None:
+        """Add a finished call (None if it failed) to its request."""
+        with self._lock:
+            usage = self._calls.pop(self._call_id(kwargs), None)
+        # Calls answered without an API call (LiteLLM cache hits) are not
+        # started, but are reported from the context of their request
+        usage = usage or _request_usage.get()
+        if usage is None or response is None:
+            return
+        prompt_tokens, completion_tokens = _token_counts(response)
+        with self._lock:
+            usage.calls += 1
+            usage.prompt_tokens += prompt_tokens
+            usage.completion_tokens += completion_tokens
+            usage.cost += float(kwargs.get("response_cost") or 0.0)
+
+    @staticmethod
+    def _call_id(kwargs: Dict[str, Any]) -> str:
+        return str(kwargs.get("litellm_call_id") or id(kwargs))
+
+
+def _token_counts(response: Any) -> tuple:
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if isinstance(usage, dict):
+        return (
+            usage.get("prompt_tokens") or 0,
+            usage.get("completion_tokens") or 0,
+        )
+    return (
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+    )
+
+
+class WorkloadDriver:
+    """
+    Issues a weighted mix of queries to one runner.
+
+    Usage:
+        driver = WorkloadDriver(runner, {1: 1.0, 3: 2.0}, seed=42)
+        requests = driver.run_poisson(qps=0.5, requests=50, max_in_flight=8)
+        summary = summarize(requests)
+    """
+
+    def __init__(self, runner: Any, mix: Dict[int, float], seed: int = 42):
+        """
+        Args:
+            runner: GenericRunner of the system and use case
+            mix: Relative weight of every query ID
+            seed: Seed of query choices, arrival and think times
+        """
+        self.runner = runner
+        # Concurrent requests share the runner: keep it from rewriting its
+        # raw results, metrics file and store rows per request
+        runner.workload_mode = True
+        self.usage_meter: Optional[UsageMeter] = UsageMeter()
+        if not self.usage_meter.install():
+            self.usage_meter = None
+        self.query_ids = list(mix)
+        weights = np.array([mix[q] for q in self.query_ids], dtype=float)
+        self.probabilities = weights / weights.sum()
+        self.rng = np.random.default_rng(seed)
+        self._rng_lock = threading.Lock()
+        # Runners that only implement batch execution (FlockMTL, BigQuery)
+        # get one query per execute_queries call
+        self._batch_only = (
+            type(runner).execute_query is GenericRunner.execute_query
+        )
+
+    def _next_query(self) -> int:
+        with self._rng_lock:
+            return int(self.rng.choice(self.query_ids, p=self.probabilities))
+
+    def _exponential(self, mean: float) -> float:
+        with self._rng_lock:
+            return float(self.rng.exponential(mean)) if mean > 0 else 0.0
+
+    @contextmanager
+    def _metered(self) -> Iterator[Optional[RequestUsage]]:
+        if self.usage_meter is None:
+            yield None
+            return
+        with self.usage_meter.request() as usage:
+            yield usage
+
+    def _execute(self, request: Request, t0: float) -> Request:
+        request.start = time.time() - t0
+        print(
+            f"  [{request.start:8.2f}s] #{request.seq} Q{request.query_id} "
+            f"started (queued {request.queueing_delay:.2f}s)"
+        )
+        try:
+            with self._metered() as usage:
+                if self._batch_only:
+                    metric = self.runner.execute_queries([request.query_id])[
+                        request.query_id
+                    ]
+                else:
+                    metric = self.runner.execute_query(request.query_id)
+            request.status = metric.status
+            request.execution_time = metric.execution_time
+            if usage is not None:
+                request.token_usage = usage.total_tokens
+                request.money_cost = usage.cost
+            else:
+                request.token_usage = metric.token_usage
+                request.money_cost = metric.money_cost
+            request.error = metric.error
+            if metric.results is not None:
+                request.row_count = len(metric.results)
+        except Exception as e:
+            request.status = "failed"
+            request.error = str(e)
+        request.end = time.time() - t0
+        print(
+            f"  [{request.end:8.2f}s] #{request.seq} Q{request.query_id} "
+            f"{request.status} after {request.service_time:.2f}s "
+            f"(latency {request.latency:.2f}s)"
+        )
+        return request
+
+    def run_poisson(
+        self, qps: float, requests: int, max_in_flight: int = 8
+    ) -> List[Request]:
+        """
+        Open-loop arrivals at *qps* on average.
+
+        Args:
+            qps: Mean arrival rate (queries per second)
+            requests: Number of queries to issue
+            max_in_flight: Queries executing at the same time; later
+                arrivals wait for a free slot (queueing delay)
+        """
+        issued: List[Request] = []
+        arrival = 0.0
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            futures = []
+            for seq in range(requests):
+                if seq:
+                    arrival += self._exponential(1.0 / qps)
+                delay = t0 + arrival - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                request = Request(
+                    seq=seq,
+                    query_id=self._next_query(),
+                    client=0,
+                    arrival=arrival,
+                )
+                issued.append(request)
+                futures.append(pool.submit(self._execute, request, t0))
+            for future in futures:
+                future.result()
+        return issued
+
+    def run_closed(
+        self,
+        clients: int,
+        requests: int,
+        think_time: float = 0.0,
+    ) -> List[Request]:
+        """
+        Closed-loop arrivals: *clients* users that each issue their next
+        query an exponential think time after the previous one finished.
+
+        Args:
+            clients: Number of concurrent users
+            requests: Number of queries to issue in total
+            think_time: Mean think time between a user's queries (seconds)
+        """
+        issued: List[Request] = []
+        lock = threading.Lock()
+        t0 = time.time()
+
+        def _client(client: int) -> None:
+            while True:
+                with lock:
+                    if len(issued) >= requests:
+                        return
+                    request = Request(
+                        seq=len(issued),
+                        query_id=self._next_query(),
+                        client=client,
+                        arrival=time.time() - t0,
+                    )
+                    issued.append(request)
+                self._execute(request, t0)
+                time.sleep(self._exponential(think_time))
+
+        threads = [
+            threading.Thread(target=_client, args=(c,), daemon=True)
+            for c in range(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return issued
+
+
+def summarize(requests: List[Request]) -> WorkloadSummary:
+    """Throughput, latency percentiles and cost of a finished workload."""
+    done = [r for r in requests if r.end is not None]
+    succeeded = [r for r in done if r.status == "success"]
+    latencies = [r.latency for r in done]
+    delays = [r.queueing_delay for r in done]
+    duration = (
+        max(r.end for r in done) - min(r.arrival for r in done) if done else 0
+    )
+    total_cost = sum(r.money_cost or 0.0 for r in done)
+    return WorkloadSummary(
+        requests=len(requests),
+        succeeded=len(succeeded),
+        failed=len(done) - len(succeeded),
+        duration=duration,
+        throughput=len(succeeded) / duration if duration else 0.0,
+        latency_p50=_percentile(latencies, 50),
+        latency_p95=_percentile(latencies, 95),
+        latency_p99=_percentile(latencies, 99),
+        latency_mean=float(np.mean(latencies)) if done else 0.0,
+        queueing_delay_mean=float(np.mean(delays)) if done else 0.0,
+        queueing_delay_p95=_percentile(delays, 95),
+        service_time_mean=(
+            float(np.mean([r.service_time for r in done])) if done else 0.0
+        ),
+        total_cost=total_cost,
+        cost_per_query=total_cost / len(done) if done else 0.0,
+        total_tokens=int(sum(r.token_usage or 0 for r in done)),
+    )
+
+
+def query_records(
+    requests: List[Request], runner: Any
+) -> Dict[str, Dict[str, Any]]:
+    """
+    One metrics record per query of the mix, in the layout of the run.py
+    metrics files: execution_time is the mean service time under
+    contention, token_usage and money_cost the means per request.
+    """
+    records = {}
+    for query_id in sorted({r.query_id for r in requests}):
+        runs = [
+            r for r in requests if r.query_id == query_id and r.end is not None
+        ]
+        succeeded = [r for r in runs if r.status == "success"]
+        measured = succeeded or runs
+        if not measured:
+            continue
+        latencies = [r.latency for r in measured]
+        errors = [r.error for r in runs if r.error]
+        record = {
+            "query_id": query_id,
+            "status": "success" if succeeded else "failed",
+            "execution_time": float(
+                np.mean([r.service_time for r in measured])
+            ),
+            "token_usage": int(np.mean([r.token_usage or 0 for r in measured])),
+            "money_cost": float(np.mean([r.money_cost or 0 for r in measured])),
+            "row_count": measured[-1].row_count or 0,
+            "requests": len(runs),
+            "failed_requests": len(runs) - len(succeeded),
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p95": _percentile(latencies, 95),
+            "latency_p99": _percentile(latencies, 99),
+            "queueing_delay": float(
+                np.mean([r.queueing_delay for r in measured])
+            ),
+            "model_name": runner.model_name,
+            "concurrent_llm_worker": runner.concurrent_llm_worker,
+            "scale_factor": runner.scale_factor,
+        }
+        if errors:
+            record["error"] = errors[-1]
+        records[f"Q{query_id}"] = record
+    return records
+
+
+def write_outputs(
+    requests: List[Request],
+    summary: WorkloadSummary,
+    runner: Any,
+    label: str,
+    settings: Dict[str, Any],
+) -> Path:
+    """
+    Write the metrics folder, summary and request log of a workload.
+
+    Returns:
+        The metrics folder
+    """
+    files_path = PROJECT_ROOT / "files" / runner.use_case
+    metrics_dir = files_path / "metrics" / f"workload_{label}"
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    with open(metrics_dir / f"{runner.get_system_name()}.json", "w") as f:
+        json.dump(query_records(requests, runner), f, indent=2)
+
+    workloads_dir = files_path / "workloads"
+    workloads_dir.mkdir(parents=True, exist_ok=True)
+    with open(workloads_dir / f"{label}.json", "w") as f:
+        json.dump(
+            {"settings": settings, "summary": asdict(summary)}, f, indent=2
+        )
+    rows = [
+        {
+            **asdict(r),
+            "queueing_delay": r.queueing_delay if r.end is not None else None,
+            "latency": r.latency if r.end is not None else None,
+        }
+        for r in requests
+    ]
+    pd.DataFrame(rows).to_csv(
+        workloads_dir / f"{label}.requests.csv", index=False
+    )
+    return metrics_dir
+
+
+def print_summary(summary: WorkloadSummary) -> None:
+    print(
+        f"\n{summary.succeeded}/{summary.requests} queries succeeded in "
+        f"{summary.duration:.1f}s: {summary.throughput:.3f} queries/s"
+    )
+    print(
+        f"  latency p50 {summary.latency_p50:.2f}s, p95 "
+        f"{summary.latency_p95:.2f}s, p99 {summary.latency_p99:.2f}s "
+        f"(mean {summary.latency_mean:.2f}s)"
+    )
+    print(
+        f"  queueing delay mean {summary.queueing_delay_mean:.2f}s, p95 "
+        f"{summary.queueing_delay_p95:.2f}s; service time mean "
+        f"{summary.service_time_mean:.2f}s"
+    )
+    print(
+        f"  cost ${summary.total_cost:.4f} (${summary.cost_per_query:.4f} "
+        f"per query), {summary.total_tokens} tokens"
+    )
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(
+        description="Serve a mix of scenario queries with one system under "
+        "concurrent arrivals"
+    )
+    parser.add_argument("--system", required=True)
+    parser.add_argument("--use-case", required=True)
+    parser.add_argument(
+        "--queries",
+        nargs="+",
+        default=None,
+        help="Query IDs of the mix (default: all queries of the system)",
+    )
+    parser.add_argument(
+        "--weights",
+        nargs="+",
+        type=float,
+        default=None,
+        help="Relative frequency of each query of --queries (default: equal)",
+    )
+    parser.add_argument(
+        "--arrival", choices=["poisson", "closed"], default="poisson"
+    )
+    parser.add_argument(
+        "--qps",
+        type=float,
+        default=None,
+        help="Target arrival rate (poisson: required; closed: sets the mean think time)",  # noqa: E501
+    )
+    parser.add_argument(
+        "--clients", type=int, default=4, help="Users of the closed loop"
+    )
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=0.0,
+        help="Mean think time of the closed loop in seconds (overridden by --qps)",  # noqa: E501
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=8,
+        help="Queries executing at the same time under poisson arrivals",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=20, help="Queries to issue in total"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--scale-factor", type=int, default=None)
+    parser.add_argument("--skip-setup", action="store_true")
+    parser.add_argument(
+        "--label",
+        default=None,
+        help="Name of the outputs (default: <system>_<arrival>_<rate>)",
+    )
+    parser.add_argument(
+        "--no-isolation",
+        action="store_true",
+        help="Run in this interpreter even if the system has its own venv",
+    )
+    args = parser.parse_args()
+
+    from run import get_runner_class, get_system_venv_python, parse_query_ids
+
+    venv_python = get_system_venv_python(args.system)
+    if (
+        venv_python
+        and not args.no_isolation
+        and Path(sys.executable).resolve() != venv_python.resolve()
+    ):
+        # Re-run the driver inside the system's venv, like run.py's workers
+        print(f"Using venv: {venv_python}")
+        os.execv(
+            str(venv_python),
+            [str(venv_python), os.path.abspath(__file__)] + sys.argv[1:],
+        )
+
+    if args.arrival == "poisson" and not args.qps:
+        parser.error("--arrival poisson requires --qps")
+    if args.requests < 1 or args.clients < 1 or args.max_in_flight < 1:
+        parser.error("--requests, --clients and --max-in-flight must be >= 1")
+
+    runner_class = get_runner_class(args.system, args.use_case)
+    if not runner_class:
+        sys.exit(1)
+    runner = runner_class(
+        use_case=args.use_case,
+        scale_factor=args.scale_factor,
+        skip_setup=args.skip_setup,
+        model_name=args.model,
+    )
+
+    query_ids = (
+        parse_query_ids(args.queries)
+        if args.queries
+        else runner._discover_queries()
+    )
+    query_ids = [int(q) for q in query_ids]
+    weights = args.weights or [1.0] * len(query_ids)
+    if len(weights) != len(query_ids):
+        parser.error("--weights needs one weight per query")
+    mix = dict(zip(query_ids, weights))
+
+    driver = WorkloadDriver(runner, mix, seed=args.seed)
+    if args.arrival == "poisson":
+        rate = f"{args.qps:g}qps"
+        print(
+            f"Poisson arrivals at {args.qps:g} queries/s, at most "
+            f"{args.max_in_flight} in flight, {args.requests} queries"
+        )
+        requests = driver.run_poisson(
+            args.qps, args.requests, args.max_in_flight
+        )
+    else:
+        think_time = args.clients / args.qps if args.qps else args.think_time
+        rate = f"{args.clients}clients"
+        print(
+            f"Closed loop with {args.clients} clients, mean think time "
+            f"{think_time:.2f}s, {args.requests} queries"
+        )
+        requests = driver.run_closed(args.clients, args.requests, think_time)
+
+    summary = summarize(requests)
+    print_summary(summary)
+    label = args.label or f"{args.system}_{args.arrival}_{rate}"
+    settings = {
+        k: v for k, v in vars(args).items() if k not in ("no_isolation",)
+    }
+    settings["mix"] = {f"Q{q}": w for q, w in mix.items()}
+    metrics_dir = write_outputs(requests, summary, runner, label, settings)
+    print(f"Metrics: {metrics_dir}")
+
+    # Background threads of some systems (LOTUS connection pools) keep the
+    # interpreter alive, like in run.py
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Regression tests for the hash-based retrieval matcher.
+
+_count_retrieval_matches() must count exactly the matches of the pairwise
+reference implementation it replaced, on seeded random frames.
+
+Usage:
+    python -m pytest -q tests/test_retrieval_matcher.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from evaluator.generic_evaluator import (  # noqa: E402
+    _count_retrieval_matches,
+    _count_retrieval_matches_pairwise,
+)
+
+SEEDS = range(20)
+
+
+def _column(rng, kind, n, nan_rate):
+    """*n* random values of *kind*, drawn from a small domain to collide."""
+    if kind == "int":
+        values = pd.Series(rng.integers(0, 4, n))
+    elif kind == "float":
+        values = pd.Series(rng.integers(0, 4, n) / 2)
+    elif kind == "str":
+        values = pd.Series(rng.choice(["a", "b", "c"], n))
+    elif kind == "bool":
+        values = pd.Series(rng.integers(0, 2, n).astype(bool))
+    elif kind == "mixed":
+        pool = np.array([1, 1.0, "1", "x", 2, True], dtype=object)
+        values = pd.Series(rng.choice(pool, n), dtype=object)
+    elif kind == "datetime":
+        values = pd.Series(
+            pd.Timestamp("2024-01-01")
+            + pd.to_timedelta(rng.integers(0, 3, n), unit="D")
+        )
+    elif kind == "dict":
+        pool = [{"k": 1}, {"k": 2}, {"k": 1, "j": 0}]
+        values = pd.Series(
+            [dict(pool[i]) for i in rng.integers(0, len(pool), n)],
+            dtype=object,
+        )
+    elif kind == "list":
+        pool = [[1], [1, 2], [2]]
+        values = pd.Series(
+            [list(pool[i]) for i in rng.integers(0, len(pool), n)],
+            dtype=object,
+        )
+    else:
+        raise ValueError(kind)
+    if nan_rate:
+        values = values.mask(rng.random(n) < nan_rate)
+    return values
+
+
+def _frame(rng, columns, n, nan_rate=0.0, duplicates=False):
+    frame = pd.DataFrame(
+        {name: _column(rng, kind, n, nan_rate) for name, kind in columns}
+    )
+    if duplicates and n:
+        # Repeat some rows verbatim
+        frame = pd.concat(
+            [frame, frame.iloc[rng.integers(0, n, n // 2)]],
+            ignore_index=True,
+        )
+    return frame.sample(frac=1, random_state=int(rng.integers(1 << 31)))
+
+
+def _outcome(count, system_results, ground_truth):
+    """Match count, or the type of the exception *count* raised."""
+    try:
+        return count(system_results, ground_truth)
+    except Exception as e:
+        return type(e)
+
+
+def _assert_same(system_results, ground_truth):
+    expected = _outcome(
+        _count_retrieval_matches_pairwise, system_results, ground_truth
+    )
+    actual = _outcome(_count_retrieval_matches, system_results, ground_truth)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_nan_wildcards(seed):
+    rng = np.random.default_rng(seed)
+    columns = [("a", "int"), ("b", "str"), ("c", "float")]
+    _assert_same(
+        _frame(rng, columns, 30, nan_rate=0.3),
+        _frame(rng, columns, 30, nan_rate=0.3),
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_duplicate_rows(seed):
+    rng = np.random.default_rng(seed)
+    columns = [("a", "int"), ("b", "str")]
+    _assert_same(
+        _frame(rng, columns, 20, nan_rate=0.1, duplicates=True),
+        _frame(rng, columns, 20, nan_rate=0.1, duplicates=True),
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_duplicate_index_labels(seed):
+    rng = np.random.default_rng(seed)
+    columns = [("a", "int"), ("b", "str")]
+    ground_truth = _frame(rng, columns, 20, duplicates=True)
+    ground_truth.index = rng.integers(0, 5, len(ground_truth))
+    _assert_same(_frame(rng, columns, 20, duplicates=True), ground_truth)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_partially_overlapping_columns(seed):
+    rng = np.random.default_rng(seed)
+    _assert_same(
+        _frame(rng, [("a", "int"), ("b", "str"), ("s", "float")], 25, 0.2),
+        _frame(rng, [("g", "bool"), ("b", "str"), ("a", "int")], 25, 0.2),
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_no_common_columns(seed):
+    rng = np.random.default_rng(seed)
+    _assert_same(
+        _frame(rng, [("a", "int")], 10), _frame(rng, [("b", "int")], 7)
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_mixed_dtypes(seed):
+    rng = np.random.default_rng(seed)
+    # The same column has different dtypes on both sides
+    _assert_same(
+        _frame(rng, [("a", "mixed"), ("b", "int"), ("c", "bool")], 30, 0.2),
+        _frame(rng, [("a", "mixed"), ("b", "float"), ("c", "mixed")], 30, 0.2),
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_datetime_columns(seed):
+    rng = np.random.default_rng(seed)
+    columns = [("t", "datetime"), ("a", "int")]
+    _assert_same(
+        _frame(rng, columns, 25, nan_rate=0.2),
+        _frame(rng, columns, 25, nan_rate=0.2),
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_unhashable_cells(seed):
+    rng = np.random.default_rng(seed)
+    columns = [("d", "dict"), ("a", "int")]
+    _assert_same(
+        _frame(rng, columns, 15, nan_rate=0.2),
+        _frame(rng, columns, 15, nan_rate=0.2),
+    )
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_list_cells(seed):
+    # pd.notna() of a longer list is an array, so both implementations may
+    # fail; they have to fail the same way
+    rng = np.random.default_rng(seed)
+    columns = [("l", "list"), ("a", "int")]
+    _assert_same(_frame(rng, columns, 15), _frame(rng, columns, 15))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_empty_frames(seed):
+    rng = np.random.default_rng(seed)
+    columns = [("a", "int"), ("b", "str")]
+    _assert_same(_frame(rng, columns, 0), _frame(rng, columns, 10))
+    _assert_same(_frame(rng, columns, 10), _frame(rng, columns, 0))